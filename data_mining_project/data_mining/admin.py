@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ClusteringRun
+
+
+@admin.register(ClusteringRun)
+class ClusteringRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'algorithm', 'dataset_id', 'n_points', 'n_clusters', 'created_at')
+    list_filter = ('algorithm',)
+    readonly_fields = ('created_at',)
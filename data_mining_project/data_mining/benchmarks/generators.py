@@ -0,0 +1,77 @@
+# benchmarks/generators.py
+# Sinh dữ liệu tổng hợp (có seed) cho các benchmark
+
+import os
+from typing import Dict, List, Any
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+def make_blobs(n: int, d: int, k: int, seed: int = 0, spread: float = 1.0) -> np.ndarray:
+    """n điểm d chiều quanh k tâm ngẫu nhiên (phân phối chuẩn)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-10, 10, size=(k, d))
+    labels = rng.integers(0, k, size=n)
+    return centers[labels] + rng.normal(scale=spread, size=(n, d))
+
+
+def make_density_data(n: int, d: int, k: int, seed: int = 0, noise: float = 0.1) -> np.ndarray:
+    """make_blobs với độ rộng cụm khác nhau, cộng một tỷ lệ `noise` điểm nhiễu đều (cho DBSCAN)."""
+    rng = np.random.default_rng(seed)
+    n_noise = int(n * noise)
+    centers = rng.uniform(-10, 10, size=(k, d))
+    labels = rng.integers(0, k, size=n - n_noise)
+    spreads = rng.uniform(0.3, 1.5, size=k)
+    blobs = centers[labels] + rng.normal(size=(n - n_noise, d)) * spreads[labels, None]
+    return np.concatenate([blobs, rng.uniform(-13, 13, size=(n_noise, d))])
+
+
+def make_sparse_data(n: int, d: int, nnz_per_row: int, k: int, seed: int = 0) -> sparse.csr_matrix:
+    """
+    Ma trận CSR (n, d) giống vector văn bản / feature hashing: mỗi dòng có
+    nnz_per_row chiều khác 0, một nửa lấy từ "từ vựng" riêng của một trong k chủ đề.
+    """
+    rng = np.random.default_rng(seed)
+    topics = rng.integers(0, d, size=(k, max(nnz_per_row * 4, 1)))
+    labels = rng.integers(0, k, size=n)
+    own = nnz_per_row // 2
+    columns = np.concatenate([
+        topics[labels[:, None], rng.integers(0, topics.shape[1], size=(n, own))],
+        rng.integers(0, d, size=(n, nnz_per_row - own)),
+    ], axis=1)
+    values = rng.exponential(size=(n, nnz_per_row))
+    matrix = sparse.csr_matrix((values.ravel(), columns.ravel(), np.arange(0, n * nnz_per_row + 1, nnz_per_row)),
+                               shape=(n, d))
+    matrix.sum_duplicates()
+    return matrix
+
+
+def points_as_dicts(data: np.ndarray) -> List[Dict[str, float]]:
+    """Định dạng UI gửi lên: [{"x": .., "y": ..}] (2D) hoặc {"f0": .., "f1": ..}."""
+    if data.shape[1] == 2:
+        return [{'x': x, 'y': y} for x, y in data.tolist()]
+    names = [f'f{j}' for j in range(data.shape[1])]
+    return [dict(zip(names, row)) for row in data.tolist()]
+
+
+def points_as_string(data: np.ndarray) -> str:
+    """Định dạng nhập tay: "x1={1,3}, x2={1.5,3.2}"."""
+    return ', '.join(
+        f"x{i + 1}={{{','.join(repr(v) for v in row)}}}" for i, row in enumerate(data.tolist())
+    )
+
+
+def categorical_records(n: int, features: List[str], categories: Dict[str, List[str]],
+                        seed: int = 0) -> List[Dict[str, str]]:
+    """n bản ghi phân loại, mỗi thuộc tính lấy ngẫu nhiên trong tập giá trị đã biết."""
+    rng = np.random.default_rng(seed)
+    columns = {f: rng.choice(categories[f], size=n).tolist() for f in features}
+    return [{f: columns[f][i] for f in features} for i in range(n)]
+
+
+def training_categories(base_dir: str, spec: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Tập giá trị của từng thuộc tính, lấy từ dataset huấn luyện."""
+    df = pd.read_csv(os.path.join(base_dir, spec['csv']), **spec.get('read_csv', {}))
+    return {f: sorted(df[f].astype(str).unique().tolist()) for f in spec['features']}
@@ -0,0 +1,65 @@
+# benchmarks/legacy.py
+# Bản cũ của các hàm đã được viết lại, giữ để benchmark so sánh
+
+from typing import List
+
+import numpy as np
+
+
+def legacy_parse_points_from_string(points_str: str) -> List[List[float]]:
+    """
+    parse_points_from_string trước khi chuyển sang parser regex/numpy
+    (tách theo dấu phẩy, bỏ qua mọi token không parse được).
+    """
+    points = []
+    # Tách theo dấu phẩy giữa các điểm
+    point_strings = points_str.split(',')
+    
+    current_point = []
+    for part in point_strings:
+        # Tìm các số trong phần này
+        if '{' in part:
+            # Bắt đầu điểm mới
+            current_point = []
+            # Lấy số sau dấu {
+            numbers = part.split('{')[1].strip()
+            if '}' in numbers:
+                numbers = numbers.split('}')[0]
+            # Tách các số
+            for num_str in numbers.split(','):
+                try:
+                    current_point.append(float(num_str.strip()))
+                except:
+                    pass
+        elif '}' in part:
+            # Kết thúc điểm
+            numbers = part.split('}')[0].strip()
+            for num_str in numbers.split(','):
+                try:
+                    current_point.append(float(num_str.strip()))
+                except:
+                    pass
+            if current_point:
+                points.append(current_point)
+                current_point = []
+        else:
+            # Tiếp tục điểm hiện tại
+            try:
+                current_point.append(float(part.strip()))
+            except:
+                pass
+    
+    return points
+
+
+def legacy_assign_clusters(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    KMeansClustering._assign_clusters trước khi chuyển sang tính theo chunk
+    bằng ma trận (một vòng lặp Python cho mỗi điểm và mỗi centroid).
+    """
+    n_samples = data.shape[0]
+    labels = np.zeros(n_samples, dtype=int)
+    for i in range(n_samples):
+        distances = [np.sqrt(np.sum((data[i] - centroid) ** 2)) for centroid in centroids]
+        labels[i] = np.argmin(distances)
+    return labels
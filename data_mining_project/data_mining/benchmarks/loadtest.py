@@ -0,0 +1,350 @@
+# benchmarks/loadtest.py
+# Bộ sinh tải open-loop (asyncio + HTTP/1.1 keep-alive) cho API data_mining
+
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from .generators import make_blobs, points_as_dicts, categorical_records, training_categories
+from .suites import CLASSIFIER_ENDPOINTS
+
+
+# method, path, body (bytes); mỗi kịch bản có nhiều biến thể để tránh cache phía server
+RequestTemplate = namedtuple('RequestTemplate', ['method', 'path', 'body'])
+
+# Tên kịch bản -> (loại, tham số)
+SCENARIOS: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    'predict.gini': ('predict', {'model': 'GINI_CART'}),
+    'predict.id3': ('predict', {'model': 'ID3_Entropy'}),
+    'predict.naivebayes': ('predict', {'model': 'NAIVE_BAYES'}),
+    'kmeans.small': ('kmeans', {'n': 100, 'k': 3}),
+    'kmeans.medium': ('kmeans', {'n': 1000, 'k': 4}),
+    'kmeans.large': ('kmeans', {'n': 10000, 'k': 5}),
+}
+
+DEFAULT_MIX = 'predict.gini=3,predict.id3=3,predict.naivebayes=3,kmeans.small=2,kmeans.medium=1'
+
+KMEANS_MAX_ITERS = 20
+VARIANTS_PER_SCENARIO = 16
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'predict.gini=3,kmeans.small=1' -> {'predict.gini': 3.0, 'kmeans.small': 1.0}."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise ValueError(f"Kịch bản không hợp lệ: '{name}'. Chọn trong: {', '.join(SCENARIOS)}")
+        mix[name] = float(weight) if weight else 1.0
+        if mix[name] < 0:
+            raise ValueError(f"Trọng số âm cho '{name}'")
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Mix rỗng")
+    return mix
+
+
+def build_templates(mix: Dict[str, float], base_dir: str, seed: int = 0) -> Dict[str, List[RequestTemplate]]:
+    """Dựng sẵn (và encode sẵn) body request cho từng kịch bản trong mix."""
+    from data_mining.service.training import TRAINING_CONFIGS
+
+    templates = {}
+    for name in mix:
+        kind, params = SCENARIOS[name]
+        if kind == 'predict':
+            spec = TRAINING_CONFIGS[params['model']]
+            categories = training_categories(base_dir, spec)
+            records = categorical_records(VARIANTS_PER_SCENARIO, spec['features'], categories, seed=seed)
+            path = CLASSIFIER_ENDPOINTS[params['model']]
+            # UI luôn gửi 'Temp'; view tự chuẩn hóa tên thuộc tính
+            templates[name] = [
+                RequestTemplate('POST', path, json.dumps(
+                    {('Temp' if f == 'Temperature' else f): v for f, v in r.items()}
+                ).encode('utf-8'))
+                for r in records
+            ]
+        else:
+            templates[name] = [
+                RequestTemplate('POST', '/data_mining/cluster/kmeans/', json.dumps({
+                    'points': points_as_dicts(make_blobs(params['n'], 2, params['k'], seed=seed + i)),
+                    'k': params['k'],
+                    'max_iters': KMEANS_MAX_ITERS,
+                }).encode('utf-8'))
+                for i in range(VARIANTS_PER_SCENARIO)
+            ]
+    return templates
+
+
+# ====================================================================
+# A. HTTP CLIENT TỐI GIẢN (HTTP/1.1 keep-alive trên asyncio streams)
+# ====================================================================
+
+class HttpError(Exception):
+    pass
+
+
+class _Connection:
+    """Một kết nối TCP keep-alive; gửi request tuần tự (không pipelining)."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes) -> Tuple[int, bytes]:
+        try:
+            return await self._request(method, path, body)
+        except BaseException:
+            # Lỗi/timeout giữa chừng: trạng thái kết nối không xác định, mở lại lần sau
+            self.close()
+            raise
+
+    async def _request(self, method: str, path: str, body: bytes) -> Tuple[int, bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: keep-alive\r\n\r\n"
+        ).encode('latin-1')
+        self.writer.write(head + body)
+        await self.writer.drain()
+        return await self._read_response()
+
+    async def _read_response(self) -> Tuple[int, bytes]:
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise HttpError("Server đóng kết nối")
+        parts = status_line.split(None, 2)
+        if len(parts) < 2:
+            raise HttpError(f"Status line không hợp lệ: {status_line!r}")
+        status = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await self._read_chunked()
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            headers['connection'] = 'close'
+
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, body
+
+    async def _read_chunked(self) -> bytes:
+        chunks = []
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await self.reader.readline()
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class ConnectionPool:
+    """Tối đa `size` kết nối; request chờ khi mọi kết nối đang bận."""
+
+    def __init__(self, host: str, port: int, size: int):
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(_Connection(host, port))
+
+    async def request(self, method: str, path: str, body: bytes) -> Tuple[int, bytes]:
+        conn = await self._idle.get()
+        try:
+            return await conn.request(method, path, body)
+        finally:
+            self._idle.put_nowait(conn)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+# ====================================================================
+# B. VÒNG SINH TẢI OPEN-LOOP
+# ====================================================================
+
+async def _run_async(url: str, templates: Dict[str, List[RequestTemplate]], mix: Dict[str, float],
+                     rps: float, duration: float, warmup: float, connections: int,
+                     timeout: float, arrival: str, seed: int) -> Dict[str, Any]:
+    target = urlsplit(url)
+    pool = ConnectionPool(target.hostname, target.port or 80, connections)
+    prefix = target.path.rstrip('/')
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+
+    samples: List[Tuple[str, float, float, int, Optional[str]]] = []   # (kịch bản, t gửi, latency, status, lỗi)
+    tasks = set()
+
+    async def fire(name: str, template: RequestTemplate, scheduled: float):
+        status, error = 0, None
+        try:
+            status, _ = await asyncio.wait_for(
+                pool.request(template.method, prefix + template.path, template.body), timeout
+            )
+        except asyncio.TimeoutError:
+            error = 'timeout'
+        except (OSError, HttpError, asyncio.IncompleteReadError) as e:
+            error = type(e).__name__
+        # Latency tính từ thời điểm lẽ ra phải gửi (tránh coordinated omission
+        # khi mọi kết nối đang bận)
+        samples.append((name, scheduled, time.perf_counter() - scheduled, status, error))
+
+    loop_start = time.perf_counter()
+    end = loop_start + warmup + duration
+    next_at = loop_start
+    interval = 1.0 / rps
+    while next_at < end:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name = rng.choices(names, weights)[0]
+        task = asyncio.ensure_future(fire(name, rng.choice(templates[name]), next_at))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        next_at += rng.expovariate(rps) if arrival == 'poisson' else interval
+
+    if tasks:
+        await asyncio.wait(list(tasks))
+    finished = time.perf_counter()
+    pool.close()
+
+    measured_from = loop_start + warmup
+    measured = [s for s in samples if s[1] >= measured_from]
+    return summarize(measured, wall_seconds=finished - measured_from, target_rps=rps)
+
+
+def run_load(url: str, templates: Dict[str, List[RequestTemplate]], mix: Dict[str, float], rps: float,
+             duration: float, warmup: float = 2.0, connections: int = 64, timeout: float = 30.0,
+             arrival: str = 'uniform', seed: int = 0) -> Dict[str, Any]:
+    """
+    Gửi request theo lịch cố định (open-loop) với tốc độ `rps` trong `duration` giây.
+
+    Lịch gửi không phụ thuộc vào việc server trả lời nhanh hay chậm, nên khi
+    server quá tải thì latency (tính từ thời điểm theo lịch) tăng lên thay vì
+    tốc độ gửi tự giảm xuống.
+    """
+    return asyncio.run(_run_async(url, templates, mix, rps, duration, warmup, connections,
+                                  timeout, arrival, seed))
+
+
+def _latency_stats(latencies_ms: np.ndarray) -> Dict[str, float]:
+    if len(latencies_ms) == 0:
+        return {}
+    return {
+        'mean_ms': float(latencies_ms.mean()),
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p90_ms': float(np.percentile(latencies_ms, 90)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'p999_ms': float(np.percentile(latencies_ms, 99.9)),
+        'max_ms': float(latencies_ms.max()),
+    }
+
+
+def _group_summary(rows, wall_seconds: float) -> Dict[str, Any]:
+    ok = [r for r in rows if r[4] is None and 200 <= r[3] < 300]
+    errors: Dict[str, int] = {}
+    for r in rows:
+        if r[4] is not None:
+            errors[r[4]] = errors.get(r[4], 0) + 1
+        elif not 200 <= r[3] < 300:
+            errors[f'http_{r[3]}'] = errors.get(f'http_{r[3]}', 0) + 1
+    return {
+        'requests': len(rows),
+        'ok': len(ok),
+        'error_rate': (len(rows) - len(ok)) / len(rows) if rows else 0.0,
+        'errors': errors,
+        'throughput_rps': len(ok) / wall_seconds if wall_seconds > 0 else 0.0,
+        'latency': _latency_stats(np.array([r[2] * 1000.0 for r in ok])),
+    }
+
+
+def summarize(samples, wall_seconds: float, target_rps: float) -> Dict[str, Any]:
+    """Tổng hợp theo toàn bộ và theo từng kịch bản."""
+    by_scenario: Dict[str, list] = {}
+    for s in samples:
+        by_scenario.setdefault(s[0], []).append(s)
+    return {
+        'target_rps': target_rps,
+        'wall_seconds': wall_seconds,
+        'total': _group_summary(samples, wall_seconds),
+        'scenarios': {name: _group_summary(rows, wall_seconds) for name, rows in sorted(by_scenario.items())},
+    }
+
+
+# ====================================================================
+# C. KHỞI ĐỘNG SERVER CỤC BỘ
+# ====================================================================
+
+def start_server(command: Optional[str], port: int, cwd: str, ready_timeout: float = 60.0) -> subprocess.Popen:
+    """
+    Chạy server trong tiến trình con và chờ tới khi nhận kết nối.
+
+    command mặc định là `manage.py runserver --noreload`; có thể thay bằng
+    lệnh khác (gunicorn, uvicorn...) để so sánh các chế độ phục vụ, với
+    '{port}' được thay bằng cổng.
+    """
+    # Nhóm tiến trình riêng để dừng được cả các worker con (gunicorn, shell...)
+    if command:
+        proc = subprocess.Popen(command.format(port=port), shell=True, cwd=cwd, start_new_session=True)
+    else:
+        proc = subprocess.Popen(
+            [sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{port}'],
+            cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+        )
+
+    deadline = time.monotonic() + ready_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server thoát sớm với mã {proc.returncode}")
+        try:
+            asyncio.run(_probe(port))
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    stop_server(proc)
+    raise RuntimeError(f"Server không sẵn sàng sau {ready_timeout:.0f} giây")
+
+
+async def _probe(port: int):
+    _, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.close()
+
+
+def stop_server(proc: subprocess.Popen):
+    if proc.poll() is None:
+        os.killpg(proc.pid, signal.SIGTERM)
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
@@ -0,0 +1,128 @@
+# benchmarks/runner.py
+# Đo thời gian (percentile), bộ nhớ đỉnh và so sánh với baseline
+
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Any, Optional
+
+import numpy as np
+
+
+# Chênh lệch tuyệt đối tối thiểu (ms) để một case bị coi là chậm đi
+DEFAULT_MIN_DELTA_MS = 1.0
+# Baseline lưu trong repo (profile quick)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def measure(fn: Callable[[], Any], repeat: int = 20, warmup: int = 2,
+            min_seconds: float = 0.0) -> Dict[str, float]:
+    """
+    Chạy fn nhiều lần và trả về thống kê thời gian (ms) + bộ nhớ đỉnh (bytes).
+
+    Bộ nhớ đỉnh đo trong một lần chạy riêng dưới tracemalloc để không làm
+    sai lệch số đo thời gian.
+    """
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start_all = time.perf_counter()
+        while len(timings) < repeat or time.perf_counter() - start_all < min_seconds:
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000.0)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    t = np.asarray(timings)
+    return {
+        'runs': int(len(t)),
+        'mean_ms': float(t.mean()),
+        'min_ms': float(t.min()),
+        'p50_ms': float(np.percentile(t, 50)),
+        'p90_ms': float(np.percentile(t, 90)),
+        'p99_ms': float(np.percentile(t, 99)),
+        'max_ms': float(t.max()),
+        'peak_memory_bytes': int(peak),
+    }
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    """Khóa so sánh: tên case + tham số (n, d, k, batch...)."""
+    params = ','.join(f'{k}={v}' for k, v in sorted(result['params'].items()))
+    return f"{result['name']}[{params}]"
+
+
+def environment() -> Dict[str, str]:
+    import numpy
+    return {
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float,
+            metric: str = 'p50_ms', min_delta_ms: float = DEFAULT_MIN_DELTA_MS) -> List[Dict[str, Any]]:
+    """
+    So sánh từng case với baseline.
+
+    Case rất nhanh dao động vài chục % giữa các lần chạy, nên ngoài tỷ lệ còn
+    cần chênh lệch tuyệt đối vượt ngưỡng nhiễu: max(min_delta_ms, p90 - p50
+    của baseline).
+
+    Returns:
+        Danh sách {'key', 'baseline', 'current', 'ratio', 'noise_ms', 'regression'};
+        regression=True khi current > baseline * (1 + threshold) và
+        current - baseline > noise_ms.
+    """
+    previous = {result_key(r): r for r in baseline.get('results', [])}
+    rows = []
+    for r in results:
+        key = result_key(r)
+        if key not in previous:
+            continue
+        stats = previous[key]['stats']
+        base = stats[metric]
+        current = r['stats'][metric]
+        ratio = current / base if base > 0 else float('inf')
+        noise = max(min_delta_ms, stats.get('p90_ms', base) - stats.get('p50_ms', base))
+        rows.append({
+            'key': key,
+            'baseline': base,
+            'current': current,
+            'ratio': ratio,
+            'noise_ms': noise,
+            'regression': ratio > 1.0 + threshold and current - base > noise,
+        })
+    return rows
+
+
+def load_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_json(path: str, data: Dict[str, Any]):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
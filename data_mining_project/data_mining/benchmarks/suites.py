@@ -0,0 +1,282 @@
+# benchmarks/suites.py
+# Các case benchmark cho đường xử lý nóng của clustering và classification
+
+import json
+import os
+from collections import namedtuple
+from typing import Dict, List, Any, Iterator
+
+import numpy as np
+
+from data_mining.service.kmeans_algorithm import (
+    KMeansClustering, WarmStart, METRICS, parse_points_from_list, parse_points_from_string
+)
+from data_mining.service.dbscan_algorithm import DBSCANClustering
+from .generators import (
+    make_blobs, make_density_data, make_sparse_data, points_as_dicts, points_as_string, categorical_records, training_categories
+)
+from .legacy import legacy_parse_points_from_string, legacy_assign_clusters
+
+
+# fn: hàm không tham số cần đo; repeat: số lần đo (None = mặc định của profile)
+Case = namedtuple('Case', ['name', 'params', 'fn', 'repeat'])
+
+# Số vòng lặp cố định để thời gian fit so sánh được giữa các lần chạy
+KMEANS_MAX_ITERS = 10
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    'quick': {
+        'repeat': 10,
+        'kmeans': [(200, 2, 3), (1000, 2, 4), (1000, 8, 8)],
+        # (n, d, số phần tử khác 0 mỗi dòng, k)
+        'kmeans_sparse': [(10000, 10000, 50, 8)],
+        # (n, d, k, tỷ lệ dòng thêm / bớt) của fit lại sau khi dữ liệu thay đổi
+        'kmeans_refit': [(100000, 8, 20, 0.01)],
+        'dbscan': [(10000, 2, 0.1, 10), (10000, 3, 0.5, 10)],
+        'parse': [1000, 10000],
+        'parse_dims': [2, 16],
+        'batch': [1, 16, 256],
+        'endpoint_points': [100, 1000],
+    },
+    'full': {
+        'repeat': 30,
+        'kmeans': [(1000, 2, 4), (10000, 2, 4), (10000, 16, 8), (50000, 2, 8)],
+        'kmeans_sparse': [(100000, 20000, 100, 20)],
+        'kmeans_refit': [(1000000, 16, 50, 0.01)],
+        'dbscan': [(100000, 2, 0.05, 10), (1000000, 2, 0.02, 10), (100000, 3, 0.2, 10)],
+        'parse': [1000, 10000, 100000],
+        'parse_dims': [2, 16, 64],
+        'batch': [1, 16, 256, 4096],
+        'endpoint_points': [100, 1000, 10000],
+    },
+}
+
+CLASSIFIER_ENDPOINTS = {
+    'GINI_CART': '/data_mining/predict/gini/',
+    'ID3_Entropy': '/data_mining/predict/id3/',
+    'NAIVE_BAYES': '/data_mining/predict/naivebayes/',
+}
+
+
+# ====================================================================
+# A. K-MEANS: fit, predict, SSE
+# ====================================================================
+
+def kmeans_cases(profile: Dict[str, Any]) -> Iterator[Case]:
+    for n, d, k in profile['kmeans']:
+        data = make_blobs(n, d, k, seed=n + d + k)
+        params = {'n': n, 'd': d, 'k': k}
+        repeat = max(3, profile['repeat'] // 5)
+
+        def fit(data=data, k=k):
+            np.random.seed(0)
+            KMeansClustering(k=k, max_iters=KMEANS_MAX_ITERS).fit(data, record_history=False)
+
+        # Model đã fit chỉ được tạo khi case predict/SSE thực sự chạy (không bị lọc bỏ)
+        fitted = _Lazy(lambda data=data, k=k: _fitted_kmeans(data, k))
+
+        yield Case('kmeans.fit', {**params, 'iters': KMEANS_MAX_ITERS}, fit, repeat)
+        yield Case('kmeans.predict', params, lambda m=fitted, x=data: m().predict(x), repeat)
+        yield Case('kmeans.sse', params,
+                   lambda m=fitted, x=data: m()._calculate_sse(x, m().labels, m().centroids), repeat)
+
+        # Bước gán cụm: chunk + ma trận so với vòng lặp theo điểm; fit đa luồng nếu có nhiều CPU
+        yield Case('kmeans.assign', params, lambda m=fitted, x=data: m()._assign_clusters(x, m().centroids), repeat)
+        yield Case('kmeans.assign.legacy', params,
+                   lambda m=fitted, x=data: legacy_assign_clusters(x, m().centroids), 3)
+        n_jobs = os.cpu_count() or 1
+        if n_jobs > 1:
+            def fit_threads(data=data, k=k, n_jobs=n_jobs):
+                np.random.seed(0)
+                KMeansClustering(k=k, max_iters=KMEANS_MAX_ITERS, n_jobs=n_jobs).fit(data, record_history=False)
+
+            yield Case('kmeans.fit.threads', {**params, 'iters': KMEANS_MAX_ITERS, 'n_jobs': n_jobs},
+                       fit_threads, repeat)
+
+
+def _fitted_kmeans(data: np.ndarray, k: int) -> KMeansClustering:
+    np.random.seed(0)
+    model = KMeansClustering(k=k, max_iters=KMEANS_MAX_ITERS)
+    model.fit(data, record_history=False)
+    return model
+
+
+def sparse_kmeans_cases(profile: Dict[str, Any]) -> Iterator[Case]:
+    """K-Means trên ma trận CSR nhiều chiều với từng metric (không chuyển sang dạng dày)."""
+    for n, d, nnz_per_row, k in profile['kmeans_sparse']:
+        data = make_sparse_data(n, d, nnz_per_row, k, seed=n + d)
+        params = {'n': n, 'd': d, 'nnz': int(data.nnz), 'k': k}
+        for metric in METRICS:
+            def fit(data=data, k=k, metric=metric):
+                np.random.seed(0)
+                KMeansClustering(k=k, max_iters=KMEANS_MAX_ITERS, metric=metric).fit(
+                    data, record_history=False, include_points=False)
+
+            yield Case('kmeans.sparse.fit', {**params, 'metric': metric, 'iters': KMEANS_MAX_ITERS}, fit, 3)
+
+
+# Fit lại chạy tới hội tụ (warm và cold cùng centroid ban đầu, cùng số vòng lặp)
+KMEANS_REFIT_MAX_ITERS = 300
+
+
+def refit_kmeans_cases(profile: Dict[str, Any]) -> Iterator[Case]:
+    """
+    Fit lại sau khi thêm/bớt một phần nhỏ dữ liệu: WarmStart (cộng trừ tổng
+    theo cụm, chỉ gán lại điểm có thể đổi cụm) so với Lloyd đầy đủ từ cùng
+    centroid ban đầu.
+    """
+    for n, d, k, fraction in profile['kmeans_refit']:
+        n_delta = max(int(n * fraction), 1)
+        points = make_blobs(n + n_delta, d, k, seed=n + d + k)
+        data, added = points[:n], points[n:]
+        removed = np.random.default_rng(0).choice(n, n_delta, replace=False)
+        keep = np.ones(n, dtype=bool)
+        keep[removed] = False
+        updated = np.concatenate([data[keep], added])
+        params = {'n': n, 'd': d, 'k': k, 'delta': n_delta}
+        base = _Lazy(lambda data=data, k=k: WarmStart.from_model(_fitted_kmeans(data, k), data))
+
+        def warm_state(base=base, data=data, added=added, removed=removed):
+            state = base()
+            state = WarmStart(state.centroids, state.sums, state.counts, state.labels, state.upper, state.lower)
+            return state.remove(removed, data[removed]).add(added)
+
+        def refit_warm(updated=updated, k=k, warm_state=warm_state):
+            KMeansClustering(k=k, max_iters=KMEANS_REFIT_MAX_ITERS).fit(
+                updated, record_history=False, include_points=False, init=warm_state())
+
+        def refit_cold(updated=updated, k=k, warm_state=warm_state):
+            KMeansClustering(k=k, max_iters=KMEANS_REFIT_MAX_ITERS).fit(
+                updated, record_history=False, include_points=False, init=warm_state().initial_centroids())
+
+        yield Case('kmeans.refit.warm', params, refit_warm, 3)
+        yield Case('kmeans.refit.cold', params, refit_cold, 3)
+
+
+class _Lazy:
+    """Giá trị tính ở lần gọi đầu tiên rồi giữ lại."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+
+    def __call__(self):
+        if self._value is None:
+            self._value = self._factory()
+        return self._value
+
+
+# ====================================================================
+# A2. DBSCAN: chỉ mục lưới (2D) và KD-tree
+# ====================================================================
+
+# KD-tree trên dữ liệu 2D chỉ đo tới kích thước này (để so với lưới)
+DBSCAN_KDTREE_MAX_2D = 100000
+
+
+def dbscan_cases(profile: Dict[str, Any]) -> Iterator[Case]:
+    for n, d, eps, min_samples in profile['dbscan']:
+        data = make_density_data(n, d, 8, seed=n + d)
+        params = {'n': n, 'd': d, 'eps': eps, 'min_samples': min_samples}
+        repeat = 1 if n >= 1000000 else 3
+        indexes = ['grid', 'kdtree'] if d <= 2 and n <= DBSCAN_KDTREE_MAX_2D else ['auto']
+        for index in indexes:
+            def fit(data=data, eps=eps, min_samples=min_samples, index=index):
+                DBSCANClustering(eps, min_samples, index=index).fit(data, include_points=False)
+
+            name = 'dbscan.fit' if index == 'auto' else f'dbscan.fit.{index}'
+            yield Case(name, params, fit, repeat)
+
+
+# ====================================================================
+# B. PARSE INPUT VÀ SERIALIZE RESPONSE
+# ====================================================================
+
+def parse_cases(profile: Dict[str, Any]) -> Iterator[Case]:
+    for n in profile['parse']:
+        data = make_blobs(n, 2, 3, seed=n)
+        as_dicts = points_as_dicts(data)
+        as_lists = data.tolist()
+        as_string = points_as_string(data)
+        yield Case('parse.points_from_list.dict', {'n': n}, lambda p=as_dicts: parse_points_from_list(p), None)
+        yield Case('parse.points_from_list.list', {'n': n}, lambda p=as_lists: parse_points_from_list(p), None)
+
+    # Chuỗi dán vào: parser regex/numpy so với bản cũ (tham số bytes -> throughput MB/s)
+    for n in profile['parse']:
+        for d in profile['parse_dims']:
+            as_string = points_as_string(make_blobs(n, d, 3, seed=n + d))
+            params = {'n': n, 'd': d, 'bytes': len(as_string)}
+            yield Case('parse.points_from_string', params, lambda s=as_string: parse_points_from_string(s), None)
+            yield Case('parse.points_from_string.legacy', params,
+                       lambda s=as_string: legacy_parse_points_from_string(s), None)
+
+    from django.http import JsonResponse
+    for n in profile['endpoint_points']:
+        data = make_blobs(n, 2, 3, seed=n)
+        np.random.seed(0)
+        result = KMeansClustering(k=3, max_iters=KMEANS_MAX_ITERS).fit(data)
+        payload = {
+            "status": "success",
+            "centroids": result['centroids'],
+            "labels": result['labels'],
+            "clusters": result['clusters'],
+            "points": data.tolist(),
+            "history": result['history'],
+        }
+        yield Case('serialize.kmeans_response', {'n': n, 'iters': result['iterations']},
+                   lambda p=payload: JsonResponse(p), None)
+
+
+# ====================================================================
+# C. CLASSIFICATION: endpoint một bản ghi và dự đoán theo lô
+# ====================================================================
+
+def classifier_cases(profile: Dict[str, Any], client, base_dir: str) -> Iterator[Case]:
+    from data_mining.service.training import TRAINING_CONFIGS
+    from data_mining.service.classification_decisionTrees_views import _run_batch_prediction
+
+    for model_name, url in CLASSIFIER_ENDPOINTS.items():
+        spec = TRAINING_CONFIGS[model_name]
+        categories = training_categories(base_dir, spec)
+        # UI luôn gửi 'Temp'; view tự chuẩn hóa tên thuộc tính
+        record = {('Temp' if f == 'Temperature' else f): v
+                  for f, v in categorical_records(1, spec['features'], categories)[0].items()}
+        body = json.dumps(record)
+
+        yield Case('endpoint.predict', {'model': model_name},
+                   lambda u=url, b=body: client.post(u, b, content_type='application/json'), None)
+
+        for batch in profile['batch']:
+            records = categorical_records(batch, spec['features'], categories, seed=batch)
+            columns = {f: np.array([r[f] for r in records]) for f in spec['features']}
+            yield Case('predict.batch', {'model': model_name, 'batch': batch},
+                       lambda m=model_name, c=columns: _run_batch_prediction(m, c), None)
+
+
+def clustering_endpoint_cases(profile: Dict[str, Any], client) -> Iterator[Case]:
+    for n in profile['endpoint_points']:
+        data = make_blobs(n, 2, 3, seed=n)
+        body = json.dumps({'points': points_as_dicts(data), 'k': 3, 'max_iters': KMEANS_MAX_ITERS})
+
+        def post(b=body):
+            np.random.seed(0)
+            return client.post('/data_mining/cluster/kmeans/', b, content_type='application/json')
+
+        yield Case('endpoint.kmeans', {'n': n, 'k': 3}, post, max(3, profile['repeat'] // 5))
+
+        dbscan_body = json.dumps({'points': points_as_dicts(data), 'eps': 0.3, 'min_samples': 5})
+        yield Case('endpoint.dbscan', {'n': n, 'eps': 0.3},
+                   lambda b=dbscan_body: client.post('/data_mining/cluster/dbscan/', b,
+                                                     content_type='application/json'),
+                   max(3, profile['repeat'] // 5))
+
+
+def all_cases(profile_name: str, client, base_dir: str) -> Iterator[Case]:
+    profile = PROFILES[profile_name]
+    yield from kmeans_cases(profile)
+    yield from sparse_kmeans_cases(profile)
+    yield from refit_kmeans_cases(profile)
+    yield from dbscan_cases(profile)
+    yield from parse_cases(profile)
+    yield from classifier_cases(profile, client, base_dir)
+    yield from clustering_endpoint_cases(profile, client)
@@ -0,0 +1,81 @@
+# management/commands/evaluate_models.py
+# Đánh giá chéo k-fold + tìm siêu tham số cho GINI, ID3 và Naive Bayes
+
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from data_mining.service.model_evaluation import DEFAULT_PILOT_CONFIGS, PARAM_GRIDS, run_evaluation, write_report
+from data_mining.service.training import TRAINING_CONFIGS
+
+
+class Command(BaseCommand):
+    help = (
+        "Chạy k-fold cross-validation trên lưới siêu tham số (max_depth, min_samples_leaf, alpha) "
+        "cho các models phân lớp, song song trên process pool, và ghi báo cáo JSON/CSV."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*',
+                            help=f"Model cần đánh giá (mặc định: {', '.join(PARAM_GRIDS)})")
+        parser.add_argument('--folds', type=int, default=5, help="Số fold (mặc định: 5)")
+        parser.add_argument('--jobs', type=int, default=None,
+                            help="Số tiến trình song song (mặc định: số CPU)")
+        parser.add_argument('--no-early-stopping', action='store_true',
+                            help="Luôn chạy đủ tất cả các fold cho mọi cấu hình")
+        parser.add_argument('--tolerance', type=float, default=0.0,
+                            help="Biên cho early stopping so với cấu hình tốt nhất của lượt đầu")
+        parser.add_argument('--pilot', type=int, default=DEFAULT_PILOT_CONFIGS,
+                            help="Số cấu hình mỗi model chạy đủ fold ở lượt đầu để đặt ngưỡng dừng sớm "
+                                 f"(mặc định: {DEFAULT_PILOT_CONFIGS})")
+        parser.add_argument('--config', default=None,
+                            help="File JSON thay thế/bổ sung dataset trong TRAINING_CONFIGS")
+        parser.add_argument('--grid', default=None,
+                            help="File JSON thay thế/bổ sung PARAM_GRIDS")
+        parser.add_argument('--output', action='append', default=[],
+                            help="File báo cáo (.json hoặc .csv), có thể lặp lại")
+
+    def handle(self, *args, **options):
+        configs = dict(TRAINING_CONFIGS)
+        grids = dict(PARAM_GRIDS)
+        if options['config']:
+            with open(options['config'], 'r', encoding='utf-8') as f:
+                configs.update(json.load(f))
+        if options['grid']:
+            with open(options['grid'], 'r', encoding='utf-8') as f:
+                grids.update(json.load(f))
+
+        names = options['models'] or list(PARAM_GRIDS)
+        unknown = [name for name in names if name not in grids or name not in configs]
+        if unknown:
+            raise CommandError(f"Model không có dataset hoặc lưới tham số: {', '.join(unknown)}")
+
+        report = run_evaluation(
+            names, str(settings.BASE_DIR), n_splits=options['folds'], grids=grids,
+            configs=configs, n_jobs=options['jobs'],
+            early_stopping=not options['no_early_stopping'], tolerance=options['tolerance'],
+            pilot_configs=options['pilot'],
+        )
+
+        for name in names:
+            info = report['datasets'][name]
+            rows = [r for r in report['results'] if r['model'] == name]
+            pruned = sum(r['pruned'] for r in rows)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name}: {info['rows']} dòng, {info['folds']} folds, "
+                f"{len(rows)} cấu hình ({pruned} dừng sớm)"
+            ))
+            for r in rows[:5]:
+                self.stdout.write(
+                    f"  acc={r['mean_accuracy']:.4f}±{r['std_accuracy']:.4f} "
+                    f"f1={r['mean_f1_macro']:.4f} fit={r['fit_seconds'] * 1000:.1f}ms "
+                    f"{json.dumps(r['params'])}" + (" [dừng sớm]" if r['pruned'] else "")
+                )
+        self.stdout.write(f"Tổng thời gian: {report['total_seconds']:.2f}s")
+
+        for path in options['output']:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            write_report(report, path)
+            self.stdout.write(self.style.SUCCESS(f"Đã ghi báo cáo: {path}"))
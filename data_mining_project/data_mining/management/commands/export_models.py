@@ -0,0 +1,111 @@
+# management/commands/export_models.py
+# Xuất các model phân loại đang phục vụ sang định dạng gọn .npz + manifest JSON (không pickle)
+
+import itertools
+import os
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from data_mining.service.compact_models import (
+    export_pipeline, export_naive_bayes_counts, save_compact, load_compact
+)
+from data_mining.service.naive_bayes import CategoricalNaiveBayes
+
+
+# Số bản ghi tối đa dùng để so khớp dự đoán giữa model gốc và model gọn
+VERIFY_MAX_RECORDS = 20000
+UNKNOWN_VALUE = '__unknown__'
+
+
+class Command(BaseCommand):
+    help = (
+        "Làm phẳng pipeline/encoder (joblib) hoặc bảng đếm Naive Bayes thành <tên>.compact.npz + "
+        "<tên>.compact.json. Server ưu tiên tải định dạng này (nhanh, không cần sklearn) "
+        "khi nó còn khớp với file nguồn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help="Tên model (mặc định: tất cả)")
+        parser.add_argument('--model-dir', default=None,
+                            help="Thư mục model (mặc định: data_mining/models)")
+        parser.add_argument('--no-verify', action='store_true',
+                            help="Bỏ qua bước so khớp dự đoán với model gốc")
+
+    def handle(self, *args, **options):
+        from data_mining.service.classification_decisionTrees_views import MODEL_CONFIGS
+
+        names = options['models'] or list(MODEL_CONFIGS)
+        unknown = [name for name in names if name not in MODEL_CONFIGS]
+        if unknown:
+            raise CommandError(f"Model không được cấu hình: {', '.join(unknown)}")
+        model_dir = options['model_dir'] or os.path.join(str(settings.BASE_DIR), 'data_mining', 'models')
+
+        failed = []
+        for name in names:
+            try:
+                arrays_path, manifest_path, reference = self._export(name, MODEL_CONFIGS[name], model_dir)
+                start = time.perf_counter()
+                compact = load_compact(arrays_path, manifest_path, mmap=True)
+                load_ms = (time.perf_counter() - start) * 1000
+                checked = 0 if options['no_verify'] else _verify(compact, reference)
+            except Exception as e:
+                failed.append(name)
+                self.stderr.write(self.style.ERROR(f"[LỖI] {name}: {e}"))
+                continue
+            size = os.path.getsize(arrays_path) + os.path.getsize(manifest_path)
+            verified = f", khớp {checked} bản ghi" if checked else ""
+            self.stdout.write(self.style.SUCCESS(
+                f"[OK] {name}: {compact.kind}, {size} byte, tải {load_ms:.2f} ms{verified}"
+            ))
+
+        if failed:
+            raise CommandError(f"Xuất thất bại: {', '.join(failed)}")
+
+    def _export(self, name, config, model_dir):
+        """Xuất đúng nguồn mà server đang dùng: bảng đếm nếu có, ngược lại pipeline + encoder."""
+        counts_path = os.path.join(model_dir, config['counts']) if config.get('counts') else None
+        if counts_path and os.path.exists(counts_path):
+            model = CategoricalNaiveBayes.load(counts_path)
+            manifest, arrays = export_naive_bayes_counts(model)
+            paths = save_compact(model_dir, name, manifest, arrays, sources=[counts_path])
+            return paths + (model.predict,)
+
+        import joblib
+        import pandas as pd
+
+        pipeline_path = os.path.join(model_dir, config['pipeline'])
+        encoder_path = os.path.join(model_dir, config['encoder'])
+        pipeline = joblib.load(pipeline_path)
+        encoder = joblib.load(encoder_path)
+        features = config['features']
+        manifest, arrays = export_pipeline(pipeline, encoder, features)
+        paths = save_compact(model_dir, name, manifest, arrays, sources=[pipeline_path, encoder_path])
+
+        def reference(rows):
+            df = pd.DataFrame(rows, columns=features)
+            return encoder.inverse_transform(pipeline.predict(df)).tolist()
+        return paths + (reference,)
+
+
+def _verify(compact, reference) -> int:
+    """
+    So khớp dự đoán của model gọn với model gốc trên mọi tổ hợp category
+    (cộng một giá trị lạ cho mỗi feature), lấy mẫu nếu quá nhiều.
+    """
+    vocabularies = [values + [UNKNOWN_VALUE] for values in compact.categories_]
+    total = int(np.prod([len(v) for v in vocabularies]))
+    if total <= VERIFY_MAX_RECORDS:
+        rows = [list(r) for r in itertools.product(*vocabularies)]
+    else:
+        rng = np.random.default_rng(0)
+        rows = [[v[rng.integers(len(v))] for v in vocabularies] for _ in range(VERIFY_MAX_RECORDS)]
+
+    expected = [str(label) for label in reference(rows)]
+    actual = compact.predict(rows)
+    mismatches = [i for i, (a, b) in enumerate(zip(expected, actual)) if a != b]
+    if mismatches:
+        raise ValueError(f"{len(mismatches)}/{len(rows)} dự đoán khác model gốc, ví dụ {rows[mismatches[0]]}")
+    return len(rows)
@@ -0,0 +1,79 @@
+# management/commands/kmeans_distributed.py
+# Coordinator K-Means phân tán: worker cục bộ (--local N) hoặc worker TCP (--workers)
+
+import json
+import os
+from multiprocessing import AuthenticationError
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from data_mining.service.distributed_kmeans import (
+    WorkerGroup, DistributedKMeans, WorkerError, DEFAULT_PORT, AUTHKEY_ENV
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Gom cụm K-Means trên nhiều worker. Dữ liệu: dataset_id trong kho dataset (mỗi worker "
+        "tự mở shard của mình, cùng dataset_id trên mọi máy) hoặc file .npy/.csv (coordinator "
+        "đọc rồi chia shard gửi cho worker). In kết quả dạng JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="dataset_id, hoặc đường dẫn file .npy / .csv")
+        parser.add_argument('-k', type=int, required=True, help="Số cụm")
+        parser.add_argument('--local', type=int, default=None, metavar='N',
+                            help="Khởi động N worker cục bộ (mặc định nếu không có --workers: 2)")
+        parser.add_argument('--workers', default=None,
+                            help=f"Danh sách host:port của worker TCP, phân tách bằng dấu phẩy "
+                                 f"(cổng mặc định {DEFAULT_PORT})")
+        parser.add_argument('--authkey', default=None, help=f"Khóa xác thực (hoặc {AUTHKEY_ENV})")
+        parser.add_argument('-c', '--columns', default=None, help="Các cột số, phân tách bằng dấu phẩy")
+        parser.add_argument('--max-iters', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--labels', default=None, help="Ghi nhãn của mọi điểm ra file .npy")
+
+    def handle(self, *args, **options):
+        if options['k'] < 1:
+            raise CommandError("Số cụm k phải >= 1")
+        columns = options['columns'].split(',') if options['columns'] else None
+        try:
+            group = self._workers(options)
+        except (OSError, ValueError, AuthenticationError) as e:
+            raise CommandError(f"Không kết nối được worker: {e}")
+
+        with group:
+            try:
+                self._load(group, options['source'], columns)
+                kmeans = DistributedKMeans(options['k'], max_iters=options['max_iters'])
+                result = kmeans.fit(group, seed=options['seed'])
+                if options['labels']:
+                    np.save(options['labels'], kmeans.labels(group))
+            except (WorkerError, ValueError) as e:
+                raise CommandError(str(e))
+        self.stdout.write(json.dumps(result, ensure_ascii=False, indent=2))
+
+    def _workers(self, options) -> WorkerGroup:
+        if not options['workers']:
+            return WorkerGroup.local(options['local'] or 2)
+        authkey = options['authkey'] or os.environ.get(AUTHKEY_ENV)
+        if not authkey:
+            raise ValueError(f"cần authkey (--authkey hoặc {AUTHKEY_ENV})")
+        addresses = []
+        for item in options['workers'].split(','):
+            host, _, port = item.strip().rpartition(':')
+            addresses.append((host, int(port)) if host else (port, DEFAULT_PORT))
+        return WorkerGroup.connect(addresses, authkey.encode())
+
+    def _load(self, group: WorkerGroup, source: str, columns):
+        if source.endswith('.npy'):
+            data = np.load(source, mmap_mode='r')
+            group.scatter(data if columns is None else data[:, [int(c) for c in columns]])
+        elif source.endswith('.csv'):
+            import pandas as pd
+
+            frame = pd.read_csv(source, usecols=columns)
+            group.scatter(frame.select_dtypes('number').to_numpy(dtype=np.float64))
+        else:
+            group.load_dataset(source, columns)
@@ -0,0 +1,35 @@
+# management/commands/kmeans_worker.py
+# Worker K-Means phân tán qua TCP (xem data_mining/service/distributed_kmeans.py)
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_mining.service.distributed_kmeans import serve_forever, DEFAULT_PORT, AUTHKEY_ENV
+from data_mining.service.kmeans_algorithm import DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Chạy một worker K-Means: giữ một shard dữ liệu và trả về tổng theo cụm cho "
+        "coordinator (manage.py kmeans_distributed --workers host:port,...). "
+        f"authkey lấy từ --authkey hoặc biến môi trường {AUTHKEY_ENV}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1',
+                            help="Địa chỉ lắng nghe (0.0.0.0 để nhận kết nối từ máy khác)")
+        parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+        parser.add_argument('--authkey', default=None, help="Khóa xác thực dùng chung với coordinator")
+        parser.add_argument('-j', '--jobs', type=int, default=1, help="Số thread gán cụm trong worker")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        authkey = options['authkey'] or os.environ.get(AUTHKEY_ENV)
+        if not authkey:
+            raise CommandError(f"Cần authkey (--authkey hoặc {AUTHKEY_ENV}): message được pickle")
+        try:
+            serve_forever((options['host'], options['port']), authkey.encode(), n_jobs=options['jobs'],
+                          chunk_size=options['chunk_size'], log=self.stdout.write)
+        except KeyboardInterrupt:
+            self.stdout.write("Dừng worker")
@@ -0,0 +1,117 @@
+# management/commands/loadtest.py
+# Sinh tải open-loop vào API data_mining và báo cáo throughput, percentile latency, tỷ lệ lỗi
+
+import os
+import socket
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from data_mining.benchmarks.loadtest import (
+    SCENARIOS, DEFAULT_MIX, parse_mix, build_templates, run_load, start_server, stop_server
+)
+from data_mining.benchmarks.runner import environment, save_json
+
+
+class Command(BaseCommand):
+    help = (
+        "Gửi tải với tốc độ cố định (RPS) theo mix kịch bản dự đoán/K-Means vào một server "
+        "(tự khởi động runserver cục bộ nếu không chỉ định --url), rồi báo cáo throughput, "
+        "percentile latency và tỷ lệ lỗi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None,
+                            help="Server đích, ví dụ http://127.0.0.1:8000 (mặc định: tự khởi động)")
+        parser.add_argument('--server-command', default=None,
+                            help="Lệnh khởi động server thay cho runserver, '{port}' được thay bằng cổng "
+                                 "(ví dụ: \"gunicorn -w 4 -b 127.0.0.1:{port} data_mining_project.wsgi\")")
+        parser.add_argument('--rps', type=float, default=50.0, help="Số request mỗi giây (mặc định: 50)")
+        parser.add_argument('--duration', type=float, default=30.0, help="Số giây đo (mặc định: 30)")
+        parser.add_argument('--warmup', type=float, default=2.0,
+                            help="Số giây chạy trước khi bắt đầu đo (mặc định: 2)")
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help=f"Trọng số kịch bản 'tên=trọng số,...'; có: {', '.join(SCENARIOS)} "
+                                 f"(mặc định: {DEFAULT_MIX})")
+        parser.add_argument('--connections', type=int, default=64,
+                            help="Số kết nối keep-alive tối đa (mặc định: 64)")
+        parser.add_argument('--timeout', type=float, default=30.0, help="Timeout mỗi request (giây)")
+        parser.add_argument('--arrival', choices=['uniform', 'poisson'], default='uniform',
+                            help="Phân phối thời điểm gửi (mặc định: uniform)")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default=None, help="File JSON kết quả")
+
+    def handle(self, *args, **options):
+        if options['rps'] <= 0 or options['duration'] <= 0:
+            raise CommandError("--rps và --duration phải > 0")
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        templates = build_templates(mix, str(settings.BASE_DIR), seed=options['seed'])
+
+        server = None
+        url = options['url']
+        if url is None:
+            port = _free_port()
+            self.stdout.write(f"Khởi động server tại cổng {port}...")
+            try:
+                server = start_server(options['server_command'], port, str(settings.BASE_DIR))
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            url = f'http://127.0.0.1:{port}'
+
+        try:
+            self.stdout.write(
+                f"Tải {options['rps']:.0f} req/s trong {options['duration']:.0f}s "
+                f"(warmup {options['warmup']:.0f}s) vào {url}"
+            )
+            report = run_load(
+                url, templates, mix, rps=options['rps'], duration=options['duration'],
+                warmup=options['warmup'], connections=options['connections'],
+                timeout=options['timeout'], arrival=options['arrival'], seed=options['seed'],
+            )
+        finally:
+            if server is not None:
+                stop_server(server)
+
+        self._print_report(report)
+
+        if options['output']:
+            report.update({
+                'mix': mix,
+                'server_command': options['server_command'] or ('runserver' if server else None),
+                'url': url,
+                'environment': environment(),
+            })
+            os.makedirs(os.path.dirname(os.path.abspath(options['output'])), exist_ok=True)
+            save_json(options['output'], report)
+            self.stdout.write(self.style.SUCCESS(f"Đã ghi: {options['output']}"))
+
+    def _print_report(self, report):
+        header = f"{'kịch bản':<22} {'req':>7} {'ok':>7} {'lỗi':>7} {'req/s':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}"
+        self.stdout.write(header)
+        rows = list(report['scenarios'].items()) + [('TỔNG', report['total'])]
+        for name, row in rows:
+            lat = row['latency']
+            cells = ' '.join(f"{lat.get(k, 0.0):7.1f}ms" for k in ('p50_ms', 'p90_ms', 'p99_ms', 'max_ms'))
+            line = (f"{name:<22} {row['requests']:>7} {row['ok']:>7} {row['error_rate']:>7.1%} "
+                    f"{row['throughput_rps']:>8.1f} {cells}")
+            style = self.style.ERROR if row['error_rate'] > 0 else (lambda s: s)
+            self.stdout.write(style(line))
+
+        total = report['total']
+        if total['errors']:
+            self.stdout.write(self.style.ERROR(f"Lỗi: {total['errors']}"))
+        if total['throughput_rps'] < report['target_rps'] * 0.95:
+            self.stdout.write(self.style.WARNING(
+                f"Chỉ đạt {total['throughput_rps']:.1f}/{report['target_rps']:.0f} req/s thành công: "
+                "server (hoặc máy sinh tải) đã bão hòa"
+            ))
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
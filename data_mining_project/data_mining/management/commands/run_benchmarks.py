@@ -0,0 +1,89 @@
+# management/commands/run_benchmarks.py
+# Chạy bộ benchmark, ghi kết quả JSON và so sánh với baseline
+
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from data_mining.benchmarks.runner import (
+    BASELINE_PATH, DEFAULT_MIN_DELTA_MS, measure, compare, environment, load_json, save_json
+)
+from data_mining.benchmarks.suites import PROFILES, all_cases
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark K-Means (fit/predict/SSE, dữ liệu sparse, fit lại warm start), DBSCAN, parse input, serialize response và 3 endpoint "
+        "phân lớp. Kết quả JSON gồm percentile thời gian và bộ nhớ đỉnh; "
+        "thoát với mã 1 nếu chậm hơn baseline quá ngưỡng."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=list(PROFILES), default='quick',
+                            help="Bộ kích thước dữ liệu (mặc định: quick)")
+        parser.add_argument('--only', action='append', default=[],
+                            help="Chỉ chạy case có tên chứa chuỗi này (có thể lặp lại)")
+        parser.add_argument('--repeat', type=int, default=None,
+                            help="Số lần đo mỗi case (ghi đè profile)")
+        parser.add_argument('--output', default=None, help="File JSON kết quả")
+        parser.add_argument('--baseline', nargs='?', const=BASELINE_PATH, default=None,
+                            help="File JSON baseline để so sánh (p50); không ghi đường dẫn -> "
+                                 "baseline lưu trong repo (benchmarks/baseline.json)")
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help="Tỷ lệ chậm đi tối đa cho phép so với baseline (mặc định: 0.25)")
+        parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA_MS,
+                            help="Chênh lệch tối thiểu (ms) để coi là chậm đi; ngưỡng nhiễu là "
+                                 f"max(giá trị này, p90 - p50 của baseline) (mặc định: {DEFAULT_MIN_DELTA_MS})")
+        parser.add_argument('--save-baseline', default=None,
+                            help="Ghi kết quả lần chạy này làm baseline mới")
+
+    def handle(self, *args, **options):
+        from django.test import Client
+        from django.test.utils import setup_test_environment
+
+        # Cho phép host 'testserver' của test client
+        setup_test_environment()
+        client = Client()
+
+        profile = PROFILES[options['profile']]
+        results = []
+        for case in all_cases(options['profile'], client, str(settings.BASE_DIR)):
+            if options['only'] and not any(pattern in case.name for pattern in options['only']):
+                continue
+            repeat = options['repeat'] or case.repeat or profile['repeat']
+            stats = measure(case.fn, repeat=repeat)
+            if 'bytes' in case.params and stats['p50_ms'] > 0:
+                stats['throughput_mb_s'] = case.params['bytes'] / 1e6 / (stats['p50_ms'] / 1000.0)
+            results.append({'name': case.name, 'params': case.params, 'stats': stats})
+            params = ' '.join(f'{k}={v}' for k, v in case.params.items())
+            throughput = f" {stats['throughput_mb_s']:8.1f}MB/s" if 'throughput_mb_s' in stats else ''
+            self.stdout.write(
+                f"{case.name:<32} {params:<36} p50={stats['p50_ms']:9.3f}ms "
+                f"p99={stats['p99_ms']:9.3f}ms peak={stats['peak_memory_bytes'] / 1024:9.1f}KiB{throughput}"
+            )
+
+        report = {'profile': options['profile'], 'environment': environment(), 'results': results}
+        for path in filter(None, [options['output'], options['save_baseline']]):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            save_json(path, report)
+            self.stdout.write(self.style.SUCCESS(f"Đã ghi: {path}"))
+
+        if options['baseline']:
+            baseline = load_json(options['baseline'])
+            if baseline is None:
+                raise CommandError(f"Không tìm thấy baseline: {options['baseline']}")
+            rows = compare(results, baseline, options['threshold'], min_delta_ms=options['min_delta'])
+            regressions = [r for r in rows if r['regression']]
+            for r in rows:
+                style = self.style.ERROR if r['regression'] else self.style.SUCCESS
+                self.stdout.write(style(
+                    f"{r['key']:<70} {r['baseline']:9.3f} -> {r['current']:9.3f}ms (x{r['ratio']:.2f}, "
+                    f"nhiễu ±{r['noise_ms']:.3f}ms)"
+                ))
+            if regressions:
+                self.stderr.write(self.style.ERROR(
+                    f"{len(regressions)} case chậm hơn baseline quá {options['threshold']:.0%} (và quá ngưỡng nhiễu)"
+                ))
+                sys.exit(1)
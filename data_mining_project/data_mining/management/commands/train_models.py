@@ -0,0 +1,72 @@
+# management/commands/train_models.py
+# Huấn luyện lại toàn bộ models (GINI, ID3, Naive Bayes, K-Means) không cần notebook
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from data_mining.service.training import TRAINING_CONFIGS, train_one
+
+
+class Command(BaseCommand):
+    help = (
+        "Huấn luyện các models từ dataset đã cấu hình, chạy song song nhiều tiến trình. "
+        "Model có dữ liệu và cấu hình không đổi (theo hash) sẽ được bỏ qua."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*',
+                            help=f"Tên model cần huấn luyện (mặc định: tất cả). "
+                                 f"Có: {', '.join(TRAINING_CONFIGS)}")
+        parser.add_argument('--force', action='store_true',
+                            help="Huấn luyện lại kể cả khi dữ liệu không đổi")
+        parser.add_argument('--jobs', type=int, default=None,
+                            help="Số tiến trình song song (mặc định: số CPU)")
+        parser.add_argument('--output-dir', default=None,
+                            help="Thư mục lưu model (mặc định: data_mining/models)")
+        parser.add_argument('--config', default=None,
+                            help="File JSON thay thế/bổ sung TRAINING_CONFIGS")
+
+    def handle(self, *args, **options):
+        configs = dict(TRAINING_CONFIGS)
+        if options['config']:
+            with open(options['config'], 'r', encoding='utf-8') as f:
+                configs.update(json.load(f))
+
+        names = options['models'] or list(configs)
+        unknown = [name for name in names if name not in configs]
+        if unknown:
+            raise CommandError(f"Model không được cấu hình: {', '.join(unknown)}")
+
+        base_dir = str(settings.BASE_DIR)
+        output_dir = options['output_dir'] or os.path.join(base_dir, 'data_mining', 'models')
+        os.makedirs(output_dir, exist_ok=True)
+
+        failed = []
+        with ProcessPoolExecutor(max_workers=options['jobs']) as pool:
+            futures = {
+                pool.submit(train_one, name, configs[name], base_dir, output_dir, options['force']): name
+                for name in names
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed.append(name)
+                    self.stderr.write(self.style.ERROR(f"[LỖI] {name}: {e}"))
+                    continue
+
+                meta = result['meta']
+                if result['status'] == 'skipped':
+                    self.stdout.write(f"[BỎ QUA] {name}: dữ liệu không đổi ({meta['dataset_sha256'][:12]})")
+                else:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"[OK] {name}: {meta['rows']} dòng, {meta['training_seconds']}s"
+                    ))
+
+        if failed:
+            raise CommandError(f"Huấn luyện thất bại: {', '.join(failed)}")
@@ -0,0 +1,188 @@
+# data_mining/middleware.py
+# Middleware đo thời gian request (Server-Timing + log), profiling theo yêu cầu và metrics
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .service.instrumentation import start_request, end_request
+from .service.metrics import REGISTRY, REQUEST_LATENCY, configure_from_settings
+
+
+logger = logging.getLogger(__name__)
+timing_logger = logging.getLogger('data_mining.timing')
+profile_logger = logging.getLogger('data_mining.profile')
+
+DEFAULT_REQUEST_TIMING = {
+    'enabled': True,
+    # Chỉ đo các URL bắt đầu bằng các prefix này
+    'path_prefixes': ['/data_mining/predict/', '/data_mining/cluster/', '/data_mining/datasets/'],
+    'server_timing_header': True,
+    # Log JSON một dòng mỗi request trên 'data_mining.timing' (mức INFO); tắt mặc
+    # định để không sinh một dòng log cho mọi request
+    'log': False,
+    'profiling': {
+        # Bật profiling theo request qua header "X-Profile: cprofile|tracemalloc"
+        # hoặc query "?_profile=cprofile|tracemalloc"
+        'allowed': False,
+        'sample_rate': 1.0,
+        'output_dir': None,
+        'top': 25,
+    },
+}
+
+
+def _timing_config():
+    config = dict(DEFAULT_REQUEST_TIMING)
+    config.update(getattr(settings, 'REQUEST_TIMING', {}))
+    config['profiling'] = {**DEFAULT_REQUEST_TIMING['profiling'], **config.get('profiling', {})}
+    return config
+
+
+class RequestTimingMiddleware:
+    """
+    Đo thời gian từng giai đoạn (span) của các API và báo cáo qua:
+      - header Server-Timing (xem được trong DevTools của trình duyệt)
+      - log JSON một dòng trên logger 'data_mining.timing' (khi bật 'log')
+
+    Profiling (cProfile hoặc tracemalloc) chỉ chạy khi request yêu cầu,
+    profiling được cho phép trong settings và request được lấy mẫu.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = _timing_config()
+        if not self.config['enabled']:
+            raise MiddlewareNotUsed()
+        self.prefixes = tuple(self.config['path_prefixes'])
+        self.profiling = self.config['profiling']
+
+    def __call__(self, request):
+        if not request.path.startswith(self.prefixes):
+            return self.get_response(request)
+
+        timer, token = start_request()
+        profile_mode = self._profile_mode(request)
+        try:
+            if profile_mode == 'cprofile':
+                response, report = self._run_cprofile(request)
+            elif profile_mode == 'tracemalloc':
+                response, report = self._run_tracemalloc(request)
+            else:
+                response, report = self.get_response(request), None
+        finally:
+            end_request(token)
+
+        if self.config['server_timing_header']:
+            response['Server-Timing'] = timer.server_timing()
+        if report is not None:
+            response['X-Profile'] = report
+        if self.config['log']:
+            timing_logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(timer.elapsed() * 1000.0, 3),
+                'spans': {name: round(ms, 3) for name, ms, _ in timer.items()},
+                'profile': profile_mode,
+            }))
+        return response
+
+    # ----------------------------------------------------------------
+    # Profiling
+    # ----------------------------------------------------------------
+
+    def _profile_mode(self, request):
+        if not self.profiling['allowed']:
+            return None
+        mode = request.headers.get('X-Profile') or request.GET.get('_profile')
+        if mode not in ('cprofile', 'tracemalloc'):
+            return None
+        if random.random() >= self.profiling['sample_rate']:
+            return None
+        return mode
+
+    def _run_cprofile(self, request):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream).sort_stats('cumulative')
+        stats.print_stats(self.profiling['top'])
+        name = self._save('cprofile', request, lambda path: stats.dump_stats(path))
+        profile_logger.info(f"cProfile {request.method} {request.path}\n{stream.getvalue()}")
+        return response, name or 'cprofile'
+
+    def _run_tracemalloc(self, request):
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        try:
+            response = self.get_response(request)
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            if not already_tracing:
+                tracemalloc.stop()
+
+        top = snapshot.statistics('lineno')[:self.profiling['top']]
+        lines = '\n'.join(str(stat) for stat in top)
+        name = self._save('tracemalloc', request, lambda path: snapshot.dump(path))
+        profile_logger.info(f"tracemalloc {request.method} {request.path} peak={peak} bytes\n{lines}")
+        return response, name or f'tracemalloc;peak={peak}'
+
+    def _save(self, kind, request, dump):
+        """Ghi profile ra output_dir (nếu cấu hình), trả về tên file."""
+        output_dir = self.profiling['output_dir']
+        if not output_dir:
+            return None
+        os.makedirs(output_dir, exist_ok=True)
+        slug = request.path.strip('/').replace('/', '_') or 'root'
+        name = f"{kind}-{slug}-{int(time.time() * 1000)}.{'prof' if kind == 'cprofile' else 'snapshot'}"
+        dump(os.path.join(output_dir, name))
+        return name
+
+
+class MetricsMiddleware:
+    """
+    Ghi histogram thời gian xử lý cho mọi request của app data_mining,
+    gắn nhãn theo tên URL (name=... trong data_mining/urls.py), method và status.
+
+    Khi cấu hình METRICS['multiprocess_dir'], snapshot của tiến trình được
+    ghi ra đĩa tối đa mỗi flush_interval giây để /metrics gộp được.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        configure_from_settings()
+        from .urls import urlpatterns
+        self.view_names = frozenset(p.name for p in urlpatterns if p.name)
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        if match is not None and match.url_name in self.view_names:
+            REQUEST_LATENCY.labels(match.url_name, request.method, response.status_code).observe(
+                time.perf_counter() - start
+            )
+        try:
+            REGISTRY.maybe_flush()
+        except OSError as e:
+            # Response đã có; lỗi ghi snapshot metrics không được làm hỏng request
+            logger.warning("Không ghi được snapshot metrics: %s", e)
+        return response
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:00
+
+import data_mining.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClusteringRun',
+            fields=[
+                ('id', models.CharField(default=data_mining.models._new_run_id, editable=False, max_length=32, primary_key=True, serialize=False)),
+                ('algorithm', models.CharField(max_length=32)),
+                ('params', models.JSONField(default=dict)),
+                ('dataset_id', models.CharField(blank=True, default='', max_length=64)),
+                ('n_points', models.PositiveIntegerField()),
+                ('n_dims', models.PositiveSmallIntegerField()),
+                ('n_clusters', models.PositiveIntegerField()),
+                ('cluster_sizes', models.JSONField(default=list)),
+                ('n_noise', models.PositiveIntegerField(default=0)),
+                ('centroids', models.JSONField(default=list)),
+                ('sse', models.FloatField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ClusterMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('cluster', models.IntegerField()),
+                ('distance', models.FloatField(null=True)),
+                ('point', models.BinaryField()),
+                ('run', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='members', to='data_mining.clusteringrun')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['run', 'cluster', 'index'], name='cluster_member_by_cluster'), models.Index(fields=['run', 'cluster', 'distance'], name='cluster_member_nearest')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='clustermember',
+            constraint=models.UniqueConstraint(fields=('run', 'index'), name='cluster_member_run_index'),
+        ),
+    ]
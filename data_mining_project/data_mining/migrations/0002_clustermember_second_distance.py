@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_mining', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clustermember',
+            name='second_distance',
+            field=models.FloatField(null=True),
+        ),
+    ]
@@ -1,3 +1,61 @@
+import uuid
+
 from django.db import models
 
-# Create your models here.
+
+def _new_run_id() -> str:
+    return uuid.uuid4().hex
+
+
+class ClusteringRun(models.Model):
+    """
+    Một lần gom cụm đã lưu (request có "persist": true).
+
+    Nhãn của từng điểm nằm ở ClusterMember (mỗi điểm một dòng), nên có thể
+    truy vấn theo cụm / theo điểm mà không phải gửi lại toàn bộ labels.
+    """
+
+    id = models.CharField(primary_key=True, max_length=32, default=_new_run_id, editable=False)
+    algorithm = models.CharField(max_length=32)
+    params = models.JSONField(default=dict)
+    dataset_id = models.CharField(max_length=64, blank=True, default='')
+    n_points = models.PositiveIntegerField()
+    n_dims = models.PositiveSmallIntegerField()
+    n_clusters = models.PositiveIntegerField()
+    # Số điểm mỗi cụm 0..n_clusters-1 (nhiễu của DBSCAN: n_noise)
+    cluster_sizes = models.JSONField(default=list)
+    n_noise = models.PositiveIntegerField(default=0)
+    # Centroid K-Means, hoặc trung bình mỗi cụm với DBSCAN
+    centroids = models.JSONField(default=list)
+    sse = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.algorithm} {self.id} ({self.n_points} điểm, {self.n_clusters} cụm)"
+
+
+class ClusterMember(models.Model):
+    """Một điểm của một lần gom cụm: vị trí trong dữ liệu gốc, cụm, khoảng cách tới centroid."""
+
+    run = models.ForeignKey(ClusteringRun, on_delete=models.CASCADE, related_name='members', db_index=False)
+    index = models.PositiveIntegerField()
+    # -1: nhiễu (DBSCAN)
+    cluster = models.IntegerField()
+    # Khoảng cách Euclid tới centroid của cụm (None với điểm nhiễu)
+    distance = models.FloatField(null=True)
+    # K-Means: khoảng cách Euclid tới centroid gần thứ hai (cận dưới cho warm start)
+    second_distance = models.FloatField(null=True)
+    # Tọa độ dạng float64 little-endian (n_dims * 8 byte)
+    point = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'index'], name='cluster_member_run_index'),
+        ]
+        indexes = [
+            models.Index(fields=['run', 'cluster', 'index'], name='cluster_member_by_cluster'),
+            models.Index(fields=['run', 'cluster', 'distance'], name='cluster_member_nearest'),
+        ]
@@ -0,0 +1,259 @@
+# service/admission.py
+# Kiểm soát tiếp nhận request tốn kém: ước lượng chi phí trước khi fit, giới hạn
+# đồng thời theo nhóm endpoint, hàng đợi có giới hạn, từ chối bằng 429 + Retry-After
+#
+# Mỗi nhóm (pool) có số request chạy đồng thời và độ sâu hàng đợi riêng; nhóm
+# 'clustering' còn có ngân sách chi phí (tổng n * k * max_iters * d đang chạy).
+# Tổng số slot của tiến trình được chia sẻ, nhưng `reserved_slots` slot cuối chỉ
+# dành cho nhóm ưu tiên cao nhất (dự đoán), và khi nhóm ưu tiên cao có request
+# đang chờ thì nhóm thấp hơn không được nhận thêm. Giới hạn áp dụng trong từng
+# tiến trình server.
+
+import functools
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+from django.http import JsonResponse
+
+from .metrics import ADMISSION_DECISIONS, ADMISSION_QUEUE_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADMISSION = {
+    'enabled': True,
+    # Số request được xử lý đồng thời trong một tiến trình (~ số thread của server)
+    'slots': 8,
+    # Số slot chỉ nhóm ưu tiên cao nhất được dùng
+    'reserved_slots': 2,
+    # Chi phí tối đa của một request gom cụm; lớn hơn -> 413 (thử lại cũng không được)
+    'max_cost': 2e10,
+    # Giá trị max_iters tối đa client được gửi
+    'max_iters': 1000,
+    # Dự đoán K-Means có chi phí n x k x d lớn hơn -> tính như gom cụm (nhóm clustering)
+    'predict_max_cost': 1e7,
+    'pools': {
+        # priority: số nhỏ hơn = ưu tiên cao hơn. queue_timeout: số giây tối đa chờ trong hàng đợi
+        'predict': {'priority': 0, 'concurrency': 8, 'queue_depth': 64, 'queue_timeout': 1.0},
+        # cost_budget: tổng chi phí các request đang chạy (None = không giới hạn)
+        'clustering': {'priority': 1, 'concurrency': 2, 'queue_depth': 4, 'queue_timeout': 5.0,
+                       'cost_budget': 4e10},
+    },
+    # Retry-After (giây) khi chưa đo được tốc độ xử lý của nhóm
+    'retry_after': 1,
+    'max_retry_after': 300,
+}
+
+
+class AdmissionRejected(Exception):
+    """Request không được nhận: status 429 (quá tải, thử lại sau) hoặc 413 (quá lớn)."""
+
+    def __init__(self, message: str, status: int = 429, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def rejection_response(error: AdmissionRejected) -> JsonResponse:
+    response = JsonResponse({"error": str(error)}, status=error.status)
+    if error.retry_after is not None:
+        response['Retry-After'] = str(error.retry_after)
+    return response
+
+
+# ====================================================================
+# A. ƯỚC LƯỢNG CHI PHÍ
+# ====================================================================
+
+# Một cặp điểm duyệt qua KD-tree tốn cỡ 4 lần một đơn vị chi phí K-Means
+# (phép tính khoảng cách-chiều vectorized), đo trên dữ liệu 3 chiều
+DBSCAN_PAIR_WEIGHT = 4.0
+
+
+def kmeans_cost(n: int, k: int, max_iters: int, d: int) -> float:
+    """Số phép tính khoảng cách-chiều trong trường hợp xấu nhất: n * k * max_iters * d."""
+    return float(n) * k * max_iters * d
+
+
+def dbscan_cost(n: int, d: int, neighbours: float = 0.0) -> float:
+    """
+    DBSCAN với chỉ mục lưới / KD-tree: ~ n * d * (log2(n) + PAIR_WEIGHT * neighbours).
+
+    neighbours: số lân cận trung bình trong bán kính eps (ước lượng từ mẫu). Với
+    KD-tree mọi cặp điểm lõi gần nhau đều được duyệt, nên dữ liệu dày / eps lớn
+    tốn ~ n * neighbours * d; chỉ mục lưới không duyệt cặp trong ô dày -> 0.
+    """
+    return float(n) * d * (max(math.log2(max(n, 2)), 1.0) + DBSCAN_PAIR_WEIGHT * neighbours)
+
+
+def check_request(cost: float, max_iters: Optional[int] = None):
+    """Từ chối ngay (413) request mà dù server rảnh cũng không được chạy."""
+    config = admission_config()
+    if not config['enabled']:
+        return
+    if max_iters is not None and max_iters > config['max_iters']:
+        raise AdmissionRejected(f"max_iters ({max_iters}) vượt quá giới hạn {config['max_iters']}", status=413)
+    if cost > config['max_cost']:
+        raise AdmissionRejected(
+            f"Chi phí ước lượng {cost:.3g} (n x k x max_iters x d) vượt quá giới hạn {config['max_cost']:.3g}; "
+            f"giảm số điểm / max_iters hoặc dùng \"compression\"", status=413)
+
+
+# ====================================================================
+# B. BỘ ĐIỀU PHỐI
+# ====================================================================
+
+class _PoolState:
+    def __init__(self, name: str, config: Dict[str, Any]):
+        self.name = name
+        self.priority = int(config.get('priority', 0))
+        self.concurrency = int(config['concurrency'])
+        self.queue_depth = int(config['queue_depth'])
+        self.queue_timeout = float(config['queue_timeout'])
+        budget = config.get('cost_budget')
+        self.cost_budget = float('inf') if budget is None else float(budget)
+        self.active = 0
+        self.active_cost = 0.0
+        self.waiting = 0
+        self.waiting_cost = 0.0
+        # Số giây trên một đơn vị chi phí (trung bình trượt), để ước lượng Retry-After
+        self.seconds_per_cost = None
+
+
+class AdmissionController:
+    """Semaphore có trọng số theo nhóm, dùng chung một Condition."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.slots = int(config['slots'])
+        self.reserved_slots = int(config['reserved_slots'])
+        self.pools = {name: _PoolState(name, pool) for name, pool in config['pools'].items()}
+        self.top_priority = min(pool.priority for pool in self.pools.values())
+        self.total_active = 0
+        self._cond = threading.Condition()
+
+    def _can_admit(self, pool: _PoolState, cost: float) -> bool:
+        if pool.active >= pool.concurrency:
+            return False
+        if pool.active and pool.active_cost + cost > pool.cost_budget:
+            return False
+        limit = self.slots if pool.priority == self.top_priority else self.slots - self.reserved_slots
+        if self.total_active >= limit:
+            return False
+        return not any(other.waiting and other.priority < pool.priority for other in self.pools.values())
+
+    def _retry_after(self, pool: _PoolState, cost: float) -> int:
+        if pool.seconds_per_cost is None:
+            return int(self.config['retry_after'])
+        pending = pool.active_cost + pool.waiting_cost + cost
+        seconds = pending * pool.seconds_per_cost / max(pool.concurrency, 1)
+        return int(min(max(math.ceil(seconds), 1), self.config['max_retry_after']))
+
+    def _reject(self, pool: _PoolState, cost: float, reason: str):
+        ADMISSION_DECISIONS.labels(pool=pool.name, decision='rejected').inc()
+        retry_after = self._retry_after(pool, cost)
+        logger.warning("Từ chối request nhóm %s (chi phí %.3g): %s", pool.name, cost, reason)
+        raise AdmissionRejected(f"Server đang bận ({reason}), thử lại sau {retry_after} giây",
+                                status=429, retry_after=retry_after)
+
+    @contextmanager
+    def admit(self, pool_name: str, cost: float = 1.0):
+        """Chờ (tối đa queue_timeout) tới khi được chạy; AdmissionRejected nếu hàng đợi đầy / hết giờ."""
+        pool = self.pools[pool_name]
+        cost = max(float(cost), 1.0)
+        start = time.perf_counter()
+        with self._cond:
+            if not (pool.waiting == 0 and self._can_admit(pool, cost)):
+                if pool.waiting >= pool.queue_depth:
+                    self._reject(pool, cost, "hàng đợi đầy")
+                pool.waiting += 1
+                pool.waiting_cost += cost
+                deadline = start + pool.queue_timeout
+                try:
+                    while not self._can_admit(pool, cost):
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            self._reject(pool, cost, "chờ quá lâu")
+                        self._cond.wait(remaining)
+                finally:
+                    pool.waiting -= 1
+                    pool.waiting_cost -= cost
+                    # Nhóm ưu tiên thấp hơn có thể đang chờ vì request này
+                    self._cond.notify_all()
+                ADMISSION_DECISIONS.labels(pool=pool.name, decision='queued').inc()
+            else:
+                ADMISSION_DECISIONS.labels(pool=pool.name, decision='admitted').inc()
+            pool.active += 1
+            pool.active_cost += cost
+            self.total_active += 1
+        ADMISSION_QUEUE_SECONDS.labels(pool=pool.name).observe(time.perf_counter() - start)
+
+        run_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - run_start
+            with self._cond:
+                pool.active -= 1
+                pool.active_cost -= cost
+                self.total_active -= 1
+                rate = elapsed / cost
+                pool.seconds_per_cost = rate if pool.seconds_per_cost is None else \
+                    0.8 * pool.seconds_per_cost + 0.2 * rate
+                self._cond.notify_all()
+
+
+_CONTROLLER: Optional[AdmissionController] = None
+_CONTROLLER_PID: Optional[int] = None
+_CONTROLLER_LOCK = threading.Lock()
+
+
+def admission_config() -> Dict[str, Any]:
+    from django.conf import settings
+    overrides = getattr(settings, 'ADMISSION_CONTROL', {})
+    pools = {name: dict(pool) for name, pool in DEFAULT_ADMISSION['pools'].items()}
+    for name, pool in overrides.get('pools', {}).items():
+        pools[name] = {**pools.get(name, {}), **pool}
+    return {**DEFAULT_ADMISSION, **overrides, 'pools': pools}
+
+
+def get_controller() -> AdmissionController:
+    """Bộ điều phối dùng chung trong tiến trình (tạo lại sau fork)."""
+    global _CONTROLLER, _CONTROLLER_PID
+    if _CONTROLLER is not None and _CONTROLLER_PID == os.getpid():
+        return _CONTROLLER
+    with _CONTROLLER_LOCK:
+        if _CONTROLLER is None or _CONTROLLER_PID != os.getpid():
+            _CONTROLLER = AdmissionController(admission_config())
+            _CONTROLLER_PID = os.getpid()
+    return _CONTROLLER
+
+
+@contextmanager
+def admit(pool_name: str, cost: float = 1.0):
+    """Chạy khối lệnh trong nhóm `pool_name` (không làm gì nếu admission control tắt)."""
+    controller = get_controller()
+    if not controller.config['enabled']:
+        yield
+        return
+    with controller.admit(pool_name, cost):
+        yield
+
+
+def admission_controlled(pool_name: str):
+    """Decorator cho view rẻ (chi phí 1): chờ slot của nhóm, trả 429 nếu quá tải."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            try:
+                with admit(pool_name):
+                    return view(request, *args, **kwargs)
+            except AdmissionRejected as e:
+                return rejection_response(e)
+        return wrapped
+    return decorator
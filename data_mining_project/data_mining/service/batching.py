@@ -0,0 +1,173 @@
+# service/batching.py
+# Gom các request dự đoán một bản ghi đồng thời thành một lần predict theo lô
+
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+from .metrics import BATCH_SIZE, BATCH_QUEUE_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCHING = {
+    'enabled': False,
+    # Số bản ghi tối đa trong một lô
+    'max_batch': 64,
+    # Thời gian tối đa bản ghi đầu tiên của lô phải chờ thêm bản ghi khác.
+    # Lớn hơn -> lô to hơn, throughput cao hơn, latency cao hơn.
+    # 0 -> không chờ: chỉ gom những request đến trong lúc lô trước đang chạy.
+    'max_wait_ms': 2.0,
+    # Thời gian tối đa một request chờ kết quả
+    'timeout': 10.0,
+}
+
+
+class BatchTimeout(Exception):
+    """Bản ghi không có kết quả trong `timeout` giây (batcher quá tải) -> 503."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class MicroBatcher:
+    """
+    Hàng đợi + một thread worker cho một model.
+
+    Request gọi submit(record) và chờ trên Future; worker lấy tối đa
+    max_batch bản ghi (hoặc những gì có sau max_wait_ms kể từ bản ghi đầu
+    tiên), gọi run_batch(records) một lần rồi trả từng kết quả về Future
+    tương ứng.
+    """
+
+    def __init__(self, name: str, run_batch: Callable[[List[Any]], List[Any]],
+                 max_batch: int = 64, max_wait_ms: float = 2.0, timeout: float = 10.0):
+        if max_batch < 1:
+            raise ValueError("max_batch phải >= 1")
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch = int(max_batch)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self.timeout = timeout
+        self._pending: List[Tuple[Any, Future, float]] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name=f'batcher-{name}', daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Any) -> Any:
+        """
+        Đưa một bản ghi vào lô kế tiếp và chờ kết quả của nó.
+
+        Raises:
+            BatchTimeout: quá `timeout` giây chưa có kết quả; bản ghi còn trong
+                hàng đợi thì được bỏ ra để không chạy vô ích
+        """
+        future: Future = Future()
+        item = (record, future, time.perf_counter())
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"Batcher '{self.name}' đã dừng")
+            self._pending.append(item)
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._cond:
+                if item in self._pending:
+                    self._pending.remove(item)
+            raise BatchTimeout(f"Hàng đợi dự đoán '{self.name}' quá tải: không có kết quả sau {self.timeout:g}s",
+                               retry_after=max(1, math.ceil(self.timeout)))
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _take_batch(self) -> Optional[List[Tuple[Any, Future, float]]]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            deadline = self._pending[0][2] + self.max_wait
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            return batch
+
+    def _worker(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            BATCH_SIZE.labels(self.name).observe(len(batch))
+            for _, _, enqueued in batch:
+                BATCH_QUEUE_SECONDS.labels(self.name).observe(started - enqueued)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[Tuple[Any, Future, float]]):
+        records = [record for record, _, _ in batch]
+        try:
+            results = self.run_batch(records)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Một bản ghi lỗi không được làm hỏng cả lô: chạy lại từng bản ghi
+            logger.warning("Lô %s (%d bản ghi) lỗi, chạy lại từng bản ghi", self.name, len(batch), exc_info=True)
+            for item in batch:
+                self._dispatch([item])
+            return
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+
+# ====================================================================
+# BATCHER THEO MODEL (tạo lười, tạo lại sau fork)
+# ====================================================================
+
+_BATCHERS: Dict[str, MicroBatcher] = {}
+_BATCHERS_PID: Optional[int] = None
+_BATCHERS_LOCK = threading.Lock()
+
+
+def batching_config() -> Dict[str, Any]:
+    from django.conf import settings
+    return {**DEFAULT_BATCHING, **getattr(settings, 'PREDICTION_BATCHING', {})}
+
+
+def get_batcher(name: str, run_batch: Callable[[List[Any]], List[Any]]) -> MicroBatcher:
+    """
+    Batcher dùng chung cho model `name` trong tiến trình hiện tại.
+
+    Thread worker không sống sót qua fork (gunicorn --preload...), nên khi
+    pid đổi các batcher được tạo lại.
+    """
+    global _BATCHERS_PID
+    batcher = _BATCHERS.get(name)
+    if batcher is not None and _BATCHERS_PID == os.getpid():
+        return batcher
+    with _BATCHERS_LOCK:
+        if _BATCHERS_PID != os.getpid():
+            _BATCHERS.clear()
+            _BATCHERS_PID = os.getpid()
+        batcher = _BATCHERS.get(name)
+        if batcher is None:
+            config = batching_config()
+            batcher = MicroBatcher(name, run_batch, max_batch=config['max_batch'],
+                                   max_wait_ms=config['max_wait_ms'], timeout=config['timeout'])
+            _BATCHERS[name] = batcher
+        return batcher
@@ -4,10 +4,23 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
 import joblib
+import logging
 import os
+import time
+from collections import Counter
 import pandas as pd
 from django.conf import settings
 from typing import Dict, List, Any
+from .naive_bayes import CategoricalNaiveBayes
+from .compact_models import CompactModel, compact_paths, read_manifest, load_compact, sources_match
+from .dataset_registry import get_registry, DatasetNotFound
+from .instrumentation import span
+from .metrics import PREDICTIONS, CACHE_REQUESTS, MODEL_LOAD_SECONDS
+from .batching import BatchTimeout, batching_config, get_batcher
+from .admission import admission_controlled
+
+
+logger = logging.getLogger(__name__)
 
 
 # ====================================================================
@@ -30,6 +43,8 @@ MODEL_CONFIGS = {
     'NAIVE_BAYES': {
         'pipeline': 'naive_bayes_pipeline.joblib',
         'encoder': 'nb_target_encoder.joblib',
+        # Bảng đếm của CategoricalNaiveBayes; nếu file tồn tại sẽ được ưu tiên hơn pipeline
+        'counts': 'nb_counts.npz',
         'features': ['Outlook', 'Temperature', 'Humidity', 'Wind']
     }
 }
@@ -38,11 +53,19 @@ MODEL_CONFIGS = {
 MODEL_CACHE: Dict[str, Any] = {}
 ENCODER_CACHE: Dict[str, Any] = {}
 
+# Model dự đoán trực tiếp từ mảng numpy (không cần DataFrame/encoder)
+ARRAY_MODELS = (CategoricalNaiveBayes, CompactModel)
+
+# Model dạng gọn <tên>.compact.npz/.json (xem compact_models.py, `manage.py export_models`)
+COMPACT_MODELS = {'enabled': True, 'mmap': True, **getattr(settings, 'COMPACT_MODELS', {})}
+
 
 def _load_model(model_name: str):
     """Tải pipeline và encoder cho một model cụ thể vào cache."""
     if model_name in MODEL_CACHE and model_name in ENCODER_CACHE:
+        CACHE_REQUESTS.labels('model', 'hit').inc()
         return
+    CACHE_REQUESTS.labels('model', 'miss').inc()
 
     config = MODEL_CONFIGS.get(model_name)
     if not config:
@@ -55,15 +78,58 @@ def _load_model(model_name: str):
     pipeline_path = os.path.join(MODEL_DIR, config['pipeline'])
     encoder_path = os.path.join(MODEL_DIR, config['encoder'])
 
+    start = time.perf_counter()
+    if COMPACT_MODELS['enabled'] and _load_compact_model(model_name, MODEL_DIR):
+        elapsed = time.perf_counter() - start
+        MODEL_LOAD_SECONDS.labels(model_name).observe(elapsed)
+        logger.info("Đã tải model dạng gọn: %s (%.1f ms)", model_name, elapsed * 1000)
+        return
+
+    # Model Naive Bayes dạng bảng đếm đã chứa sẵn nhãn lớp, không cần encoder
+    counts_path = os.path.join(MODEL_DIR, config['counts']) if config.get('counts') else None
+    if counts_path and os.path.exists(counts_path):
+        try:
+            MODEL_CACHE[model_name] = CategoricalNaiveBayes.load(counts_path)
+            ENCODER_CACHE[model_name] = None
+            elapsed = time.perf_counter() - start
+            MODEL_LOAD_SECONDS.labels(model_name).observe(elapsed)
+            logger.info("Đã tải bảng đếm Naive Bayes: %s (%.1f ms)", model_name, elapsed * 1000)
+            return
+        except Exception as e:
+            raise RuntimeError(f"Lỗi tải file {model_name}: {e}. Kiểm tra đường dẫn: {counts_path}")
+
     try:
         MODEL_CACHE[model_name] = joblib.load(pipeline_path)
         ENCODER_CACHE[model_name] = joblib.load(encoder_path)
-        print(f"   [OK] Đã tải Model/Encoder: {model_name}")
+        elapsed = time.perf_counter() - start
+        MODEL_LOAD_SECONDS.labels(model_name).observe(elapsed)
+        logger.info("Đã tải Model/Encoder: %s (%.1f ms)", model_name, elapsed * 1000)
     except Exception as e:
         # Nếu lỗi tải file, báo lỗi ngay lập tức
         raise RuntimeError(f"Lỗi tải file {model_name}: {e}. Kiểm tra đường dẫn: {pipeline_path}")
 
 
+def _load_compact_model(model_name: str, model_dir: str) -> bool:
+    """
+    Tải model dạng gọn vào cache nếu có và còn khớp với file nguồn
+    (pipeline/encoder/bảng đếm). Trả về False để dùng file gốc.
+    """
+    arrays_path, manifest_path = compact_paths(model_dir, model_name)
+    if not (os.path.exists(arrays_path) and os.path.exists(manifest_path)):
+        return False
+    try:
+        if not sources_match(read_manifest(manifest_path), model_dir):
+            logger.warning("Model dạng gọn %s cũ hơn file nguồn, dùng file gốc (chạy lại export_models)",
+                           model_name)
+            return False
+        MODEL_CACHE[model_name] = load_compact(arrays_path, manifest_path, mmap=COMPACT_MODELS['mmap'])
+        ENCODER_CACHE[model_name] = None
+        return True
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Không tải được model dạng gọn %s: %s", model_name, e)
+        return False
+
+
 def _run_single_prediction(model_name: str, raw_data: Dict) -> str:
     """
     Hàm lõi để chạy dự đoán cho bất kỳ model nào.
@@ -74,26 +140,119 @@ def _run_single_prediction(model_name: str, raw_data: Dict) -> str:
     pipeline = MODEL_CACHE[model_name]
     encoder = ENCODER_CACHE[model_name]
     features = MODEL_CONFIGS[model_name]['features']
+
+    # Micro-batching: gom với các request đồng thời khác của cùng model
+    if _BATCHING_ENABLED:
+        record = {col: raw_data.get(col, '') for col in features}
+        with span('predict'):
+            return get_batcher(model_name, _batch_runner(model_name)).submit(record)
+
+    # Model bảng đếm / dạng gọn: dự đoán trực tiếp từ các mảng numpy
+    if isinstance(pipeline, ARRAY_MODELS):
+        with span('predict'):
+            prediction_label = pipeline.predict([{col: raw_data.get(col, '') for col in features}])[0]
+        PREDICTIONS.labels(model_name, prediction_label).inc()
+        return prediction_label
     
     # 2. Xử lý input thô thành DataFrame (Dạng chuỗi)
-    input_data = {col: [raw_data.get(col, '')] for col in features}
-    input_df = pd.DataFrame(input_data, columns=features)
+    with span('dataframe'):
+        input_data = {col: [raw_data.get(col, '')] for col in features}
+        input_df = pd.DataFrame(input_data, columns=features)
     
     # 3. Dự đoán (Pipeline tự xử lý tiền xử lý)
-    prediction_int = pipeline.predict(input_df)[0]
+    with span('predict'):
+        prediction_int = pipeline.predict(input_df)[0]
     
     # 4. Giải mã và trả về label
-    prediction_label = encoder.inverse_transform([prediction_int])[0]
-    
+    with span('decode'):
+        prediction_label = encoder.inverse_transform([prediction_int])[0]
+
+    PREDICTIONS.labels(model_name, prediction_label).inc()
     return prediction_label
 
+
+_BATCHING_ENABLED = batching_config()['enabled']
+
+
+def _batch_runner(model_name: str):
+    """Hàm chạy một lô bản ghi (dict) cho micro-batcher của model."""
+    features = MODEL_CONFIGS[model_name]['features']
+
+    def run(records: List[Dict]) -> List[str]:
+        return _run_batch_prediction(model_name, {col: [r[col] for r in records] for col in features})
+    return run
+
+
+# Tên thay thế của cùng một thuộc tính giữa các dataset (UI gửi 'Temp')
+FEATURE_ALIASES = {
+    'Temperature': 'Temp',
+    'Temp': 'Temperature',
+}
+
+
+def _run_batch_prediction(model_name: str, columns: Dict[str, Any]) -> List[str]:
+    """
+    Dự đoán theo lô: một lần predict cho toàn bộ các dòng.
+
+    Args:
+        columns: {tên feature: mảng giá trị}, các mảng cùng độ dài
+    """
+    _load_model(model_name)
+
+    pipeline = MODEL_CACHE[model_name]
+    encoder = ENCODER_CACHE[model_name]
+    features = MODEL_CONFIGS[model_name]['features']
+
+    with span('predict'):
+        if isinstance(pipeline, ARRAY_MODELS):
+            rows = list(zip(*(columns[col] for col in features)))
+            labels = pipeline.predict(rows)
+        else:
+            input_df = pd.DataFrame({col: columns[col] for col in features}, columns=features)
+            predictions = pipeline.predict(input_df)
+            labels = encoder.inverse_transform(predictions).tolist()
+
+    for label, count in Counter(labels).items():
+        PREDICTIONS.labels(model_name, label).inc(count)
+    return labels
+
+
+def _dataset_prediction_response(model_name: str, display_name: str, dataset_id: str):
+    """Dự đoán cho mọi dòng của một dataset đã upload."""
+    registry = get_registry()
+    try:
+        schema = registry.schema(dataset_id)
+    except DatasetNotFound:
+        return JsonResponse({"error": f"Không tìm thấy dataset {dataset_id}"}, status=404)
+
+    available = set(schema['categorical_columns']) | set(schema['numeric_columns'])
+    mapping = {}
+    for col in MODEL_CONFIGS[model_name]['features']:
+        source = col if col in available else FEATURE_ALIASES.get(col)
+        if source not in available:
+            return JsonResponse({"error": f"Dataset thiếu thuộc tính '{col}'"}, status=400)
+        mapping[col] = source
+
+    data = registry.read_columns(dataset_id, list(mapping.values()))
+    columns = {col: data[source].astype(str) for col, source in mapping.items()}
+    predictions = _run_batch_prediction(model_name, columns)
+
+    return JsonResponse({
+        "status": "success",
+        "model": display_name,
+        "dataset_id": dataset_id,
+        "count": len(predictions),
+        "predictions": predictions
+    })
+
+
 # Tải tất cả các models khi file views được import lần đầu
 try:
     for name in MODEL_CONFIGS.keys():
         _load_model(name)
 except Exception as e:
-    # Lỗi tải sẽ được in ra, nhưng không làm crash toàn bộ ứng dụng
-    print(f"Lỗi lớn khi khởi tạo Models: {e}")
+    # Lỗi tải sẽ được ghi log, nhưng không làm crash toàn bộ ứng dụng
+    logger.exception("Lỗi lớn khi khởi tạo Models: %s", e)
 
 
 # ====================================================================
@@ -121,14 +280,27 @@ def _normalize_input_data(model_name: str, raw_data: Dict) -> Dict:
 # B. CÁC VIEW ENDPOINT RIÊNG (Dành cho Postman)
 # ====================================================================
 
+def _batch_timeout_response(error: BatchTimeout) -> JsonResponse:
+    """Micro-batcher không trả kết quả kịp: 503 kèm Retry-After (không phải lỗi input)."""
+    response = JsonResponse({"error": str(error)}, status=503)
+    response['Retry-After'] = str(error.retry_after)
+    return response
+
+
 # Sử dụng csrf_exempt cho API test trên Postman
-@csrf_exempt 
+@csrf_exempt
+@admission_controlled('predict')
 def predict_gini_view(request):
     """API endpoint cho mô hình GINI/CART."""
     if request.method == 'POST':
         try:
             # Đọc JSON data từ body request
-            raw_data = json.loads(request.body)
+            with span('json_parse'):
+                raw_data = json.loads(request.body)
+
+            # Dự đoán theo lô cho dataset đã upload
+            if isinstance(raw_data, dict) and raw_data.get('dataset_id'):
+                return _dataset_prediction_response('GINI_CART', 'GINI_CART (Decision Tree)', raw_data['dataset_id'])
             
             # Gọi hàm lõi
             # prediction = _run_single_prediction('GINI_CART', raw_data)
@@ -138,55 +310,76 @@ def predict_gini_view(request):
 
             prediction = _run_single_prediction('GINI_CART', processed_data)
             
-            return JsonResponse({
-                "status": "success",
-                "model": "GINI_CART (Decision Tree)",
-                "prediction": prediction
-            })
+            with span('encode'):
+                return JsonResponse({
+                    "status": "success",
+                    "model": "GINI_CART (Decision Tree)",
+                    "prediction": prediction
+                })
+        except BatchTimeout as e:
+            return _batch_timeout_response(e)
         except Exception as e:
             return JsonResponse({"error": f"Lỗi xử lý GINI: {e}"}, status=400)
     return JsonResponse({"error": "Chỉ chấp nhận POST"}, status=405)
 
 
 @csrf_exempt
+@admission_controlled('predict')
 def predict_id3_view(request):
     """API endpoint cho mô hình ID3/Entropy."""
     if request.method == 'POST':
         try:
-            raw_data = json.loads(request.body)
+            with span('json_parse'):
+                raw_data = json.loads(request.body)
+
+            # Dự đoán theo lô cho dataset đã upload
+            if isinstance(raw_data, dict) and raw_data.get('dataset_id'):
+                return _dataset_prediction_response('ID3_Entropy', 'ID3_Entropy (Decision Tree)', raw_data['dataset_id'])
 
             # BƯỚC CHUẨN HÓA
             processed_data = _normalize_input_data('ID3_Entropy', raw_data)
 
             prediction = _run_single_prediction('ID3_Entropy', raw_data)
             
-            return JsonResponse({
-                "status": "success",
-                "model": "ID3_Entropy (Decision Tree)",
-                "prediction": prediction
-            })
+            with span('encode'):
+                return JsonResponse({
+                    "status": "success",
+                    "model": "ID3_Entropy (Decision Tree)",
+                    "prediction": prediction
+                })
+        except BatchTimeout as e:
+            return _batch_timeout_response(e)
         except Exception as e:
             return JsonResponse({"error": f"Lỗi xử lý ID3: {e}"}, status=400)
     return JsonResponse({"error": "Chỉ chấp nhận POST"}, status=405)
 
 
 @csrf_exempt
+@admission_controlled('predict')
 def predict_bayes_view(request):
     """API endpoint cho mô hình Naive Bayes."""
     if request.method == 'POST':
         try:
-            raw_data = json.loads(request.body)
+            with span('json_parse'):
+                raw_data = json.loads(request.body)
+
+            # Dự đoán theo lô cho dataset đã upload
+            if isinstance(raw_data, dict) and raw_data.get('dataset_id'):
+                return _dataset_prediction_response('NAIVE_BAYES', 'NAIVE_BAYES', raw_data['dataset_id'])
 
             # BƯỚC CHUẨN HÓA: Chuẩn hóa tên thuộc tính cho NAIVE_BAYES
             processed_data = _normalize_input_data('NAIVE_BAYES', raw_data)
 
             prediction = _run_single_prediction('NAIVE_BAYES', processed_data)
             
-            return JsonResponse({
-                "status": "success",
-                "model": "NAIVE_BAYES",
-                "prediction": prediction
-            })
+            with span('encode'):
+                return JsonResponse({
+                    "status": "success",
+                    "model": "NAIVE_BAYES",
+                    "prediction": prediction
+                })
+        except BatchTimeout as e:
+            return _batch_timeout_response(e)
         except Exception as e:
             return JsonResponse({"error": f"Lỗi xử lý Naive Bayes: {e}"}, status=400)
     return JsonResponse({"error": "Chỉ chấp nhận POST"}, status=405)
\ No newline at end of file
@@ -0,0 +1,206 @@
+# service/cluster_visualization.py
+# Dữ liệu vẽ biểu đồ đã tổng hợp sẵn cho kết quả gom cụm lớn
+# (lưới histogram, mẫu phân tầng, bao lồi, hộp bao theo từng cụm)
+
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+
+
+DEFAULT_GRID_SIZE = 64
+MAX_GRID_SIZE = 256
+DEFAULT_SAMPLE_SIZE = 2000
+MAX_SAMPLE_SIZE = 20000
+# Tối thiểu số điểm mẫu của mỗi cụm (nếu cụm đủ lớn), để cụm nhỏ vẫn hiện trên biểu đồ
+MIN_SAMPLE_PER_CLUSTER = 20
+
+# Hướng dùng để loại trước các điểm chắc chắn nằm trong bao lồi (Akl–Toussaint)
+_FILTER_DIRECTIONS = np.stack([
+    np.cos(np.linspace(0, 2 * np.pi, 16, endpoint=False)),
+    np.sin(np.linspace(0, 2 * np.pi, 16, endpoint=False)),
+], axis=1)
+
+
+def aggregate_clusters(data: np.ndarray, labels: np.ndarray, k: int,
+                       grid_size: int = DEFAULT_GRID_SIZE, sample_size: int = DEFAULT_SAMPLE_SIZE,
+                       dims: Tuple[int, int] = (0, 1), seed: int = 0) -> Dict[str, Any]:
+    """
+    Tổng hợp kết quả gom cụm thành payload có kích thước không phụ thuộc n.
+
+    Mọi phép tính theo cụm chạy trên dữ liệu đã sắp theo nhãn (một lần
+    argsort), dùng reduceat/bincount thay cho vòng lặp theo điểm.
+
+    Args:
+        data: Mảng (n, d), có thể là memmap
+        labels: Nhãn cụm (n,)
+        dims: Hai cột dùng làm trục x, y (dữ liệu 1 chiều: y = 0)
+
+    Returns:
+        {"dims", "bounds", "grid": {...}, "clusters": [{"cluster", "size",
+         "bbox", "hull", "cells", "sample", "sample_indices"}, ...]}
+    """
+    grid_size = int(min(max(grid_size, 1), MAX_GRID_SIZE))
+    sample_size = int(min(max(sample_size, 0), MAX_SAMPLE_SIZE))
+    labels = np.asarray(labels, dtype=np.intp)
+    xy = _project(data, dims)
+
+    order = np.argsort(labels, kind='stable')
+    sorted_xy = xy[order]
+    sizes = np.bincount(labels, minlength=k)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    present = sizes > 0
+
+    # Hộp bao của từng cụm
+    bbox_min = np.full((k, 2), np.nan)
+    bbox_max = np.full((k, 2), np.nan)
+    if present.any():
+        bbox_min[present] = np.minimum.reduceat(sorted_xy, starts[present], axis=0)
+        bbox_max[present] = np.maximum.reduceat(sorted_xy, starts[present], axis=0)
+
+    # Lưới histogram chung cho mọi cụm: counts[c, ix, iy]
+    lo = np.nanmin(bbox_min, axis=0)
+    hi = np.nanmax(bbox_max, axis=0)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    cell = np.minimum(((xy - lo) / span * grid_size).astype(np.intp), grid_size - 1)
+    flat = (labels * grid_size + cell[:, 0]) * grid_size + cell[:, 1]
+    counts = np.bincount(flat, minlength=k * grid_size * grid_size).reshape(k, grid_size, grid_size)
+
+    sample_idx = _stratified_sample(sizes, starts, order, sample_size, seed)
+
+    clusters = []
+    for c in range(k):
+        entry = {'cluster': c, 'size': int(sizes[c])}
+        if sizes[c]:
+            ix, iy = np.nonzero(counts[c])
+            members = sorted_xy[starts[c]:starts[c] + sizes[c]]
+            entry.update({
+                'bbox': [bbox_min[c].tolist(), bbox_max[c].tolist()],
+                'hull': convex_hull(members).tolist(),
+                'cells': np.stack([ix, iy, counts[c, ix, iy]], axis=1).tolist(),
+                'sample': xy[sample_idx[c]].tolist(),
+                'sample_indices': sample_idx[c].tolist(),
+            })
+        else:
+            entry.update({'bbox': None, 'hull': [], 'cells': [], 'sample': [], 'sample_indices': []})
+        clusters.append(entry)
+
+    return {
+        'dims': list(dims) if data.ndim > 1 and data.shape[1] > 1 else [0],
+        'bounds': [lo.tolist(), hi.tolist()],
+        'grid': {
+            'size': grid_size,
+            'x_edges': np.linspace(lo[0], lo[0] + span[0], grid_size + 1).tolist(),
+            'y_edges': np.linspace(lo[1], lo[1] + span[1], grid_size + 1).tolist(),
+        },
+        'sample_size': int(sum(len(s) for s in sample_idx)),
+        'clusters': clusters,
+    }
+
+
+def _project(data: np.ndarray, dims: Tuple[int, int]) -> np.ndarray:
+    data = np.asarray(data)
+    if data.ndim == 1:
+        data = data.reshape(-1, 1)
+    if data.shape[1] == 1:
+        return np.column_stack([data[:, 0], np.zeros(len(data))]).astype(np.float64)
+    for dim in dims:
+        if not 0 <= dim < data.shape[1]:
+            raise ValueError(f"Chiều {dim} không hợp lệ cho dữ liệu {data.shape[1]} chiều")
+    return np.ascontiguousarray(data[:, list(dims)], dtype=np.float64)
+
+
+# ====================================================================
+# A. MẪU PHÂN TẦNG THEO CỤM
+# ====================================================================
+
+def sample_quotas(sizes: np.ndarray, sample_size: int, minimum: int = MIN_SAMPLE_PER_CLUSTER) -> np.ndarray:
+    """
+    Số điểm mẫu của mỗi cụm: tỷ lệ với kích thước cụm, mỗi cụm có ít nhất
+    min(minimum, size) điểm, tổng không vượt quá sample_size (trừ khi chỉ
+    riêng phần tối thiểu đã vượt).
+    """
+    sizes = np.asarray(sizes, dtype=np.int64)
+    total = int(sizes.sum())
+    if total <= sample_size:
+        return sizes.copy()
+    base = np.minimum(sizes, minimum)
+    remaining = max(sample_size - int(base.sum()), 0)
+    extra_capacity = sizes - base
+    if remaining == 0 or extra_capacity.sum() == 0:
+        return base
+    # Chia phần còn lại theo tỷ lệ (phương pháp phần dư lớn nhất)
+    share = extra_capacity / extra_capacity.sum() * remaining
+    extra = np.floor(share).astype(np.int64)
+    leftover = remaining - int(extra.sum())
+    if leftover > 0:
+        extra[np.argsort(extra - share)[:leftover]] += 1
+    return base + np.minimum(extra, extra_capacity)
+
+
+def _stratified_sample(sizes: np.ndarray, starts: np.ndarray, order: np.ndarray,
+                       sample_size: int, seed: int) -> List[np.ndarray]:
+    """Chỉ số (gốc, đã sắp tăng dần) của các điểm mẫu của từng cụm."""
+    quotas = sample_quotas(sizes, sample_size)
+    rng = np.random.default_rng(seed)
+    result = []
+    for start, size, quota in zip(starts, sizes, quotas):
+        if quota >= size:
+            picked = order[start:start + size]
+        else:
+            picked = order[start + rng.choice(size, size=int(quota), replace=False)]
+        result.append(np.sort(picked))
+    return result
+
+
+# ====================================================================
+# B. BAO LỒI 2D
+# ====================================================================
+
+def convex_hull(points: np.ndarray) -> np.ndarray:
+    """
+    Bao lồi (ngược chiều kim đồng hồ, không lặp điểm đầu) của các điểm 2D.
+
+    Trước tiên loại các điểm nằm hẳn trong đa giác nối các điểm cực trị theo
+    16 hướng (vector hóa), sau đó chạy monotone chain trên số ít điểm còn lại.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) > 64:
+        points = _discard_interior(points)
+    points = np.unique(points, axis=0)     # sắp theo x rồi y
+    if len(points) <= 2:
+        return points
+
+    def half(chain_points):
+        chain: List[np.ndarray] = []
+        for p in chain_points:
+            while len(chain) >= 2 and _cross(chain[-2], chain[-1], p) <= 0:
+                chain.pop()
+            chain.append(p)
+        return chain
+
+    lower = half(points)
+    upper = half(points[::-1])
+    return np.array(lower[:-1] + upper[:-1])
+
+
+def _cross(o, a, b) -> float:
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+
+def _discard_interior(points: np.ndarray) -> np.ndarray:
+    """Bỏ các điểm nằm hẳn bên trong đa giác cực trị (luôn nằm trong bao lồi)."""
+    # (16, m) liên tục trong bộ nhớ: argmax theo hàng nhanh hơn nhiều so với theo cột
+    extremes = points[np.argmax(_FILTER_DIRECTIONS @ points.T, axis=1)]
+    # Các điểm cực trị theo hướng tăng dần góc tạo đa giác lồi ngược chiều kim đồng hồ
+    keep = np.ones(len(extremes), dtype=bool)
+    keep[1:] = np.any(extremes[1:] != extremes[:-1], axis=1)
+    polygon = extremes[keep]
+    if len(polygon) > 1 and np.array_equal(polygon[0], polygon[-1]):
+        polygon = polygon[:-1]
+    if len(polygon) < 3:
+        return points
+
+    inside = np.ones(len(points), dtype=bool)
+    for a, b in zip(polygon, np.roll(polygon, -1, axis=0)):
+        inside &= (b[0] - a[0]) * (points[:, 1] - a[1]) - (b[1] - a[1]) * (points[:, 0] - a[0]) > 0
+    return points[~inside]
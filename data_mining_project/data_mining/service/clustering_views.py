@@ -1,15 +1,44 @@
 # service/clustering_views.py
-# API Views cho K-Means Clustering
+# API Views cho K-Means Clustering và DBSCAN
 
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
+from django.utils.http import parse_etags
+from django.core.exceptions import RequestDataTooBig
 import json
 import os
-import pandas as pd
 import numpy as np
+from scipy import sparse
 from typing import Dict, List, Any
-from .kmeans_algorithm import KMeansClustering, parse_points_from_list
+from .kmeans_algorithm import (
+    KMeansClustering, DEFAULT_CHUNK_SIZE, parse_points_from_list, parse_points_from_string,
+    parse_sparse_points, load_sparse_npz
+)
+from .dataset_cache import EXAMPLE_DATASET_CACHE, points_payload
+from .dataset_registry import get_registry, DatasetNotFound
+from .instrumentation import span
+from .cluster_visualization import aggregate_clusters, DEFAULT_GRID_SIZE, DEFAULT_SAMPLE_SIZE
+from .dbscan_algorithm import DBSCANClustering, NOISE, estimate_neighbours
+from .run_store import save_run, load_warm_start
+from .admission import (
+    AdmissionRejected, admit, admission_config, check_request, rejection_response, kmeans_cost, dbscan_cost
+)
+from .coreset import compress, DEFAULT_CORESET_SIZE, DEFAULT_GRID_CELLS
+from ..models import ClusteringRun
+
+
+# Dữ liệu ví dụ: tên tham số ?file= -> (tên file CSV, k mặc định)
+EXAMPLE_DATASETS = {
+    'bai1': ('Bai1_k2_data.csv', 2),
+    'bai2': ('Bai2_k3_data.csv', 3),
+}
+
+# Tùy chọn chung cho mọi KMeansClustering của API (settings.KMEANS)
+KMEANS_OPTIONS = {'n_jobs': 1, 'chunk_size': DEFAULT_CHUNK_SIZE, **getattr(settings, 'KMEANS', {})}
+
+# Content-Type của body là file .npz (scipy.sparse.save_npz); tham số nằm trên query string
+NPZ_CONTENT_TYPES = ('application/x-npz', 'application/octet-stream')
 
 
 @csrf_exempt
@@ -27,18 +56,98 @@ def kmeans_cluster_view(request):
         "k": 2,
         "max_iters": 100
     }
+
+    "points" cũng có thể là chuỗi dán vào (số chiều bất kỳ, có hoặc không nhãn):
+    "x1={1,3}, x2={1.5,3.2}"
+
+    Hoặc dùng dataset đã upload (xem /datasets/upload/) thay cho "points":
+    {"dataset_id": "...", "columns": ["x", "y"], "k": 3}
+    Khi đó response không gửi lại điểm gốc, "clusters" chỉ chứa số điểm mỗi cụm
+    và history mặc định tắt ("history": true để bật).
+
+    Với dữ liệu lớn, thêm "visualization": "aggregate" (tùy chọn "grid_size",
+    "sample_size", "dims") để nhận dữ liệu vẽ đã tổng hợp thay cho từng điểm:
+    lưới histogram, mẫu phân tầng, bao lồi và hộp bao của mỗi cụm
+    (xem cluster_visualization.aggregate_clusters). Kích thước response
+    không phụ thuộc số điểm.
+
+    Dữ liệu nhiều điểm trùng/dày đặc có thể nén trước khi gom cụm bằng
+    "compression": "dedup" (gộp điểm trùng, không mất mát), "grid" hoặc
+    "lightweight" (coreset có trọng số, xem coreset.py); "compression_size"
+    là số ô lưới mỗi chiều / số điểm mẫu. K-Means chạy trên tập đã nén,
+    nhãn được ánh xạ về từng điểm gốc, "sse" tính trên dữ liệu gốc và
+    "compression" cho biết kích thước tập nén cùng cận sai số. History
+    không có trong chế độ này.
+
+    "persist": true lưu kết quả vào database và trả thêm "run_id"; truy vấn
+    thành viên / số điểm / điểm gần centroid theo trang qua
+    /cluster/runs/<run_id>/... (xem run_views.py).
+
+    "metric": "euclidean" (mặc định), "cosine" (spherical K-Means) hoặc
+    "manhattan" (K-Medians, centroid là trung vị theo từng chiều).
+
+    Dữ liệu sparse nhiều chiều (vector văn bản, feature hashing) gửi dạng CSR
+    thay cho "points", không bao giờ chuyển sang ma trận dày n x d:
+    {"sparse": {"shape": [n, d], "indptr": [...], "indices": [...], "data": [...]}, "k": 8}
+    hoặc {"sparse": {"n_features": d, "rows": [{"3": 0.5, "17": 1.2}, ...]}, ...},
+    hoặc body là file scipy.sparse.save_npz (Content-Type: application/x-npz)
+    với tham số trên query string: ?k=8&metric=cosine&max_iters=50.
+    Response không gửi lại điểm, "clusters" là số điểm mỗi cụm.
+
+    Khởi tạo từ kết quả trước thay cho chọn ngẫu nhiên: "init_centroids":
+    [[...], ...] (k = số centroid), hoặc "warm_start": {"run_id": "..."} của
+    một run K-Means đã lưu (dùng centroids của run) cùng "points"/"dataset_id".
+    Dữ liệu thay đổi ít so với run đã lưu thì chỉ gửi phần thay đổi, không gửi
+    "points":
+    {"warm_start": {"run_id": "...", "add": [{"x": 1, "y": 2}, ...], "remove": [3, 17]}}
+    ("remove": index của điểm trong run, "add" cùng dạng "points"). Dữ liệu mới
+    là các điểm còn lại theo thứ tự index rồi tới các điểm thêm; centroid ban
+    đầu lấy từ tổng / số điểm mỗi cụm đã cộng trừ phần thay đổi, và với metric
+    euclidean chỉ các điểm mà cận khoảng cách không loại trừ được việc đổi cụm
+    mới được gán lại ("relabelled" trong response). Thêm "persist": true để
+    lưu kết quả thành run mới.
+
+    Admission control (admission.py): chi phí ước lượng n x k x max_iters x d
+    vượt giới hạn -> 413; server đang gom cụm đủ số request -> chờ trong hàng
+    đợi ngắn, hết chỗ / quá giờ -> 429 kèm header Retry-After.
     """
     if request.method == 'POST':
         try:
-            # Parse JSON data
-            data = json.loads(request.body)
+            # Parse JSON data (body .npz: tham số lấy từ query string)
+            npz_body = request.content_type in NPZ_CONTENT_TYPES
+            if npz_body:
+                data = request.GET.dict()
+            else:
+                with span('json_parse'):
+                    data = json.loads(request.body)
             
             # Lấy dữ liệu
             points_list = data.get('points', [])
             k = int(data.get('k', 2))
             max_iters = int(data.get('max_iters', 100))
-            
-            if not points_list:
+
+            if (isinstance(data.get('warm_start'), dict) and data.get('points') is None
+                    and data.get('sparse') is None and not data.get('dataset_id') and not npz_body):
+                return _kmeans_delta_response(data, max_iters)
+            if data.get('warm_start') is not None or data.get('init_centroids') is not None:
+                k = _resolve_init(data)
+
+            if npz_body or data.get('sparse') is not None:
+                with span('parse_points'):
+                    matrix = load_sparse_npz(request.body) if npz_body else parse_sparse_points(data['sparse'])
+                return _kmeans_sparse_response(data, matrix, k, max_iters)
+
+            if data.get('dataset_id'):
+                return _kmeans_dataset_response(data, k, max_iters)
+
+            # Chuỗi điểm dán vào ("x1={1,3}, x2={1.5,3.2}"): parse thẳng thành mảng numpy
+            parsed_array = None
+            if isinstance(points_list, str):
+                with span('parse_points'):
+                    parsed_array = parse_points_from_string(points_list)
+                points_list = parsed_array
+
+            if len(points_list) == 0:
                 return JsonResponse({
                     "error": "Danh sách điểm không được để trống"
                 }, status=400)
@@ -54,7 +163,11 @@ def kmeans_cluster_view(request):
                 }, status=400)
             
             # Parse points
-            points = parse_points_from_list(points_list)
+            if parsed_array is not None:
+                points = parsed_array.tolist()
+            else:
+                with span('parse_points'):
+                    points = parse_points_from_list(points_list)
             
             if not points:
                 return JsonResponse({
@@ -71,25 +184,44 @@ def kmeans_cluster_view(request):
                 }, status=400)
             
             # Tạo và huấn luyện mô hình
-            kmeans = KMeansClustering(k=k, max_iters=max_iters)
-            result = kmeans.fit(data_array, verbose=False)
+            with _admit_kmeans(data, data_array, k, max_iters):
+                kmeans = _new_kmeans(data, k, max_iters)
+                if data.get('visualization') == 'aggregate':
+                    return _kmeans_aggregate_response(data, data_array, kmeans)
+
+                result = _fit_kmeans(kmeans, data_array, data)
             
-            # Chuẩn bị kết quả trả về
-            response_data = {
-                "status": "success",
-                "algorithm": "K-Means Clustering",
-                "k": k,
-                "iterations": result['iterations'],
-                "sse": round(result['sse'], 4),
-                "centroids": result['centroids'],
-                "labels": result['labels'],
-                "clusters": result['clusters'],
-                "points": points,  # Trả lại điểm gốc
-                "history": result['history']  # Lịch sử các lần lặp
-            }
+                # Chuẩn bị kết quả trả về
+                response_data = {
+                    "status": "success",
+                    "algorithm": "K-Means Clustering",
+                    "k": k,
+                    "iterations": result['iterations'],
+                    "sse": round(result['sse'], 4),
+                    "centroids": result['centroids'],
+                    "labels": result['labels'],
+                    "clusters": result['clusters'],
+                    "points": points,  # Trả lại điểm gốc
+                    "history": result['history']  # Lịch sử các lần lặp
+                }
+                if 'compression' in result:
+                    response_data["compression"] = result['compression']
+                if data.get('persist'):
+                    response_data["run_id"] = _persist_kmeans(data, data_array, kmeans, result)
             
-            return JsonResponse(response_data)
+                with span('encode'):
+                    return JsonResponse(response_data)
             
+        except AdmissionRejected as e:
+            return rejection_response(e)
+        except RequestDataTooBig as e:
+            return JsonResponse({
+                "error": f"Request quá lớn: {str(e)}"
+            }, status=413)
+        except ClusteringRun.DoesNotExist:
+            return JsonResponse({
+                "error": f"Không tìm thấy lần gom cụm {data['warm_start'].get('run_id')}"
+            }, status=404)
         except ValueError as e:
             return JsonResponse({
                 "error": f"Lỗi giá trị: {str(e)}"
@@ -104,6 +236,491 @@ def kmeans_cluster_view(request):
     }, status=405)
 
 
+def _kmeans_run(run_id) -> ClusteringRun:
+    """Run K-Means đã lưu (ClusteringRun.DoesNotExist nếu không có)."""
+    run = ClusteringRun.objects.get(pk=str(run_id))
+    if run.algorithm != 'kmeans':
+        raise ValueError(f"Lần gom cụm {run.id} là {run.algorithm}, không phải kmeans")
+    return run
+
+
+def _resolve_init(data: Dict) -> int:
+    """
+    Centroid ban đầu từ "init_centroids" hoặc centroids của run "warm_start",
+    đặt vào data['init_centroids'] (mảng numpy); trả về k = số centroid.
+    """
+    warm_start = data.get('warm_start')
+    if warm_start is not None:
+        if not isinstance(warm_start, dict) or not warm_start.get('run_id'):
+            raise ValueError('"warm_start" phải có dạng {"run_id": "..."}')
+        if data.get('init_centroids') is not None:
+            raise ValueError('Chỉ dùng một trong "warm_start" và "init_centroids"')
+        init = np.asarray(_kmeans_run(warm_start['run_id']).centroids, dtype=np.float64)
+    else:
+        init = np.array(data['init_centroids'], dtype=np.float64, ndmin=2)
+    if init.ndim != 2 or len(init) == 0:
+        raise ValueError('"init_centroids" phải là danh sách các centroid cùng số chiều')
+    if data.get('k') is not None and int(data['k']) != len(init):
+        raise ValueError(f"k ({data['k']}) khác số centroid ban đầu ({len(init)})")
+    data['init_centroids'] = init
+    return len(init)
+
+
+def _parse_points_field(points) -> np.ndarray:
+    """Điểm dạng danh sách object/mảng hoặc chuỗi dán vào -> mảng (n, d)."""
+    if isinstance(points, str):
+        return parse_points_from_string(points)
+    parsed = parse_points_from_list(points)
+    if len(set(len(p) for p in parsed)) > 1:
+        raise ValueError("Tất cả các điểm phải có cùng số chiều")
+    return np.array(parsed, dtype=np.float64)
+
+
+def _kmeans_delta_response(data: Dict, max_iters: int):
+    """
+    Fit lại một run K-Means đã lưu sau khi thêm/bớt điểm ("warm_start" có
+    "add" / "remove", không có "points"). Chi phí ước lượng cho admission
+    control: một lượt kiểm tra cận mỗi vòng lặp (n x max_iters x d) cộng một
+    lượt gán lại toàn bộ (n x k x d), thay vì n x k x max_iters x d.
+    """
+    warm_start = data['warm_start']
+    if not warm_start.get('run_id'):
+        raise ValueError('"warm_start" phải có "run_id"')
+    for option in ('compression', 'init_centroids'):
+        if data.get(option) is not None:
+            raise ValueError(f'"{option}" không dùng cùng "warm_start" có "add" / "remove"')
+    if data.get('visualization') == 'aggregate':
+        raise ValueError('"visualization": "aggregate" không dùng cùng "warm_start" có "add" / "remove"')
+    run = _kmeans_run(warm_start['run_id'])
+    k = run.n_clusters
+    if data.get('k') is not None and int(data['k']) != k:
+        raise ValueError(f"k ({data['k']}) khác số cụm của run ({k})")
+    # Mặc định giữ metric của run
+    data = {**data, 'metric': data.get('metric', run.params.get('metric', 'euclidean'))}
+
+    with span('parse_points'):
+        added = _parse_points_field(warm_start.get('add') or [])
+    if len(added) and added.shape[1] != run.n_dims:
+        raise ValueError(f"Điểm thêm có {added.shape[1]} chiều, run có {run.n_dims} chiều")
+    removed = np.asarray(warm_start.get('remove') or [], dtype=np.int64)
+    if len(removed) and (removed.min() < 0 or removed.max() >= run.n_points):
+        raise ValueError(f'"remove" phải là index trong [0, {run.n_points})')
+    n = run.n_points - len(removed) + len(added)
+    if n < k:
+        return JsonResponse({
+            "error": f"Số điểm ({n}) phải >= số cụm k ({k})"
+        }, status=400)
+
+    d = run.n_dims
+    cost = kmeans_cost(n, 1, max_iters, d) + kmeans_cost(n, k, 1, d)
+    check_request(cost, max_iters=max_iters)
+    with admit('clustering', cost):
+        with span('load_run'):
+            previous, state = load_warm_start(run)
+        with span('delta'):
+            state.remove(removed, previous[removed])
+            state.add(added.reshape(-1, d), chunk_size=int(KMEANS_OPTIONS['chunk_size']))
+            keep = np.ones(len(previous), dtype=bool)
+            keep[removed] = False
+            data_array = np.concatenate([previous[keep], added.reshape(-1, d)])
+
+        kmeans = _new_kmeans(data, k, max_iters)
+        with span('fit'):
+            result = kmeans.fit(data_array, verbose=False, record_history=False, include_points=False, init=state)
+
+        response_data = {
+            "status": "success",
+            "algorithm": "K-Means Clustering",
+            "metric": kmeans.metric,
+            "k": k,
+            "n_points": len(data_array),
+            "iterations": result['iterations'],
+            "sse": round(result['sse'], 4),
+            "centroids": result['centroids'],
+            "labels": kmeans.labels.tolist(),
+            "clusters": result['clusters'],
+            "warm_start": {
+                "run_id": run.id,
+                "removed": len(removed),
+                "added": len(added),
+                "relabelled": result.get('relabelled'),
+            },
+        }
+        if data.get('persist'):
+            response_data["run_id"] = _persist_kmeans(data, data_array, kmeans, result)
+        with span('encode'):
+            return JsonResponse(response_data)
+
+
+def _new_kmeans(data: Dict, k: int, max_iters: int = 100) -> KMeansClustering:
+    """KMeansClustering với tùy chọn chung của API và "metric" của request."""
+    options = {**KMEANS_OPTIONS, 'metric': data.get('metric', KMEANS_OPTIONS.get('metric', 'euclidean'))}
+    return KMeansClustering(k=k, max_iters=max_iters, **options)
+
+
+def _kmeans_sparse_response(data: Dict, matrix, k: int, max_iters: int):
+    """Gom cụm ma trận CSR (tích sparse x dense, bộ nhớ theo số phần tử khác 0)."""
+    for option in ('compression', 'persist'):
+        if data.get(option):
+            raise ValueError(f'"{option}" chưa hỗ trợ dữ liệu sparse')
+    if data.get('visualization') == 'aggregate':
+        raise ValueError('"visualization": "aggregate" chưa hỗ trợ dữ liệu sparse')
+    if k < 1:
+        return JsonResponse({
+            "error": "Số cụm k phải >= 1"
+        }, status=400)
+    if matrix.shape[0] < k:
+        return JsonResponse({
+            "error": f"Số điểm ({matrix.shape[0]}) phải >= số cụm k ({k})"
+        }, status=400)
+
+    with _admit_kmeans(data, matrix, k, max_iters):
+        kmeans = _new_kmeans(data, k, max_iters)
+        with span('fit'):
+            result = kmeans.fit(matrix, verbose=False, record_history=False, init=data.get('init_centroids'))
+
+        response_data = {
+            "status": "success",
+            "algorithm": "K-Means Clustering",
+            "metric": kmeans.metric,
+            "k": k,
+            "n_points": matrix.shape[0],
+            "n_features": matrix.shape[1],
+            "nnz": int(matrix.nnz),
+            "iterations": result['iterations'],
+            "sse": round(result['sse'], 4),
+            "centroids": result['centroids'],
+            "labels": result['labels'],
+            "clusters": result['clusters'],
+        }
+        with span('encode'):
+            return JsonResponse(response_data)
+
+
+def _open_dataset_points(data: Dict) -> np.ndarray:
+    """Mở các cột số của dataset đã upload (memory-map, không copy)."""
+    data_array = get_registry().open_values(data['dataset_id'], data.get('columns'))
+    if data_array.shape[1] == 0:
+        raise ValueError("Dataset không có cột số")
+    return data_array
+
+
+def _kmeans_dataset_response(data: Dict, k: int, max_iters: int):
+    """Gom cụm trực tiếp trên dataset đã upload."""
+    try:
+        data_array = _open_dataset_points(data)
+    except DatasetNotFound:
+        return JsonResponse({
+            "error": f"Không tìm thấy dataset {data['dataset_id']}"
+        }, status=404)
+
+    if k < 1:
+        return JsonResponse({
+            "error": "Số cụm k phải >= 1"
+        }, status=400)
+
+    if len(data_array) < k:
+        return JsonResponse({
+            "error": f"Số điểm ({len(data_array)}) phải >= số cụm k ({k})"
+        }, status=400)
+
+    with _admit_kmeans(data, data_array, k, max_iters):
+        kmeans = _new_kmeans(data, k, max_iters)
+        if data.get('visualization') == 'aggregate':
+            return _kmeans_aggregate_response(data, data_array, kmeans)
+
+        result = _fit_kmeans(kmeans, data_array, data, record_history=bool(data.get('history', False)))
+        sizes = np.bincount(kmeans.labels, minlength=k)
+
+        response_data = {
+            "status": "success",
+            "algorithm": "K-Means Clustering",
+            "dataset_id": data['dataset_id'],
+            "k": k,
+            "iterations": result['iterations'],
+            "sse": round(result['sse'], 4),
+            "centroids": result['centroids'],
+            "labels": result['labels'],
+            "clusters": {f'cluster_{i}': int(sizes[i]) for i in range(k)},
+            "history": result['history']
+        }
+        if 'compression' in result:
+            response_data["compression"] = result['compression']
+        if data.get('persist'):
+            response_data["run_id"] = _persist_kmeans(data, data_array, kmeans, result)
+        with span('encode'):
+            return JsonResponse(response_data)
+
+
+def _admit_kmeans(data: Dict, data_array: np.ndarray, k: int, max_iters: int):
+    """
+    Admission control trước khi fit: chi phí ~ n * k * max_iters * d (d của
+    ma trận sparse: số phần tử khác 0 trung bình mỗi dòng), với
+    "compression" thì n là số điểm tối đa của tập nén (cộng một lượt gán nhãn
+    n * k * d trên dữ liệu gốc). 413 nếu vượt giới hạn, 429 nếu quá tải.
+    """
+    n, d = _cost_shape(data_array)
+    method = data.get('compression')
+    if method == 'grid':
+        fit_points = min(n, int(data.get('compression_size') or DEFAULT_GRID_CELLS) ** d)
+    elif method == 'lightweight':
+        fit_points = min(n, int(data.get('compression_size') or DEFAULT_CORESET_SIZE))
+    else:
+        fit_points = n
+    cost = kmeans_cost(fit_points, k, max_iters, d) + (kmeans_cost(n, k, 1, d) if method else 0)
+    check_request(cost, max_iters=max_iters)
+    return admit('clustering', cost)
+
+
+def _admit_kmeans_predict(data_array: np.ndarray, k: int):
+    """
+    Admission control cho dự đoán K-Means: một lượt gán nhãn ~ n * k * d.
+    Lô nhỏ chạy trong nhóm predict (chi phí 1); lô lớn hơn predict_max_cost
+    (vd. cả dataset đã upload) được tính như gom cụm: 413 nếu vượt max_cost,
+    chờ / 429 trong nhóm clustering.
+    """
+    n, d = _cost_shape(data_array)
+    cost = kmeans_cost(n, k, 1, d)
+    if cost <= admission_config()['predict_max_cost']:
+        return admit('predict')
+    check_request(cost)
+    return admit('clustering', cost)
+
+
+def _cost_shape(data_array: np.ndarray):
+    """(n, d) dùng để ước lượng chi phí; d của ma trận sparse là số phần tử khác 0 trung bình mỗi dòng."""
+    n = data_array.shape[0]
+    d = data_array.shape[1] if data_array.ndim == 2 else 1
+    if sparse.issparse(data_array):
+        # Tích sparse x dense: chi phí theo số phần tử khác 0 trung bình mỗi dòng
+        d = max(data_array.nnz / max(n, 1), 1.0)
+    return n, d
+
+
+def _fit_kmeans(kmeans: KMeansClustering, data_array: np.ndarray, data: Dict,
+                record_history: bool = True, include_points: bool = True) -> Dict[str, Any]:
+    """
+    kmeans.fit trên toàn bộ dữ liệu, hoặc trên tập đã nén nếu request có
+    "compression". Sau hàm này kmeans.labels luôn là nhãn của từng điểm gốc.
+    """
+    method = data.get('compression')
+    if not method:
+        with span('fit'):
+            return kmeans.fit(data_array, verbose=False, record_history=record_history,
+                              include_points=include_points, init=data.get('init_centroids'))
+
+    if method != 'dedup' and kmeans.metric != 'euclidean':
+        raise ValueError(f"compression '{method}' chỉ dùng với metric euclidean (dùng 'dedup')")
+    with span('compress'):
+        coreset = compress(data_array, method, size=data.get('compression_size'), seed=int(data.get('seed', 0)))
+    if len(coreset.points) < kmeans.k:
+        raise ValueError(f"Tập nén chỉ còn {len(coreset.points)} điểm, ít hơn số cụm k ({kmeans.k})")
+    with span('fit'):
+        result = kmeans.fit(coreset.points, verbose=False, record_history=False, include_points=False,
+                            sample_weight=coreset.weights, init=data.get('init_centroids'))
+    with span('map_labels'):
+        coreset_sse = result['sse']
+        kmeans.labels = coreset.map_labels(kmeans.labels, data_array, kmeans)
+        original = np.asarray(data_array, dtype=np.float64).reshape(len(kmeans.labels), -1)
+        result['sse'] = kmeans._calculate_sse(original, kmeans.labels, kmeans.centroids)
+        result['compression'] = {**coreset.summary(), 'coreset_sse': coreset_sse}
+        if include_points:
+            result['labels'] = kmeans.labels.tolist()
+            result['clusters'] = {
+                f'cluster_{i}': original[kmeans.labels == i].tolist() for i in range(kmeans.k)
+            }
+        else:
+            sizes = np.bincount(kmeans.labels, minlength=kmeans.k)
+            result['clusters'] = {f'cluster_{i}': int(sizes[i]) for i in range(kmeans.k)}
+    return result
+
+
+def _kmeans_aggregate_response(data: Dict, data_array: np.ndarray, kmeans: KMeansClustering):
+    """Gom cụm rồi trả về dữ liệu vẽ đã tổng hợp (không gửi từng điểm/nhãn)."""
+    result = _fit_kmeans(kmeans, data_array, data, record_history=bool(data.get('history', False)),
+                         include_points=False)
+    with span('aggregate'):
+        visualization = aggregate_clusters(
+            data_array, kmeans.labels, kmeans.k,
+            grid_size=int(data.get('grid_size', DEFAULT_GRID_SIZE)),
+            sample_size=int(data.get('sample_size', DEFAULT_SAMPLE_SIZE)),
+            dims=tuple(data.get('dims', (0, 1))),
+        )
+
+    response_data = {
+        "status": "success",
+        "algorithm": "K-Means Clustering",
+        "k": kmeans.k,
+        "iterations": result['iterations'],
+        "sse": round(result['sse'], 4),
+        "centroids": result['centroids'],
+        "clusters": result['clusters'],
+        "visualization": "aggregate",
+        "aggregate": visualization,
+        "history": result['history']
+    }
+    if 'compression' in result:
+        response_data["compression"] = result['compression']
+    if data.get('dataset_id'):
+        response_data["dataset_id"] = data['dataset_id']
+    if data.get('persist'):
+        response_data["run_id"] = _persist_kmeans(data, data_array, kmeans, result)
+    with span('encode'):
+        return JsonResponse(response_data)
+
+
+def _persist_kmeans(data: Dict, data_array: np.ndarray, kmeans: KMeansClustering, result: Dict[str, Any]) -> str:
+    """Lưu kết quả K-Means vào database ("persist": true), trả về run_id."""
+    params = {'k': kmeans.k, 'max_iters': kmeans.max_iters, 'iterations': result['iterations']}
+    if kmeans.metric != 'euclidean':
+        params['metric'] = kmeans.metric
+    if data.get('compression'):
+        params['compression'] = data['compression']
+    if isinstance(data.get('warm_start'), dict):
+        params['warm_start'] = data['warm_start'].get('run_id')
+    second_distances = None
+    with span('persist'):
+        if kmeans.metric == 'euclidean' and not sparse.issparse(data_array):
+            _, second_distances = kmeans.distance_bounds(data_array)
+        run = save_run('kmeans', data_array, kmeans.labels, kmeans.k, centroids=kmeans.centroids,
+                       params=params, dataset_id=data.get('dataset_id', ''), sse=result['sse'],
+                       second_distances=second_distances)
+    return run.id
+
+
+@csrf_exempt
+def dbscan_cluster_view(request):
+    """
+    API endpoint cho DBSCAN (gom cụm theo mật độ, không cần biết trước k).
+
+    Input JSON giống /cluster/kmeans/, thay "k" bằng:
+    {
+        "points": [{"x": 1, "y": 3}, ...],   (hoặc chuỗi "x1={1,3}, ...")
+        "eps": 0.5,
+        "min_samples": 5,
+        "index": "auto"      (tùy chọn: "grid" - chỉ 2D, "kdtree")
+    }
+
+    Hoặc {"dataset_id": "...", "columns": [...], "eps": ..., "min_samples": ...}
+    (response không gửi lại điểm gốc, "clusters" chỉ chứa số điểm mỗi cụm).
+    "visualization": "aggregate" trả dữ liệu vẽ đã tổng hợp như K-Means;
+    nhiễu là mục cuối cùng với "cluster": -1.
+
+    Nhãn -1 là nhiễu; "noise" chứa các điểm nhiễu (khi gửi kèm điểm).
+    "persist": true lưu kết quả như K-Means (centroid = trung bình mỗi cụm).
+    """
+    if request.method != 'POST':
+        return JsonResponse({
+            "error": "Chỉ chấp nhận POST"
+        }, status=405)
+
+    try:
+        with span('json_parse'):
+            data = json.loads(request.body)
+
+        eps = float(data.get('eps', 0.5))
+        min_samples = int(data.get('min_samples', 5))
+        dbscan = DBSCANClustering(eps=eps, min_samples=min_samples, index=data.get('index', 'auto'))
+
+        points = None
+        if data.get('dataset_id'):
+            try:
+                data_array = _open_dataset_points(data)
+            except DatasetNotFound:
+                return JsonResponse({
+                    "error": f"Không tìm thấy dataset {data['dataset_id']}"
+                }, status=404)
+        else:
+            points_list = data.get('points', [])
+            with span('parse_points'):
+                if isinstance(points_list, str):
+                    data_array = parse_points_from_string(points_list)
+                    points = data_array.tolist()
+                else:
+                    points = parse_points_from_list(points_list) if points_list else []
+                    if len(set(len(p) for p in points)) > 1:
+                        return JsonResponse({
+                            "error": "Tất cả các điểm phải có cùng số chiều"
+                        }, status=400)
+                    data_array = np.array(points, dtype=np.float64)
+            if len(points) == 0:
+                return JsonResponse({
+                    "error": "Danh sách điểm không được để trống"
+                }, status=400)
+
+        n, d = data_array.shape if data_array.ndim == 2 else (len(data_array), 1)
+        neighbours = 0.0
+        if dbscan.resolve_index(d) == 'kdtree':
+            with span('estimate_cost'):
+                neighbours = estimate_neighbours(data_array, eps)
+        cost = dbscan_cost(n, d, neighbours)
+        check_request(cost)
+        with admit('clustering', cost):
+            aggregate = data.get('visualization') == 'aggregate'
+            with span('fit'):
+                result = dbscan.fit(data_array, include_points=points is not None and not aggregate)
+
+            response_data = {
+                "status": "success",
+                "algorithm": "DBSCAN",
+                "eps": eps,
+                "min_samples": min_samples,
+                "index": result['index'],
+                "n_clusters": result['n_clusters'],
+                "n_noise": result['n_noise'],
+                "n_core": result['n_core'],
+                "clusters": result['clusters'],
+            }
+            if data.get('dataset_id'):
+                response_data["dataset_id"] = data['dataset_id']
+
+            if aggregate:
+                k = dbscan.n_clusters
+                with span('aggregate'):
+                    # Nhiễu được tổng hợp như một cụm thêm ở cuối
+                    visualization = aggregate_clusters(
+                        data_array, np.where(dbscan.labels == NOISE, k, dbscan.labels), k + 1,
+                        grid_size=int(data.get('grid_size', DEFAULT_GRID_SIZE)),
+                        sample_size=int(data.get('sample_size', DEFAULT_SAMPLE_SIZE)),
+                        dims=tuple(data.get('dims', (0, 1))),
+                    )
+                visualization['clusters'][k]['cluster'] = NOISE
+                response_data.update({"visualization": "aggregate", "aggregate": visualization})
+            elif points is not None:
+                response_data.update({
+                    "labels": result['labels'],
+                    "noise": result['noise'],
+                    "points": points,
+                })
+            else:
+                response_data["labels"] = dbscan.labels.tolist()
+
+            if data.get('persist'):
+                with span('persist'):
+                    run = save_run('dbscan', data_array, dbscan.labels, dbscan.n_clusters,
+                                   params={'eps': eps, 'min_samples': min_samples, 'index': result['index']},
+                                   dataset_id=data.get('dataset_id', ''))
+                response_data["run_id"] = run.id
+
+            with span('encode'):
+                return JsonResponse(response_data)
+
+    except AdmissionRejected as e:
+        return rejection_response(e)
+    except RequestDataTooBig as e:
+        return JsonResponse({
+            "error": f"Request quá lớn: {str(e)}"
+        }, status=413)
+    except ValueError as e:
+        return JsonResponse({
+            "error": f"Lỗi giá trị: {str(e)}"
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            "error": f"Lỗi xử lý: {str(e)}"
+        }, status=500)
+
+
 @csrf_exempt
 def kmeans_predict_view(request):
     """
@@ -114,10 +731,16 @@ def kmeans_predict_view(request):
         "centroids": [[1.2, 2.8], [3.0, 1.0]],
         "points": [{"x": 1.1, "y": 2.9}]
     }
+    "points" cũng có thể là chuỗi dán vào: "x1={1.1,2.9}"
+    Dữ liệu sparse: "sparse" (dạng CSR như /cluster/kmeans/) thay cho "points".
+    "metric" phải trùng với metric lúc train (mặc định "euclidean").
+
+    Nhóm admission theo chi phí n x k x d (xem _admit_kmeans_predict).
     """
     if request.method == 'POST':
         try:
-            data = json.loads(request.body)
+            with span('json_parse'):
+                data = json.loads(request.body)
             
             centroids = data.get('centroids', [])
             points_list = data.get('points', [])
@@ -126,23 +749,60 @@ def kmeans_predict_view(request):
                 return JsonResponse({
                     "error": "Centroids không được để trống"
                 }, status=400)
-            
-            if not points_list:
+
+            if data.get('sparse') is not None:
+                kmeans = _new_kmeans(data, len(centroids))
+                kmeans.centroids = np.array(centroids, dtype=np.float64)
+                with span('parse_points'):
+                    matrix = parse_sparse_points(data['sparse'])
+                with _admit_kmeans_predict(matrix, len(centroids)), span('predict'):
+                    labels = kmeans.predict(matrix)
+                return JsonResponse({
+                    "status": "success",
+                    "labels": labels.tolist()
+                })
+
+            # Dự đoán cho toàn bộ dataset đã upload
+            if data.get('dataset_id'):
+                kmeans = _new_kmeans(data, len(centroids))
+                kmeans.centroids = np.array(centroids, dtype=np.float64)
+                data_array = _open_dataset_points(data)
+                with _admit_kmeans_predict(data_array, len(centroids)), span('predict'):
+                    labels = kmeans.predict(data_array)
+                return JsonResponse({
+                    "status": "success",
+                    "dataset_id": data['dataset_id'],
+                    "labels": labels.tolist()
+                })
+
+            # Chuỗi điểm dán vào ("x1={1,3}, x2={1.5,3.2}"): parse thẳng thành mảng numpy
+            parsed_array = None
+            if isinstance(points_list, str):
+                with span('parse_points'):
+                    parsed_array = parse_points_from_string(points_list)
+                points_list = parsed_array
+
+            if len(points_list) == 0:
                 return JsonResponse({
                     "error": "Danh sách điểm không được để trống"
                 }, status=400)
             
             # Parse points
-            points = parse_points_from_list(points_list)
+            if parsed_array is not None:
+                points = parsed_array.tolist()
+            else:
+                with span('parse_points'):
+                    points = parse_points_from_list(points_list)
             data_array = np.array(points)
             
             # Tạo model với centroids đã biết
             k = len(centroids)
-            kmeans = KMeansClustering(k=k)
+            kmeans = _new_kmeans(data, k)
             kmeans.centroids = np.array(centroids)
             
             # Dự đoán
-            labels = kmeans.predict(data_array)
+            with _admit_kmeans_predict(data_array, k), span('predict'):
+                labels = kmeans.predict(data_array)
             
             return JsonResponse({
                 "status": "success",
@@ -150,6 +810,12 @@ def kmeans_predict_view(request):
                 "points": points
             })
             
+        except AdmissionRejected as e:
+            return rejection_response(e)
+        except DatasetNotFound:
+            return JsonResponse({
+                "error": f"Không tìm thấy dataset {data['dataset_id']}"
+            }, status=404)
         except Exception as e:
             return JsonResponse({
                 "error": f"Lỗi xử lý: {str(e)}"
@@ -166,20 +832,23 @@ def load_example_data_view(request):
     API endpoint để load dữ liệu ví dụ từ file CSV.
     
     GET /data_mining/cluster/load-example/?file=bai1 hoặc ?file=bai2
+
+    File CSV chỉ được parse một lần (làm mới khi mtime thay đổi); response JSON
+    được serialize sẵn kèm ETag, request có If-None-Match khớp nhận 304.
     """
     if request.method == 'GET':
         try:
             file_name = request.GET.get('file', 'bai1')
             
-            # Xác định file CSV cần đọc
-            if file_name == 'bai1':
-                csv_file = 'Bai1_k2_data.csv'
-            elif file_name == 'bai2':
-                csv_file = 'Bai2_k3_data.csv'
-            else:
-                return JsonResponse({
-                    "error": "File không hợp lệ. Chỉ chấp nhận 'bai1' hoặc 'bai2'"
-                }, status=400)
+            # Dataset đã upload vào kho (tham chiếu bằng ID)
+            if file_name not in EXAMPLE_DATASETS:
+                try:
+                    return _registry_example_response(file_name)
+                except DatasetNotFound:
+                    return JsonResponse({
+                        "error": "File không hợp lệ. Chỉ chấp nhận 'bai1', 'bai2' hoặc ID dataset đã upload"
+                    }, status=400)
+            csv_file, k_default = EXAMPLE_DATASETS[file_name]
             
             # Đường dẫn đến file CSV
             csv_path = os.path.join(
@@ -196,28 +865,22 @@ def load_example_data_view(request):
                     "error": f"Không tìm thấy file {csv_file}"
                 }, status=404)
             
-            # Đọc file CSV
-            df = pd.read_csv(csv_path, index_col=0)
-            
-            # Chuyển đổi sang định dạng JSON
-            points = []
-            for idx, row in df.iterrows():
-                points.append({
-                    'id': str(idx),
-                    'x': float(row['x']),
-                    'y': float(row['y'])
-                })
-            
-            # Xác định giá trị k mặc định
-            k_default = 2 if file_name == 'bai1' else 3
-            
-            return JsonResponse({
+            # Lấy dataset từ cache (đọc file CSV nếu chưa có hoặc đã thay đổi)
+            entry = EXAMPLE_DATASET_CACHE.get(csv_path, lambda e: {
                 "status": "success",
                 "file": csv_file,
-                "points": points,
+                "points": points_payload(e),
                 "k": k_default,
-                "num_points": len(points)
+                "num_points": len(e.array)
             })
+
+            if entry.etag in parse_etags(request.headers.get('If-None-Match', '')):
+                response = HttpResponseNotModified()
+            else:
+                response = HttpResponse(entry.body, content_type='application/json')
+            response['ETag'] = entry.etag
+            response['Cache-Control'] = 'no-cache'
+            return response
             
         except Exception as e:
             return JsonResponse({
@@ -228,3 +891,25 @@ def load_example_data_view(request):
         "error": "Chỉ chấp nhận GET"
     }, status=405)
 
+
+def _registry_example_response(dataset_id: str):
+    """Trả về điểm (2 cột số đầu tiên, ưu tiên x/y) của một dataset trong kho."""
+    registry = get_registry()
+    schema = registry.schema(dataset_id)
+    numeric = schema['numeric_columns']
+    columns = ['x', 'y'] if {'x', 'y'} <= set(numeric) else numeric[:2]
+    if len(columns) < 2:
+        return JsonResponse({
+            "error": "Dataset cần ít nhất 2 cột số để hiển thị"
+        }, status=400)
+
+    values = registry.open_values(dataset_id, columns)
+    xs, ys = values[:, 0].tolist(), values[:, 1].tolist()
+    points = [{'id': str(i), 'x': x, 'y': y} for i, (x, y) in enumerate(zip(xs, ys))]
+    return JsonResponse({
+        "status": "success",
+        "file": schema.get('name') or dataset_id,
+        "points": points,
+        "k": schema.get('k', 2),
+        "num_points": len(points)
+    })
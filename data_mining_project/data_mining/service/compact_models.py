@@ -0,0 +1,360 @@
+# service/compact_models.py
+# Định dạng model gọn, không dùng pickle: file .npz (mảng số) + manifest JSON
+#
+# Mỗi model phân loại (pipeline OneHotEncoder + DecisionTreeClassifier/GaussianNB,
+# hoặc bảng đếm CategoricalNaiveBayes) được làm phẳng thành:
+#   <tên>.compact.json : từ vựng category của từng feature, nhãn lớp, loại model,
+#                        hash các file nguồn, dtype/shape của từng mảng
+#   <tên>.compact.npz  : mảng nút cây hoặc bảng log-xác suất (không nén, để mmap)
+#
+# Tải và dự đoán chỉ cần numpy (không import sklearn/pandas/joblib).
+
+import hashlib
+import json
+import os
+import time
+import zipfile
+from typing import Dict, List, Any, Sequence, Tuple
+
+import numpy as np
+
+
+FORMAT_VERSION = 'data_mining.compact/1'
+COMPACT_SUFFIX = '.compact'
+
+
+def compact_paths(model_dir: str, model_name: str) -> Tuple[str, str]:
+    """(đường dẫn .npz, đường dẫn .json) của model dạng gọn."""
+    prefix = os.path.join(model_dir, model_name + COMPACT_SUFFIX)
+    return prefix + '.npz', prefix + '.json'
+
+
+# ====================================================================
+# A. MODEL DẠNG GỌN (chỉ numpy)
+# ====================================================================
+
+class CompactModel:
+    """
+    Phần chung: từ vựng category, nhãn lớp và encode bản ghi thành mã
+    category (n_samples, n_features); giá trị chưa từng thấy có mã -1.
+
+    predict(records) nhận cùng kiểu đầu vào với CategoricalNaiveBayes.predict:
+    danh sách dict {feature: value} hoặc list giá trị theo thứ tự features.
+    """
+
+    kind = ''
+
+    def __init__(self, manifest: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        self.manifest = manifest
+        self.arrays = arrays
+        self.features: List[str] = list(manifest['features'])
+        self.classes_: List[str] = list(manifest['classes'])
+        self.categories_: List[List[str]] = [list(manifest['categories'][f]) for f in self.features]
+        self._category_index = [{v: i for i, v in enumerate(c)} for c in self.categories_]
+
+    def encode(self, records: Sequence[Any]) -> np.ndarray:
+        columns = self._columns(records)
+        codes = np.empty((len(records), len(self.features)), dtype=np.intp)
+        for f, column in enumerate(columns):
+            index = self._category_index[f]
+            codes[:, f] = np.fromiter((index.get(str(v), -1) for v in column), dtype=np.intp, count=len(column))
+        return codes
+
+    def predict(self, records: Sequence[Any]) -> List[str]:
+        """Dự đoán nhãn cho một lô mẫu."""
+        class_index = self.predict_codes(self.encode(records))
+        return [self.classes_[i] for i in class_index]
+
+    def predict_codes(self, codes: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def _columns(self, records: Sequence[Any]) -> List[List[Any]]:
+        if len(records) and isinstance(records[0], dict):
+            return [[r.get(name, '') for r in records] for name in self.features]
+        n_features = len(self.features)
+        for r in records:
+            if len(r) != n_features:
+                raise ValueError(f"Mỗi mẫu phải có đúng {n_features} giá trị")
+        return [list(col) for col in zip(*records)] if len(records) else [[] for _ in self.features]
+
+
+class CompactDecisionTree(CompactModel):
+    """
+    Cây quyết định trên dữ liệu one-hot, lưu bằng các mảng nút:
+
+    - node_column: cột one-hot được kiểm tra tại nút (-1 nếu là lá)
+    - threshold, left, right: đi sang trái nếu giá trị cột <= threshold
+    - leaf_class: chỉ số nhãn lớp của lá (theo classes)
+    - column_feature, column_category: cột one-hot j <=> (feature, mã category)
+
+    Mọi mẫu được duyệt đồng thời theo từng tầng (vectorized), không dựng
+    ma trận one-hot.
+    """
+
+    kind = 'decision_tree'
+
+    def predict_codes(self, codes: np.ndarray) -> np.ndarray:
+        a = self.arrays
+        node_column, threshold = a['node_column'], a['threshold']
+        left, right = a['left'], a['right']
+        column_feature, column_category = a['column_feature'], a['column_category']
+
+        node = np.zeros(len(codes), dtype=np.intp)
+        active = np.arange(len(codes))
+        for _ in range(int(self.manifest['max_depth']) + 1):
+            column = node_column[node[active]]
+            internal = column >= 0
+            active, column = active[internal], column[internal]
+            if not len(active):
+                break
+            value = (codes[active, column_feature[column]] == column_category[column]).astype(np.float64)
+            current = node[active]
+            node[active] = np.where(value <= threshold[current], left[current], right[current])
+        return a['leaf_class'][node]
+
+
+class CompactNaiveBayes(CompactModel):
+    """
+    Naive Bayes dạng bảng: log P(c) (cộng các hạng tử hằng) trong class_base,
+    đóng góp của từng (feature, category) trong log_table (n_rows, n_classes).
+    Mỗi feature chiếm len(categories)+1 hàng bắt đầu tại offsets[f]; hàng
+    cuối của feature là hàng 0 dành cho category chưa từng thấy.
+    """
+
+    kind = 'naive_bayes_table'
+
+    def predict_codes(self, codes: np.ndarray) -> np.ndarray:
+        return self.joint_log_likelihood(codes).argmax(axis=1)
+
+    def joint_log_likelihood(self, codes: np.ndarray) -> np.ndarray:
+        a = self.arrays
+        sizes = np.array([len(c) for c in self.categories_], dtype=np.intp)
+        rows = np.where(codes >= 0, codes, sizes) + a['offsets']
+        return a['class_base'] + a['log_table'][rows].sum(axis=1)
+
+
+MODEL_KINDS = {cls.kind: cls for cls in (CompactDecisionTree, CompactNaiveBayes)}
+
+
+# ====================================================================
+# B. TẢI (mmap được)
+# ====================================================================
+
+def read_manifest(manifest_path: str) -> Dict[str, Any]:
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT_VERSION:
+        raise ValueError(f"{manifest_path}: định dạng không hỗ trợ: {manifest.get('format')}")
+    if manifest.get('kind') not in MODEL_KINDS:
+        raise ValueError(f"{manifest_path}: loại model không hỗ trợ: {manifest.get('kind')}")
+    return manifest
+
+
+def load_compact(arrays_path: str, manifest_path: str, mmap: bool = False) -> CompactModel:
+    """Tải model dạng gọn; mmap=True ánh xạ trực tiếp các mảng trong file .npz."""
+    manifest = read_manifest(manifest_path)
+    arrays = load_npz(arrays_path, mmap=mmap)
+    missing = set(manifest['arrays']) - set(arrays)
+    if missing:
+        raise ValueError(f"{arrays_path}: thiếu mảng {sorted(missing)}")
+    return MODEL_KINDS[manifest['kind']](manifest, arrays)
+
+
+def load_npz(path: str, mmap: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Đọc mọi mảng trong file .npz (allow_pickle=False).
+
+    np.load(mmap_mode=...) không áp dụng cho .npz; với mmap=True, các thành
+    phần lưu không nén được ánh xạ bằng np.memmap tại đúng offset dữ liệu
+    trong file zip (thành phần nén thì đọc bình thường).
+    """
+    if not mmap:
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+            # Local file header: 30 byte cố định + tên + extra
+            f.seek(info.header_offset)
+            header = f.read(30)
+            name_length = int.from_bytes(header[26:28], 'little')
+            extra_length = int.from_bytes(header[28:30], 'little')
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            read_header = _NPY_HEADER_READERS.get(version)
+            if read_header is None:
+                raise ValueError(f"{path}: phiên bản .npy {version} không hỗ trợ mmap")
+            shape, fortran_order, dtype = read_header(f)
+            if dtype.hasobject:
+                raise ValueError(f"{path}: mảng '{name}' chứa object (cần pickle)")
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+                continue
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                     order='F' if fortran_order else 'C')
+    return arrays
+
+
+_NPY_HEADER_READERS = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0,
+}
+
+
+def sources_match(manifest: Dict[str, Any], model_dir: str) -> bool:
+    """
+    Model gọn còn khớp với các file nguồn (pipeline/encoder/bảng đếm) hay không.
+    File nguồn không còn tồn tại thì bỏ qua (cho phép triển khai chỉ với model gọn).
+    """
+    for name, digest in manifest.get('sources', {}).items():
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path) and _sha256(path) != digest:
+            return False
+    return True
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ====================================================================
+# C. XUẤT TỪ MODEL ĐÃ HUẤN LUYỆN
+# ====================================================================
+
+def export_pipeline(pipeline, encoder, features: Sequence[str]) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """
+    Làm phẳng Pipeline(ColumnTransformer(OneHotEncoder), classifier) + LabelEncoder.
+
+    Hỗ trợ DecisionTreeClassifier và GaussianNB. Returns (manifest, arrays).
+    """
+    preprocessor = pipeline.steps[0][1]
+    classifier = pipeline.steps[-1][1]
+    features = list(features)
+    categories, column_feature, column_category = _one_hot_layout(preprocessor, features)
+    # classifier.classes_ là nhãn đã encode -> chỉ số trong encoder.classes_
+    classes = [str(c) for c in encoder.classes_]
+    classifier_classes = np.asarray(classifier.classes_, dtype=np.intp)
+
+    kind = type(classifier).__name__
+    if kind == 'DecisionTreeClassifier':
+        tree = classifier.tree_
+        is_leaf = tree.children_left < 0
+        arrays = {
+            'node_column': np.where(is_leaf, -1, tree.feature).astype(np.int32),
+            'threshold': tree.threshold.astype(np.float64),
+            'left': np.where(is_leaf, 0, tree.children_left).astype(np.int32),
+            'right': np.where(is_leaf, 0, tree.children_right).astype(np.int32),
+            'leaf_class': classifier_classes[tree.value[:, 0, :].argmax(axis=1)].astype(np.int32),
+            'column_feature': column_feature,
+            'column_category': column_category,
+        }
+        manifest = {'kind': CompactDecisionTree.kind, 'max_depth': int(tree.max_depth)}
+    elif kind == 'GaussianNB':
+        # x là one-hot (0/1): log N(x | theta, var) chỉ có 2 giá trị cho mỗi (lớp, cột)
+        var, theta = classifier.var_, classifier.theta_
+        log_norm = -0.5 * np.log(2.0 * np.pi * var)
+        term0 = log_norm - 0.5 * theta ** 2 / var
+        term1 = log_norm - 0.5 * (1.0 - theta) ** 2 / var
+        class_base = np.log(classifier.class_prior_) + term0.sum(axis=1)
+        # Mỗi feature: các hàng category (term1 - term0) rồi một hàng 0 cho category lạ
+        delta = (term1 - term0).T
+        blocks, offsets, start = [], [], 0
+        for f, values in enumerate(categories):
+            offsets.append(start)
+            blocks.append(delta[column_feature == f])
+            blocks.append(np.zeros((1, delta.shape[1])))
+            start += len(values) + 1
+        arrays = {
+            'class_base': _by_class(class_base, classifier_classes, len(classes)),
+            'log_table': _by_class(np.vstack(blocks), classifier_classes, len(classes)),
+            'offsets': np.asarray(offsets, dtype=np.intp),
+        }
+        manifest = {'kind': CompactNaiveBayes.kind}
+    else:
+        raise ValueError(f"Không hỗ trợ xuất classifier {kind}")
+
+    manifest.update({'features': features, 'classes': classes,
+                     'categories': dict(zip(features, categories)), 'source_type': kind})
+    return manifest, arrays
+
+
+def export_naive_bayes_counts(model) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Làm phẳng CategoricalNaiveBayes (bảng đếm) thành bảng log-xác suất."""
+    model._ensure_table()
+    manifest = {
+        'kind': CompactNaiveBayes.kind,
+        'features': list(model.features),
+        'classes': list(model.classes_),
+        'categories': {f: list(c) for f, c in zip(model.features, model.categories_)},
+        'source_type': 'CategoricalNaiveBayes',
+    }
+    arrays = {
+        'class_base': np.asarray(model._class_log_prior, dtype=np.float64),
+        'log_table': np.asarray(model._log_table, dtype=np.float64),
+        'offsets': np.asarray(model._offsets, dtype=np.intp),
+    }
+    return manifest, arrays
+
+
+def save_compact(model_dir: str, model_name: str, manifest: Dict[str, Any], arrays: Dict[str, np.ndarray],
+                 sources: Sequence[str] = ()) -> Tuple[str, str]:
+    """
+    Ghi .npz (không nén) rồi manifest, cả hai đều nguyên tử. Manifest ghi
+    sau cùng nên tiến trình đang phục vụ không bao giờ thấy manifest mới
+    đi với mảng cũ.
+    """
+    from .training import atomic_write
+
+    arrays_path, manifest_path = compact_paths(model_dir, model_name)
+    manifest = {
+        'format': FORMAT_VERSION,
+        'model': model_name,
+        **manifest,
+        'arrays': {name: {'dtype': a.dtype.str, 'shape': list(a.shape)} for name, a in arrays.items()},
+        'sources': {os.path.basename(p): _sha256(p) for p in sources},
+        'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+    atomic_write(arrays_path, lambda f: np.savez(f, **arrays))
+    atomic_write(manifest_path,
+                 lambda f: f.write(json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')))
+    return arrays_path, manifest_path
+
+
+def _one_hot_layout(preprocessor, features: List[str]):
+    """
+    Từ vựng của từng feature và ánh xạ cột one-hot -> (feature, mã category),
+    theo đúng thứ tự cột đầu ra của ColumnTransformer.
+    """
+    categories: List[List[str]] = [[] for _ in features]
+    column_feature: List[int] = []
+    column_category: List[int] = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == 'remainder':
+            if transformer != 'drop' and len(columns):
+                raise ValueError("Không hỗ trợ cột passthrough ngoài các feature phân loại")
+            continue
+        if type(transformer).__name__ != 'OneHotEncoder' or transformer.drop is not None:
+            raise ValueError(f"Chỉ hỗ trợ OneHotEncoder (drop=None), gặp {transformer}")
+        for column, values in zip(columns, transformer.categories_):
+            f = features.index(str(column))
+            categories[f] = [str(v) for v in values]
+            column_feature.extend([f] * len(values))
+            column_category.extend(range(len(values)))
+    return categories, np.asarray(column_feature, dtype=np.int32), np.asarray(column_category, dtype=np.int32)
+
+
+def _by_class(values: np.ndarray, classifier_classes: np.ndarray, n_classes: int) -> np.ndarray:
+    """Sắp lại trục lớp (cuối cùng) theo thứ tự của encoder.classes_; lớp vắng mặt = -inf."""
+    result = np.full(values.shape[:-1] + (n_classes,), -np.inf)
+    result[..., classifier_classes] = values
+    return result
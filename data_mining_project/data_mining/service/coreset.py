@@ -0,0 +1,168 @@
+# service/coreset.py
+# Nén dữ liệu trước khi gom cụm: gộp điểm trùng, coreset lưới, lightweight coreset
+#
+# Mỗi phương pháp trả về một Coreset: tập điểm nhỏ hơn kèm trọng số để chạy
+# KMeansClustering.fit(..., sample_weight=...), và cách ánh xạ nhãn của tập
+# nhỏ về từng dòng dữ liệu gốc.
+
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+
+COMPRESSION_METHODS = ('dedup', 'grid', 'lightweight')
+# Số ô mỗi chiều của coreset lưới
+DEFAULT_GRID_CELLS = 64
+# Số điểm mẫu của lightweight coreset
+DEFAULT_CORESET_SIZE = 2000
+
+
+class Coreset:
+    """
+    Tập điểm có trọng số thay cho dữ liệu gốc.
+
+    Attributes:
+        points: Mảng (m, d) các điểm đại diện
+        weights: Trọng số (m,) - số điểm gốc (ước lượng) mà mỗi điểm đại diện
+        inverse: (n,) chỉ số điểm đại diện của từng dòng gốc, hoặc None nếu
+            nhãn của dòng gốc phải tính lại bằng centroid gần nhất
+        error_bound: Thông tin sai số của phương pháp (xem từng hàm)
+    """
+
+    def __init__(self, method: str, points: np.ndarray, weights: np.ndarray, n_original: int,
+                 inverse: Optional[np.ndarray] = None, error_bound: Optional[Dict[str, Any]] = None):
+        self.method = method
+        self.points = points
+        self.weights = weights
+        self.n_original = n_original
+        self.inverse = inverse
+        self.error_bound = error_bound or {}
+
+    def map_labels(self, labels: np.ndarray, data: np.ndarray, kmeans) -> np.ndarray:
+        """Nhãn của từng dòng gốc từ nhãn của các điểm đại diện."""
+        if self.inverse is not None:
+            return np.asarray(labels)[self.inverse]
+        return kmeans.predict(data)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'method': self.method,
+            'original_points': int(self.n_original),
+            'compressed_points': int(len(self.points)),
+            'ratio': round(len(self.points) / self.n_original, 6) if self.n_original else 1.0,
+            'error_bound': self.error_bound,
+        }
+
+
+def compress(data: np.ndarray, method: str, size: Optional[int] = None, seed: int = 0) -> Coreset:
+    """
+    Nén data bằng phương pháp `method` (một trong COMPRESSION_METHODS).
+
+    size: số ô mỗi chiều với 'grid', số điểm mẫu với 'lightweight'.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if data.ndim == 1:
+        data = data.reshape(-1, 1)
+    if method == 'dedup':
+        return deduplicate(data)
+    if method == 'grid':
+        return grid_coreset(data, int(size or DEFAULT_GRID_CELLS))
+    if method == 'lightweight':
+        return lightweight_coreset(data, int(size or DEFAULT_CORESET_SIZE), seed=seed)
+    raise ValueError(f"Phương pháp nén không hợp lệ: {method} (chấp nhận: {', '.join(COMPRESSION_METHODS)})")
+
+
+# ====================================================================
+# A. GỘP ĐIỂM TRÙNG
+# ====================================================================
+
+def deduplicate(data: np.ndarray) -> Coreset:
+    """
+    Gộp các dòng trùng nhau thành một điểm có trọng số = số lần xuất hiện.
+
+    Không mất mát: với mọi tập centroids, SSE có trọng số trên tập đã gộp
+    bằng đúng SSE trên dữ liệu gốc, và nhãn ánh xạ lại là chính xác.
+    """
+    points, inverse, counts = np.unique(data, axis=0, return_inverse=True, return_counts=True)
+    return Coreset('dedup', points, counts.astype(np.float64), len(data),
+                   inverse=inverse.reshape(-1), error_bound={'sse_offset': 0.0})
+
+
+# ====================================================================
+# B. CORESET LƯỚI
+# ====================================================================
+
+def grid_coreset(data: np.ndarray, cells_per_dim: int = DEFAULT_GRID_CELLS) -> Coreset:
+    """
+    Chia không gian thành lưới cells_per_dim ô mỗi chiều; mỗi ô khác rỗng
+    được thay bằng trung bình các điểm trong ô, trọng số = số điểm.
+
+    Sai số: mọi điểm trong một ô nhận cùng nhãn với điểm đại diện, nên với
+    mọi tập centroids, SSE trên dữ liệu gốc của nhãn ánh xạ lại bằng đúng
+    SSE có trọng số trên coreset cộng với W = tổng bình phương khoảng cách
+    từ các điểm tới trung bình ô của chúng (hằng số, không phụ thuộc
+    centroids). W <= n * sum(h_j^2) / 4 với h_j là cạnh ô theo chiều j.
+    """
+    if cells_per_dim < 1:
+        raise ValueError("Số ô lưới mỗi chiều phải >= 1")
+    lo = data.min(axis=0)
+    hi = data.max(axis=0)
+    cell_width = np.where(hi > lo, (hi - lo) / cells_per_dim, 1.0)
+    cells = np.minimum(((data - lo) / cell_width).astype(np.int64), cells_per_dim - 1)
+
+    _, inverse, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    weights = counts.astype(np.float64)
+    points = np.empty((len(counts), data.shape[1]))
+    for j in range(data.shape[1]):
+        points[:, j] = np.bincount(inverse, weights=data[:, j], minlength=len(counts)) / weights
+
+    diff = data - points[inverse]
+    within = float(np.einsum('ij,ij->', diff, diff))
+    widths = np.where(hi > lo, cell_width, 0.0)
+    return Coreset('grid', points, weights, len(data), inverse=inverse, error_bound={
+        'sse_offset': within,
+        'sse_offset_max': float(len(data) * np.sum(widths ** 2) / 4),
+    })
+
+
+# ====================================================================
+# C. LIGHTWEIGHT CORESET (Bachem, Lucic, Krause 2018)
+# ====================================================================
+
+def lightweight_coreset(data: np.ndarray, size: int = DEFAULT_CORESET_SIZE, seed: int = 0) -> Coreset:
+    """
+    Lấy mẫu `size` điểm với xác suất q(x) = 1/(2n) + d(x, mu)^2 / (2 * sum d^2)
+    (mu là trung bình dữ liệu), trọng số 1 / (size * q(x)).
+
+    Sai số: với size = O((d*k*log k + log(1/delta)) / eps^2), xác suất
+    >= 1 - delta, với mọi tập k centroids C:
+        |SSE_coreset(C) - SSE(C)| <= eps/2 * SSE(C) + eps/2 * SSE({mu})
+    SSE({mu}) (tổng bình phương khoảng cách tới trung bình) được trả về trong
+    error_bound. Nhãn của dòng gốc được tính lại bằng centroid gần nhất.
+    """
+    n = len(data)
+    if size < 1:
+        raise ValueError("Kích thước coreset phải >= 1")
+    if size >= n:
+        return Coreset('lightweight', data, np.ones(n), n, inverse=np.arange(n),
+                       error_bound={'total_variance': _total_variance(data), 'sampled': False})
+
+    diff = data - data.mean(axis=0)
+    distances = np.einsum('ij,ij->i', diff, diff)
+    total = float(distances.sum())
+    q = 0.5 / n + (0.5 * distances / total if total > 0 else 0.5 / n)
+    q /= q.sum()
+
+    rng = np.random.default_rng(seed)
+    sampled = rng.choice(n, size=size, replace=True, p=q)
+    # Điểm được chọn nhiều lần -> một điểm với trọng số cộng dồn
+    indices, repeats = np.unique(sampled, return_counts=True)
+    weights = repeats / (size * q[indices])
+    return Coreset('lightweight', data[indices], weights, n,
+                   error_bound={'total_variance': total, 'sampled': True})
+
+
+def _total_variance(data: np.ndarray) -> float:
+    diff = data - data.mean(axis=0)
+    return float(np.einsum('ij,ij->', diff, diff))
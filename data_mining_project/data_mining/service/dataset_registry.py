@@ -0,0 +1,244 @@
+# service/dataset_registry.py
+# Kho dataset: upload một lần, lưu dạng nhị phân .npy, mở lại bằng memory-map
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+# Kích thước khối khi ghi file upload và số dòng mỗi lần đọc CSV khi chuyển đổi
+UPLOAD_CHUNK_SIZE = 1 << 20
+CONVERT_CHUNK_ROWS = 100_000
+
+# Tên file trong thư mục của mỗi dataset
+SOURCE_FILE = 'source.csv'
+VALUES_FILE = 'values.npy'     # Các cột số: float64, shape (n_rows, n_numeric)
+CODES_FILE = 'codes.npy'       # Các cột phân loại: int32 (chỉ số trong vocabulary)
+SCHEMA_FILE = 'schema.json'
+
+_DATASET_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class DatasetNotFound(KeyError):
+    """Không tìm thấy dataset với ID đã cho."""
+
+
+class DatasetRegistry:
+    """
+    Quản lý các dataset đã upload trong một thư mục gốc.
+
+    Mỗi dataset nằm trong <root>/<dataset_id>/ gồm file CSV gốc, các mảng .npy
+    và schema.json (tên cột, kiểu, vocabulary của cột phân loại, hash nguồn).
+    Dữ liệu được mở bằng np.load(mmap_mode='r') nên nhiều lần fit dùng chung
+    page cache của hệ điều hành thay vì parse lại JSON/CSV.
+    """
+
+    def __init__(self, root: str):
+        self.root = str(root)
+
+    # ----------------------------------------------------------------
+    # Đường dẫn
+    # ----------------------------------------------------------------
+
+    def _dir(self, dataset_id: str) -> str:
+        if not _DATASET_ID_RE.match(str(dataset_id)):
+            raise DatasetNotFound(dataset_id)
+        return os.path.join(self.root, dataset_id)
+
+    def path(self, dataset_id: str, filename: str) -> str:
+        return os.path.join(self._dir(dataset_id), filename)
+
+    # ----------------------------------------------------------------
+    # Tạo dataset
+    # ----------------------------------------------------------------
+
+    def new_dataset(self) -> str:
+        """Tạo thư mục cho một dataset mới, trả về ID."""
+        dataset_id = uuid.uuid4().hex
+        os.makedirs(self._dir(dataset_id))
+        return dataset_id
+
+    def write_source(self, dataset_id: str, chunks, max_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Ghi file CSV nguồn từ một iterator các khối bytes (không giữ cả file trong bộ nhớ).
+
+        Returns:
+            {'size': số byte, 'sha256': hash nội dung}
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with open(self.path(dataset_id, SOURCE_FILE), 'wb') as f:
+            for chunk in chunks:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ValueError(f"File vượt quá giới hạn {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+        return {'size': size, 'sha256': digest.hexdigest()}
+
+    def convert(self, dataset_id: str, name: str = '', id_column: Optional[str] = None,
+                source_info: Optional[Dict[str, Any]] = None,
+                extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Chuyển CSV nguồn sang .npy theo từng khối dòng.
+
+        Lượt đọc đầu chỉ xác định kiểu của mỗi cột trên toàn bộ file: cột số
+        (ở mọi khối) -> float64, cột còn lại -> mã int32 theo vocabulary, đọc
+        lại dạng chuỗi ở lượt hai để mã không phụ thuộc kiểu pandas đoán cho
+        từng khối. Cột ID (hoặc cột index không tên đầu tiên) bị loại bỏ.
+        """
+        source = self.path(dataset_id, SOURCE_FILE)
+        values_part = self.path(dataset_id, VALUES_FILE + '.part')
+        codes_part = self.path(dataset_id, CODES_FILE + '.part')
+
+        columns: List[str] = []
+        is_numeric: Dict[str, bool] = {}
+        for chunk in pd.read_csv(source, chunksize=CONVERT_CHUNK_ROWS):
+            if not columns:
+                drop = [c for c in chunk.columns if c == id_column or str(c).startswith('Unnamed: 0')]
+                columns = [c for c in chunk.columns if c not in drop]
+                if not columns:
+                    raise ValueError("Dataset không có cột dữ liệu")
+                is_numeric = dict.fromkeys(columns, True)
+            for c in columns:
+                is_numeric[c] = is_numeric[c] and pd.api.types.is_numeric_dtype(chunk[c])
+        numeric = [c for c in columns if is_numeric[c]]
+        categorical = [c for c in columns if not is_numeric[c]]
+        vocab: Dict[str, Dict[str, int]] = {c: {} for c in categorical}
+        n_rows = 0
+
+        with open(values_part, 'wb') as fv, open(codes_part, 'wb') as fc:
+            for chunk in pd.read_csv(source, chunksize=CONVERT_CHUNK_ROWS, dtype={c: str for c in categorical}):
+                try:
+                    values = chunk[numeric].apply(pd.to_numeric).to_numpy(dtype=np.float64)
+                except (ValueError, TypeError) as e:
+                    raise ValueError(f"Cột số chứa giá trị không hợp lệ gần dòng {n_rows + 1}: {e}")
+                np.ascontiguousarray(values).tofile(fv)
+
+                codes = np.empty((len(chunk), len(categorical)), dtype=np.int32)
+                for j, col in enumerate(categorical):
+                    index = vocab[col]
+                    codes[:, j] = [index.setdefault(v, len(index)) for v in chunk[col].astype(str)]
+                codes.tofile(fc)
+                n_rows += len(chunk)
+
+        _finalize_npy(values_part, self.path(dataset_id, VALUES_FILE), '<f8', (n_rows, len(numeric)))
+        _finalize_npy(codes_part, self.path(dataset_id, CODES_FILE), '<i4', (n_rows, len(categorical)))
+
+        schema = {
+            'id': dataset_id,
+            'name': name,
+            'rows': n_rows,
+            'numeric_columns': numeric,
+            'categorical_columns': categorical,
+            'vocabularies': {col: list(index) for col, index in vocab.items()},
+            'source': source_info or {},
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        }
+        schema.update(extra or {})
+        _write_json(self.path(dataset_id, SCHEMA_FILE), schema)
+        return schema
+
+    # ----------------------------------------------------------------
+    # Truy vấn
+    # ----------------------------------------------------------------
+
+    def schema(self, dataset_id: str) -> Dict[str, Any]:
+        try:
+            with open(self.path(dataset_id, SCHEMA_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise DatasetNotFound(dataset_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.root):
+            return []
+        result = []
+        for entry in sorted(os.listdir(self.root)):
+            if _DATASET_ID_RE.match(entry) and os.path.exists(os.path.join(self.root, entry, SCHEMA_FILE)):
+                schema = self.schema(entry)
+                schema.pop('vocabularies', None)
+                result.append(schema)
+        return result
+
+    def delete(self, dataset_id: str):
+        directory = self._dir(dataset_id)
+        if not os.path.isdir(directory):
+            raise DatasetNotFound(dataset_id)
+        shutil.rmtree(directory)
+
+    def open_values(self, dataset_id: str, columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        Mở các cột số dạng memory-map (read-only).
+
+        Không truyền columns thì trả về chính memmap (không copy). Chọn một
+        phần cột thì chỉ đọc các cột đó vào bộ nhớ.
+        """
+        schema = self.schema(dataset_id)
+        values = np.load(self.path(dataset_id, VALUES_FILE), mmap_mode='r')
+        if columns is None or list(columns) == schema['numeric_columns']:
+            return values
+        missing = [c for c in columns if c not in schema['numeric_columns']]
+        if missing:
+            raise ValueError(f"Không có cột số: {missing}")
+        return values[:, [schema['numeric_columns'].index(c) for c in columns]]
+
+    def open_codes(self, dataset_id: str) -> np.ndarray:
+        """Mở ma trận mã của các cột phân loại dạng memory-map."""
+        return np.load(self.path(dataset_id, CODES_FILE), mmap_mode='r')
+
+    def read_columns(self, dataset_id: str, columns: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Đọc các cột theo tên; cột phân loại được giải mã lại thành chuỗi."""
+        schema = self.schema(dataset_id)
+        result = {}
+        codes = values = None
+        for col in columns:
+            if col in schema['categorical_columns']:
+                if codes is None:
+                    codes = self.open_codes(dataset_id)
+                vocabulary = np.asarray(schema['vocabularies'][col], dtype=str)
+                result[col] = vocabulary[codes[:, schema['categorical_columns'].index(col)]]
+            elif col in schema['numeric_columns']:
+                if values is None:
+                    values = self.open_values(dataset_id)
+                result[col] = values[:, schema['numeric_columns'].index(col)]
+            else:
+                raise ValueError(f"Dataset không có cột '{col}'")
+        return result
+
+
+def _finalize_npy(part_path: str, final_path: str, descr: str, shape):
+    """Ghép header .npy với dữ liệu thô đã ghi theo từng khối."""
+    with open(final_path + '.tmp', 'wb') as out:
+        np.lib.format.write_array_header_1_0(out, {'descr': descr, 'fortran_order': False, 'shape': shape})
+        with open(part_path, 'rb') as raw:
+            shutil.copyfileobj(raw, out, UPLOAD_CHUNK_SIZE)
+    os.replace(final_path + '.tmp', final_path)
+    os.remove(part_path)
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+_REGISTRY: Optional[DatasetRegistry] = None
+
+
+def get_registry() -> DatasetRegistry:
+    """Registry dùng chung, thư mục gốc lấy từ settings.DATASET_STORAGE_DIR."""
+    global _REGISTRY
+    from django.conf import settings
+    root = str(getattr(settings, 'DATASET_STORAGE_DIR', os.path.join(settings.BASE_DIR, 'datasets')))
+    if _REGISTRY is None or _REGISTRY.root != root:
+        _REGISTRY = DatasetRegistry(root)
+    return _REGISTRY
@@ -0,0 +1,147 @@
+# service/dataset_views.py
+# API Views cho kho dataset (upload, liệt kê, xem schema, xóa)
+
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from .dataset_registry import get_registry, DatasetNotFound, SOURCE_FILE, UPLOAD_CHUNK_SIZE
+
+
+class _RegistryUploadHandler(FileUploadHandler):
+    """
+    Upload handler ghi thẳng file multipart vào thư mục dataset.
+
+    Django mặc định giữ file nhỏ trong bộ nhớ; handler này ghi (và hash) từng
+    khối ra đĩa ngay khi nhận được, nên không có lúc nào cả file nằm trong RAM.
+    """
+
+    chunk_size = UPLOAD_CHUNK_SIZE
+
+    def __init__(self, request, path, max_bytes):
+        super().__init__(request)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.info = None
+        self.error = None
+        self._file = None
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        if self._file is not None or self.info is not None:
+            self.error = "Chỉ nhận một file cho mỗi request"
+            raise StopUpload(connection_reset=False)
+        self._file = open(self.path, 'wb')
+        self._digest = hashlib.sha256()
+        self._size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self._size += len(raw_data)
+        if self.max_bytes is not None and self._size > self.max_bytes:
+            self.error = f"File vượt quá giới hạn {self.max_bytes} bytes"
+            self._close()
+            raise StopUpload(connection_reset=True)
+        self._digest.update(raw_data)
+        self._file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        self._close()
+        self.info = {'size': file_size, 'sha256': self._digest.hexdigest(), 'file_name': self.file_name}
+        return UploadedFile(file=None, name=self.file_name, size=file_size)
+
+    def upload_complete(self):
+        self._close()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _upload_limit():
+    return getattr(settings, 'DATASET_UPLOAD_MAX_BYTES', None)
+
+
+@csrf_exempt
+def dataset_upload_view(request):
+    """
+    API endpoint upload dataset CSV.
+
+    POST /data_mining/datasets/upload/?name=...&id_column=ID&k=3
+      - multipart/form-data với field 'file', hoặc
+      - body là nội dung CSV thô (Content-Type: text/csv)
+
+    File được ghi ra đĩa theo từng khối rồi chuyển một lần sang .npy.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"error": "Chỉ chấp nhận POST"}, status=405)
+
+    registry = get_registry()
+    dataset_id = registry.new_dataset()
+    try:
+        name = request.GET.get('name', '')
+        if request.content_type == 'multipart/form-data':
+            handler = _RegistryUploadHandler(request, registry.path(dataset_id, SOURCE_FILE), _upload_limit())
+            request.upload_handlers = [handler]
+            request.FILES  # Kích hoạt việc parse (và ghi) multipart
+            if handler.error:
+                raise ValueError(handler.error)
+            if handler.info is None:
+                raise ValueError("Không tìm thấy file trong request (field 'file')")
+            name = name or handler.info.pop('file_name')
+            source_info = handler.info
+        else:
+            source_info = registry.write_source(
+                dataset_id, iter(lambda: request.read(UPLOAD_CHUNK_SIZE), b''), _upload_limit()
+            )
+        if source_info['size'] == 0:
+            raise ValueError("File rỗng")
+
+        extra = {}
+        if request.GET.get('k'):
+            extra['k'] = int(request.GET['k'])
+        schema = registry.convert(dataset_id, name=name, id_column=request.GET.get('id_column'),
+                                  source_info=source_info, extra=extra)
+        return JsonResponse({"status": "success", "dataset": _public_schema(schema)}, status=201)
+
+    except ValueError as e:
+        registry.delete(dataset_id)
+        return JsonResponse({"error": f"Lỗi upload: {str(e)}"}, status=400)
+    except Exception as e:
+        registry.delete(dataset_id)
+        return JsonResponse({"error": f"Lỗi xử lý: {str(e)}"}, status=500)
+
+
+def _public_schema(schema):
+    """Schema trả về client: bỏ vocabulary quá lớn, chỉ giữ số lượng giá trị."""
+    result = dict(schema)
+    result['vocabularies'] = {col: len(v) for col, v in schema.get('vocabularies', {}).items()}
+    return result
+
+
+@csrf_exempt
+def dataset_list_view(request):
+    """GET /data_mining/datasets/ - liệt kê các dataset đã upload."""
+    if request.method != 'GET':
+        return JsonResponse({"error": "Chỉ chấp nhận GET"}, status=405)
+    return JsonResponse({"status": "success", "datasets": get_registry().list()})
+
+
+@csrf_exempt
+def dataset_detail_view(request, dataset_id):
+    """GET/DELETE /data_mining/datasets/<id>/ - xem schema hoặc xóa dataset."""
+    registry = get_registry()
+    try:
+        if request.method == 'GET':
+            return JsonResponse({"status": "success", "dataset": _public_schema(registry.schema(dataset_id))})
+        if request.method == 'DELETE':
+            registry.delete(dataset_id)
+            return JsonResponse({"status": "success", "deleted": dataset_id})
+    except DatasetNotFound:
+        return JsonResponse({"error": f"Không tìm thấy dataset {dataset_id}"}, status=404)
+    return JsonResponse({"error": "Chỉ chấp nhận GET hoặc DELETE"}, status=405)
@@ -0,0 +1,428 @@
+# service/dbscan_algorithm.py
+# Thuật toán gom cụm theo mật độ DBSCAN, truy vấn lân cận qua chỉ mục lưới (2D) hoặc KD-tree
+
+import time
+from typing import Dict, Any, Iterator, Tuple
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+from .instrumentation import span
+
+
+NOISE = -1
+INDEX_TYPES = ('auto', 'grid', 'kdtree')
+
+# Số cặp điểm tối đa sinh ra trong một lần xử lý vectorized (giới hạn bộ nhớ)
+PAIR_CHUNK = 1 << 20
+# Ô lõi mà (số điểm lõi x số điểm lõi của dải lân cận) không vượt ngưỡng này được
+# kiểm tra hàng loạt bằng numpy; lớn hơn thì dùng KD-tree của từng ô, chỉ kiểm tra
+# khi hai ô chưa liên thông
+BULK_PAIR_LIMIT = 4096
+
+# Ô (cạnh eps/sqrt(2)) có thể chứa điểm cách một điểm của ô gốc <= eps: lệch tối
+# đa 2 ô mỗi trục, trừ 4 góc. Gom theo cột thành dải (dx, dy_min, dy_max)
+_FULL_STRIPS = [(0, -2, 2), (-1, -2, 2), (1, -2, 2), (-2, -1, 1), (2, -1, 1)]
+# Như trên nhưng bỏ ô gốc, gần trước xa sau (đếm lân cận, dừng sớm)
+_COUNT_STRIPS = [(0, -1, -1), (0, 1, 1), (-1, -1, 1), (1, -1, 1),
+                 (0, -2, -2), (0, 2, 2), (-1, -2, -2), (-1, 2, 2), (1, -2, -2), (1, 2, 2),
+                 (-2, -1, 1), (2, -1, 1)]
+# Một nửa (không tính ô gốc): mỗi cặp ô chỉ xét một lần
+_HALF_STRIPS = [(0, 1, 2), (1, -2, 2), (2, -1, 1)]
+
+
+class DBSCANClustering:
+    """
+    DBSCAN (Ester et al. 1996): điểm lõi có ít nhất min_samples điểm (kể cả
+    chính nó) trong bán kính eps; các điểm lõi cách nhau <= eps thuộc cùng một
+    cụm; điểm biên (không lõi, gần một điểm lõi) nhận cụm của điểm lõi gần
+    nhất; còn lại là nhiễu (nhãn -1).
+
+    Truy vấn lân cận không so sánh mọi cặp điểm (O(n^2)):
+    - 2D: lưới đều cạnh eps/sqrt(2) - mọi điểm trong một ô cách nhau <= eps,
+      nên ô có >= min_samples điểm là lõi toàn bộ và liên thông sẵn; chỉ các
+      ô thưa mới cần đếm lân cận, trong 21 ô xung quanh.
+    - Số chiều khác: KD-tree (scipy cKDTree).
+    """
+
+    def __init__(self, eps: float, min_samples: int = 5, index: str = 'auto'):
+        """
+        Args:
+            eps: Bán kính lân cận (> 0)
+            min_samples: Số điểm tối thiểu trong lân cận của điểm lõi (>= 1)
+            index: 'grid' (chỉ 2D), 'kdtree' hoặc 'auto' (grid nếu dữ liệu 2D)
+        """
+        if not eps > 0:
+            raise ValueError("eps phải > 0")
+        if min_samples < 1:
+            raise ValueError("min_samples phải >= 1")
+        if index not in INDEX_TYPES:
+            raise ValueError(f"index phải là một trong {', '.join(INDEX_TYPES)}")
+        self.eps = float(eps)
+        self.min_samples = int(min_samples)
+        self.index = index
+        self.labels = None
+        self.core_mask = None
+        self.n_clusters = 0
+
+    def resolve_index(self, n_features: int) -> str:
+        """Chỉ mục thực sự được dùng cho dữ liệu n_features chiều ('grid' hoặc 'kdtree')."""
+        index = self.index
+        if index == 'auto':
+            index = 'grid' if n_features <= 2 else 'kdtree'
+        if index == 'grid' and n_features > 2:
+            raise ValueError("Chỉ mục lưới chỉ hỗ trợ dữ liệu 1 hoặc 2 chiều")
+        return index
+
+    def fit(self, data: np.ndarray, include_points: bool = True) -> Dict[str, Any]:
+        """
+        Gom cụm dữ liệu.
+
+        Args:
+            data: Mảng numpy 2D (n_samples, n_features), có thể là memmap
+            include_points: Trả về labels và điểm của từng cụm dạng list;
+                False -> bỏ labels, 'clusters' chỉ chứa số điểm mỗi cụm
+
+        Returns:
+            Dictionary chứa thông tin kết quả
+        """
+        data = np.asarray(data, dtype=np.float64)
+        if len(data.shape) == 1:
+            data = data.reshape(-1, 1)
+        if len(data) == 0:
+            raise ValueError("Dữ liệu rỗng")
+
+        index = self.resolve_index(data.shape[1])
+
+        start = time.perf_counter()
+        with span('fit_loop'):
+            if index == 'grid':
+                xy = data if data.shape[1] == 2 else np.column_stack([data[:, 0], np.zeros(len(data))])
+                raw_labels, core = _grid_dbscan(xy, self.eps, self.min_samples)
+            else:
+                raw_labels, core = _kdtree_dbscan(data, self.eps, self.min_samples)
+        self.labels, self.n_clusters = _renumber(raw_labels)
+        self.core_mask = core
+        elapsed = time.perf_counter() - start
+
+        sizes = np.bincount(self.labels[self.labels >= 0], minlength=self.n_clusters)
+        result = {
+            'n_clusters': self.n_clusters,
+            'n_noise': int(np.count_nonzero(self.labels == NOISE)),
+            'n_core': int(np.count_nonzero(core)),
+            'index': index,
+            'seconds': round(elapsed, 6),
+        }
+        if not include_points:
+            result['clusters'] = {f'cluster_{i}': int(sizes[i]) for i in range(self.n_clusters)}
+            return result
+
+        with span('tolist'):
+            # Sắp xếp ổn định theo nhãn (nhiễu -1 đứng đầu) rồi cắt một list duy nhất,
+            # thay vì lọc mặt nạ cho từng cụm (O(n x số cụm))
+            order = np.argsort(self.labels, kind='stable')
+            rows = data[order].tolist()
+            bounds = np.concatenate(([0], np.cumsum(np.bincount(self.labels + 1, minlength=self.n_clusters + 1))))
+            result.update({
+                'labels': self.labels.tolist(),
+                'clusters': {
+                    f'cluster_{i}': rows[bounds[i + 1]:bounds[i + 2]]
+                    for i in range(self.n_clusters)
+                },
+                'noise': rows[:bounds[1]],
+            })
+        return result
+
+
+def _renumber(raw_labels: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Đánh lại số cụm 0..k-1 theo thứ tự điểm đầu tiên xuất hiện (nhiễu giữ -1)."""
+    labels = np.full(len(raw_labels), NOISE, dtype=np.intp)
+    clustered = np.flatnonzero(raw_labels >= 0)
+    if not len(clustered):
+        return labels, 0
+    ids, first, inverse = np.unique(raw_labels[clustered], return_index=True, return_inverse=True)
+    rank = np.empty(len(ids), dtype=np.intp)
+    rank[np.argsort(first, kind='stable')] = np.arange(len(ids))
+    labels[clustered] = rank[inverse.reshape(-1)]
+    return labels, len(ids)
+
+
+# ====================================================================
+# A. CHỈ MỤC LƯỚI 2D
+# ====================================================================
+
+class _GridIndex:
+    """
+    Điểm 2D đã sắp theo khóa ô (ix * height + iy). Các ô cùng cột ix có khóa
+    liên tiếp, nên điểm của một dải ô (ix + dx, iy + dy_min..dy_max) nằm liền
+    nhau: mỗi truy vấn dải chỉ là hai lần searchsorted.
+    """
+
+    def __init__(self, sorted_keys: np.ndarray, height: int):
+        self.height = height
+        self.cell_keys, starts, self.counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+        self.bounds = np.append(starts, len(sorted_keys))
+        self.cell_of = np.repeat(np.arange(len(self.cell_keys)), self.counts)
+
+    def strip(self, keys: np.ndarray, dx: int, dy_min: int, dy_max: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Đoạn điểm [lo, hi) của dải ô lệch (dx, dy_min..dy_max) so với từng khóa trong `keys`."""
+        base = keys + dx * self.height
+        lo = np.searchsorted(self.cell_keys, base + dy_min, side='left')
+        hi = np.searchsorted(self.cell_keys, base + dy_max, side='right')
+        return self.bounds[lo], self.bounds[hi]
+
+    def strip_cells(self, keys: np.ndarray, dx: int, dy_min: int, dy_max: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Như strip() nhưng trả về đoạn chỉ số ô [lo, hi)."""
+        base = keys + dx * self.height
+        return (np.searchsorted(self.cell_keys, base + dy_min, side='left'),
+                np.searchsorted(self.cell_keys, base + dy_max, side='right'))
+
+
+def _grid_dbscan(xy: np.ndarray, eps: float, min_samples: int) -> Tuple[np.ndarray, np.ndarray]:
+    """DBSCAN 2D trên lưới đều. Returns (nhãn thô theo thứ tự gốc, mặt nạ điểm lõi)."""
+    n = len(xy)
+    eps2 = eps * eps
+    side = eps / np.sqrt(2.0)
+    cell_xy = np.floor((xy - xy.min(axis=0)) / side).astype(np.int64)
+    # Đệm 2 ô mỗi phía để dải ô lân cận không tràn sang cột khác
+    height = int(cell_xy[:, 1].max()) + 5
+    if (int(cell_xy[:, 0].max()) + 5) * height >= 2 ** 62:
+        return _kdtree_dbscan(xy, eps, min_samples)
+    keys = (cell_xy[:, 0] + 2) * height + (cell_xy[:, 1] + 2)
+
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    points = np.ascontiguousarray(xy[order])
+    grid = _GridIndex(sorted_keys, height)
+
+    # 1. Điểm lõi. Mọi điểm trong ô gốc đều là lân cận nên ô đủ dày là lõi toàn
+    #    bộ; điểm của ô thưa đếm thêm theo các dải xung quanh, gần trước xa sau,
+    #    và dừng ngay khi đủ min_samples
+    neighbour_count = grid.counts[grid.cell_of].astype(np.int64)
+    core = neighbour_count >= min_samples
+    pending = np.flatnonzero(~core)
+    for dx, dy_min, dy_max in _COUNT_STRIPS:
+        if not len(pending):
+            break
+        lo, hi = grid.strip(sorted_keys[pending], dx, dy_min, dy_max)
+        for i, j in _range_pairs(pending, lo, hi):
+            close = _squared_distances(points, i, j) <= eps2
+            neighbour_count += np.bincount(i[close], minlength=n)
+        reached = neighbour_count[pending] >= min_samples
+        core[pending[reached]] = True
+        pending = pending[~reached]
+
+    # 2. Liên thông giữa các ô có điểm lõi (trong một ô: luôn liên thông)
+    core_index = np.flatnonzero(core)             # vẫn sắp theo ô
+    sorted_labels = np.full(n, NOISE, dtype=np.intp)
+    if len(core_index):
+        core_points = points[core_index]
+        core_grid = _GridIndex(sorted_keys[core_index], height)
+        cell_labels = _connect_core_cells(core_grid, core_points, eps)
+        sorted_labels[core_index] = cell_labels[core_grid.cell_of]
+
+        # 3. Điểm biên: nhận cụm của điểm lõi gần nhất trong bán kính eps. Điểm
+        #    không lõi có < min_samples lân cận nên số cặp gần được giữ lại nhỏ
+        non_core = np.flatnonzero(~core)
+        near_i, near_j, near_d2 = [], [], []
+        for dx, dy_min, dy_max in _FULL_STRIPS:
+            lo, hi = core_grid.strip(sorted_keys[non_core], dx, dy_min, dy_max)
+            for i, j in _range_pairs(non_core, lo, hi):
+                d2 = np.sum((points[i] - core_points[j]) ** 2, axis=1)
+                close = d2 <= eps2
+                near_i.append(i[close])
+                near_j.append(j[close])
+                near_d2.append(d2[close])
+        if near_i:
+            i, j, d2 = np.concatenate(near_i), np.concatenate(near_j), np.concatenate(near_d2)
+            nearest = np.lexsort((d2, i))
+            i, j = i[nearest], j[nearest]
+            first = np.concatenate(([True], i[1:] != i[:-1])) if len(i) else np.zeros(0, dtype=bool)
+            sorted_labels[i[first]] = sorted_labels[core_index[j[first]]]
+
+    labels = np.empty(n, dtype=np.intp)
+    labels[order] = sorted_labels
+    core_mask = np.empty(n, dtype=bool)
+    core_mask[order] = core
+    return labels, core_mask
+
+
+def _connect_core_cells(grid: _GridIndex, points: np.ndarray, eps: float) -> np.ndarray:
+    """
+    Nhãn thành phần liên thông của từng ô lõi. Hai ô lân cận liên thông nếu có
+    một cặp điểm lõi cách nhau <= eps. Dải nhỏ (ít cặp điểm) được kiểm tra
+    hàng loạt; cặp ô lớn dùng KD-tree của ô và chỉ kiểm tra khi hai ô chưa
+    thuộc cùng thành phần (union-find).
+    """
+    eps2 = eps * eps
+    n_cells = len(grid.cell_keys)
+    cells = np.arange(n_cells)
+    edge_a, edge_b, big = [], [], []
+    for dx, dy_min, dy_max in _HALF_STRIPS:
+        lo, hi = grid.strip_cells(grid.cell_keys, dx, dy_min, dy_max)
+        width = grid.bounds[hi] - grid.bounds[lo]
+        small = grid.counts * width <= BULK_PAIR_LIMIT
+        big.extend((a, b_lo, b_hi) for a, b_lo, b_hi in zip(
+            cells[~small & (hi > lo)].tolist(), lo[~small & (hi > lo)].tolist(), hi[~small & (hi > lo)].tolist()))
+
+        # Mọi điểm của các ô có dải nhỏ, mỗi điểm với đoạn điểm của dải
+        queries = np.flatnonzero(small[grid.cell_of])
+        query_cells = grid.cell_of[queries]
+        for i, j in _range_pairs(queries, grid.bounds[lo[query_cells]], grid.bounds[hi[query_cells]]):
+            close = _squared_distances(points, i, j) <= eps2
+            edges = np.unique(grid.cell_of[i[close]] * n_cells + grid.cell_of[j[close]])
+            edge_a.append(edges // n_cells)
+            edge_b.append(edges % n_cells)
+
+    edge_a = np.concatenate(edge_a) if edge_a else np.zeros(0, dtype=np.intp)
+    edge_b = np.concatenate(edge_b) if edge_b else np.zeros(0, dtype=np.intp)
+    graph = coo_matrix((np.ones(len(edge_a), dtype=np.int8), (edge_a, edge_b)), shape=(n_cells, n_cells))
+    n_components, component = connected_components(graph, directed=False)
+
+    parent = list(range(n_components))
+
+    def find(c: int) -> int:
+        root = c
+        while parent[root] != root:
+            root = parent[root]
+        while parent[c] != root:
+            parent[c], c = root, parent[c]
+        return root
+
+    trees: Dict[int, cKDTree] = {}
+
+    def tree_of(cell: int) -> cKDTree:
+        tree = trees.get(cell)
+        if tree is None:
+            tree = trees[cell] = cKDTree(points[grid.bounds[cell]:grid.bounds[cell + 1]])
+        return tree
+
+    component_list = component.tolist()
+    counts = grid.counts.tolist()
+    for a, b_lo, b_hi in big:
+        for b in range(b_lo, b_hi):
+            root_a, root_b = find(component_list[a]), find(component_list[b])
+            if root_a == root_b:
+                continue
+            small_cell, large_cell = (a, b) if counts[a] <= counts[b] else (b, a)
+            distances, _ = tree_of(large_cell).query(
+                points[grid.bounds[small_cell]:grid.bounds[small_cell + 1]], k=1, distance_upper_bound=eps)
+            if np.any(distances <= eps):
+                parent[root_a] = root_b
+
+    roots = np.array([find(c) for c in range(n_components)], dtype=np.intp)
+    return roots[component]
+
+
+def _range_pairs(queries: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Sinh mọi cặp (queries[p], j) với lo[p] <= j < hi[p], theo từng khối tối đa
+    ~PAIR_CHUNK cặp để giới hạn bộ nhớ.
+    """
+    sizes = hi - lo
+    keep = sizes > 0
+    queries, lo, sizes = queries[keep], lo[keep], sizes[keep]
+    if not len(sizes):
+        return
+    cumulative = np.cumsum(sizes)
+    cuts = np.searchsorted(cumulative, np.arange(PAIR_CHUNK, int(cumulative[-1]), PAIR_CHUNK), side='right')
+    cuts = np.unique(np.concatenate(([0], cuts, [len(sizes)])))
+    for a, b in zip(cuts[:-1], cuts[1:]):
+        chunk = sizes[a:b]
+        # j = lo[p] + (vị trí trong khối - vị trí bắt đầu của p trong khối)
+        shift = lo[a:b] - (np.cumsum(chunk) - chunk)
+        yield np.repeat(queries[a:b], chunk), np.arange(int(chunk.sum())) + np.repeat(shift, chunk)
+
+
+def _squared_distances(points: np.ndarray, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    dx = points[i, 0] - points[j, 0]
+    dy = points[i, 1] - points[j, 1]
+    return dx * dx + dy * dy
+
+
+# ====================================================================
+# B. KD-TREE (số chiều bất kỳ)
+# ====================================================================
+
+def _kdtree_dbscan(data: np.ndarray, eps: float, min_samples: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    DBSCAN với KD-tree: đếm lân cận bằng query_ball_point(return_length=True),
+    nối các điểm lõi theo từng khối (_connect_core_blocks), điểm biên nhận cụm
+    của điểm lõi gần nhất.
+    """
+    n = len(data)
+    tree = cKDTree(data)
+    counts = tree.query_ball_point(data, eps, return_length=True, workers=-1)
+    core = counts >= min_samples
+    labels = np.full(n, NOISE, dtype=np.intp)
+    core_index = np.flatnonzero(core)
+    if not len(core_index):
+        return labels, core
+
+    core_points = data[core_index]
+    core_tree = cKDTree(core_points)
+    component = _connect_core_blocks(core_points, core_tree, counts[core_index], eps)
+    labels[core_index] = component
+
+    border = np.flatnonzero(~core)
+    if len(border):
+        distances, nearest = core_tree.query(data[border], k=1, distance_upper_bound=eps, workers=-1)
+        reached = distances <= eps
+        labels[border[reached]] = component[nearest[reached]]
+    return labels, core
+
+
+def _connect_core_blocks(core_points: np.ndarray, core_tree: cKDTree, counts: np.ndarray,
+                         eps: float) -> np.ndarray:
+    """
+    Gán mỗi điểm lõi một đại diện thành phần liên thông (cạnh = cặp điểm lõi
+    cách nhau <= eps) mà không sinh toàn bộ các cặp một lúc: điểm lõi được chia
+    thành khối sao cho tổng số lân cận (counts, đã đếm ở bước trước, là cận trên
+    của số cặp lõi-lõi) không vượt PAIR_CHUNK. Cặp của từng khối được ánh xạ qua
+    đại diện hiện tại; chỉ các cặp nối hai đại diện khác nhau mới được gộp
+    (union-find dạng mảng, đại diện = chỉ số nhỏ nhất của thành phần).
+    """
+    n_core = len(core_points)
+    root = np.arange(n_core, dtype=np.intp)
+    cumulative = np.cumsum(counts)
+    cuts = np.searchsorted(cumulative, np.arange(PAIR_CHUNK, int(cumulative[-1]), PAIR_CHUNK), side='right')
+    cuts = np.unique(np.concatenate(([0], cuts, [n_core])))
+    for a, b in zip(cuts[:-1], cuts[1:]):
+        block = cKDTree(core_points[a:b])
+        pairs = block.sparse_distance_matrix(core_tree, eps, output_type='ndarray')
+        left, right = root[pairs['i'] + a], root[pairs['j']]
+        del pairs
+        keep = left != right
+        if not np.any(keep):
+            continue
+        left, right = left[keep], right[keep]
+        nodes, inverse = np.unique(np.concatenate((left, right)), return_inverse=True)
+        half = len(left)
+        graph = coo_matrix((np.ones(half, dtype=np.int8), (inverse[:half], inverse[half:])),
+                           shape=(len(nodes), len(nodes)))
+        _, component = connected_components(graph, directed=False)
+        # nodes đã sắp tăng dần -> phần tử đầu tiên của mỗi thành phần là đại diện nhỏ nhất
+        _, first = np.unique(component, return_index=True)
+        relabel = np.arange(n_core, dtype=np.intp)
+        relabel[nodes] = nodes[first[component]]
+        root = relabel[root]
+    return root
+
+
+def estimate_neighbours(data: np.ndarray, eps: float, sample_size: int = 1024) -> float:
+    """
+    Ước lượng số lân cận trung bình trong bán kính eps từ một mẫu ngẫu nhiên
+    (không tính chính điểm đó), dùng cho ước lượng chi phí trước khi fit.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if data.ndim == 1:
+        data = data.reshape(-1, 1)
+    n = len(data)
+    if n < 2:
+        return 0.0
+    size = min(n, sample_size)
+    sample = data[np.sort(np.random.default_rng(0).choice(n, size, replace=False))] if size < n else data
+    pairs = len(cKDTree(sample).query_pairs(eps))
+    return 2.0 * pairs / size * (n - 1) / max(size - 1, 1)
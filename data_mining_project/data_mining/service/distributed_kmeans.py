@@ -0,0 +1,367 @@
+# service/distributed_kmeans.py
+# K-Means map-reduce: dữ liệu chia thành shard nằm trong các tiến trình worker
+# (cục bộ hoặc trên máy khác qua TCP), coordinator chỉ gửi/nhận các tổng theo cụm
+#
+# Mỗi vòng lặp coordinator gửi centroids (k x d) cho mọi worker; mỗi worker gán
+# cụm cho shard của mình và trả về tổng tọa độ (k x d), số điểm (k) và SSE theo
+# cụm. Lưu lượng mỗi vòng là O(workers * k * d), không phụ thuộc số điểm n.
+#
+# Giao thức: multiprocessing.connection (Pipe với worker cục bộ, Listener/Client
+# có authkey với worker TCP). Message là tuple (lệnh, *tham số), trả lời là
+# ('ok', kết quả) hoặc ('error', thông báo). Message được pickle: chỉ kết nối
+# tới worker tin cậy và luôn dùng authkey khi qua mạng.
+
+import multiprocessing
+import time
+from multiprocessing.connection import Connection, Listener, Client
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .kmeans_algorithm import KMeansClustering, DEFAULT_CHUNK_SIZE
+
+
+# Số điểm mẫu mỗi cụm (tổng trên mọi worker) dùng để khởi tạo centroids
+INIT_SAMPLE_PER_CLUSTER = 100
+DEFAULT_PORT = 6100
+# Biến môi trường chứa authkey cho worker / coordinator TCP
+AUTHKEY_ENV = 'DATA_MINING_KMEANS_AUTHKEY'
+
+
+# ====================================================================
+# A. WORKER
+# ====================================================================
+
+class KMeansWorker:
+    """
+    Trạng thái của một worker: shard dữ liệu và nhãn của lần gán cụm gần nhất.
+    Nhãn ở lại trong worker; chỉ gửi về khi coordinator yêu cầu 'labels'.
+    """
+
+    def __init__(self, n_jobs: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self.data = None
+        self.labels = None
+
+    def handle(self, command: str, *args) -> Any:
+        handler = getattr(self, f'cmd_{command}', None)
+        if handler is None:
+            raise ValueError(f"Lệnh không hợp lệ: {command}")
+        return handler(*args)
+
+    def _require_data(self) -> np.ndarray:
+        if self.data is None:
+            raise ValueError("Worker chưa có dữ liệu (gửi 'load_array' hoặc 'load_dataset' trước)")
+        return self.data
+
+    def cmd_load_array(self, data: np.ndarray) -> Tuple[int, int]:
+        data = np.asarray(data, dtype=np.float64)
+        self.data = data.reshape(-1, 1) if data.ndim == 1 else data
+        self.labels = None
+        return self.data.shape
+
+    def cmd_load_dataset(self, dataset_id: str, columns: Optional[Sequence[str]], part: int,
+                         n_parts: int) -> Tuple[int, int]:
+        """
+        Tự mở phần `part` / `n_parts` (theo dòng) của dataset trong kho dataset
+        của máy worker - coordinator không gửi dữ liệu. Chỉ đọc các dòng của shard.
+        """
+        from .dataset_registry import get_registry
+
+        registry = get_registry()
+        values = registry.open_values(dataset_id)
+        n = len(values)
+        shard = values[n * part // n_parts:n * (part + 1) // n_parts]
+        if columns:
+            numeric = registry.schema(dataset_id)['numeric_columns']
+            missing = [c for c in columns if c not in numeric]
+            if missing:
+                raise ValueError(f"Không có cột số: {missing}")
+            shard = shard[:, [numeric.index(c) for c in columns]]
+        return self.cmd_load_array(shard)
+
+    def cmd_info(self) -> Tuple[int, int]:
+        return self._require_data().shape
+
+    def cmd_sample(self, size: int, seed: int) -> np.ndarray:
+        data = self._require_data()
+        size = min(int(size), len(data))
+        rng = np.random.default_rng(seed)
+        return data[np.sort(rng.choice(len(data), size, replace=False))]
+
+    def cmd_step(self, centroids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+        """Gán cụm theo centroids, trả về (tổng tọa độ, số điểm, SSE) theo cụm."""
+        data = self._require_data()
+        model = KMeansClustering(k=len(centroids), n_jobs=self.n_jobs, chunk_size=self.chunk_size)
+        self.labels, sums, counts, sse = model._assign_and_accumulate(data, centroids)
+        return sums, counts, sse
+
+    def cmd_sse(self, centroids: np.ndarray) -> float:
+        """SSE của nhãn hiện tại so với centroids (sau bước cập nhật cuối)."""
+        data = self._require_data()
+        if self.labels is None:
+            raise ValueError("Chưa có nhãn (gửi 'step' trước)")
+        return KMeansClustering(k=len(centroids))._calculate_sse(data, self.labels, centroids)
+
+    def cmd_labels(self) -> np.ndarray:
+        if self.labels is None:
+            raise ValueError("Chưa có nhãn (gửi 'step' trước)")
+        return self.labels
+
+
+def serve_connection(conn: Connection, worker: KMeansWorker):
+    """Nhận lệnh và trả lời cho tới khi nhận 'close' hoặc mất kết nối."""
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        command, args = message[0], message[1:]
+        if command == 'close':
+            conn.send(('ok', None))
+            return
+        try:
+            conn.send(('ok', worker.handle(command, *args)))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+
+
+def _local_worker_main(conn: Connection, n_jobs: int, chunk_size: int):
+    try:
+        serve_connection(conn, KMeansWorker(n_jobs, chunk_size))
+    finally:
+        conn.close()
+
+
+def serve_forever(address: Tuple[str, int], authkey: bytes, n_jobs: int = 1,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE, log=print):
+    """
+    Worker TCP: phục vụ lần lượt từng coordinator kết nối tới `address`.
+    Mỗi kết nối có shard riêng, được giải phóng khi kết nối đóng.
+    """
+    with Listener(address, authkey=authkey) as listener:
+        log(f"Worker K-Means đang nghe tại {listener.address[0]}:{listener.address[1]}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # Sai authkey / kết nối hỏng: bỏ qua, tiếp tục nghe
+                log(f"Từ chối kết nối: {e}")
+                continue
+            log(f"Coordinator kết nối từ {listener.last_accepted}")
+            with conn:
+                serve_connection(conn, KMeansWorker(n_jobs, chunk_size))
+            log("Coordinator đã ngắt kết nối")
+
+
+# ====================================================================
+# B. COORDINATOR
+# ====================================================================
+
+class WorkerError(RuntimeError):
+    """Worker trả lời lỗi hoặc mất kết nối."""
+
+
+class WorkerGroup:
+    """
+    Tập kết nối tới các worker. Lệnh được gửi tới mọi worker trước rồi mới
+    chờ trả lời, nên các worker tính song song.
+
+    Dùng như context manager để luôn đóng kết nối / dừng worker cục bộ.
+    """
+
+    def __init__(self, connections: List[Connection], processes: Sequence[multiprocessing.Process] = ()):
+        if not connections:
+            raise ValueError("Cần ít nhất một worker")
+        self.connections = connections
+        self.processes = list(processes)
+
+    @classmethod
+    def local(cls, n_workers: int, n_jobs: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE) -> 'WorkerGroup':
+        """Khởi động n_workers tiến trình worker trên máy này (kết nối qua Pipe)."""
+        if n_workers < 1:
+            raise ValueError("Số worker phải >= 1")
+        connections, processes = [], []
+        for _ in range(n_workers):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_local_worker_main, args=(child, n_jobs, chunk_size),
+                                              daemon=True)
+            process.start()
+            child.close()
+            connections.append(parent)
+            processes.append(process)
+        return cls(connections, processes)
+
+    @classmethod
+    def connect(cls, addresses: Sequence[Tuple[str, int]], authkey: bytes) -> 'WorkerGroup':
+        """Kết nối tới các worker TCP (manage.py kmeans_worker) đang chạy."""
+        connections = []
+        try:
+            for address in addresses:
+                connections.append(Client(tuple(address), authkey=authkey))
+        except Exception:
+            for conn in connections:
+                conn.close()
+            raise
+        return cls(connections)
+
+    def __len__(self):
+        return len(self.connections)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def call(self, command: str, *args) -> List[Any]:
+        """Gửi cùng một lệnh tới mọi worker, trả về danh sách kết quả."""
+        return self.call_each([(command, *args)] * len(self.connections))
+
+    def call_each(self, messages: Sequence[Tuple]) -> List[Any]:
+        """Gửi messages[i] tới worker i, trả về danh sách kết quả."""
+        for conn, message in zip(self.connections, messages):
+            conn.send(message)
+        # Nhận đủ trả lời của mọi worker trước khi báo lỗi, để kết nối không lệch nhịp
+        results, errors = [], []
+        for i, conn in enumerate(self.connections):
+            try:
+                status, value = conn.recv()
+            except EOFError:
+                status, value = 'error', "mất kết nối"
+            if status != 'ok':
+                errors.append(f"Worker {i}: {value}")
+            results.append(value)
+        if errors:
+            raise WorkerError('; '.join(errors))
+        return results
+
+    def scatter(self, data: np.ndarray) -> List[Tuple[int, int]]:
+        """Chia data theo dòng thành các shard liên tiếp và gửi mỗi worker một shard."""
+        data = np.asarray(data, dtype=np.float64)
+        bounds = [len(data) * i // len(self) for i in range(len(self) + 1)]
+        return self.call_each([('load_array', data[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])])
+
+    def load_dataset(self, dataset_id: str, columns: Optional[Sequence[str]] = None) -> List[Tuple[int, int]]:
+        """Mỗi worker tự mở shard của mình từ kho dataset (cùng dataset_id trên mọi máy)."""
+        return self.call_each([('load_dataset', dataset_id, columns, i, len(self)) for i in range(len(self))])
+
+    def close(self):
+        for conn in self.connections:
+            try:
+                conn.send(('close',))
+                conn.recv()
+            except (EOFError, OSError):
+                pass
+            conn.close()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.connections = []
+        self.processes = []
+
+
+class DistributedKMeans:
+    """
+    K-Means trên các shard nằm trong WorkerGroup.
+
+    Khởi tạo: lấy mẫu đều (tỷ lệ theo kích thước shard) từ các worker rồi chọn
+    k điểm ngẫu nhiên như KMeansClustering. Mỗi vòng lặp: broadcast centroids,
+    cộng tổng/số điểm/SSE của các worker, cập nhật centroids - cùng công thức,
+    cùng điều kiện dừng với KMeansClustering.fit, nên với cùng centroids khởi
+    tạo kết quả trùng với chạy trên một máy.
+    """
+
+    def __init__(self, k: int, max_iters: int = 100, tolerance: float = 1e-4):
+        self.model = KMeansClustering(k=k, max_iters=max_iters, tolerance=tolerance)
+        self.k = k
+        self.max_iters = max_iters
+        self.tolerance = tolerance
+
+    @property
+    def centroids(self) -> Optional[np.ndarray]:
+        return self.model.centroids
+
+    @property
+    def iterations(self) -> int:
+        return self.model.iterations
+
+    def fit(self, workers: WorkerGroup, seed: Optional[int] = None, init: Optional[np.ndarray] = None,
+            verbose: bool = False) -> Dict[str, Any]:
+        """
+        Gom cụm dữ liệu đã nạp vào các worker (scatter / load_dataset).
+
+        Args:
+            seed: Seed cho lấy mẫu và chọn centroids khởi tạo
+            init: Centroids khởi tạo (k, d) thay cho lấy mẫu
+
+        Returns:
+            Dictionary giống KMeansClustering.fit(include_points=False), thêm
+            'workers', 'points' và 'bytes_per_iteration' (ước lượng payload
+            mỗi vòng lặp)
+        """
+        start = time.perf_counter()
+        shapes = workers.call('info')
+        if len({shape[1] for shape in shapes}) > 1:
+            raise ValueError(f"Các shard có số chiều khác nhau: {shapes}")
+        sizes = [shape[0] for shape in shapes]
+        n, d = sum(sizes), shapes[0][1]
+        if n < self.k:
+            raise ValueError(f"Số điểm ({n}) phải >= số cụm k ({self.k})")
+
+        if init is not None:
+            centroids = np.asarray(init, dtype=np.float64).reshape(self.k, d)
+        else:
+            centroids = self._initial_centroids(workers, sizes, seed)
+        self.model.centroids = centroids
+
+        for iteration in range(self.max_iters):
+            partials = workers.call('step', self.model.centroids)
+            sums = np.sum([p[0] for p in partials], axis=0)
+            counts = np.sum([p[1] for p in partials], axis=0)
+            sse = float(sum(p[2] for p in partials))
+            new_centroids = self.model._centroids_from_sums(sums, counts)
+            shift = float(np.sum([self.model._euclidean_distance(a, b)
+                                  for a, b in zip(self.model.centroids, new_centroids)]))
+            if verbose:
+                print(f"Iteration {iteration + 1}: SSE = {sse:.4f}, Centroid shift = {shift:.6f}")
+            self.model.centroids = new_centroids
+            self.model.iterations = iteration + 1
+            if shift < self.tolerance:
+                break
+
+        final_sse = float(sum(workers.call('sse', self.model.centroids)))
+        # Gửi: centroids (k*d); nhận: sums (k*d) + counts (k) + SSE - mỗi worker, float64
+        payload = len(workers) * 8 * (2 * self.k * d + self.k + 1)
+        return {
+            'centroids': self.model.centroids.tolist(),
+            'sse': final_sse,
+            'iterations': self.model.iterations,
+            'clusters': {f'cluster_{i}': int(round(counts[i])) for i in range(self.k)},
+            'workers': len(workers),
+            'points': n,
+            'bytes_per_iteration': payload,
+            'seconds': round(time.perf_counter() - start, 6),
+        }
+
+    def _initial_centroids(self, workers: WorkerGroup, sizes: List[int], seed: Optional[int]) -> np.ndarray:
+        n = sum(sizes)
+        total = min(n, max(self.k, INIT_SAMPLE_PER_CLUSTER * self.k))
+        # Số mẫu mỗi worker tỷ lệ với kích thước shard -> mẫu chung đều trên toàn dữ liệu
+        quotas = np.floor(np.asarray(sizes) * total / n).astype(int)
+        quotas[np.argsort(-np.asarray(sizes))[:total - quotas.sum()]] += 1
+        rng = np.random.default_rng(seed)
+        seeds = rng.integers(0, 2 ** 32, size=len(sizes))
+        samples = workers.call_each([('sample', int(q), int(s)) for q, s in zip(quotas, seeds)])
+        sample = np.concatenate(samples)
+        indices = rng.choice(len(sample), self.k, replace=False)
+        return sample[indices].copy()
+
+    def labels(self, workers: WorkerGroup) -> np.ndarray:
+        """Nhãn của mọi điểm theo thứ tự shard (O(n) - chỉ gọi khi cần)."""
+        return np.concatenate(workers.call('labels'))
+
+    def predict(self, data: np.ndarray) -> np.ndarray:
+        return self.model.predict(data)
@@ -0,0 +1,99 @@
+# service/instrumentation.py
+# Đo thời gian theo từng giai đoạn (span) trong một request
+
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+
+class RequestTimer:
+    """Tập hợp các span của một request; span trùng tên được cộng dồn."""
+
+    __slots__ = ('start', 'spans')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: Dict[str, List[float]] = {}   # name -> [tổng giây, số lần]
+
+    def add(self, name: str, seconds: float):
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def items(self) -> List[Tuple[str, float, int]]:
+        """[(tên, mili giây, số lần)] theo thứ tự span xuất hiện."""
+        return [(name, total * 1000.0, count) for name, (total, count) in self.spans.items()]
+
+    def server_timing(self, total_name: str = 'total') -> str:
+        """Giá trị header Server-Timing, ví dụ: 'json_parse;dur=0.12, fit;dur=35.40, total;dur=36.10'."""
+        parts = [f'{name};dur={ms:.2f}' for name, ms, _ in self.items()]
+        parts.append(f'{total_name};dur={self.elapsed() * 1000.0:.2f}')
+        return ', '.join(parts)
+
+
+_current_timer: ContextVar[Optional[RequestTimer]] = ContextVar('data_mining_request_timer', default=None)
+
+
+class _Span:
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer: RequestTimer, name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str):
+    """
+    Context manager đo một giai đoạn của request hiện tại.
+
+    Ngoài request (hoặc khi middleware tắt) trả về một span rỗng dùng chung,
+    chi phí chỉ là một lần đọc ContextVar.
+
+        with span('fit'):
+            result = kmeans.fit(data)
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        return _NULL_SPAN
+    return _Span(timer, name)
+
+
+def start_request() -> Tuple[RequestTimer, object]:
+    """Gắn một RequestTimer mới vào context hiện tại, trả về (timer, token)."""
+    timer = RequestTimer()
+    return timer, _current_timer.set(timer)
+
+
+def end_request(token):
+    _current_timer.reset(token)
+
+
+def current_timer() -> Optional[RequestTimer]:
+    return _current_timer.get()
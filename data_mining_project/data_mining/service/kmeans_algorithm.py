@@ -3,7 +3,26 @@
 
 import numpy as np
 from typing import List, Tuple, Dict, Any
+import io
 import math
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from scipy import sparse
+from scipy.spatial.distance import cdist
+from .instrumentation import span
+from .metrics import KMEANS_FITS, KMEANS_FIT_POINTS, KMEANS_FIT_ITERATIONS, KMEANS_FIT_SECONDS
+
+
+# Số dòng mỗi chunk của bước gán cụm: buffer khoảng cách (chunk, k) đủ nhỏ để
+# nằm trong cache, đủ lớn để mỗi lần gọi BLAS/argmin có nhiều việc
+DEFAULT_CHUNK_SIZE = 4096
+
+# Độ đo khoảng cách: 'euclidean' (K-Means), 'cosine' (spherical K-Means: điểm
+# và centroid chuẩn hóa về độ dài 1) và 'manhattan' (K-Medians: centroid là
+# trung vị theo từng chiều)
+METRICS = ('euclidean', 'cosine', 'manhattan')
 
 
 class KMeansClustering:
@@ -11,7 +30,8 @@ class KMeansClustering:
     Triển khai thuật toán K-Means Clustering từ đầu.
     """
     
-    def __init__(self, k: int, max_iters: int = 100, tolerance: float = 1e-4):
+    def __init__(self, k: int, max_iters: int = 100, tolerance: float = 1e-4,
+                 n_jobs: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE, metric: str = 'euclidean'):
         """
         Khởi tạo K-Means.
         
@@ -19,126 +39,399 @@ class KMeansClustering:
             k: Số cụm (clusters)
             max_iters: Số lần lặp tối đa
             tolerance: Ngưỡng dừng (khi centroids thay đổi < tolerance)
+            n_jobs: Số thread cho bước gán cụm (-1 hoặc None = số CPU)
+            chunk_size: Số dòng mỗi chunk của bước gán cụm
+            metric: Một trong METRICS
         """
+        if chunk_size < 1:
+            raise ValueError("chunk_size phải >= 1")
+        if metric not in METRICS:
+            raise ValueError(f"metric phải là một trong {METRICS}")
         self.k = k
         self.max_iters = max_iters
         self.tolerance = tolerance
+        self.n_jobs = (os.cpu_count() or 1) if n_jobs in (None, -1) else max(int(n_jobs), 1)
+        self.chunk_size = int(chunk_size)
+        self.metric = metric
         self.centroids = None
         self.labels = None
         self.iterations = 0
         self.history = []  # Lưu lịch sử để hiển thị
+        # Buffer khoảng cách/chuẩn của từng partition, dùng lại giữa các vòng lặp
+        self._buffers: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
         
     def _euclidean_distance(self, point1: np.ndarray, point2: np.ndarray) -> float:
         """Tính khoảng cách Euclidean giữa 2 điểm."""
         return np.sqrt(np.sum((point1 - point2) ** 2))
     
-    def _initialize_centroids(self, data: np.ndarray) -> np.ndarray:
+    def _initialize_centroids(self, data: np.ndarray, sample_weight: np.ndarray = None) -> np.ndarray:
         """
         Khởi tạo centroids bằng phương pháp Forgy (chọn ngẫu nhiên k điểm).
+
+        Có trọng số: xác suất chọn mỗi điểm tỷ lệ với trọng số (một điểm đại
+        diện cho w điểm trùng có khả năng được chọn như khi chưa gộp).
         """
         n_samples = data.shape[0]
-        indices = np.random.choice(n_samples, self.k, replace=False)
-        centroids = data[indices].copy()
+        p = None if sample_weight is None else sample_weight / sample_weight.sum()
+        indices = np.random.choice(n_samples, self.k, replace=False, p=p)
+        centroids = data[indices].toarray() if sparse.issparse(data) else data[indices].copy()
+        return self._normalize_centroids(centroids)
+
+    def _normalize_centroids(self, centroids: np.ndarray) -> np.ndarray:
+        """Với metric 'cosine': chuẩn hóa các centroid khác 0 về độ dài 1 (tại chỗ)."""
+        if self.metric == 'cosine':
+            norms = np.linalg.norm(centroids, axis=1)
+            centroids[norms > 0] /= norms[norms > 0, None]
         return centroids
+
+    def _centroid_norms(self, centroids: np.ndarray) -> np.ndarray:
+        """||c||^2 (euclidean), ||c||_1 (manhattan); cosine không dùng (centroid có độ dài 1)."""
+        if self.metric == 'manhattan':
+            return np.abs(centroids).sum(axis=1)
+        if self.metric == 'cosine':
+            return np.zeros(len(centroids))
+        return np.einsum('ij,ij->i', centroids, centroids)
     
     def _assign_clusters(self, data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
         """
         Gán mỗi điểm vào cụm gần nhất (bước Assignment).
+
+        Tính theo chunk bằng ma trận (xem _chunk_distances), các partition
+        chạy song song trên n_jobs thread.
         
         Returns:
             labels: Mảng chứa chỉ số cụm cho mỗi điểm
         """
-        n_samples = data.shape[0]
-        labels = np.zeros(n_samples, dtype=int)
-        
-        for i in range(n_samples):
-            distances = [self._euclidean_distance(data[i], centroid) for centroid in centroids]
-            labels[i] = np.argmin(distances)
-        
+        centroids = np.ascontiguousarray(centroids, dtype=np.float64)
+        centroid_norms = self._centroid_norms(centroids)
+        labels = np.empty(data.shape[0], dtype=np.intp)
+
+        def assign_partition(part: int, start: int, stop: int):
+            distances, _ = self._partition_buffers(part, len(centroids))
+            for lo in range(start, stop, self.chunk_size):
+                hi = min(lo + self.chunk_size, stop)
+                chunk_distances = self._chunk_distances(data[lo:hi], centroids, centroid_norms, distances)
+                np.argmin(chunk_distances, axis=1, out=labels[lo:hi])
+
+        self._run_partitions(assign_partition, data.shape[0])
         return labels
+
+    def _assign_and_accumulate(self, data: np.ndarray, centroids: np.ndarray,
+                               sample_weight: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+        """
+        Bước Assignment và phần tổng của bước Update trong một lần quét dữ liệu.
+
+        Mỗi partition (một thread) gán cụm cho các chunk của mình và cộng dồn
+        tổng tọa độ, số điểm (có trọng số) từng cụm cùng SSE theo centroids
+        hiện tại vào biến riêng; các tổng riêng phần được cộng lại ở cuối.
+        Không cần data[labels == cluster_id] (quét toàn bộ dữ liệu k lần).
+
+        Với metric 'cosine', tổng là tổng các điểm đã chuẩn hóa (mỗi điểm nhân
+        1 / ||x|| khi cộng, không tạo bản sao dữ liệu) và sse là tổng 1 - cos;
+        với 'manhattan' không cần tổng (centroid là trung vị), sse là tổng
+        khoảng cách L1.
+
+        Returns:
+            labels, sums (k, n_features), counts (k,), sse
+        """
+        centroids = np.ascontiguousarray(centroids, dtype=np.float64)
+        centroid_norms = self._centroid_norms(centroids)
+        k, n_features = centroids.shape
+        labels = np.empty(data.shape[0], dtype=np.intp)
+
+        def accumulate_partition(part: int, start: int, stop: int):
+            distances, norms = self._partition_buffers(part, k)
+            sums = np.zeros((k, n_features))
+            counts = np.zeros(k)
+            sse = 0.0
+            for lo in range(start, stop, self.chunk_size):
+                hi = min(lo + self.chunk_size, stop)
+                chunk = data[lo:hi]
+                chunk_labels = labels[lo:hi]
+                chunk_distances = self._chunk_distances(chunk, centroids, centroid_norms, distances)
+                np.argmin(chunk_distances, axis=1, out=chunk_labels)
+
+                nearest = np.take_along_axis(chunk_distances, chunk_labels[:, None], axis=1)[:, 0]
+                weights = None if sample_weight is None else sample_weight[lo:hi]
+                sum_weights = weights
+                if self.metric == 'euclidean':
+                    # Khoảng cách bình phương tới centroid gần nhất = phần đã tính + ||x||^2
+                    nearest += _row_squared_norms(chunk, out=norms[:hi - lo])
+                elif self.metric == 'cosine':
+                    # 1 - cos = 1 + (-x.c) / ||x||; điểm 0 có khoảng cách 1 và không góp vào tổng
+                    row_norms = np.sqrt(_row_squared_norms(chunk, out=norms[:hi - lo]))
+                    scale = np.divide(1.0, row_norms, out=np.zeros_like(row_norms), where=row_norms > 0)
+                    nearest = 1.0 + nearest * scale
+                    sum_weights = scale if weights is None else scale * weights
+                np.maximum(nearest, 0.0, out=nearest)
+
+                sse += float(nearest.sum() if weights is None else nearest @ weights)
+                counts += np.bincount(chunk_labels, weights=weights, minlength=k)
+                if self.metric != 'manhattan':
+                    _add_cluster_sums(sums, chunk, chunk_labels, sum_weights)
+            return sums, counts, sse
+
+        partials = self._run_partitions(accumulate_partition, data.shape[0])
+        sums = np.sum([p[0] for p in partials], axis=0)
+        counts = np.sum([p[1] for p in partials], axis=0)
+        sse = float(sum(p[2] for p in partials))
+        return labels, sums, counts, sse
+
+    def _chunk_distances(self, chunk: np.ndarray, centroids: np.ndarray, centroid_norms: np.ndarray,
+                         buffer: np.ndarray) -> np.ndarray:
+        """
+        ||c||^2 - 2 x.c cho mọi cặp (điểm trong chunk, centroid), ghi vào buffer
+        có sẵn. Thiếu hạng tử ||x||^2 (không đổi theo centroid nên không ảnh
+        hưởng argmin). Phép nhân ma trận chạy trong BLAS, nhả GIL.
+
+        Metric 'cosine': -x.c (centroid có độ dài 1, argmin = cos lớn nhất).
+        Metric 'manhattan': khoảng cách L1 đầy đủ (xem _manhattan_distances).
+        Chunk CSR: tích sparse x dense, bộ nhớ theo số phần tử khác 0.
+        """
+        out = buffer[:chunk.shape[0]]
+        if self.metric == 'manhattan':
+            return _manhattan_distances(chunk, centroids, centroid_norms, out)
+        if sparse.issparse(chunk):
+            out[...] = chunk @ centroids.T
+        else:
+            np.dot(chunk, centroids.T, out=out)
+        if self.metric == 'cosine':
+            np.negative(out, out=out)
+        else:
+            out *= -2.0
+            out += centroid_norms
+        return out
+
+    def _partition_buffers(self, part: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Buffer (chunk_size, k) khoảng cách và (chunk_size,) chuẩn của partition `part`."""
+        buffers = self._buffers.get(part)
+        if buffers is None or buffers[0].shape[1] != k:
+            buffers = (np.empty((self.chunk_size, k)), np.empty(self.chunk_size))
+            self._buffers[part] = buffers
+        return buffers
+
+    def _run_partitions(self, fn, n_samples: int) -> List[Any]:
+        """
+        Chia [0, n_samples) thành tối đa n_jobs khoảng liên tiếp (mỗi khoảng ít
+        nhất một chunk) và gọi fn(part, start, stop) cho từng khoảng, song song
+        trên thread pool nếu có nhiều hơn một khoảng.
+        """
+        n_parts = max(1, min(self.n_jobs, -(-n_samples // self.chunk_size)))
+        bounds = np.linspace(0, n_samples, n_parts + 1).astype(int)
+        if n_parts == 1:
+            return [fn(0, 0, n_samples)]
+        with ThreadPoolExecutor(max_workers=n_parts) as pool:
+            futures = [pool.submit(fn, part, int(bounds[part]), int(bounds[part + 1])) for part in range(n_parts)]
+            return [future.result() for future in futures]
     
-    def _update_centroids(self, data: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    def _update_centroids(self, data: np.ndarray, labels: np.ndarray,
+                          sample_weight: np.ndarray = None) -> np.ndarray:
         """
-        Cập nhật centroids bằng cách tính trung bình của các điểm trong cụm (bước Update).
+        Cập nhật centroids bằng cách tính trung bình (có trọng số) của các điểm
+        trong cụm (bước Update). Tổng theo cụm tính bằng np.bincount, mỗi chiều
+        một lần quét dữ liệu.
         
         Returns:
             new_centroids: Centroids mới
         """
-        n_features = data.shape[1]
-        new_centroids = np.zeros((self.k, n_features))
-        
-        for cluster_id in range(self.k):
-            # Lấy tất cả các điểm thuộc cụm này
-            cluster_points = data[labels == cluster_id]
-            
-            if len(cluster_points) > 0:
-                # Tính trung bình
-                new_centroids[cluster_id] = np.mean(cluster_points, axis=0)
-            else:
-                # Nếu cụm rỗng, giữ nguyên centroid cũ
-                new_centroids[cluster_id] = self.centroids[cluster_id]
-        
-        return new_centroids
+        counts = np.bincount(labels, weights=sample_weight, minlength=self.k)
+        sums = np.zeros((self.k, data.shape[1]))
+        _add_cluster_sums(sums, data, labels, sample_weight)
+        return self._centroids_from_sums(sums, counts)
+
+    def _centroids_from_sums(self, sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """Trung bình từng cụm từ tổng tọa độ và số điểm (cụm rỗng giữ nguyên centroid cũ)."""
+        new_centroids = np.array(self.centroids, dtype=np.float64, copy=True)
+        non_empty = counts > 0
+        new_centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+        return self._normalize_centroids(new_centroids)
+
+    def _cluster_medians(self, data, labels: np.ndarray, sample_weight: np.ndarray = None) -> np.ndarray:
+        """
+        Bước Update với metric 'manhattan' (K-Medians): trung vị (có trọng số)
+        theo từng chiều của mỗi cụm, cụm rỗng giữ nguyên centroid cũ. Với nhiều
+        trung vị (số điểm chẵn) lấy giá trị nhỏ hơn.
+        """
+        medians = np.array(self.centroids, dtype=np.float64, copy=True)
+        if sparse.issparse(data):
+            _sparse_cluster_medians(data, labels, sample_weight, medians)
+            return medians
+        for cluster in range(self.k):
+            mask = labels == cluster
+            weights = None if sample_weight is None else sample_weight[mask]
+            if not mask.any() or (weights is not None and weights.sum() <= 0):
+                continue
+            medians[cluster] = _weighted_median(data[mask], weights)
+        return medians
     
-    def _calculate_sse(self, data: np.ndarray, labels: np.ndarray, centroids: np.ndarray) -> float:
+    def _calculate_sse(self, data: np.ndarray, labels: np.ndarray, centroids: np.ndarray,
+                       sample_weight: np.ndarray = None) -> float:
         """
-        Tính Sum of Squared Errors (SSE) - tổng bình phương khoảng cách.
+        Tính Sum of Squared Errors (SSE) - tổng (có trọng số) bình phương khoảng cách.
+
+        Metric 'cosine': tổng 1 - cos; 'manhattan': tổng khoảng cách L1 (giá
+        trị hàm mục tiêu mà fit tối ưu). Dữ liệu CSR tính theo chunk.
         """
-        sse = 0.0
-        for i in range(len(data)):
-            cluster_id = labels[i]
-            distance = self._euclidean_distance(data[i], centroids[cluster_id])
-            sse += distance ** 2
-        return sse
+        centroids = np.asarray(centroids, dtype=np.float64)
+        if self.metric == 'euclidean' and not sparse.issparse(data):
+            diff = data - centroids[labels]
+            squared = np.einsum('ij,ij->i', diff, diff)
+            if sample_weight is None:
+                return float(squared.sum())
+            return float(squared @ sample_weight)
+
+        total = 0.0
+        for lo in range(0, data.shape[0], self.chunk_size):
+            hi = min(lo + self.chunk_size, data.shape[0])
+            distances = _assigned_distances(self.metric, data[lo:hi], centroids, labels[lo:hi])
+            total += float(distances.sum() if sample_weight is None else distances @ sample_weight[lo:hi])
+        return total
     
-    def fit(self, data: np.ndarray, verbose: bool = False) -> Dict[str, Any]:
+    def fit(self, data: np.ndarray, verbose: bool = False, record_history: bool = True,
+            include_points: bool = True, sample_weight: np.ndarray = None, init=None) -> Dict[str, Any]:
         """
         Huấn luyện mô hình K-Means.
         
         Args:
-            data: Mảng numpy 2D (n_samples, n_features)
+            data: Mảng numpy 2D (n_samples, n_features), có thể là memmap,
+                hoặc ma trận scipy.sparse (CSR; không chuyển sang dạng dày)
             verbose: In ra thông tin chi tiết
+            record_history: Lưu centroids/labels/điểm của từng lần lặp
+                (tắt với dữ liệu lớn để không nhân bản dữ liệu mỗi vòng lặp;
+                luôn tắt với dữ liệu sparse)
+            include_points: Trả về labels và điểm của từng cụm dạng list;
+                False -> bỏ labels, 'clusters' chỉ chứa số điểm mỗi cụm
+                (dữ liệu sparse: có labels, 'clusters' là số điểm mỗi cụm)
+            sample_weight: Trọng số (n_samples,) >= 0 của từng điểm, ví dụ số
+                điểm gốc mà mỗi điểm đại diện (xem coreset.py). SSE, centroids
+                và số điểm mỗi cụm đều tính theo trọng số.
+            init: None (chọn ngẫu nhiên k điểm), mảng (k, n_features) centroid
+                ban đầu (ví dụ centroids của lần fit trước), hoặc WarmStart:
+                centroid ban đầu = tổng / số điểm mỗi cụm của lần trước đã
+                cộng/trừ các dòng thay đổi. WarmStart có nhãn và cận khoảng
+                cách của từng dòng (metric 'euclidean') -> chỉ tính lại khoảng
+                cách cho các điểm mà cận không còn chắc chắn (xem
+                _fit_loop_bounded); không có history.
             
         Returns:
             Dictionary chứa thông tin kết quả
         """
-        data = np.array(data)
-        if len(data.shape) == 1:
-            data = data.reshape(-1, 1)
+        data = as_matrix(data)
+        is_sparse = sparse.issparse(data)
+        record_history = record_history and not is_sparse
         
         n_samples, n_features = data.shape
+        sample_weight = self._check_sample_weight(sample_weight, n_samples)
         
         # Khởi tạo centroids
-        self.centroids = self._initialize_centroids(data)
+        warm = init if isinstance(init, WarmStart) else None
+        bounded = warm is not None and warm.labels is not None and self.metric == 'euclidean'
+        if warm is not None:
+            warm.check(n_samples, n_features, self.k, require_rows=bounded)
+            self.centroids = self._normalize_centroids(warm.initial_centroids())
+        elif init is not None:
+            self.centroids = self._check_init(init, n_features)
+        else:
+            self.centroids = self._initialize_centroids(data, sample_weight)
         
         # Lưu lịch sử
         self.history = []
+        self.relabelled = None
         
-        for iteration in range(self.max_iters):
-            # Bước 1: Gán cụm
-            self.labels = self._assign_clusters(data, self.centroids)
-            
-            # Bước 2: Cập nhật centroids
-            new_centroids = self._update_centroids(data, self.labels)
-            
-            # Tính SSE
-            sse = self._calculate_sse(data, self.labels, self.centroids)
-            
-            # Lưu lịch sử
-            iteration_info = {
-                'iteration': iteration + 1,
+        start = time.perf_counter()
+        with span('fit_loop'):
+            if bounded:
+                self._fit_loop_bounded(data, warm, verbose, sample_weight)
+            else:
+                self._fit_loop(data, verbose, record_history, sample_weight)
+        KMEANS_FITS.inc()
+        KMEANS_FIT_POINTS.observe(n_samples)
+        KMEANS_FIT_ITERATIONS.observe(self.iterations)
+        KMEANS_FIT_SECONDS.observe(time.perf_counter() - start)
+        
+        # Kết quả cuối cùng
+        final_sse = self._calculate_sse(data, self.labels, self.centroids, sample_weight)
+        
+        if not include_points or is_sparse:
+            sizes = np.bincount(self.labels, weights=sample_weight, minlength=self.k)
+            result = {
+                'centroids': self.centroids.tolist(),
+                'sse': float(final_sse),
+                'iterations': self.iterations,
+                'history': self.history,
+                'clusters': {f'cluster_{i}': int(round(sizes[i])) for i in range(self.k)},
+            }
+            if include_points:
+                result['labels'] = self.labels.tolist()
+            if self.relabelled is not None:
+                result['relabelled'] = self.relabelled
+            return result
+
+        with span('tolist'):
+            result = {
                 'centroids': self.centroids.tolist(),
                 'labels': self.labels.tolist(),
-                'sse': float(sse),
-                'clusters': {}
+                'sse': float(final_sse),
+                'iterations': self.iterations,
+                'history': self.history,
+                'clusters': {
+                    f'cluster_{i}': data[self.labels == i].tolist() 
+                    for i in range(self.k)
+                }
             }
+        if self.relabelled is not None:
+            result['relabelled'] = self.relabelled
+        return result
+
+    def _check_init(self, init, n_features: int) -> np.ndarray:
+        centroids = np.array(init, dtype=np.float64, ndmin=2)
+        if centroids.shape != (self.k, n_features):
+            raise ValueError(f"Centroid ban đầu phải có dạng ({self.k}, {n_features}), nhận {centroids.shape}")
+        if not np.all(np.isfinite(centroids)):
+            raise ValueError("Centroid ban đầu phải là số hữu hạn")
+        return self._normalize_centroids(centroids)
+
+    def _check_sample_weight(self, sample_weight, n_samples: int):
+        if sample_weight is None:
+            return None
+        sample_weight = np.asarray(sample_weight, dtype=np.float64).reshape(-1)
+        if len(sample_weight) != n_samples:
+            raise ValueError(f"sample_weight có {len(sample_weight)} phần tử, dữ liệu có {n_samples} điểm")
+        if not np.all(np.isfinite(sample_weight)) or np.any(sample_weight < 0):
+            raise ValueError("sample_weight phải là số hữu hạn >= 0")
+        if np.count_nonzero(sample_weight) < self.k:
+            raise ValueError(f"Cần ít nhất k ({self.k}) điểm có trọng số > 0")
+        return sample_weight
+
+    def _fit_loop(self, data: np.ndarray, verbose: bool, record_history: bool,
+                  sample_weight: np.ndarray = None):
+        """Vòng lặp Assignment / Update cho tới khi hội tụ hoặc hết max_iters."""
+        for iteration in range(self.max_iters):
+            # Bước 1: Gán cụm (kèm tổng theo cụm và SSE, cùng một lần quét)
+            self.labels, sums, counts, sse = self._assign_and_accumulate(data, self.centroids, sample_weight)
             
-            # Nhóm điểm theo cụm
-            for cluster_id in range(self.k):
-                cluster_points = data[self.labels == cluster_id]
-                iteration_info['clusters'][f'cluster_{cluster_id}'] = cluster_points.tolist()
+            # Bước 2: Cập nhật centroids
+            if self.metric == 'manhattan':
+                new_centroids = self._cluster_medians(data, self.labels, sample_weight)
+            else:
+                new_centroids = self._centroids_from_sums(sums, counts)
             
-            self.history.append(iteration_info)
+            # Lưu lịch sử
+            if record_history:
+                iteration_info = {
+                    'iteration': iteration + 1,
+                    'centroids': self.centroids.tolist(),
+                    'labels': self.labels.tolist(),
+                    'sse': float(sse),
+                    'clusters': {}
+                }
+                
+                # Nhóm điểm theo cụm
+                for cluster_id in range(self.k):
+                    cluster_points = data[self.labels == cluster_id]
+                    iteration_info['clusters'][f'cluster_{cluster_id}'] = cluster_points.tolist()
+                
+                self.history.append(iteration_info)
             
             # Kiểm tra điều kiện dừng
             centroid_shift = np.sum([self._euclidean_distance(self.centroids[i], new_centroids[i]) 
@@ -158,22 +451,72 @@ class KMeansClustering:
                 break
             
             self.iterations = iteration + 1
-        
-        # Kết quả cuối cùng
-        final_sse = self._calculate_sse(data, self.labels, self.centroids)
-        
-        return {
-            'centroids': self.centroids.tolist(),
-            'labels': self.labels.tolist(),
-            'sse': float(final_sse),
-            'iterations': self.iterations,
-            'history': self.history,
-            'clusters': {
-                f'cluster_{i}': data[self.labels == i].tolist() 
-                for i in range(self.k)
-            }
-        }
     
+    def _fit_loop_bounded(self, data, warm: 'WarmStart', verbose: bool, sample_weight: np.ndarray = None):
+        """
+        Vòng lặp Lloyd với cận khoảng cách kiểu Hamerly, bắt đầu từ WarmStart.
+
+        Mỗi dòng giữ cụm a, cận trên u >= d(x, c_a) và cận dưới l <= khoảng
+        cách tới centroid gần thứ hai. Khi centroid dịch chuyển delta, u tăng
+        delta_a và l giảm delta lớn nhất của cụm khác; dòng có
+        u <= max(l, s_a) (s_a: nửa khoảng cách từ c_a tới centroid gần nhất)
+        chắc chắn giữ cụm, không cần tính khoảng cách. Các dòng còn lại siết u
+        bằng khoảng cách thật rồi mới gán lại với mọi centroid. Tổng theo cụm
+        được cập nhật theo các dòng đổi cụm; cuối cùng centroid được tính lại
+        chính xác từ nhãn (một lần quét O(n * d)).
+
+        self.relabelled: số lần một dòng phải tính khoảng cách tới mọi centroid.
+        """
+        labels = warm.labels.astype(np.intp, copy=True)
+        upper, lower = warm.upper.copy(), warm.lower.copy()
+        sums, counts = warm.sums.copy(), warm.counts.copy()
+        _shift_bounds(upper, lower, labels, self.centroids - warm.centroids)
+        weights = np.ones(data.shape[0]) if sample_weight is None else sample_weight
+        self.relabelled = 0
+        self.iterations = 0
+
+        for iteration in range(self.max_iters):
+            # Bước 1: Gán cụm, chỉ cho các dòng mà cận không loại trừ được việc đổi cụm
+            gaps = np.sqrt(np.maximum(_pairwise_squared_distances(self.centroids), 0.0))
+            np.fill_diagonal(gaps, np.inf)
+            bound = np.maximum(lower, gaps.min(axis=1)[labels] / 2)
+            candidates = np.flatnonzero(upper > bound)
+            if len(candidates):
+                upper[candidates] = np.sqrt(_assigned_distances(
+                    'euclidean', data[candidates], self.centroids, labels[candidates]))
+                candidates = candidates[upper[candidates] > bound[candidates]]
+            if len(candidates):
+                self.relabelled += len(candidates)
+                points = data[candidates]
+                old = labels[candidates]
+                new, upper[candidates], lower[candidates] = _distance_bounds(points, self.centroids, self.chunk_size)
+                labels[candidates] = new
+                moved = np.flatnonzero(new != old)
+                if len(moved):
+                    moved_weights = weights[candidates[moved]]
+                    moved_points = points[moved]
+                    _add_cluster_sums(sums, moved_points, new[moved], moved_weights)
+                    _add_cluster_sums(sums, moved_points, old[moved], -moved_weights)
+                    counts += np.bincount(new[moved], weights=moved_weights, minlength=self.k)
+                    counts -= np.bincount(old[moved], weights=moved_weights, minlength=self.k)
+
+            # Bước 2: Cập nhật centroids, nới cận theo độ dịch chuyển
+            new_centroids = self._centroids_from_sums(sums, counts)
+            shift = _shift_bounds(upper, lower, labels, new_centroids - self.centroids)
+            centroid_shift = float(shift.sum())
+            self.centroids = new_centroids
+            self.iterations = iteration + 1
+            if verbose:
+                print(f"Iteration {iteration + 1}: relabelled = {len(candidates)}, Centroid shift = {centroid_shift:.6f}")
+            if centroid_shift < self.tolerance:
+                if verbose:
+                    print(f"Converged after {iteration + 1} iterations")
+                break
+
+        # Tổng tích lũy có thể lệch (khởi tạo từ centroids * số điểm, sai số làm tròn)
+        self.labels = labels
+        self.centroids = self._update_centroids(data, labels, sample_weight)
+
     def predict(self, data: np.ndarray) -> np.ndarray:
         """
         Dự đoán cụm cho dữ liệu mới.
@@ -181,57 +524,487 @@ class KMeansClustering:
         if self.centroids is None:
             raise ValueError("Model chưa được huấn luyện. Gọi fit() trước.")
         
-        data = np.array(data)
-        if len(data.shape) == 1:
-            data = data.reshape(-1, 1)
-        
-        return self._assign_clusters(data, self.centroids)
+        data = as_matrix(data)
+        centroids = self._normalize_centroids(np.array(self.centroids, dtype=np.float64))
+        return self._assign_clusters(data, centroids)
+
+    def distance_bounds(self, data) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Khoảng cách Euclid của từng dòng tới centroid được gán (self.labels) và
+        tới centroid gần thứ hai; lưu kèm run để WarmStart dùng làm cận.
+        """
+        if self.labels is None:
+            raise ValueError("Model chưa được huấn luyện. Gọi fit() trước.")
+        _, nearest, second = _distance_bounds(as_matrix(data), self.centroids, self.chunk_size, labels=self.labels)
+        return nearest, second
 
 
-def parse_points_from_string(points_str: str) -> List[List[float]]:
+# ====================================================================
+# DỮ LIỆU SPARSE VÀ CÁC ĐỘ ĐO KHÁC
+# ====================================================================
+
+def as_matrix(data):
     """
-    Parse chuỗi điểm từ input text.
-    Ví dụ: "x1={1,3}, x2={1.5,3.2}" -> [[1, 3], [1.5, 3.2]]
+    Mảng (n, d) float64; ma trận scipy.sparse -> CSR float64 dạng chuẩn (chỉ
+    số không trùng, không lưu số 0), không chuyển sang dạng dày.
     """
-    points = []
-    # Tách theo dấu phẩy giữa các điểm
-    point_strings = points_str.split(',')
-    
-    current_point = []
-    for part in point_strings:
-        # Tìm các số trong phần này
-        if '{' in part:
-            # Bắt đầu điểm mới
-            current_point = []
-            # Lấy số sau dấu {
-            numbers = part.split('{')[1].strip()
-            if '}' in numbers:
-                numbers = numbers.split('}')[0]
-            # Tách các số
-            for num_str in numbers.split(','):
-                try:
-                    current_point.append(float(num_str.strip()))
-                except:
-                    pass
-        elif '}' in part:
-            # Kết thúc điểm
-            numbers = part.split('}')[0].strip()
-            for num_str in numbers.split(','):
-                try:
-                    current_point.append(float(num_str.strip()))
-                except:
-                    pass
-            if current_point:
-                points.append(current_point)
-                current_point = []
+    if sparse.issparse(data):
+        data = sparse.csr_matrix(data, dtype=np.float64)
+        if not data.has_canonical_format or (data.data == 0).any():
+            data = data.copy()
+            data.sum_duplicates()
+            data.eliminate_zeros()
+        return data
+    data = np.asarray(data, dtype=np.float64)
+    if data.ndim == 1:
+        data = data.reshape(-1, 1)
+    return data
+
+
+def _nonzero_rows(chunk: sparse.csr_matrix) -> np.ndarray:
+    """Chỉ số dòng của từng phần tử khác 0 (cùng thứ tự với chunk.data)."""
+    return np.repeat(np.arange(chunk.shape[0]), np.diff(chunk.indptr))
+
+
+def _row_squared_norms(chunk, out: np.ndarray = None) -> np.ndarray:
+    if sparse.issparse(chunk):
+        return np.bincount(_nonzero_rows(chunk), weights=chunk.data ** 2, minlength=chunk.shape[0])
+    return np.einsum('ij,ij->i', chunk, chunk, out=out)
+
+
+def _add_cluster_sums(sums: np.ndarray, chunk, labels: np.ndarray, weights: np.ndarray = None):
+    """sums[c] += tổng (có trọng số) các dòng của chunk có nhãn c."""
+    k, n_features = sums.shape
+    if sparse.issparse(chunk):
+        # Ma trận chỉ thị (k, m) nhân chunk: O(số phần tử khác 0)
+        m = chunk.shape[0]
+        values = np.ones(m) if weights is None else weights
+        indicator = sparse.csr_matrix((values, (labels, np.arange(m))), shape=(k, m))
+        block = (indicator @ chunk).tocoo()
+        sums[block.row, block.col] += block.data
+        return
+    for j in range(n_features):
+        column = chunk[:, j] if weights is None else chunk[:, j] * weights
+        sums[:, j] += np.bincount(labels, weights=column, minlength=k)
+
+
+def _manhattan_distances(chunk, centroids: np.ndarray, centroid_l1: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """
+    Khoảng cách L1 (m, k). Chunk CSR: |x - c|_1 = ||c||_1 + tổng trên các phần
+    tử khác 0 của x của (|x_j - c_j| - |c_j|), bộ nhớ O(nnz(chunk) * k).
+    """
+    if not sparse.issparse(chunk):
+        return cdist(chunk, centroids, 'cityblock', out=out)
+    # (nnz, k): các tọa độ centroid tại vị trí khác 0 của từng dòng
+    at_nonzeros = np.ascontiguousarray(centroids.T)[chunk.indices]
+    corrections = np.abs(chunk.data[:, None] - at_nonzeros)
+    corrections -= np.abs(at_nonzeros, out=at_nonzeros)
+    # Cộng theo dòng bằng ma trận (m, nnz) có cùng indptr với chunk
+    nnz = chunk.nnz
+    row_sums = sparse.csr_matrix((np.ones(nnz), np.arange(nnz), chunk.indptr), shape=(chunk.shape[0], nnz))
+    out[...] = row_sums @ corrections
+    out += centroid_l1
+    return out
+
+
+def _assigned_distances(metric: str, chunk, centroids: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """Khoảng cách (theo hàm mục tiêu của metric) từ mỗi dòng tới centroid được gán."""
+    assigned = centroids[labels] if not sparse.issparse(chunk) else None
+    if metric == 'manhattan':
+        if assigned is not None:
+            return np.abs(chunk - assigned).sum(axis=1)
+        rows = _nonzero_rows(chunk)
+        at_nonzeros = centroids[labels[rows], chunk.indices]
+        corrections = np.abs(chunk.data - at_nonzeros) - np.abs(at_nonzeros)
+        return np.abs(centroids).sum(axis=1)[labels] + np.bincount(rows, corrections, minlength=chunk.shape[0])
+
+    if assigned is not None:
+        dots = np.einsum('ij,ij->i', chunk, assigned)
+    else:
+        rows = _nonzero_rows(chunk)
+        dots = np.bincount(rows, chunk.data * centroids[labels[rows], chunk.indices], minlength=chunk.shape[0])
+    centroid_squares = np.einsum('ij,ij->i', centroids, centroids)[labels]
+    row_squares = _row_squared_norms(chunk)
+    if metric == 'euclidean':
+        return np.maximum(row_squares - 2.0 * dots + centroid_squares, 0.0)
+    norms = np.sqrt(row_squares * centroid_squares)
+    return 1.0 - np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+
+def _weighted_median(values: np.ndarray, weights: np.ndarray = None) -> np.ndarray:
+    """Trung vị (nhỏ hơn) theo từng cột: giá trị đầu tiên có trọng số tích lũy >= một nửa tổng."""
+    if weights is None:
+        middle = (len(values) - 1) // 2
+        return np.partition(values, middle, axis=0)[middle]
+    order = np.argsort(values, axis=0, kind='stable')
+    cumulative = np.cumsum(weights[order], axis=0)
+    first = np.argmax(cumulative >= cumulative[-1] / 2, axis=0)
+    columns = np.arange(values.shape[1])
+    return values[order[first, columns], columns]
+
+
+def _sparse_cluster_medians(data: sparse.csr_matrix, labels: np.ndarray, sample_weight: np.ndarray,
+                            medians: np.ndarray):
+    """
+    Trung vị theo từng (cụm, chiều) của ma trận CSR, ghi vào medians (cụm rỗng
+    giữ nguyên). Mỗi (cụm, chiều) là một đoạn các giá trị khác 0 đã sắp xếp;
+    các số 0 ẩn là một khối có trọng số = tổng trọng số cụm - trọng số phần
+    khác 0, đứng giữa giá trị âm và dương. O(nnz log nnz + k * d).
+    """
+    k, n_features = medians.shape
+    weights = np.ones(data.shape[0]) if sample_weight is None else sample_weight
+    totals = np.bincount(labels, weights=weights, minlength=k)
+    medians[totals > 0] = 0.0
+    if data.nnz == 0:
+        return
+
+    # Sắp xếp các phần tử khác 0 theo (cụm, chiều) rồi theo giá trị: sắp theo giá
+    # trị, sau đó dựng CSR với dòng = (cụm, chiều), cột = thứ hạng giá trị (phép
+    # chuyển COO -> CSR là counting sort ổn định, nhanh hơn lexsort nhiều lần)
+    rows = _nonzero_rows(data)
+    keys = labels[rows].astype(np.int64) * n_features + data.indices
+    by_value = np.argsort(data.data)
+    grouped = sparse.csr_matrix((by_value, (keys[by_value], np.arange(data.nnz))), shape=(k * n_features, data.nnz))
+    del keys, by_value
+    order, sizes = grouped.data, np.diff(grouped.indptr)
+    del grouped
+    values, entry_weights = data.data[order], weights[rows[order]]
+    del rows, order
+    segment_keys = np.flatnonzero(sizes)
+    sizes = sizes[segment_keys]
+    n_segments = len(segment_keys)
+    segment = np.repeat(np.arange(n_segments), sizes)
+
+    half = totals[segment_keys // n_features] / 2
+    nonzero_weight = np.bincount(segment, weights=entry_weights, minlength=n_segments)
+    negative_weight = np.bincount(segment, weights=entry_weights * (values < 0), minlength=n_segments)
+    zero_weight = 2 * half - nonzero_weight
+
+    # Trọng số tích lũy trong đoạn, khối số 0 được tính trước các giá trị dương
+    cumulative = np.cumsum(entry_weights)
+    cumulative -= np.concatenate(([0.0], np.cumsum(nonzero_weight)[:-1]))[segment]
+    cumulative += (values > 0) * zero_weight[segment]
+
+    # Giá trị khác 0 đầu tiên đạt một nửa trong mỗi đoạn; nếu đó không phải giá
+    # trị âm mà khối số 0 đã đạt một nửa thì trung vị là 0
+    result = np.zeros(n_segments)
+    hits = np.flatnonzero(cumulative >= half[segment])
+    hit_segments = segment[hits]
+    first = np.flatnonzero(np.concatenate(([True], hit_segments[1:] != hit_segments[:-1])))
+    result[hit_segments[first]] = values[hits[first]]
+    result[(result > 0) & (negative_weight + zero_weight >= half)] = 0.0
+
+    valid = half > 0
+    medians.reshape(-1)[segment_keys[valid]] = result[valid]
+
+
+# ====================================================================
+# WARM START / FIT LẠI THEO PHẦN THAY ĐỔI
+# ====================================================================
+
+class WarmStart:
+    """
+    Trạng thái của một lần fit trước, dùng để fit lại khi dữ liệu thay đổi ít.
+
+    sums / counts: tổng tọa độ (có trọng số) và số điểm của từng cụm; thêm hoặc
+    bớt dòng chỉ cộng/trừ các dòng đó (O(số dòng thay đổi * d)), centroid ban
+    đầu của lần fit mới là sums / counts. labels / upper / lower (tùy chọn) là
+    nhãn, cận trên khoảng cách tới centroid được gán và cận dưới khoảng cách tới
+    centroid gần thứ hai của từng dòng, theo `centroids` (Euclid, không bình
+    phương); có chúng thì fit chỉ gán lại các dòng có thể đổi cụm.
+    """
+
+    def __init__(self, centroids: np.ndarray, sums: np.ndarray = None, counts: np.ndarray = None,
+                 labels: np.ndarray = None, upper: np.ndarray = None, lower: np.ndarray = None):
+        self.centroids = np.array(centroids, dtype=np.float64, ndmin=2)
+        k = self.centroids.shape[0]
+        self.counts = np.zeros(k) if counts is None else np.array(counts, dtype=np.float64)
+        if sums is None:
+            sums = self.centroids * self.counts[:, None]
+        self.sums = np.array(sums, dtype=np.float64)
+        if self.counts.shape != (k,) or self.sums.shape != self.centroids.shape:
+            raise ValueError("sums / counts không khớp số cụm của centroids")
+        rows = (labels, upper, lower)
+        if any(row is None for row in rows) and not all(row is None for row in rows):
+            raise ValueError("labels, upper và lower phải được cho cùng nhau")
+        if labels is None:
+            self.labels = self.upper = self.lower = None
         else:
-            # Tiếp tục điểm hiện tại
-            try:
-                current_point.append(float(part.strip()))
-            except:
-                pass
-    
-    return points
+            self.labels = np.asarray(labels, dtype=np.intp)
+            self.upper = np.asarray(upper, dtype=np.float64)
+            self.lower = np.asarray(lower, dtype=np.float64)
+            if not (len(self.labels) == len(self.upper) == len(self.lower)):
+                raise ValueError("labels, upper và lower phải có cùng độ dài")
+            if len(self.labels) and (self.labels.min() < 0 or self.labels.max() >= k):
+                raise ValueError("labels nằm ngoài [0, k)")
+
+    @classmethod
+    def from_labels(cls, centroids: np.ndarray, data, labels: np.ndarray, upper: np.ndarray = None,
+                    lower: np.ndarray = None, sample_weight: np.ndarray = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> 'WarmStart':
+        """Trạng thái từ dữ liệu và nhãn; không cho cận -> tính chính xác từ centroids."""
+        data = as_matrix(data)
+        centroids = np.array(centroids, dtype=np.float64, ndmin=2)
+        labels = np.asarray(labels, dtype=np.intp)
+        sums = np.zeros_like(centroids)
+        _add_cluster_sums(sums, data, labels, sample_weight)
+        counts = np.bincount(labels, weights=sample_weight, minlength=len(centroids)).astype(np.float64)
+        if upper is None or lower is None:
+            _, upper, lower = _distance_bounds(data, centroids, chunk_size, labels=labels)
+        return cls(centroids, sums, counts, labels, upper, lower)
+
+    @classmethod
+    def from_model(cls, model: KMeansClustering, data, sample_weight: np.ndarray = None) -> 'WarmStart':
+        """Trạng thái từ model đã fit trên `data`."""
+        return cls.from_labels(model.centroids, data, model.labels, sample_weight=sample_weight,
+                               chunk_size=model.chunk_size)
+
+    @property
+    def k(self) -> int:
+        return self.centroids.shape[0]
+
+    def check(self, n_samples: int, n_features: int, k: int, require_rows: bool = False):
+        if self.centroids.shape != (k, n_features):
+            raise ValueError(f"Warm start có centroids dạng {self.centroids.shape}, cần ({k}, {n_features})")
+        if require_rows and len(self.labels) != n_samples:
+            raise ValueError(f"Warm start có {len(self.labels)} dòng, dữ liệu có {n_samples} dòng")
+
+    def remove(self, rows: np.ndarray, points, sample_weight: np.ndarray = None) -> 'WarmStart':
+        """
+        Bớt các dòng `rows` (chỉ số theo thứ tự hiện tại, giá trị tọa độ là
+        `points`) khỏi tổng của cụm chứa chúng; các dòng còn lại dồn lên giữ
+        nguyên thứ tự. Cần labels.
+        """
+        if self.labels is None:
+            raise ValueError("Bớt dòng cần nhãn từng dòng của lần fit trước")
+        rows = np.asarray(rows, dtype=np.intp)
+        if len(np.unique(rows)) != len(rows) or (len(rows) and (rows.min() < 0 or rows.max() >= len(self.labels))):
+            raise ValueError(f"Chỉ số dòng cần bớt phải khác nhau và nằm trong [0, {len(self.labels)})")
+        labels = self.labels[rows]
+        weights = np.ones(len(rows)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        _add_cluster_sums(self.sums, as_matrix(points), labels, -weights)
+        self.counts -= np.bincount(labels, weights=weights, minlength=self.k)
+        keep = np.ones(len(self.labels), dtype=bool)
+        keep[rows] = False
+        self.labels, self.upper, self.lower = self.labels[keep], self.upper[keep], self.lower[keep]
+        return self
+
+    def add(self, points, sample_weight: np.ndarray = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> 'WarmStart':
+        """Thêm các dòng mới vào cuối: gán vào centroid gần nhất của trạng thái hiện tại."""
+        points = as_matrix(points)
+        if points.shape[0] == 0:
+            return self
+        if points.shape[1] != self.centroids.shape[1]:
+            raise ValueError(f"Điểm thêm có {points.shape[1]} chiều, cần {self.centroids.shape[1]}")
+        labels, upper, lower = _distance_bounds(points, self.centroids, chunk_size)
+        _add_cluster_sums(self.sums, points, labels, sample_weight)
+        self.counts += np.bincount(labels, weights=sample_weight, minlength=self.k)
+        if self.labels is not None:
+            self.labels = np.concatenate([self.labels, labels])
+            self.upper = np.concatenate([self.upper, upper])
+            self.lower = np.concatenate([self.lower, lower])
+        return self
+
+    def initial_centroids(self) -> np.ndarray:
+        """sums / counts; cụm rỗng (hoặc bị bớt hết) giữ centroid cũ."""
+        centroids = self.centroids.copy()
+        non_empty = self.counts > 1e-12
+        centroids[non_empty] = self.sums[non_empty] / self.counts[non_empty, None]
+        return centroids
+
+
+def _pairwise_squared_distances(centroids: np.ndarray) -> np.ndarray:
+    squares = np.einsum('ij,ij->i', centroids, centroids)
+    return squares[:, None] - 2.0 * (centroids @ centroids.T) + squares[None, :]
+
+
+def _distance_bounds(data, centroids: np.ndarray, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     labels: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Theo từng dòng: nhãn (centroid gần nhất, hoặc `labels` nếu cho trước),
+    khoảng cách Euclid tới centroid đó và khoảng cách nhỏ nhất tới các centroid
+    còn lại (inf khi k = 1). Tính theo chunk, bộ nhớ O(chunk_size * k).
+    """
+    n_samples, k = data.shape[0], centroids.shape[0]
+    centroid_squares = np.einsum('ij,ij->i', centroids, centroids)
+    assigned = np.empty(n_samples, dtype=np.intp) if labels is None else np.asarray(labels, dtype=np.intp)
+    nearest = np.empty(n_samples)
+    second = np.full(n_samples, np.inf)
+    for start in range(0, n_samples, chunk_size):
+        stop = min(start + chunk_size, n_samples)
+        chunk = data[start:stop]
+        distances = np.asarray(chunk @ centroids.T)
+        distances *= -2.0
+        distances += centroid_squares
+        distances += _row_squared_norms(chunk)[:, None]
+        np.maximum(distances, 0.0, out=distances)
+        rows = np.arange(stop - start)
+        if labels is None:
+            assigned[start:stop] = distances.argmin(axis=1)
+        own = assigned[start:stop]
+        nearest[start:stop] = distances[rows, own]
+        if k > 1:
+            distances[rows, own] = np.inf
+            second[start:stop] = distances.min(axis=1)
+    np.sqrt(nearest, out=nearest)
+    np.sqrt(second, out=second)
+    return assigned, nearest, second
+
+
+def _shift_bounds(upper: np.ndarray, lower: np.ndarray, labels: np.ndarray, delta: np.ndarray) -> np.ndarray:
+    """
+    Nới cận khi centroid dịch chuyển `delta` (k, d): cận trên tăng độ dịch của
+    cụm được gán, cận dưới giảm độ dịch lớn nhất của các cụm khác. Trả về độ
+    dịch của từng centroid.
+    """
+    shift = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+    upper += shift[labels]
+    if len(shift) > 1:
+        order = np.argsort(shift)
+        largest, runner_up = shift[order[-1]], shift[order[-2]]
+        lower -= np.where(labels == order[-1], runner_up, largest)
+    return shift
+
+
+# Cú pháp một điểm: [nhãn (=|:)] {số, số, ...}  — chấp nhận cả (...) và [...];
+# giữa các điểm là dấu phẩy, chấm phẩy hoặc khoảng trắng/xuống dòng.
+#
+# Đường nhanh quét bytes bằng các thao tác chạy ở tầng C (translate/split/join),
+# không có vòng lặp Python theo từng ký tự hay từng số. Regex _POINT_RE chỉ
+# dùng khi có lỗi, để tìm vị trí chính xác.
+_SEPARATOR_BYTES = b' \t\r\n\f\v,;'
+_NON_BRACKET_BYTES = bytes(i for i in range(256) if i not in b'{}()[]')
+_BRACKETS_TO_BRACES = bytes.maketrans(b'()[]', b'{}{}')
+_OPEN_TO_CLOSE = bytes.maketrans(b'{([', b'})]')
+# Các phần đứng trước mỗi điểm (nối bằng \x00): phân cách + nhãn tùy chọn
+try:
+    # Python >= 3.11: lượng từ possessive không backtrack, nhanh hơn ~4 lần
+    _HEADS_RE = re.compile(rb"(?:[\s,;]*+(?:[^\s=:{}()\[\],;\x00]++\s*+[=:]\s*+)?+\x00)*+[\s,;]*+")
+except re.error:
+    _HEADS_RE = re.compile(rb"(?:[\s,;]*(?:[^\s=:{}()\[\],;\x00]+\s*[=:]\s*)?\x00)*[\s,;]*")
+
+_POINT_RE = re.compile(r"""
+    [\s,;]*
+    (?:
+        (?:(?P<label>[^\s=:{}()\[\],;]+)\s*[=:]\s*)?
+        (?P<open>[{(\[])(?P<body>[^{}()\[\]]*)(?P<close>[})\]])
+      | (?P<bad>[^\s,;])
+      | \Z
+    )
+""", re.VERBOSE)
+
+
+def _error_position(text: str, offset: int) -> str:
+    line = text.count('\n', 0, offset) + 1
+    column = offset - (text.rfind('\n', 0, offset) + 1) + 1
+    return f"dòng {line}, cột {column} (ký tự thứ {offset})"
+
+
+def _point_match(text: str, index: int):
+    """Match regex của điểm thứ index."""
+    for i, match in enumerate(_POINT_RE.finditer(text)):
+        if i == index:
+            return match
+    raise IndexError(index)
+
+
+def _point_start(match) -> int:
+    return match.start('label') if match.group('label') else match.start('open')
+
+
+def _syntax_error(text: str) -> ValueError:
+    """Lỗi cú pháp đầu tiên (ký tự lạ hoặc ngoặc không khớp) kèm vị trí."""
+    for i, match in enumerate(_POINT_RE.finditer(text)):
+        if match.group('bad'):
+            return ValueError(f"Ký tự không hợp lệ {match.group('bad')!r} tại "
+                              f"{_error_position(text, match.start('bad'))}")
+        if match.group('open') and match.group('open').translate(str.maketrans('{([', '})]')) != match.group('close'):
+            return ValueError(f"Ngoặc không khớp ở điểm thứ {i + 1} tại "
+                              f"{_error_position(text, match.start('close'))}")
+    return ValueError("Cú pháp điểm không hợp lệ")
+
+
+def _parse_points(points_str: str) -> Tuple[List[bytes], np.ndarray]:
+    """Trả về (phần đứng trước mỗi điểm, mảng (n, d)); xem parse_labelled_points."""
+    raw = points_str.encode('utf-8')
+
+    # Ngoặc phải xen kẽ mở/đóng, không lồng nhau, cùng loại
+    brackets = raw.translate(None, _NON_BRACKET_BYTES)
+    n = len(brackets) // 2
+    if brackets != b'{}' * n:
+        if (len(brackets) % 2 or brackets.translate(_BRACKETS_TO_BRACES) != b'{}' * n
+                or brackets[0::2].translate(_OPEN_TO_CLOSE) != brackets[1::2]):
+            raise _syntax_error(points_str)
+        raw = raw.translate(_BRACKETS_TO_BRACES)
+    if n == 0:
+        if raw.strip(_SEPARATOR_BYTES):
+            raise _syntax_error(points_str)
+        raise ValueError("Không tìm thấy điểm nào")
+
+    # [trước điểm 1, thân điểm 1, trước điểm 2, thân điểm 2, ..., phần cuối]
+    pieces = raw.replace(b'}', b'{').split(b'{')
+    heads, bodies = pieces[0::2], pieces[1::2]
+    if not _HEADS_RE.fullmatch(b'\x00'.join(heads)):
+        raise _syntax_error(points_str)
+
+    commas = list(map(bytes.count, bodies, [b','] * n))
+    d = commas[0] + 1
+    if commas.count(commas[0]) != n:
+        i = next(i for i in range(n) if commas[i] != commas[0])
+        raise ValueError(f"Điểm thứ {i + 1} có {commas[i] + 1} chiều, khác {d} chiều của điểm đầu tiên, tại "
+                         f"{_error_position(points_str, _point_start(_point_match(points_str, i)))}")
+
+    # Mọi số của mọi điểm được chuyển một lần vào mảng cấp phát trước
+    data = np.empty((n, d), dtype=np.float64)
+    try:
+        data.reshape(-1)[:] = b','.join(bodies).split(b',')
+        valid = bool(np.isfinite(data).all())
+    except ValueError:
+        valid = False
+    if not valid:
+        for i, body in enumerate(bodies):
+            offset = 0
+            for token in body.decode('utf-8').split(','):
+                try:
+                    ok = math.isfinite(float(token))
+                except ValueError:
+                    ok = False
+                if not ok:
+                    position = _point_match(points_str, i).start('body') + offset + (len(token) - len(token.lstrip()))
+                    raise ValueError(f"Giá trị {token.strip()!r} không phải số hữu hạn ở điểm thứ {i + 1} tại "
+                                     f"{_error_position(points_str, position)}")
+                offset += len(token) + 1
+    return heads[:-1], data
+
+
+def parse_labelled_points(points_str: str) -> Tuple[List[str], np.ndarray]:
+    """
+    Parse chuỗi điểm nhập tay/dán vào, số chiều bất kỳ, có hoặc không có nhãn.
+
+    Ví dụ: "x1={1,3}, x2={1.5,3.2}" -> (['x1', 'x2'], array([[1. , 3. ], [1.5, 3.2]]))
+           "A: (1, 2, 3)\nB: (4, 5, 6)" hoặc "{1,3} {2,4}" (nhãn tự đặt x1, x2...)
+
+    Raises:
+        ValueError: kèm dòng/cột của lỗi đầu tiên (ký tự lạ, ngoặc không khớp,
+            số chiều không đồng nhất, số không hợp lệ)
+    """
+    heads, data = _parse_points(points_str)
+    labels = []
+    for i, head in enumerate(heads):
+        # head đã được kiểm tra: phân cách + [nhãn + khoảng trắng + (=|:)]
+        head = head.strip(_SEPARATOR_BYTES)
+        labels.append(head[:-1].rstrip().decode('utf-8') if head else f'x{i + 1}')
+    return labels, data
+
+
+def parse_points_from_string(points_str: str) -> np.ndarray:
+    """
+    Parse chuỗi điểm từ input text thành mảng (n, d).
+    Ví dụ: "x1={1,3}, x2={1.5,3.2}" -> array([[1, 3], [1.5, 3.2]])
+
+    Xem parse_labelled_points về cú pháp và lỗi; hàm này bỏ qua nhãn.
+    """
+    return _parse_points(points_str)[1]
 
 
 def parse_points_from_list(points_list: List[Dict]) -> List[List[float]]:
@@ -257,3 +1030,67 @@ def parse_points_from_list(points_list: List[Dict]) -> List[List[float]]:
                 points.append(point)
     return points
 
+
+
+def parse_sparse_points(sparse_data: Dict) -> sparse.csr_matrix:
+    """
+    Parse ma trận sparse từ JSON thành CSR (không tạo mảng dày n x d).
+
+    Dạng CSR: {"shape": [n, d], "indptr": [0, 2, 3], "indices": [0, 7, 3], "data": [1.0, 2.5, 0.4]}
+    Hoặc từng dòng: {"n_features": d, "rows": [{"0": 1.0, "7": 2.5}, {"3": 0.4}]}
+
+    Raises:
+        ValueError: chỉ số ngoài [0, d), indptr không hợp lệ, giá trị không hữu hạn
+    """
+    if not isinstance(sparse_data, dict):
+        raise ValueError('"sparse" phải là object {"shape", "indptr", "indices", "data"} hoặc {"n_features", "rows"}')
+    if 'rows' in sparse_data:
+        rows = sparse_data['rows']
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indices, values = [], []
+        for i, row in enumerate(rows):
+            if not isinstance(row, dict):
+                raise ValueError(f"Dòng thứ {i + 1} phải là object {{chỉ số: giá trị}}")
+            indices.extend(int(j) for j in row.keys())
+            values.extend(row.values())
+            indptr[i + 1] = len(indices)
+        if 'n_features' in sparse_data:
+            n_features = int(sparse_data['n_features'])
+        else:
+            n_features = max(indices) + 1 if indices else 1
+        shape = (len(rows), n_features)
+    else:
+        try:
+            shape = tuple(int(v) for v in sparse_data['shape'])
+            indptr, indices, values = sparse_data['indptr'], sparse_data['indices'], sparse_data['data']
+        except KeyError as e:
+            raise ValueError(f"Thiếu trường {e} của ma trận sparse")
+        if len(shape) != 2:
+            raise ValueError("shape phải có dạng [số dòng, số chiều]")
+
+    try:
+        matrix = sparse.csr_matrix((np.asarray(values, dtype=np.float64),
+                                    np.asarray(indices, dtype=np.int64),
+                                    np.asarray(indptr, dtype=np.int64)), shape=shape)
+        matrix.check_format(full_check=True)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Ma trận sparse không hợp lệ: {e}")
+    return _checked_sparse(matrix)
+
+
+def load_sparse_npz(raw: bytes) -> sparse.csr_matrix:
+    """Đọc ma trận sparse từ nội dung file .npz của scipy.sparse.save_npz (không dùng pickle)."""
+    try:
+        matrix = sparse.load_npz(io.BytesIO(raw))
+    except Exception as e:
+        raise ValueError(f"File .npz không phải ma trận scipy.sparse hợp lệ: {e}")
+    return _checked_sparse(matrix)
+
+
+def _checked_sparse(matrix) -> sparse.csr_matrix:
+    matrix = as_matrix(matrix)
+    if matrix.shape[0] == 0:
+        raise ValueError("Ma trận sparse không có dòng nào")
+    if not np.all(np.isfinite(matrix.data)):
+        raise ValueError("Ma trận sparse chứa giá trị không hữu hạn")
+    return matrix
@@ -0,0 +1,466 @@
+# service/metrics.py
+# Registry metrics trong tiến trình (Counter / Gauge / Histogram) + xuất định dạng Prometheus
+
+import atexit
+import bisect
+import glob
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import weakref
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+
+# ====================================================================
+# A. BỘ ĐẾM PHÂN MẢNH THEO THREAD
+# ====================================================================
+
+class _ShardHolder:
+    """Giữ shard trong threading.local; bị thu hồi khi thread kết thúc."""
+
+    __slots__ = ('values', '__weakref__')
+
+    def __init__(self, values: List[float]):
+        self.values = values
+
+
+class _ShardedValues:
+    """
+    Mảng giá trị cộng dồn, mỗi thread ghi vào mảng riêng của nó.
+
+    Đường ghi (inc/observe) không lấy lock: chỉ tra threading.local rồi cộng
+    vào list của thread. Lock chỉ dùng khi một thread ghi lần đầu (đăng ký
+    shard), khi thread kết thúc (gộp shard vào _base rồi bỏ shard, để số
+    shard không tăng theo số thread đã từng chạy, ví dụ runserver tạo một
+    thread mỗi request) và khi đọc tổng.
+    """
+
+    __slots__ = ('size', '_local', '_shards', '_base', '_lock')
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._shards: Dict[int, List[float]] = {}
+        self._base = [0.0] * size
+        self._lock = threading.Lock()
+
+    def local(self) -> List[float]:
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            values = [0.0] * self.size
+            holder = _ShardHolder(values)
+            with self._lock:
+                self._shards[id(values)] = values
+            # threading.local xóa holder khi thread kết thúc -> gộp shard
+            weakref.finalize(holder, self._retire, values)
+            self._local.holder = holder
+        return holder.values
+
+    def _retire(self, values: List[float]):
+        with self._lock:
+            if self._shards.pop(id(values), None) is not None:
+                for i, v in enumerate(values):
+                    self._base[i] += v
+
+    def total(self) -> List[float]:
+        with self._lock:
+            shards = list(self._shards.values())
+            result = list(self._base)
+        for shard in shards:
+            for i, v in enumerate(shard):
+                result[i] += v
+        return result
+
+
+# ====================================================================
+# B. CÁC LOẠI METRIC
+# ====================================================================
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+
+    def labels(self, *values, **kwargs):
+        """Lấy metric con theo giá trị nhãn, ví dụ: PREDICTIONS.labels(model='GINI_CART', label='Yes')."""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Dict[Tuple[str, ...], List[float]]:
+        """{giá trị nhãn: mảng giá trị tổng hợp} của mọi metric con."""
+        if not self.labelnames:
+            return {(): self._default.values()}
+        with self._lock:
+            children = list(self._children.items())
+        return {key: child.values() for key, child in children}
+
+    def describe(self) -> Dict[str, Any]:
+        return {'type': self.type_name, 'help': self.documentation, 'labelnames': list(self.labelnames)}
+
+
+class _CounterChild:
+    __slots__ = ('_values',)
+
+    def __init__(self):
+        self._values = _ShardedValues(1)
+
+    def inc(self, amount: float = 1.0):
+        self._values.local()[0] += amount
+
+    def values(self) -> List[float]:
+        return self._values.total()
+
+
+class Counter(_Metric):
+    """Bộ đếm chỉ tăng."""
+    type_name = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ('_value',)
+
+    def __init__(self):
+        self._value = 0.0
+
+    def set(self, value: float):
+        # Gán một float là thao tác nguyên tử dưới GIL, không cần lock
+        self._value = float(value)
+
+    def values(self) -> List[float]:
+        return [self._value]
+
+
+class Gauge(_Metric):
+    """Giá trị tức thời (khi gộp nhiều tiến trình: lấy giá trị lớn nhất)."""
+    type_name = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+
+class _HistogramChild:
+    __slots__ = ('_buckets', '_values')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        # [đếm từng bucket..., tổng giá trị, số lần quan sát]
+        self._values = _ShardedValues(len(buckets) + 2)
+
+    def observe(self, value: float):
+        values = self._values.local()
+        values[bisect.bisect_left(self._buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    def values(self) -> List[float]:
+        return self._values.total()
+
+
+class Histogram(_Metric):
+    """Phân phối giá trị theo bucket cố định (bucket cuối là +Inf)."""
+    type_name = 'histogram'
+
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf)) + (math.inf,)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def describe(self) -> Dict[str, Any]:
+        info = super().describe()
+        info['buckets'] = [b if b != math.inf else 'inf' for b in self.buckets]
+        return info
+
+
+# ====================================================================
+# C. REGISTRY (gộp nhiều tiến trình qua thư mục snapshot)
+# ====================================================================
+
+class MetricsRegistry:
+    """
+    Registry các metric của tiến trình.
+
+    Khi chạy nhiều tiến trình (gunicorn workers...), đặt multiprocess_dir:
+    mỗi tiến trình định kỳ ghi snapshot JSON của mình vào thư mục đó, và
+    /metrics gộp snapshot của mọi tiến trình (counter/histogram: cộng dồn,
+    gauge: lấy max) với giá trị hiện tại của tiến trình đang phục vụ.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.multiprocess_dir: Optional[str] = None
+        self.flush_interval = 5.0
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' đã được đăng ký")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=Histogram.DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    # ----------------------------------------------------------------
+    # Snapshot
+    # ----------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Trạng thái hiện tại dạng JSON được: {name: {type, help, ..., samples: [[labels, values]]}}."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            m.name: {**m.describe(), 'samples': [[list(k), v] for k, v in m.samples().items()]}
+            for m in metrics
+        }
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.multiprocess_dir, f'metrics-{pid}.json')
+
+    def flush(self):
+        """
+        Ghi snapshot của tiến trình này vào multiprocess_dir (ghi nguyên tử:
+        file tạm riêng cho mỗi lần ghi trong cùng thư mục rồi os.replace).
+        """
+        if not self.multiprocess_dir:
+            return
+        with self._flush_lock:
+            self._last_flush = time.monotonic()
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        os.makedirs(self.multiprocess_dir, exist_ok=True)
+        path = self._snapshot_path(os.getpid())
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                        dir=self.multiprocess_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def maybe_flush(self):
+        """
+        Gọi sau mỗi request: chỉ ghi file nếu đã quá flush_interval giây. Chỉ
+        một thread ghi tại một thời điểm; thread khác gặp lúc đang ghi thì bỏ qua.
+        """
+        if not self.multiprocess_dir or time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            # Kiểm tra lại: thread khác có thể vừa ghi xong
+            if time.monotonic() - self._last_flush < self.flush_interval:
+                return
+            self._last_flush = time.monotonic()
+            self._write_snapshot()
+        finally:
+            self._flush_lock.release()
+
+    def collect(self) -> Dict[str, Any]:
+        """Gộp snapshot của tiến trình này với snapshot của các tiến trình khác."""
+        merged = self.snapshot()
+        if not self.multiprocess_dir:
+            return merged
+        own = self._snapshot_path(os.getpid())
+        for path in glob.glob(os.path.join(self.multiprocess_dir, 'metrics-*.json')):
+            if path == own:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    other = json.load(f)
+            except (OSError, ValueError):
+                continue
+            _merge_snapshot(merged, other)
+        return merged
+
+    # ----------------------------------------------------------------
+    # Xuất định dạng text của Prometheus
+    # ----------------------------------------------------------------
+
+    def exposition(self) -> str:
+        lines = []
+        for name, metric in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {_escape_help(metric['help'])}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            labelnames = metric['labelnames']
+            for labelvalues, values in metric['samples']:
+                pairs = list(zip(labelnames, labelvalues))
+                if metric['type'] == 'histogram':
+                    cumulative = 0.0
+                    for bound, count in zip(metric['buckets'], values[:-2]):
+                        cumulative += count
+                        le = '+Inf' if bound == 'inf' else _format_value(bound)
+                        lines.append(f"{name}_bucket{_format_labels(pairs + [('le', le)])} {_format_value(cumulative)}")
+                    lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(values[-2])}")
+                    lines.append(f"{name}_count{_format_labels(pairs)} {_format_value(values[-1])}")
+                else:
+                    lines.append(f"{name}{_format_labels(pairs)} {_format_value(values[0])}")
+        return '\n'.join(lines) + '\n'
+
+
+def _merge_snapshot(target: Dict[str, Any], other: Dict[str, Any]):
+    for name, metric in other.items():
+        if name not in target:
+            target[name] = metric
+            continue
+        samples = {tuple(k): v for k, v in target[name]['samples']}
+        for key, values in metric['samples']:
+            key = tuple(key)
+            if key not in samples:
+                samples[key] = values
+            elif metric['type'] == 'gauge':
+                samples[key] = [max(a, b) for a, b in zip(samples[key], values)]
+            else:
+                samples[key] = [a + b for a, b in zip(samples[key], values)]
+        target[name]['samples'] = [[list(k), v] for k, v in samples.items()]
+
+
+def _escape_help(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return '{' + body + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# ====================================================================
+# D. REGISTRY VÀ CÁC METRIC CỦA ỨNG DỤNG
+# ====================================================================
+
+REGISTRY = MetricsRegistry()
+atexit.register(REGISTRY.flush)
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    'data_mining_request_duration_seconds',
+    'Thời gian xử lý request theo view (tên URL trong data_mining/urls.py).',
+    ['view', 'method', 'status'],
+)
+PREDICTIONS = REGISTRY.counter(
+    'data_mining_predictions_total',
+    'Số dự đoán theo model và nhãn dự đoán.',
+    ['model', 'label'],
+)
+KMEANS_FITS = REGISTRY.counter(
+    'data_mining_kmeans_fits_total',
+    'Số lần fit K-Means.',
+)
+KMEANS_FIT_POINTS = REGISTRY.histogram(
+    'data_mining_kmeans_fit_points',
+    'Số điểm của mỗi lần fit K-Means.',
+    buckets=(10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+KMEANS_FIT_ITERATIONS = REGISTRY.histogram(
+    'data_mining_kmeans_fit_iterations',
+    'Số vòng lặp tới khi hội tụ của mỗi lần fit K-Means.',
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+KMEANS_FIT_SECONDS = REGISTRY.histogram(
+    'data_mining_kmeans_fit_seconds',
+    'Thời gian fit K-Means.',
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'data_mining_cache_requests_total',
+    'Số lần tra cache theo cache và kết quả (hit/miss).',
+    ['cache', 'result'],
+)
+MODEL_LOAD_SECONDS = REGISTRY.histogram(
+    'data_mining_model_load_seconds',
+    'Thời gian tải model từ đĩa.',
+    ['model'],
+)
+BATCH_SIZE = REGISTRY.histogram(
+    'data_mining_prediction_batch_size',
+    'Số bản ghi trong mỗi lô dự đoán của micro-batcher.',
+    ['model'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+BATCH_QUEUE_SECONDS = REGISTRY.histogram(
+    'data_mining_prediction_batch_queue_seconds',
+    'Thời gian một bản ghi chờ trong hàng đợi micro-batcher trước khi lô chạy.',
+    ['model'],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+ADMISSION_DECISIONS = REGISTRY.counter(
+    'data_mining_admission_decisions_total',
+    'Quyết định của admission control theo nhóm (admitted/queued/rejected).',
+    ['pool', 'decision'],
+)
+ADMISSION_QUEUE_SECONDS = REGISTRY.histogram(
+    'data_mining_admission_queue_seconds',
+    'Thời gian request chờ slot của admission control.',
+    ['pool'],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+def configure_from_settings():
+    """Đọc METRICS trong settings (multiprocess_dir, flush_interval)."""
+    from django.conf import settings
+    config = getattr(settings, 'METRICS', {})
+    REGISTRY.multiprocess_dir = config.get('multiprocess_dir') or os.environ.get('DATA_MINING_METRICS_DIR')
+    REGISTRY.flush_interval = float(config.get('flush_interval', REGISTRY.flush_interval))
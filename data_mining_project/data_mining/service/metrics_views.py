@@ -0,0 +1,16 @@
+# service/metrics_views.py
+# API View xuất metrics theo định dạng text của Prometheus
+
+from django.http import HttpResponse, JsonResponse
+
+from .metrics import REGISTRY
+
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics_view(request):
+    """GET /metrics - toàn bộ metrics của mọi tiến trình (định dạng Prometheus)."""
+    if request.method != 'GET':
+        return JsonResponse({"error": "Chỉ chấp nhận GET"}, status=405)
+    return HttpResponse(REGISTRY.exposition(), content_type=PROMETHEUS_CONTENT_TYPE)
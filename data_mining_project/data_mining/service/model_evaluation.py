@@ -0,0 +1,266 @@
+# service/model_evaluation.py
+# Đánh giá chéo k-fold và tìm kiếm siêu tham số cho 3 models phân lớp
+
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .naive_bayes import CategoricalNaiveBayes
+from .training import TRAINING_CONFIGS
+
+
+# ====================================================================
+# A. LƯỚI SIÊU THAM SỐ
+# ====================================================================
+
+PARAM_GRIDS: Dict[str, Dict[str, List[Any]]] = {
+    'GINI_CART': {
+        'max_depth': [None, 2, 3, 4, 6, 8],
+        'min_samples_leaf': [1, 2, 4, 8],
+    },
+    'ID3_Entropy': {
+        'max_depth': [None, 2, 3, 4, 6, 8],
+        'min_samples_leaf': [1, 2, 4, 8],
+    },
+    'NAIVE_BAYES': {
+        'alpha': [0.01, 0.1, 0.5, 1.0, 2.0, 5.0],
+    },
+}
+
+
+# Số cấu hình mỗi model được chạy đủ fold ở lượt đầu, làm ngưỡng dừng sớm
+DEFAULT_PILOT_CONFIGS = 4
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """{'a': [1, 2], 'b': [3]} -> [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+# ====================================================================
+# B. TRẠNG THÁI TRONG TIẾN TRÌNH CON
+# ====================================================================
+
+# Mỗi worker đọc dataset một lần và cache phần tiền xử lý theo (model, fold),
+# các cấu hình siêu tham số sau đó dùng lại ma trận đã mã hóa.
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def _init_worker(specs: Dict[str, Dict[str, Any]],
+                 datasets: Dict[str, Tuple[pd.DataFrame, np.ndarray, List[str]]],
+                 folds: Dict[str, List[Tuple[np.ndarray, np.ndarray]]]):
+    _WORKER_STATE['specs'] = specs
+    _WORKER_STATE['datasets'] = datasets
+    _WORKER_STATE['folds'] = folds
+    _WORKER_STATE['cache'] = {}
+
+
+def _preprocessed_fold(model_name: str, fold: int):
+    """Tiền xử lý cho một fold (fit trên tập train), tính một lần rồi cache."""
+    key = (model_name, fold)
+    cache = _WORKER_STATE['cache']
+    if key in cache:
+        return cache[key]
+
+    X, y, features = _WORKER_STATE['datasets'][model_name]
+    train_idx, test_idx = _WORKER_STATE['folds'][model_name][fold]
+    X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+
+    if _WORKER_STATE['specs'][model_name]['kind'] == 'naive_bayes':
+        # Naive Bayes bảng đếm: đếm một lần với alpha tạm, các alpha khác chỉ dựng lại bảng log
+        model = CategoricalNaiveBayes(features).fit(X_train.values.tolist(), y[train_idx].tolist())
+        encoded = model.encode(X_test.values.tolist())
+        cache[key] = (model, encoded, y[test_idx])
+    else:
+        from sklearn.preprocessing import OneHotEncoder
+        encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
+        cache[key] = (encoder.fit_transform(X_train), y[train_idx],
+                      encoder.transform(X_test), y[test_idx])
+    return cache[key]
+
+
+def _score_fold(model_name: str, fold: int, params: Dict[str, Any]) -> Dict[str, float]:
+    spec = _WORKER_STATE['specs'][model_name]
+    # Tiền xử lý fold (cache miss) và import sklearn không tính vào thời gian
+    # của cấu hình: bắt đầu đo sau khi đã có dữ liệu của fold
+    if spec['kind'] == 'naive_bayes':
+        counted, encoded, y_test = _preprocessed_fold(model_name, fold)
+        start = time.perf_counter()
+        # Dùng chung bảng đếm, chỉ thay hệ số làm trơn
+        model = CategoricalNaiveBayes.from_arrays({**counted.to_arrays(), 'alpha': np.array(params['alpha'])})
+        jll = model.joint_log_likelihood(encoded)
+        y_pred = np.asarray(model.classes_)[jll.argmax(axis=1)]
+    else:
+        from sklearn.tree import DecisionTreeClassifier
+        X_train, y_train, X_test, y_test = _preprocessed_fold(model_name, fold)
+        start = time.perf_counter()
+        model = DecisionTreeClassifier(criterion=spec.get('criterion', 'gini'),
+                                       random_state=spec.get('random_state'), **params)
+        model.fit(X_train, y_train)
+        y_pred = model.predict(X_test)
+    elapsed = time.perf_counter() - start
+
+    from sklearn.metrics import f1_score
+    return {
+        'accuracy': float(np.mean(y_pred == y_test)),
+        'f1_macro': float(f1_score(y_test, y_pred, average='macro', zero_division=0)),
+        'seconds': elapsed,
+    }
+
+
+def _evaluate_config(model_name: str, params: Dict[str, Any],
+                     threshold: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Chạy lần lượt các fold cho một cấu hình.
+
+    Early stopping (threshold không None): sau mỗi fold, nếu kể cả khi các fold
+    còn lại đạt độ chính xác tối đa (1.0) mà trung bình vẫn thấp hơn threshold
+    thì dừng cấu hình này. threshold cố định cho cả lượt chạy nên kết quả không
+    phụ thuộc thứ tự hoàn thành của các tiến trình.
+    """
+    n_folds = len(_WORKER_STATE['folds'][model_name])
+
+    start = time.perf_counter()
+    folds: List[Dict[str, float]] = []
+    pruned = False
+    for fold in range(n_folds):
+        folds.append(_score_fold(model_name, fold, params))
+        remaining = n_folds - len(folds)
+        upper_bound = (sum(f['accuracy'] for f in folds) + remaining) / n_folds
+        if threshold is not None and remaining and upper_bound < threshold:
+            pruned = True
+            break
+
+    accuracies = np.array([f['accuracy'] for f in folds])
+    result = {
+        'model': model_name,
+        'params': params,
+        'folds_evaluated': len(folds),
+        'pruned': pruned,
+        'mean_accuracy': float(accuracies.mean()),
+        'std_accuracy': float(accuracies.std()),
+        'mean_f1_macro': float(np.mean([f['f1_macro'] for f in folds])),
+        'fit_seconds': float(sum(f['seconds'] for f in folds)),
+        'wall_seconds': time.perf_counter() - start,
+    }
+    return result
+
+
+# ====================================================================
+# C. CHẠY ĐÁNH GIÁ
+# ====================================================================
+
+def _load_dataset(spec: Dict[str, Any], base_dir: str):
+    df = pd.read_csv(os.path.join(base_dir, spec['csv']), **spec.get('read_csv', {}))
+    X = df[spec['features']].astype(str).reset_index(drop=True)
+    y = df[spec['target']].astype(str).to_numpy()
+    return X, y, list(spec['features'])
+
+
+def _make_folds(y: np.ndarray, n_splits: int, random_state: int):
+    """StratifiedKFold nếu mỗi lớp đủ n_splits mẫu, ngược lại KFold."""
+    from sklearn.model_selection import KFold, StratifiedKFold
+
+    _, counts = np.unique(y, return_counts=True)
+    n_splits = max(2, min(n_splits, len(y)))
+    if counts.min() >= n_splits:
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    else:
+        splitter = KFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    return [(train, test) for train, test in splitter.split(np.zeros(len(y)), y)]
+
+
+def _pilot_indices(n_configs: int, n_pilot: int) -> List[int]:
+    """n_pilot chỉ số trải đều trên lưới (theo thứ tự expand_grid), luôn gồm cấu hình đầu."""
+    if n_pilot <= 0:
+        return []
+    return sorted(set(np.linspace(0, n_configs - 1, min(n_pilot, n_configs)).round().astype(int).tolist()))
+
+
+def _run_tasks(pool: ProcessPoolExecutor, tasks: List[Tuple[str, Dict[str, Any]]],
+               thresholds: Dict[str, Optional[float]]) -> List[Dict[str, Any]]:
+    futures = [pool.submit(_evaluate_config, name, params, thresholds.get(name)) for name, params in tasks]
+    return [future.result() for future in as_completed(futures)]
+
+
+def run_evaluation(model_names: List[str], base_dir: str, n_splits: int = 5,
+                   grids: Optional[Dict[str, Dict[str, List[Any]]]] = None,
+                   configs: Optional[Dict[str, Dict[str, Any]]] = None,
+                   n_jobs: Optional[int] = None, early_stopping: bool = True,
+                   tolerance: float = 0.0, random_state: int = 42,
+                   pilot_configs: int = DEFAULT_PILOT_CONFIGS) -> Dict[str, Any]:
+    """
+    Đánh giá chéo k-fold cho từng (model, cấu hình siêu tham số) trên một process pool.
+
+    Early stopping chạy hai lượt để kết quả xác định (không phụ thuộc tiến trình
+    nào xong trước): lượt đầu chạy đủ fold cho pilot_configs cấu hình trải đều
+    trên lưới của mỗi model; mean_accuracy tốt nhất của chúng trừ tolerance là
+    ngưỡng cố định để dừng sớm các cấu hình còn lại ở lượt hai.
+
+    Returns:
+        Báo cáo dạng dict: thông tin dataset, ngưỡng dừng sớm, kết quả từng cấu
+        hình (sắp theo mean_accuracy giảm dần) và cấu hình tốt nhất của mỗi model.
+    """
+    grids = grids or PARAM_GRIDS
+    configs = configs or TRAINING_CONFIGS
+
+    specs = {name: configs[name] for name in model_names}
+    datasets, folds = {}, {}
+    for name in model_names:
+        datasets[name] = _load_dataset(configs[name], base_dir)
+        folds[name] = _make_folds(datasets[name][1], n_splits, random_state)
+
+    pilot_tasks, tasks = [], []
+    for name in model_names:
+        configs_of_model = expand_grid(grids[name])
+        pilot = set(_pilot_indices(len(configs_of_model), pilot_configs if early_stopping else 0))
+        for i, params in enumerate(configs_of_model):
+            (pilot_tasks if i in pilot else tasks).append((name, params))
+
+    start = time.perf_counter()
+    thresholds: Dict[str, Optional[float]] = {}
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                             initargs=(specs, datasets, folds)) as pool:
+        results = _run_tasks(pool, pilot_tasks, thresholds)
+        for name in model_names:
+            scores = [r['mean_accuracy'] for r in results if r['model'] == name]
+            thresholds[name] = max(scores) - tolerance if scores else None
+        results += _run_tasks(pool, tasks, thresholds)
+
+    results.sort(key=lambda r: (r['model'], r['pruned'], -r['mean_accuracy'], r['fit_seconds']))
+    best = {}
+    for r in results:
+        if not r['pruned'] and r['model'] not in best:
+            best[r['model']] = r
+
+    return {
+        'n_splits': n_splits,
+        'early_stopping': early_stopping,
+        'pruning_thresholds': thresholds,
+        'datasets': {
+            name: {'csv': configs[name]['csv'], 'rows': int(len(datasets[name][1])),
+                   'folds': len(folds[name])}
+            for name in model_names
+        },
+        'total_seconds': time.perf_counter() - start,
+        'results': results,
+        'best': best,
+    }
+
+
+def write_report(report: Dict[str, Any], path: str):
+    """Ghi báo cáo: .json giữ toàn bộ, .csv là bảng phẳng để so sánh giữa các lần chạy."""
+    if path.endswith('.csv'):
+        rows = [{**{k: v for k, v in r.items() if k != 'params'},
+                 'params': json.dumps(r['params'], sort_keys=True)} for r in report['results']]
+        pd.DataFrame(rows).to_csv(path, index=False)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
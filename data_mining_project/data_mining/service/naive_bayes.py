@@ -0,0 +1,237 @@
+# service/naive_bayes.py
+# Naive Bayes phân loại cho dữ liệu categorical dựa trên bảng đếm (count table)
+
+import numpy as np
+from typing import List, Dict, Any, Optional, Sequence
+
+
+class CategoricalNaiveBayes:
+    """
+    Naive Bayes cho thuộc tính phân loại, lưu trữ bằng các mảng đếm.
+
+    - class_count_: số mẫu của mỗi lớp, shape (n_classes,)
+    - feature_count_: với mỗi feature f, mảng (n_classes, n_categories_f)
+      đếm số lần giá trị xuất hiện trong từng lớp
+    - Làm trơn Laplace với hệ số alpha
+
+    Sau khi huấn luyện, bảng log-xác suất được tính sẵn thành một mảng phẳng
+    (n_classes, tổng số category + n_features). Dự đoán theo lô chỉ còn là
+    phép gather theo chỉ số rồi cộng dồn (vectorized).
+    """
+
+    def __init__(self, features: Sequence[str], alpha: float = 1.0):
+        """
+        Args:
+            features: Danh sách tên thuộc tính (theo thứ tự)
+            alpha: Hệ số làm trơn Laplace (alpha > 0)
+        """
+        if alpha <= 0:
+            raise ValueError("alpha phải > 0")
+        self.features = list(features)
+        self.alpha = float(alpha)
+        self.classes_: List[str] = []
+        self.categories_: List[List[str]] = [[] for _ in self.features]
+        self.class_count_ = np.zeros(0, dtype=np.float64)
+        self.feature_count_ = [np.zeros((0, 0), dtype=np.float64) for _ in self.features]
+
+        self._class_index: Dict[str, int] = {}
+        self._category_index: List[Dict[str, int]] = [{} for _ in self.features]
+        self._log_table: Optional[np.ndarray] = None
+        self._class_log_prior: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    # ----------------------------------------------------------------
+    # Huấn luyện
+    # ----------------------------------------------------------------
+
+    def fit(self, records: Sequence[Any], labels: Sequence[Any]) -> 'CategoricalNaiveBayes':
+        """Huấn luyện lại từ đầu (xóa toàn bộ bảng đếm cũ)."""
+        self.__init__(self.features, self.alpha)
+        return self.partial_fit(records, labels)
+
+    def partial_fit(self, records: Sequence[Any], labels: Sequence[Any]) -> 'CategoricalNaiveBayes':
+        """
+        Cộng dồn các mẫu có nhãn mới vào bảng đếm, không cần huấn luyện lại.
+
+        Args:
+            records: Danh sách dict {feature: value} hoặc list giá trị theo thứ tự features
+            labels: Nhãn tương ứng của từng mẫu
+        """
+        if len(records) != len(labels):
+            raise ValueError(f"Số mẫu ({len(records)}) và số nhãn ({len(labels)}) không khớp")
+        if len(records) == 0:
+            return self
+
+        columns = self._columns(records)
+
+        # Mở rộng từ điển lớp và category khi gặp giá trị mới
+        y = np.fromiter((self._grow_class(str(label)) for label in labels),
+                        dtype=np.intp, count=len(labels))
+        n_classes = len(self.classes_)
+        self.class_count_ = _pad(self.class_count_, (n_classes,))
+        self.class_count_ += np.bincount(y, minlength=n_classes)
+
+        for f, column in enumerate(columns):
+            x = np.fromiter((self._grow_category(f, str(v)) for v in column),
+                            dtype=np.intp, count=len(column))
+            n_categories = len(self.categories_[f])
+            counts = _pad(self.feature_count_[f], (n_classes, n_categories))
+            # Đếm cặp (lớp, category) bằng một lần bincount trên chỉ số phẳng
+            counts += np.bincount(y * n_categories + x,
+                                  minlength=n_classes * n_categories).reshape(n_classes, n_categories)
+            self.feature_count_[f] = counts
+
+        self._log_table = None
+        return self
+
+    def _grow_class(self, label: str) -> int:
+        index = self._class_index.get(label)
+        if index is None:
+            index = self._class_index[label] = len(self.classes_)
+            self.classes_.append(label)
+        return index
+
+    def _grow_category(self, f: int, value: str) -> int:
+        index = self._category_index[f].get(value)
+        if index is None:
+            index = self._category_index[f][value] = len(self.categories_[f])
+            self.categories_[f].append(value)
+        return index
+
+    # ----------------------------------------------------------------
+    # Bảng log-xác suất
+    # ----------------------------------------------------------------
+
+    def _build_log_table(self):
+        """
+        Tính sẵn log P(x_f = v | c) cho mọi (lớp, feature, category).
+
+        Mỗi feature có thêm một cột "unknown" mang giá trị 0, để category chưa
+        từng thấy bị bỏ qua (giống OneHotEncoder(handle_unknown='ignore')).
+        """
+        if not self.classes_:
+            raise ValueError("Model chưa được huấn luyện. Gọi fit() trước.")
+
+        n_classes = len(self.classes_)
+        sizes = np.array([len(c) + 1 for c in self.categories_], dtype=np.intp)
+        self._offsets = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.intp)
+
+        table = np.zeros((n_classes, int(sizes.sum())), dtype=np.float64)
+        for f, counts in enumerate(self.feature_count_):
+            n_categories = counts.shape[1]
+            denom = self.class_count_[:, None] + self.alpha * n_categories
+            start = self._offsets[f]
+            table[:, start:start + n_categories] = np.log(counts + self.alpha) - np.log(denom)
+
+        self._class_log_prior = np.log(self.class_count_) - np.log(self.class_count_.sum())
+        # Lưu dạng (tổng số cột, n_classes) để gather theo hàng liền kề trong bộ nhớ
+        self._log_table = np.ascontiguousarray(table.T)
+
+    def _ensure_table(self):
+        if self._log_table is None:
+            self._build_log_table()
+
+    # ----------------------------------------------------------------
+    # Dự đoán
+    # ----------------------------------------------------------------
+
+    def encode(self, records: Sequence[Any]) -> np.ndarray:
+        """
+        Chuyển danh sách mẫu thành ma trận chỉ số cột (n_samples, n_features)
+        trỏ vào bảng log-xác suất phẳng.
+        """
+        self._ensure_table()
+        columns = self._columns(records)
+        encoded = np.empty((len(records), len(self.features)), dtype=np.intp)
+        for f, column in enumerate(columns):
+            index = self._category_index[f]
+            unknown = len(self.categories_[f])
+            encoded[:, f] = np.fromiter((index.get(str(v), unknown) for v in column),
+                                        dtype=np.intp, count=len(column))
+        encoded += self._offsets
+        return encoded
+
+    def joint_log_likelihood(self, encoded: np.ndarray) -> np.ndarray:
+        """log P(c) + sum_f log P(x_f | c) cho ma trận đã encode, shape (n_samples, n_classes)."""
+        self._ensure_table()
+        return self._class_log_prior + self._log_table[encoded].sum(axis=1)
+
+    def predict_proba(self, records: Sequence[Any]) -> np.ndarray:
+        """Xác suất hậu nghiệm của từng lớp, shape (n_samples, n_classes)."""
+        jll = self.joint_log_likelihood(self.encode(records))
+        jll -= jll.max(axis=1, keepdims=True)
+        proba = np.exp(jll)
+        proba /= proba.sum(axis=1, keepdims=True)
+        return proba
+
+    def predict(self, records: Sequence[Any]) -> List[str]:
+        """Dự đoán nhãn cho một lô mẫu."""
+        jll = self.joint_log_likelihood(self.encode(records))
+        return [self.classes_[i] for i in jll.argmax(axis=1)]
+
+    def _columns(self, records: Sequence[Any]) -> List[List[Any]]:
+        """Tách danh sách mẫu (dict hoặc list) thành các cột theo thứ tự features."""
+        if len(records) and isinstance(records[0], dict):
+            return [[r.get(name, '') for r in records] for name in self.features]
+        n_features = len(self.features)
+        for r in records:
+            if len(r) != n_features:
+                raise ValueError(f"Mỗi mẫu phải có đúng {n_features} giá trị")
+        return [list(col) for col in zip(*records)] if len(records) else [[] for _ in self.features]
+
+    # ----------------------------------------------------------------
+    # Lưu / tải (định dạng .npz, không dùng pickle)
+    # ----------------------------------------------------------------
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Xuất toàn bộ trạng thái thành các mảng numpy (không cần pickle)."""
+        sizes = np.array([len(c) for c in self.categories_], dtype=np.int64)
+        flat_counts = [c.ravel() for c in self.feature_count_]
+        return {
+            'features': np.array(self.features, dtype=str),
+            'alpha': np.array(self.alpha),
+            'classes': np.array(self.classes_, dtype=str),
+            'category_sizes': sizes,
+            'categories': np.array([v for c in self.categories_ for v in c], dtype=str),
+            'class_count': self.class_count_,
+            'feature_count': np.concatenate(flat_counts) if flat_counts else np.zeros(0),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> 'CategoricalNaiveBayes':
+        """Khôi phục model từ các mảng do to_arrays() tạo ra."""
+        model = cls([str(f) for f in arrays['features']], float(arrays['alpha']))
+        model.classes_ = [str(c) for c in arrays['classes']]
+        model._class_index = {c: i for i, c in enumerate(model.classes_)}
+        model.class_count_ = np.asarray(arrays['class_count'], dtype=np.float64)
+
+        n_classes = len(model.classes_)
+        categories = [str(v) for v in arrays['categories']]
+        feature_count = np.asarray(arrays['feature_count'], dtype=np.float64)
+        pos = cat_pos = 0
+        for f, size in enumerate(int(s) for s in arrays['category_sizes']):
+            model.categories_[f] = categories[cat_pos:cat_pos + size]
+            model._category_index[f] = {v: i for i, v in enumerate(model.categories_[f])}
+            model.feature_count_[f] = feature_count[pos:pos + n_classes * size].reshape(n_classes, size)
+            cat_pos += size
+            pos += n_classes * size
+        return model
+
+    def save(self, path: str):
+        """Lưu model ra file .npz."""
+        np.savez(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path: str) -> 'CategoricalNaiveBayes':
+        """Tải model từ file .npz."""
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls.from_arrays(dict(arrays))
+
+
+def _pad(array: np.ndarray, shape) -> np.ndarray:
+    """Mở rộng mảng đếm (điền 0) khi xuất hiện lớp/category mới."""
+    if array.shape == tuple(shape):
+        return array
+    padded = np.zeros(shape, dtype=array.dtype)
+    padded[tuple(slice(0, s) for s in array.shape)] = array
+    return padded
@@ -0,0 +1,190 @@
+# service/run_store.py
+# Lưu kết quả gom cụm vào database (ClusteringRun + ClusterMember) và đọc lại theo trang
+
+import itertools
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from ..models import ClusteringRun, ClusterMember
+from .kmeans_algorithm import WarmStart
+
+
+RUN_STORE = {
+    # Số điểm tối đa của một lần gom cụm được lưu
+    'max_points': 1000000,
+    # Số dòng ClusterMember mỗi lần executemany
+    'batch_size': 5000,
+    'page_size': 100,
+    'max_page_size': 1000,
+    **getattr(settings, 'CLUSTERING_RUNS', {}),
+}
+
+POINT_DTYPE = np.dtype('<f8')
+
+
+def save_run(algorithm: str, data: np.ndarray, labels: np.ndarray, n_clusters: int,
+             centroids: Optional[np.ndarray] = None, params: Optional[Dict[str, Any]] = None,
+             dataset_id: str = '', sse: Optional[float] = None,
+             second_distances: Optional[np.ndarray] = None) -> ClusteringRun:
+    """
+    Lưu một lần gom cụm: một dòng ClusteringRun và mỗi điểm một dòng
+    ClusterMember (insert theo lô trong một transaction).
+
+    Args:
+        data: Mảng (n, d) dữ liệu đã gom cụm
+        labels: Nhãn (n,) trong 0..n_clusters-1, -1 là nhiễu
+        centroids: (n_clusters, d); None -> trung bình mỗi cụm (DBSCAN)
+        second_distances: (n,) khoảng cách tới centroid gần thứ hai (K-Means),
+            để fit lại từ run này chỉ gán lại các điểm có thể đổi cụm
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if data.ndim == 1:
+        data = data.reshape(-1, 1)
+    labels = np.asarray(labels, dtype=np.int64)
+    n = len(data)
+    if n > RUN_STORE['max_points']:
+        raise ValueError(f"Chỉ lưu được tối đa {RUN_STORE['max_points']} điểm (có {n})")
+
+    clustered = labels >= 0
+    sizes = np.bincount(labels[clustered], minlength=n_clusters)
+    if centroids is None:
+        centroids = cluster_means(data, labels, n_clusters)
+    centroids = np.asarray(centroids, dtype=np.float64).reshape(n_clusters, data.shape[1])
+
+    distances = np.full(n, np.nan)
+    diff = data[clustered] - centroids[labels[clustered]]
+    distances[clustered] = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+    run = ClusteringRun(
+        algorithm=algorithm,
+        params=params or {},
+        dataset_id=dataset_id or '',
+        n_points=n,
+        n_dims=data.shape[1],
+        n_clusters=n_clusters,
+        cluster_sizes=sizes.tolist(),
+        n_noise=int(n - clustered.sum()),
+        centroids=centroids.tolist(),
+        sse=None if sse is None else float(sse),
+    )
+    points = np.ascontiguousarray(data, dtype=POINT_DTYPE)
+    distances = [None if d != d else d for d in distances.tolist()]
+    if second_distances is None:
+        seconds = itertools.repeat(None, n)
+    else:
+        seconds = [None if d != d or d == np.inf else d
+                   for d in np.asarray(second_distances, dtype=np.float64).tolist()]
+    with transaction.atomic():
+        run.save()
+        _insert_members(run.id, labels.tolist(), distances, list(seconds), _point_bytes(points))
+    return run
+
+
+def _insert_members(run_id: str, labels: List[int], distances: List[Optional[float]],
+                    second_distances: List[Optional[float]], points: List[bytes]):
+    """
+    INSERT các dòng ClusterMember theo lô bằng executemany: tạo hàng triệu
+    instance model qua bulk_create chậm hơn nhiều lần so với chính lệnh INSERT.
+    """
+    meta = ClusterMember._meta
+    columns = [meta.get_field(name).column for name in ('run', 'index', 'cluster', 'distance', 'second_distance', 'point')]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(meta.db_table), ', '.join(quote(c) for c in columns), ', '.join(['%s'] * len(columns)))
+    batch_size = int(RUN_STORE['batch_size'])
+    with connection.cursor() as cursor:
+        for start in range(0, len(labels), batch_size):
+            stop = min(start + batch_size, len(labels))
+            cursor.executemany(sql, list(zip(
+                itertools.repeat(run_id, stop - start), range(start, stop),
+                labels[start:stop], distances[start:stop], second_distances[start:stop], points[start:stop],
+            )))
+
+
+def cluster_means(data: np.ndarray, labels: np.ndarray, n_clusters: int) -> np.ndarray:
+    """Trung bình các điểm của mỗi cụm (bỏ qua nhiễu)."""
+    clustered = labels >= 0
+    sizes = np.bincount(labels[clustered], minlength=n_clusters).astype(np.float64)
+    means = np.empty((n_clusters, data.shape[1]))
+    for j in range(data.shape[1]):
+        means[:, j] = np.bincount(labels[clustered], weights=data[clustered, j], minlength=n_clusters)
+    return means / np.maximum(sizes, 1)[:, None]
+
+
+def load_warm_start(run: ClusteringRun) -> Tuple[np.ndarray, WarmStart]:
+    """
+    Dữ liệu (n, d) theo thứ tự index và trạng thái WarmStart của một run
+    K-Means đã lưu: tổng / số điểm mỗi cụm tính lại từ các điểm, cận trên là
+    khoảng cách đã lưu, cận dưới là second_distance (0 nếu không có -> điểm đó
+    sẽ được gán lại).
+    """
+    meta = ClusterMember._meta
+    columns = [meta.get_field(name).column for name in ('cluster', 'distance', 'second_distance', 'point')]
+    quote = connection.ops.quote_name
+    sql = 'SELECT {} FROM {} WHERE {} = %s ORDER BY {}'.format(
+        ', '.join(quote(c) for c in columns), quote(meta.db_table),
+        quote(meta.get_field('run').column), quote(meta.get_field('index').column))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [run.id])
+        rows = cursor.fetchall()
+    if not rows:
+        raise ValueError(f"Run {run.id} không có điểm nào")
+    labels, distances, seconds, points = zip(*rows)
+    data = np.frombuffer(b''.join(bytes(p) for p in points), dtype=POINT_DTYPE).reshape(len(rows), run.n_dims)
+    labels = np.array(labels, dtype=np.intp)
+    upper = np.array(distances, dtype=np.float64)
+    lower = np.array(seconds, dtype=np.float64)
+    # NULL -> nan: không có cận -> buộc tính lại
+    upper[np.isnan(upper)] = np.inf
+    lower[np.isnan(lower)] = 0.0 if run.n_clusters > 1 else np.inf
+    centroids = np.asarray(run.centroids, dtype=np.float64).reshape(run.n_clusters, run.n_dims)
+    return data, WarmStart.from_labels(centroids, data, labels, upper, lower)
+
+
+def _point_bytes(points: np.ndarray) -> List[bytes]:
+    row = points.shape[1] * POINT_DTYPE.itemsize
+    raw = points.tobytes()
+    return [raw[i:i + row] for i in range(0, len(raw), row)]
+
+
+def decode_point(value) -> List[float]:
+    return np.frombuffer(bytes(value), dtype=POINT_DTYPE).tolist()
+
+
+# ====================================================================
+# ĐỌC LẠI
+# ====================================================================
+
+def run_summary(run: ClusteringRun) -> Dict[str, Any]:
+    return {
+        'run_id': run.id,
+        'algorithm': run.algorithm,
+        'params': run.params,
+        'dataset_id': run.dataset_id or None,
+        'n_points': run.n_points,
+        'n_dims': run.n_dims,
+        'n_clusters': run.n_clusters,
+        'n_noise': run.n_noise,
+        'sse': run.sse,
+        'created_at': run.created_at.isoformat(),
+    }
+
+
+def member_payload(member: ClusterMember) -> Dict[str, Any]:
+    return {
+        'index': member.index,
+        'cluster': member.cluster,
+        'distance': member.distance,
+        'point': decode_point(member.point),
+    }
+
+
+def page_size(value: Optional[str]) -> int:
+    """Kích thước trang từ query string (mặc định / tối đa theo RUN_STORE)."""
+    size = int(value) if value else int(RUN_STORE['page_size'])
+    if size < 1:
+        raise ValueError("limit phải >= 1")
+    return min(size, int(RUN_STORE['max_page_size']))
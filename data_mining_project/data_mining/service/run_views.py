@@ -0,0 +1,165 @@
+# service/run_views.py
+# API Views truy vấn kết quả gom cụm đã lưu ("persist": true), theo trang
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from ..models import ClusteringRun, ClusterMember
+from .run_store import run_summary, member_payload, page_size
+
+
+def _get_run(run_id: str):
+    try:
+        return ClusteringRun.objects.get(pk=run_id)
+    except ClusteringRun.DoesNotExist:
+        return None
+
+
+def _not_found(run_id: str):
+    return JsonResponse({"error": f"Không tìm thấy lần gom cụm {run_id}"}, status=404)
+
+
+def _int_param(request, name: str, default=None):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return default
+    return int(value)
+
+
+@csrf_exempt
+def cluster_run_list_view(request):
+    """GET /data_mining/cluster/runs/?limit=&offset= - các lần gom cụm đã lưu, mới nhất trước."""
+    if request.method != 'GET':
+        return JsonResponse({"error": "Chỉ chấp nhận GET"}, status=405)
+    try:
+        limit = page_size(request.GET.get('limit'))
+        offset = max(_int_param(request, 'offset', 0), 0)
+    except ValueError as e:
+        return JsonResponse({"error": f"Lỗi giá trị: {str(e)}"}, status=400)
+
+    runs = ClusteringRun.objects.defer('centroids', 'cluster_sizes')[offset:offset + limit + 1]
+    runs = list(runs)
+    return JsonResponse({
+        "status": "success",
+        "runs": [run_summary(run) for run in runs[:limit]],
+        "next_offset": offset + limit if len(runs) > limit else None,
+    })
+
+
+@csrf_exempt
+def cluster_run_detail_view(request, run_id):
+    """GET/DELETE /data_mining/cluster/runs/<run_id>/ - tham số và centroids, hoặc xóa."""
+    run = _get_run(run_id)
+    if run is None:
+        return _not_found(run_id)
+    if request.method == 'GET':
+        return JsonResponse({"status": "success", "run": {**run_summary(run), "centroids": run.centroids}})
+    if request.method == 'DELETE':
+        run.delete()
+        return JsonResponse({"status": "success", "deleted": run_id})
+    return JsonResponse({"error": "Chỉ chấp nhận GET hoặc DELETE"}, status=405)
+
+
+@csrf_exempt
+def cluster_run_counts_view(request, run_id):
+    """GET /data_mining/cluster/runs/<run_id>/counts/?limit=&offset= - số điểm mỗi cụm."""
+    if request.method != 'GET':
+        return JsonResponse({"error": "Chỉ chấp nhận GET"}, status=405)
+    run = _get_run(run_id)
+    if run is None:
+        return _not_found(run_id)
+    try:
+        limit = page_size(request.GET.get('limit'))
+        offset = max(_int_param(request, 'offset', 0), 0)
+    except ValueError as e:
+        return JsonResponse({"error": f"Lỗi giá trị: {str(e)}"}, status=400)
+
+    sizes = run.cluster_sizes[offset:offset + limit]
+    return JsonResponse({
+        "status": "success",
+        "run_id": run.id,
+        "n_clusters": run.n_clusters,
+        "n_noise": run.n_noise,
+        "counts": [{"cluster": offset + i, "size": size} for i, size in enumerate(sizes)],
+        "next_offset": offset + limit if offset + limit < run.n_clusters else None,
+    })
+
+
+@csrf_exempt
+def cluster_run_members_view(request, run_id):
+    """
+    GET /data_mining/cluster/runs/<run_id>/members/?cluster=3&after=&limit=
+
+    Các điểm của một cụm (-1: nhiễu) theo thứ tự index. Phân trang theo con
+    trỏ: gửi lại "next_after" làm ?after= để lấy trang tiếp theo; mỗi trang
+    là một lần quét chỉ mục (run, cluster, index), không phụ thuộc vị trí trang.
+    """
+    if request.method != 'GET':
+        return JsonResponse({"error": "Chỉ chấp nhận GET"}, status=405)
+    if not ClusteringRun.objects.filter(pk=run_id).exists():
+        return _not_found(run_id)
+    try:
+        cluster = _int_param(request, 'cluster')
+        if cluster is None:
+            raise ValueError("Thiếu tham số cluster")
+        after = _int_param(request, 'after', -1)
+        limit = page_size(request.GET.get('limit'))
+    except ValueError as e:
+        return JsonResponse({"error": f"Lỗi giá trị: {str(e)}"}, status=400)
+
+    members = list(ClusterMember.objects.filter(run_id=run_id, cluster=cluster, index__gt=after)
+                   .order_by('index')[:limit + 1])
+    page = members[:limit]
+    return JsonResponse({
+        "status": "success",
+        "run_id": run_id,
+        "cluster": cluster,
+        "members": [member_payload(m) for m in page],
+        "next_after": page[-1].index if len(members) > limit else None,
+    })
+
+
+@csrf_exempt
+def cluster_run_nearest_view(request, run_id):
+    """
+    GET /data_mining/cluster/runs/<run_id>/nearest/?cluster=3&limit=&offset=
+
+    Các điểm gần centroid của cụm nhất (tăng dần theo khoảng cách), đọc
+    theo chỉ mục (run, cluster, distance).
+    """
+    if request.method != 'GET':
+        return JsonResponse({"error": "Chỉ chấp nhận GET"}, status=405)
+    if not ClusteringRun.objects.filter(pk=run_id).exists():
+        return _not_found(run_id)
+    try:
+        cluster = _int_param(request, 'cluster')
+        if cluster is None or cluster < 0:
+            raise ValueError("cluster phải >= 0")
+        limit = page_size(request.GET.get('limit'))
+        offset = max(_int_param(request, 'offset', 0), 0)
+    except ValueError as e:
+        return JsonResponse({"error": f"Lỗi giá trị: {str(e)}"}, status=400)
+
+    members = list(ClusterMember.objects.filter(run_id=run_id, cluster=cluster)
+                   .order_by('distance', 'index')[offset:offset + limit + 1])
+    return JsonResponse({
+        "status": "success",
+        "run_id": run_id,
+        "cluster": cluster,
+        "members": [member_payload(m) for m in members[:limit]],
+        "next_offset": offset + limit if len(members) > limit else None,
+    })
+
+
+@csrf_exempt
+def cluster_run_point_view(request, run_id, index):
+    """GET /data_mining/cluster/runs/<run_id>/points/<index>/ - cụm của điểm thứ index."""
+    if request.method != 'GET':
+        return JsonResponse({"error": "Chỉ chấp nhận GET"}, status=405)
+    try:
+        member = ClusterMember.objects.get(run_id=run_id, index=index)
+    except ClusterMember.DoesNotExist:
+        if not ClusteringRun.objects.filter(pk=run_id).exists():
+            return _not_found(run_id)
+        return JsonResponse({"error": f"Không có điểm {index} trong lần gom cụm {run_id}"}, status=404)
+    return JsonResponse({"status": "success", "run_id": run_id, **member_payload(member)})
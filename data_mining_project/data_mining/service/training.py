@@ -0,0 +1,335 @@
+# service/training.py
+# Pipeline huấn luyện tái lập được (thay cho các notebook trong train_model/)
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Any, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .kmeans_algorithm import KMeansClustering
+from .naive_bayes import CategoricalNaiveBayes
+
+
+# ====================================================================
+# A. CẤU HÌNH DATASET CHO TỪNG MODEL
+# ====================================================================
+
+# Đường dẫn 'csv' tính tương đối từ BASE_DIR của project.
+# Tên file đầu ra khớp với MODEL_CONFIGS trong classification_decisionTrees_views.
+TRAINING_CONFIGS: Dict[str, Dict[str, Any]] = {
+    'GINI_CART': {
+        'kind': 'decision_tree',
+        'criterion': 'gini',
+        'csv': 'train_model/DecisiionTree_Bayes/data/DecisionTree_Gini_data/DecisionTree_Gini_data.csv',
+        'read_csv': {'index_col': 0},
+        'features': ['Outlook', 'Temperature', 'Humidity', 'Wind'],
+        'target': 'Play ball',
+        'test_size': 0.3,
+        'random_state': 42,
+        'outputs': {
+            'pipeline': 'decision_tree_gini_pipeline.joblib',
+            'encoder': 'gini_target_encoder.joblib',
+        },
+    },
+    'ID3_Entropy': {
+        'kind': 'decision_tree',
+        'criterion': 'entropy',
+        'csv': 'train_model/DecisiionTree_Bayes/data/DecisionTree_ID3_data/DecisionTree_ID3_data.csv',
+        'read_csv': {},
+        'features': ['Outlook', 'Temp', 'Humidity', 'Wind'],
+        'target': 'Play',
+        'test_size': 0.3,
+        'random_state': 42,
+        'outputs': {
+            'pipeline': 'decision_tree_id3_pipeline.joblib',
+            'encoder': 'id3_target_encoder.joblib',
+        },
+    },
+    'NAIVE_BAYES': {
+        'kind': 'naive_bayes',
+        'csv': 'train_model/DecisiionTree_Bayes/data/NaiveBayes/NaiveBayes_data.csv',
+        'read_csv': {},
+        'features': ['Outlook', 'Temperature', 'Humidity', 'Wind'],
+        'target': 'Play ball',
+        'test_size': 0.3,
+        'random_state': 42,
+        'alpha': 1.0,
+        'outputs': {
+            'pipeline': 'naive_bayes_pipeline.joblib',
+            'encoder': 'nb_target_encoder.joblib',
+            'counts': 'nb_counts.npz',
+        },
+    },
+    'KMEANS_BAI1': {
+        'kind': 'kmeans',
+        'csv': 'train_model/KMeans/data/Bai1_k2_data.csv',
+        'read_csv': {'index_col': 0},
+        'features': ['x', 'y'],
+        'k': 2,
+        'max_iters': 100,
+        'random_state': 42,
+        'outputs': {
+            'centroids': 'kmeans_bai1.npz',
+        },
+    },
+    'KMEANS_BAI2': {
+        'kind': 'kmeans',
+        'csv': 'train_model/KMeans/data/Bai2_k3_data.csv',
+        'read_csv': {'index_col': 0},
+        'features': ['x', 'y'],
+        'k': 3,
+        'max_iters': 100,
+        'random_state': 42,
+        'outputs': {
+            'centroids': 'kmeans_bai2.npz',
+        },
+    },
+}
+
+
+# ====================================================================
+# B. HASH DỮ LIỆU VÀ METADATA
+# ====================================================================
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Tính SHA-256 của file theo từng khối (không đọc cả file vào bộ nhớ)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def config_sha256(spec: Dict[str, Any]) -> str:
+    """Hash cấu hình huấn luyện, để đổi tham số cũng kích hoạt huấn luyện lại."""
+    payload = json.dumps(spec, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+def rows_sha256(df: pd.DataFrame) -> str:
+    """Hash nội dung các dòng (dùng để nhận biết dữ liệu chỉ được nối thêm ở cuối)."""
+    return hashlib.sha256(df.to_csv(index=False).encode('utf-8')).hexdigest()
+
+
+def meta_path(output_dir: str, model_name: str) -> str:
+    return os.path.join(output_dir, f'{model_name}.meta.json')
+
+
+def read_meta(output_dir: str, model_name: str) -> Optional[Dict[str, Any]]:
+    """Đọc metadata của lần huấn luyện trước (None nếu chưa có hoặc file hỏng)."""
+    try:
+        with open(meta_path(output_dir, model_name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def atomic_write(path: str, writer):
+    """
+    Ghi file nguyên tử: ghi ra file tạm trong cùng thư mục rồi os.replace().
+    Tiến trình đang phục vụ sẽ không bao giờ đọc phải file ghi dở.
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            writer(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    atomic_write(path, lambda f: f.write(json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')))
+
+
+# ====================================================================
+# C. CÁC HÀM HUẤN LUYỆN
+# ====================================================================
+
+def _build_one_hot_pipeline(features: List[str], classifier):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False), features)
+        ],
+        remainder='passthrough'
+    )
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('classifier', classifier)
+    ])
+
+
+def _split(X: pd.DataFrame, y: np.ndarray, spec: Dict[str, Any]):
+    """Chia train/test giống notebook (test_size=0 thì huấn luyện trên toàn bộ dữ liệu)."""
+    test_size = spec.get('test_size', 0)
+    if not test_size:
+        return X, X.iloc[:0], y, y[:0]
+    from sklearn.model_selection import train_test_split
+    return train_test_split(X, y, test_size=test_size, random_state=spec.get('random_state'))
+
+
+def _fit_classifier_pipeline(df: pd.DataFrame, spec: Dict[str, Any], classifier):
+    """Huấn luyện pipeline OneHot + classifier, trả về (pipeline, encoder, metrics)."""
+    from sklearn.preprocessing import LabelEncoder
+
+    features = spec['features']
+    X = df[features].astype(str)
+    encoder = LabelEncoder()
+    y = encoder.fit_transform(df[spec['target']].astype(str))
+
+    X_train, X_test, y_train, y_test = _split(X, y, spec)
+    pipeline = _build_one_hot_pipeline(features, classifier)
+    pipeline.fit(X_train, y_train)
+
+    metrics = {'train_rows': int(len(X_train)), 'test_rows': int(len(X_test))}
+    if len(X_test):
+        metrics['test_accuracy'] = float(np.mean(pipeline.predict(X_test) == y_test))
+    return pipeline, encoder, metrics
+
+
+def _categories(df: pd.DataFrame, features: List[str]) -> Dict[str, List[str]]:
+    return {col: sorted(df[col].astype(str).unique().tolist()) for col in features}
+
+
+def train_decision_tree(df: pd.DataFrame, spec: Dict[str, Any], output_dir: str, previous) -> Dict[str, Any]:
+    from sklearn.tree import DecisionTreeClassifier
+
+    classifier = DecisionTreeClassifier(criterion=spec['criterion'], random_state=spec.get('random_state'))
+    pipeline, encoder, metrics = _fit_classifier_pipeline(df, spec, classifier)
+
+    outputs = spec['outputs']
+    atomic_write(os.path.join(output_dir, outputs['pipeline']), lambda f: joblib.dump(pipeline, f))
+    atomic_write(os.path.join(output_dir, outputs['encoder']), lambda f: joblib.dump(encoder, f))
+
+    metrics['classes'] = encoder.classes_.tolist()
+    metrics['tree_depth'] = int(pipeline.named_steps['classifier'].get_depth())
+    return metrics
+
+
+def train_naive_bayes(df: pd.DataFrame, spec: Dict[str, Any], output_dir: str, previous) -> Dict[str, Any]:
+    """
+    Huấn luyện pipeline GaussianNB (giống notebook) và bảng đếm CategoricalNaiveBayes.
+
+    Bảng đếm được huấn luyện trên toàn bộ dữ liệu. Nếu dữ liệu mới chỉ nối thêm
+    dòng vào cuối file cũ, chỉ các dòng mới được cộng dồn bằng partial_fit.
+    """
+    from sklearn.naive_bayes import GaussianNB
+
+    pipeline, encoder, metrics = _fit_classifier_pipeline(df, spec, GaussianNB())
+
+    outputs = spec['outputs']
+    atomic_write(os.path.join(output_dir, outputs['pipeline']), lambda f: joblib.dump(pipeline, f))
+    atomic_write(os.path.join(output_dir, outputs['encoder']), lambda f: joblib.dump(encoder, f))
+
+    features, target = spec['features'], spec['target']
+    counts_path = os.path.join(output_dir, outputs['counts'])
+    data = df[features + [target]].astype(str)
+
+    model, start = None, 0
+    prev_rows = (previous or {}).get('rows', 0)
+    if (previous and previous.get('config_sha256') == config_sha256(spec)
+            and 0 < prev_rows <= len(data) and os.path.exists(counts_path)
+            and previous.get('rows_sha256') == rows_sha256(data.iloc[:prev_rows])):
+        model, start = CategoricalNaiveBayes.load(counts_path), prev_rows
+    if model is None:
+        model = CategoricalNaiveBayes(features, alpha=spec.get('alpha', 1.0))
+
+    new_rows = data.iloc[start:]
+    model.partial_fit(new_rows[features].values.tolist(), new_rows[target].tolist())
+    atomic_write(counts_path, lambda f: np.savez(f, **model.to_arrays()))
+
+    metrics['classes'] = encoder.classes_.tolist()
+    metrics['counts_incremental_rows'] = int(len(new_rows)) if start else 0
+    metrics['rows_sha256'] = rows_sha256(data)
+    return metrics
+
+
+def train_kmeans(df: pd.DataFrame, spec: Dict[str, Any], output_dir: str, previous) -> Dict[str, Any]:
+    data = df[spec['features']].to_numpy(dtype=np.float64)
+    if spec.get('random_state') is not None:
+        np.random.seed(spec['random_state'])
+
+    kmeans = KMeansClustering(k=spec['k'], max_iters=spec.get('max_iters', 100))
+    result = kmeans.fit(data)
+
+    def _write(f):
+        np.savez(f, centroids=np.asarray(result['centroids']),
+                 labels=np.asarray(result['labels'], dtype=np.int64))
+
+    atomic_write(os.path.join(output_dir, spec['outputs']['centroids']), _write)
+    return {'k': spec['k'], 'iterations': result['iterations'], 'sse': result['sse']}
+
+
+TRAINERS = {
+    'decision_tree': train_decision_tree,
+    'naive_bayes': train_naive_bayes,
+    'kmeans': train_kmeans,
+}
+
+
+# ====================================================================
+# D. HUẤN LUYỆN MỘT MODEL (chạy được trong tiến trình con)
+# ====================================================================
+
+def train_one(model_name: str, spec: Dict[str, Any], base_dir: str, output_dir: str,
+              force: bool = False) -> Dict[str, Any]:
+    """
+    Huấn luyện một model nếu dữ liệu hoặc cấu hình đã thay đổi.
+
+    Hàm chỉ nhận tham số đơn giản (có thể pickle) để chạy trong ProcessPoolExecutor.
+
+    Returns:
+        {'model': ..., 'status': 'trained' | 'skipped', 'meta': {...}}
+    """
+    csv_path = os.path.join(base_dir, spec['csv'])
+    dataset_hash = file_sha256(csv_path)
+    spec_hash = config_sha256(spec)
+
+    previous = read_meta(output_dir, model_name)
+    outputs_exist = all(os.path.exists(os.path.join(output_dir, name)) for name in spec['outputs'].values())
+    if (not force and previous and outputs_exist
+            and previous.get('dataset_sha256') == dataset_hash
+            and previous.get('config_sha256') == spec_hash):
+        return {'model': model_name, 'status': 'skipped', 'meta': previous}
+
+    start = time.perf_counter()
+    df = pd.read_csv(csv_path, **spec.get('read_csv', {}))
+    missing = [col for col in spec['features'] + ([spec['target']] if 'target' in spec else [])
+               if col not in df.columns]
+    if missing:
+        raise ValueError(f"{model_name}: thiếu cột {missing} trong {spec['csv']}")
+
+    metrics = TRAINERS[spec['kind']](df, spec, output_dir, previous)
+
+    meta = {
+        'model': model_name,
+        'kind': spec['kind'],
+        'dataset': spec['csv'],
+        'dataset_sha256': dataset_hash,
+        'config_sha256': spec_hash,
+        'rows': int(len(df)),
+        'features': spec['features'],
+        'categories': _categories(df, spec['features']) if spec['kind'] != 'kmeans' else None,
+        'outputs': spec['outputs'],
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'training_seconds': round(time.perf_counter() - start, 4),
+    }
+    meta.update(metrics)
+    # Metadata ghi sau cùng: nếu tiến trình chết giữa chừng, lần chạy sau sẽ huấn luyện lại
+    _write_json(meta_path(output_dir, model_name), meta)
+    return {'model': model_name, 'status': 'trained', 'meta': meta}
@@ -1,3 +1,1357 @@
-from django.test import TestCase
+import io
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial.distance import cdist
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from .service import admission
+from .service.admission import AdmissionController, AdmissionRejected, DEFAULT_ADMISSION, dbscan_cost
+from .service.compact_models import CompactModel, compact_paths, load_compact, read_manifest, sources_match
+from .service.dbscan_algorithm import DBSCANClustering, NOISE, estimate_neighbours
+from .service.distributed_kmeans import DistributedKMeans, WorkerError, WorkerGroup, serve_forever
+from .service.kmeans_algorithm import (
+    KMeansClustering, METRICS, WarmStart, parse_labelled_points, parse_points_from_string, parse_sparse_points
+)
+from .service.naive_bayes import CategoricalNaiveBayes
+from .service.run_store import RUN_STORE, decode_point, load_warm_start, save_run
+from .models import ClusteringRun, ClusterMember
+
+
+NAIVE_BAYES_CSV = os.path.join(settings.BASE_DIR, 'train_model', 'DecisiionTree_Bayes', 'data', 'NaiveBayes',
+                               'NaiveBayes_data.csv')
+NAIVE_BAYES_FEATURES = ['Outlook', 'Temperature', 'Humidity', 'Wind']
+
+
+def post_json(client, path, body):
+    return client.post(path, json.dumps(body), content_type='application/json')
+
+
+# ====================================================================
+# NAIVE BAYES BẢNG ĐẾM
+# ====================================================================
+
+class CategoricalNaiveBayesTests(TestCase):
+    """/predict/naivebayes/ dùng CategoricalNaiveBayes: phải khớp sklearn CategoricalNB(alpha=1)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from sklearn.naive_bayes import CategoricalNB
+        from sklearn.preprocessing import OrdinalEncoder
+
+        df = pd.read_csv(NAIVE_BAYES_CSV)
+        cls.X = df[NAIVE_BAYES_FEATURES].astype(str)
+        cls.y = df.iloc[:, -1].astype(str).to_numpy()
+        cls.encoder = OrdinalEncoder()
+        cls.reference = CategoricalNB(alpha=1.0).fit(cls.encoder.fit_transform(cls.X), cls.y)
+        cls.combinations = [dict(zip(NAIVE_BAYES_FEATURES, values))
+                            for values in itertools.product(*cls.encoder.categories_)]
+
+    def _reference_predict(self, records):
+        frame = pd.DataFrame(records, columns=NAIVE_BAYES_FEATURES)
+        return self.reference.predict(self.encoder.transform(frame)).tolist()
+
+    def test_probabilities_match_sklearn(self):
+        model = CategoricalNaiveBayes(NAIVE_BAYES_FEATURES, alpha=1.0).fit(self.X.values.tolist(), self.y.tolist())
+        frame = pd.DataFrame(self.combinations, columns=NAIVE_BAYES_FEATURES)
+        expected = self.reference.predict_proba(self.encoder.transform(frame))
+        order = [list(model.classes_).index(c) for c in self.reference.classes_]
+        np.testing.assert_allclose(model.predict_proba(self.combinations)[:, order], expected, rtol=1e-10)
+
+    def test_served_predictions_match_sklearn(self):
+        expected = self._reference_predict(self.combinations)
+        for record, label in zip(self.combinations, expected):
+            response = post_json(self.client, '/data_mining/predict/naivebayes/', record)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(response.json()['prediction'], label, record)
+
+
+# ====================================================================
+# CACHE DỮ LIỆU VÍ DỤ
+# ====================================================================
+
+class ExampleDatasetCacheTests(TestCase):
+    """load-example: response dựng sẵn kèm ETag, 304 khi khớp, parse lại khi file đổi."""
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get('/data_mining/cluster/load-example/', {'file': 'bai2'})
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        body = response.json()
+        df = pd.read_csv(os.path.join(settings.BASE_DIR, 'train_model', 'KMeans', 'data', 'Bai2_k3_data.csv'),
+                         index_col=0)
+        self.assertEqual((body['k'], body['num_points']), (3, len(df)))
+        self.assertEqual(body['points'][0], {'id': str(df.index[0]), 'x': float(df['x'].iloc[0]),
+                                             'y': float(df['y'].iloc[0])})
+
+        response = self.client.get('/data_mining/cluster/load-example/', {'file': 'bai2'},
+                                   HTTP_IF_NONE_MATCH=f'"other", {etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get('/data_mining/cluster/load-example/', {'file': 'bai2'},
+                                   HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_reparses_when_mtime_changes(self):
+        import tempfile
+        from .service.dataset_cache import DatasetCache, points_payload
+
+        cache = DatasetCache('test')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'points.csv')
+            with open(path, 'w') as f:
+                f.write('id,x,y\nA,1,2\nB,3,4\n')
+            first = cache.get(path, points_payload)
+            self.assertIs(cache.get(path, points_payload), first)
+            self.assertEqual(json.loads(first.body), [{'id': 'A', 'x': 1.0, 'y': 2.0}, {'id': 'B', 'x': 3.0, 'y': 4.0}])
+
+            # Cùng kích thước, chỉ đổi nội dung và mtime
+            with open(path, 'w') as f:
+                f.write('id,x,y\nA,5,2\nB,3,4\n')
+            os.utime(path, ns=(first.mtime_ns + 10 ** 9, first.mtime_ns + 10 ** 9))
+            second = cache.get(path, points_payload)
+            self.assertIsNot(second, first)
+            self.assertNotEqual(second.etag, first.etag)
+            np.testing.assert_array_equal(second.array, [[5, 2], [3, 4]])
+
+            cache.invalidate(path)
+            self.assertIsNot(cache.get(path, points_payload), second)
+
+
+# ====================================================================
+# KHO DATASET (UPLOAD / .NPY)
+# ====================================================================
+
+class DatasetRegistryTests(TestCase):
+    """CSV -> .npy theo khối: kiểu cột xác định trên toàn file, không chỉ khối đầu."""
+
+    def setUp(self):
+        import tempfile
+        from .service.dataset_registry import DatasetRegistry
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.registry = DatasetRegistry(directory.name)
+
+    def convert(self, text: str, **kwargs):
+        from .service.dataset_registry import SOURCE_FILE
+
+        dataset_id = self.registry.new_dataset()
+        with open(self.registry.path(dataset_id, SOURCE_FILE), 'w') as f:
+            f.write(text)
+        return self.registry.convert(dataset_id, **kwargs)
+
+    def test_column_type_is_inferred_across_chunks(self):
+        from .service import dataset_registry
+
+        zones = ['0', '1', '2', '3', '4', 'Z0', 'Z1', '2', 'Z2', '0']
+        text = 'ID,x,zone\n' + ''.join(f'P{i},{i * 0.5},{zone}\n' for i, zone in enumerate(zones))
+        with mock.patch.object(dataset_registry, 'CONVERT_CHUNK_ROWS', 3):
+            schema = self.convert(text, id_column='ID')
+        self.assertEqual(schema['rows'], len(zones))
+        self.assertEqual(schema['numeric_columns'], ['x'])
+        self.assertEqual(schema['categorical_columns'], ['zone'])
+        self.assertEqual(self.registry.read_columns(schema['id'], ['zone'])['zone'].tolist(), zones)
+        np.testing.assert_array_equal(self.registry.open_values(schema['id'])[:, 0], np.arange(10) * 0.5)
+
+
+class DatasetUploadTests(TestCase):
+    """Upload CSV (thô / multipart) -> .npy -> gom cụm bằng dataset_id."""
+
+    def setUp(self):
+        import tempfile
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        storage = override_settings(DATASET_STORAGE_DIR=directory.name)
+        storage.enable()
+        self.addCleanup(storage.disable)
+        self.points = np.round(_blobs(300, 2, 3, seed=30), 6)
+        self.csv = 'ID,x,y,group\n' + ''.join(
+            f'P{i},{x!r},{y!r},{"ab"[i % 2]}\n' for i, (x, y) in enumerate(self.points.tolist()))
+
+    def test_raw_upload_then_fit_by_dataset_id(self):
+        response = self.client.post('/data_mining/datasets/upload/?name=blobs&id_column=ID&k=3', self.csv,
+                                    content_type='text/csv')
+        self.assertEqual(response.status_code, 201, response.content)
+        dataset = response.json()['dataset']
+        self.assertEqual((dataset['name'], dataset['rows'], dataset['k']), ('blobs', 300, 3))
+        self.assertEqual(dataset['numeric_columns'], ['x', 'y'])
+        self.assertEqual(dataset['vocabularies'], {'group': 2})
+
+        init = self.points[:3].tolist()
+        by_id = post_json(self.client, '/data_mining/cluster/kmeans/',
+                          {'dataset_id': dataset['id'], 'k': 3, 'init_centroids': init})
+        by_points = post_json(self.client, '/data_mining/cluster/kmeans/',
+                              {'points': self.points.tolist(), 'k': 3, 'init_centroids': init})
+        self.assertEqual(by_id.status_code, 200, by_id.content)
+        self.assertEqual(by_points.status_code, 200, by_points.content)
+        self.assertEqual(by_id.json()['labels'], by_points.json()['labels'])
+        np.testing.assert_allclose(by_id.json()['centroids'], by_points.json()['centroids'])
+
+        listed = self.client.get('/data_mining/datasets/').json()['datasets']
+        self.assertEqual([d['id'] for d in listed], [dataset['id']])
+        self.assertEqual(self.client.delete(f'/data_mining/datasets/{dataset["id"]}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/data_mining/datasets/{dataset["id"]}/').status_code, 404)
+        response = post_json(self.client, '/data_mining/cluster/kmeans/', {'dataset_id': dataset['id'], 'k': 3})
+        self.assertEqual(response.status_code, 404)
+
+    def test_multipart_upload(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        upload = SimpleUploadedFile('blobs.csv', self.csv.encode(), content_type='text/csv')
+        response = self.client.post('/data_mining/datasets/upload/?id_column=ID', {'file': upload})
+        self.assertEqual(response.status_code, 201, response.content)
+        dataset = response.json()['dataset']
+        self.assertEqual((dataset['name'], dataset['rows']), ('blobs.csv', 300))
+        self.assertEqual(dataset['source']['size'], len(self.csv.encode()))
+        from .service.dataset_registry import get_registry
+        np.testing.assert_array_equal(get_registry().open_values(dataset['id']), self.points)
+
+    def test_upload_limit(self):
+        with override_settings(DATASET_UPLOAD_MAX_BYTES=100):
+            response = self.client.post('/data_mining/datasets/upload/', self.csv, content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/data_mining/datasets/').json()['datasets'], [])
+
+
+# ====================================================================
+# ĐO THỜI GIAN REQUEST
+# ====================================================================
+
+class RequestTimingTests(TestCase):
+    """Header Server-Timing luôn có; log JSON mỗi request chỉ khi bật 'log'."""
+
+    RECORD = {'Outlook': 'Sunny', 'Temperature': 'Hot', 'Humidity': 'High', 'Wind': 'Weak'}
+
+    def test_server_timing_header_without_log_by_default(self):
+        with self.assertNoLogs('data_mining.timing', level='DEBUG'):
+            response = post_json(self.client, '/data_mining/predict/naivebayes/', self.RECORD)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    def test_log_when_enabled(self):
+        with override_settings(REQUEST_TIMING={'log': True}):
+            client = self.client_class()
+            with self.assertLogs('data_mining.timing', level='INFO') as logs:
+                post_json(client, '/data_mining/predict/naivebayes/', self.RECORD)
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['path'], entry['status']), ('/data_mining/predict/naivebayes/', 200))
+
+
+# ====================================================================
+# METRICS (PROMETHEUS)
+# ====================================================================
+
+class MetricsTests(TestCase):
+    """Shard theo thread, định dạng text Prometheus và gộp snapshot nhiều tiến trình."""
+
+    def test_counter_total_survives_thread_exit(self):
+        import gc
+        from .service.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        counter = registry.counter('test_total', 'Bộ đếm thử.', ['kind'])
+        histogram = registry.histogram('test_seconds', 'Thời gian thử.', buckets=(0.5, 1.0))
+
+        def work():
+            for _ in range(100):
+                counter.labels('a').inc()
+                histogram.observe(0.75)
+
+        for _ in range(5):
+            threads = [threading.Thread(target=work) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        gc.collect()
+        self.assertEqual(counter.labels('a').values(), [2000.0])
+        self.assertEqual(histogram.samples()[()], [0.0, 2000.0, 0.0, 1500.0, 2000.0])
+        # Shard của các thread đã kết thúc được gộp vào tổng, không còn giữ lại
+        self.assertEqual(counter.labels('a')._values._shards, {})
+
+    def test_exposition_format(self):
+        from .service.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        registry.counter('jobs_total', 'Số job.\nDòng hai', ['queue']).labels(queue='a"b').inc(3)
+        registry.gauge('temperature', 'Nhiệt độ.').set(21.5)
+        latency = registry.histogram('latency_seconds', 'Độ trễ.', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            latency.observe(value)
+        self.assertEqual(registry.exposition(), '\n'.join([
+            '# HELP jobs_total Số job.\\nDòng hai',
+            '# TYPE jobs_total counter',
+            'jobs_total{queue="a\\"b"} 3',
+            '# HELP latency_seconds Độ trễ.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            'latency_seconds_sum 6.05',
+            'latency_seconds_count 4',
+            '# HELP temperature Nhiệt độ.',
+            '# TYPE temperature gauge',
+            'temperature 21.5',
+        ]) + '\n')
+
+    def test_collect_merges_other_process_snapshots(self):
+        import tempfile
+        from .service.metrics import MetricsRegistry
+
+        def make_registry(directory, jobs, temperature):
+            registry = MetricsRegistry()
+            registry.multiprocess_dir = directory
+            registry.counter('jobs_total', 'Số job.').inc(jobs)
+            registry.gauge('temperature', 'Nhiệt độ.').set(temperature)
+            return registry
+
+        with tempfile.TemporaryDirectory() as directory:
+            current = make_registry(directory, 2, 10.0)
+            other = make_registry(directory, 5, 30.0)
+            # Snapshot của "tiến trình khác" (PID khác), file hỏng bị bỏ qua
+            with open(os.path.join(directory, 'metrics-999999999.json'), 'w', encoding='utf-8') as f:
+                json.dump(other.snapshot(), f)
+            with open(os.path.join(directory, 'metrics-999999998.json'), 'w', encoding='utf-8') as f:
+                f.write('{')
+            current.flush()
+            self.assertTrue(os.path.exists(os.path.join(directory, f'metrics-{os.getpid()}.json')))
+            collected = current.collect()
+        self.assertEqual(collected['jobs_total']['samples'], [[[], [7.0]]])
+        self.assertEqual(collected['temperature']['samples'], [[[], [30.0]]])
+
+    def test_metrics_endpoint(self):
+        post_json(self.client, '/data_mining/predict/naivebayes/',
+                  {'Outlook': 'Sunny', 'Temperature': 'Hot', 'Humidity': 'High', 'Wind': 'Weak'})
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE data_mining_request_duration_seconds histogram', body)
+        self.assertIn('data_mining_request_duration_seconds_count{view="api_predict_bayes",method="POST",status="200"}',
+                      body)
+        self.assertEqual(self.client.post('/metrics').status_code, 405)
+
+
+# ====================================================================
+# MICRO-BATCHING DỰ ĐOÁN
+# ====================================================================
+
+class MicroBatchingTests(TestCase):
+    """Gom lô không đổi kết quả; lỗi một bản ghi không làm hỏng lô; quá hạn -> 503."""
+
+    def make_batcher(self, run_batch, **kwargs):
+        from .service.batching import MicroBatcher
+
+        batcher = MicroBatcher('test', run_batch, **kwargs)
+        self.addCleanup(batcher.close)
+        return batcher
+
+    def submit_concurrently(self, batcher, records):
+        results = [None] * len(records)
+
+        def submit(i):
+            try:
+                results[i] = batcher.submit(records[i])
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(records))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_batched_results_match_single_records(self):
+        sizes = []
+
+        def run_batch(records):
+            sizes.append(len(records))
+            return [r * r for r in records]
+
+        batcher = self.make_batcher(run_batch, max_batch=8, max_wait_ms=50)
+        self.assertEqual(self.submit_concurrently(batcher, list(range(20))), [r * r for r in range(20)])
+        self.assertEqual(sum(sizes), 20)
+        self.assertLessEqual(max(sizes), 8)
+        self.assertGreater(max(sizes), 1)
+
+    def test_failing_record_does_not_fail_the_batch(self):
+        def run_batch(records):
+            if 'bad' in records:
+                raise ValueError('bản ghi lỗi')
+            return [r.upper() for r in records]
+
+        batcher = self.make_batcher(run_batch, max_batch=16, max_wait_ms=50)
+        with self.assertLogs('data_mining.service.batching', level='WARNING'):
+            results = self.submit_concurrently(batcher, ['a', 'b', 'bad', 'c'])
+        self.assertEqual([results[0], results[1], results[3]], ['A', 'B', 'C'])
+        self.assertIsInstance(results[2], ValueError)
+
+    def test_timeout_raises_batch_timeout(self):
+        from .service.batching import BatchTimeout
+
+        release = threading.Event()
+        batcher = self.make_batcher(lambda records: release.wait() and records, max_wait_ms=0, timeout=0.05)
+        first = threading.Thread(target=self.submit_concurrently, args=(batcher, ['slow']))
+        first.start()
+        self.addCleanup(first.join)
+        self.addCleanup(release.set)
+        _wait_until(lambda: not batcher._pending)
+        with self.assertRaises(BatchTimeout) as ctx:
+            batcher.submit('queued')
+        self.assertEqual(ctx.exception.retry_after, 1)
+        # Bản ghi hết hạn khi còn trong hàng đợi được bỏ ra
+        self.assertEqual(batcher._pending, [])
+
+    def test_endpoint_with_batching(self):
+        from .service import batching, classification_decisionTrees_views as views
+
+        def close_batchers():
+            for batcher in batching._BATCHERS.values():
+                batcher.close()
+            batching._BATCHERS.clear()
+
+        records = [dict(zip(NAIVE_BAYES_FEATURES, values)) for values in itertools.product(
+            ['Sunny', 'Overcast', 'Rain'], ['Hot', 'Mild', 'Cool'], ['High', 'Normal'], ['Weak', 'Strong'])]
+        expected = [post_json(self.client, '/data_mining/predict/naivebayes/', r).json()['prediction']
+                    for r in records]
+
+        close_batchers()
+        self.addCleanup(close_batchers)
+        with mock.patch.object(views, '_BATCHING_ENABLED', True):
+            batched = [post_json(self.client, '/data_mining/predict/naivebayes/', r).json()['prediction']
+                       for r in records]
+            self.assertEqual(batched, expected)
+
+            with mock.patch.object(batching.MicroBatcher, 'submit',
+                                   side_effect=batching.BatchTimeout('quá tải', retry_after=3)):
+                response = post_json(self.client, '/data_mining/predict/naivebayes/', records[0])
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '3')
+
+
+# ====================================================================
+# PARSER CHUỖI ĐIỂM
+# ====================================================================
+
+class PointParserTests(TestCase):
+    """parse_points_from_string / parse_labelled_points: cú pháp hợp lệ và vị trí lỗi."""
+
+    def test_labels_and_default_labels(self):
+        labels, data = parse_labelled_points("x1={1,3}, x2={1.5,3.2}")
+        self.assertEqual(labels, ['x1', 'x2'])
+        np.testing.assert_array_equal(data, [[1, 3], [1.5, 3.2]])
+        labels, _ = parse_labelled_points("{1,3} {2,4}")
+        self.assertEqual(labels, ['x1', 'x2'])
+        labels, _ = parse_labelled_points("{1,3}  \n  y = {2,4}\ný: {0,0}")
+        self.assertEqual(labels, ['x1', 'y', 'ý'])
+
+    def test_brackets_separators_and_number_formats(self):
+        data = parse_points_from_string("A: (1, 2, 3)\nB: [4, 5, 6]")
+        np.testing.assert_array_equal(data, [[1, 2, 3], [4, 5, 6]])
+        data = parse_points_from_string("{1e3,-2.5E-1};{ +4 , 5 }\t{.5,6.}")
+        np.testing.assert_array_equal(data, [[1000, -0.25], [4, 5], [0.5, 6]])
+        self.assertEqual(parse_points_from_string("{7}").shape, (1, 1))
+
+    def test_empty_input(self):
+        for text in ("", "  ,;  \n"):
+            with self.assertRaisesMessage(ValueError, "Không tìm thấy điểm nào"):
+                parse_points_from_string(text)
+
+    def test_inconsistent_dimensions_reports_point(self):
+        with self.assertRaisesMessage(ValueError, "Điểm thứ 2 có 3 chiều, khác 2 chiều"):
+            parse_points_from_string("x1={1,3}, x2={1,2,3}")
+
+    def test_invalid_numbers_report_position(self):
+        cases = {
+            "{1,abc}": ("'abc'", "cột 4"),
+            "{1,nan}": ("'nan'", "cột 4"),
+            "{1,inf}": ("'inf'", "cột 4"),
+            "{1,}": ("''", "cột 4"),
+            "{0,0}\n{2, x}": ("'x'", "dòng 2, cột 5"),
+        }
+        for text, fragments in cases.items():
+            with self.assertRaises(ValueError, msg=text) as ctx:
+                parse_points_from_string(text)
+            for fragment in fragments:
+                self.assertIn(fragment, str(ctx.exception), text)
+
+    def test_syntax_errors(self):
+        cases = {
+            "{1,3": "Ký tự không hợp lệ",
+            "{(1,3)}": "Ký tự không hợp lệ",
+            "{1,3)": "Ngoặc không khớp",
+            "x1={1,3} junk {2,4}": "'j' tại dòng 1, cột 10",
+            "{1,3} x2": "'x' tại dòng 1, cột 7",
+        }
+        for text, fragment in cases.items():
+            with self.assertRaises(ValueError, msg=text) as ctx:
+                parse_points_from_string(text)
+            self.assertIn(fragment, str(ctx.exception), text)
+
+    def test_kmeans_endpoint_accepts_string_points(self):
+        response = post_json(self.client, '/data_mining/cluster/kmeans/',
+                             {"points": "x1={1,1}, x2={1.2,1}, x3={8,8}, x4={8,8.2}", "k": 2})
+        self.assertEqual(response.status_code, 200, response.content)
+        labels = response.json()['labels']
+        self.assertEqual(labels[0], labels[1])
+        self.assertNotEqual(labels[0], labels[2])
+        response = post_json(self.client, '/data_mining/cluster/kmeans/', {"points": "{1,2} {3}", "k": 1})
+        self.assertEqual(response.status_code, 400)
+
+
+# ====================================================================
+# BIỂU ĐỒ TỔNG HỢP CHO KẾT QUẢ LỚN
+# ====================================================================
+
+class ClusterVisualizationTests(TestCase):
+    """Hạn mức mẫu theo cụm, bao lồi (so với scipy) và payload tổng hợp."""
+
+    def test_sample_quotas_bounds(self):
+        from .service.cluster_visualization import sample_quotas
+
+        rng = np.random.default_rng(40)
+        for _ in range(200):
+            sizes = rng.integers(0, 5000, size=rng.integers(1, 30))
+            sizes[rng.random(len(sizes)) < 0.2] = 0
+            sample_size = int(rng.integers(0, 20000))
+            minimum = int(rng.integers(0, 50))
+            quotas = sample_quotas(sizes, sample_size, minimum)
+            self.assertTrue(np.all(quotas <= sizes))
+            self.assertTrue(np.all(quotas >= np.minimum(sizes, minimum)))
+            if sizes.sum() <= sample_size:
+                np.testing.assert_array_equal(quotas, sizes)
+            else:
+                self.assertLessEqual(quotas.sum(), max(sample_size, np.minimum(sizes, minimum).sum()))
+                if np.minimum(sizes, minimum).sum() <= sample_size:
+                    self.assertEqual(quotas.sum(), sample_size)
+
+    def test_sample_quotas_proportional(self):
+        from .service.cluster_visualization import sample_quotas
+
+        quotas = sample_quotas(np.array([10, 1000, 9000, 0]), 1000, minimum=20)
+        # Mỗi cụm tối thiểu 20 điểm (cụm 10 điểm lấy hết), 950 điểm còn lại chia theo
+        # phần vượt tối thiểu 980 : 8980, phần dư lớn nhất được làm tròn lên
+        self.assertEqual(quotas.tolist(), [10, 113, 877, 0])
+
+    def test_convex_hull_matches_scipy(self):
+        from scipy.spatial import ConvexHull
+        from .service.cluster_visualization import convex_hull
+
+        rng = np.random.default_rng(41)
+        cases = [rng.normal(size=(5000, 2)), rng.uniform(size=(50, 2)), np.round(rng.normal(size=(3000, 2)), 1),
+                 np.vstack([rng.uniform(size=(500, 2)), [[0, 0], [1, 0], [1, 1], [0, 1]]])]
+        for points in cases:
+            hull = convex_hull(points)
+            expected = points[ConvexHull(points).vertices]
+            self.assertEqual({tuple(p) for p in hull.tolist()}, {tuple(p) for p in expected.tolist()})
+            # Ngược chiều kim đồng hồ: diện tích có dấu dương
+            x, y = hull[:, 0], hull[:, 1]
+            self.assertGreater(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)), 0)
+
+    def test_convex_hull_degenerate(self):
+        from .service.cluster_visualization import convex_hull
+
+        self.assertEqual(convex_hull(np.array([[1.0, 1.0]] * 3)).tolist(), [[1.0, 1.0]])
+        line = np.column_stack([np.arange(100.0), 2 * np.arange(100.0)])
+        self.assertEqual(convex_hull(line).tolist(), [[0.0, 0.0], [99.0, 198.0]])
+
+    def test_aggregate_clusters(self):
+        from .service.cluster_visualization import aggregate_clusters
+
+        data = _blobs(20000, 3, 4, seed=42)
+        labels = np.random.default_rng(42).integers(0, 4, size=len(data))
+        result = aggregate_clusters(data, labels, 5, grid_size=16, sample_size=400, dims=(0, 2))
+        self.assertEqual(result['sample_size'], 400)
+        self.assertEqual(result['clusters'][4], {'cluster': 4, 'size': 0, 'bbox': None, 'hull': [], 'cells': [],
+                                                 'sample': [], 'sample_indices': []})
+        for c, entry in enumerate(result['clusters'][:4]):
+            members = data[labels == c][:, [0, 2]]
+            self.assertEqual(entry['size'], len(members))
+            self.assertEqual(sum(cell[2] for cell in entry['cells']), len(members))
+            np.testing.assert_array_equal(entry['bbox'], [members.min(axis=0), members.max(axis=0)])
+            indices = np.array(entry['sample_indices'])
+            self.assertTrue(np.all(labels[indices] == c))
+            np.testing.assert_array_equal(entry['sample'], data[indices][:, [0, 2]])
+
+
+# ====================================================================
+# K-MEANS CÓ TRỌNG SỐ VÀ NÉN DỮ LIỆU
+# ====================================================================
+
+class CompressionTests(TestCase):
+    """Gộp điểm trùng không mất mát; hằng số sse_offset của coreset lưới đúng với mọi centroids."""
+
+    def setUp(self):
+        # Tọa độ làm tròn -> nhiều dòng trùng nhau
+        self.data = np.round(_blobs(5000, 2, 4, seed=50))
+        self.init = self.data[np.random.default_rng(50).choice(len(self.data), 4, replace=False)]
+
+    def test_dedup_weighted_fit_equals_unweighted_fit(self):
+        from .service.coreset import deduplicate
+
+        coreset = deduplicate(self.data)
+        self.assertLess(len(coreset.points), len(self.data) // 5)
+        self.assertEqual(coreset.weights.sum(), len(self.data))
+
+        expected = KMeansClustering(k=4, max_iters=100)
+        expected_result = expected.fit(self.data, record_history=False, include_points=False, init=self.init)
+        weighted = KMeansClustering(k=4, max_iters=100)
+        result = weighted.fit(coreset.points, record_history=False, include_points=False,
+                              sample_weight=coreset.weights, init=self.init)
+        self.assertEqual(result['iterations'], expected_result['iterations'])
+        np.testing.assert_allclose(weighted.centroids, expected.centroids, rtol=1e-10)
+        self.assertAlmostEqual(result['sse'], expected_result['sse'], delta=1e-8 * expected_result['sse'])
+        np.testing.assert_array_equal(coreset.map_labels(weighted.labels, self.data, weighted), expected.labels)
+        self.assertEqual(result['clusters'], expected_result['clusters'])
+
+    def test_grid_sse_offset_identity(self):
+        from .service.coreset import grid_coreset
+
+        data = _blobs(5000, 3, 4, seed=51)
+        coreset = grid_coreset(data, cells_per_dim=8)
+        self.assertLessEqual(coreset.error_bound['sse_offset'], coreset.error_bound['sse_offset_max'])
+        model = KMeansClustering(k=4)
+        rng = np.random.default_rng(51)
+        for _ in range(5):
+            centroids = rng.normal(0, 10, size=(4, 3))
+            labels = model._assign_clusters(coreset.points, centroids)
+            weighted = model._calculate_sse(coreset.points, labels, centroids, coreset.weights)
+            original = model._calculate_sse(data, labels[coreset.inverse], centroids)
+            self.assertAlmostEqual(original, weighted + coreset.error_bound['sse_offset'], delta=1e-9 * original)
+
+    def test_lightweight_coreset_weights_are_unbiased(self):
+        from .service.coreset import lightweight_coreset
+
+        data = _blobs(20000, 2, 4, seed=52)
+        totals = [lightweight_coreset(data, 500, seed=seed).weights.sum() for seed in range(20)]
+        self.assertAlmostEqual(np.mean(totals) / len(data), 1.0, delta=0.05)
+        small = lightweight_coreset(data[:100], 500)
+        self.assertEqual((len(small.points), small.error_bound['sampled']), (100, False))
+
+    def test_endpoint_dedup_compression(self):
+        body = {'points': self.data.tolist(), 'k': 4, 'init_centroids': self.init.tolist()}
+        plain = post_json(self.client, '/data_mining/cluster/kmeans/', body).json()
+        compressed = post_json(self.client, '/data_mining/cluster/kmeans/', {**body, 'compression': 'dedup'}).json()
+        self.assertEqual(compressed['labels'], plain['labels'])
+        np.testing.assert_allclose(compressed['centroids'], plain['centroids'], rtol=1e-10)
+        self.assertEqual(compressed['compression']['method'], 'dedup')
+        self.assertEqual(compressed['compression']['original_points'], len(self.data))
+
+
+# ====================================================================
+# K-MEANS GÁN CỤM THEO CHUNK, NHIỀU THREAD
+# ====================================================================
+
+class ParallelAssignmentTests(TestCase):
+    """n_jobs > 1 (nhiều partition, nhiều chunk) phải cho cùng kết quả với n_jobs = 1."""
+
+    def assert_same_fit(self, data, k, metric='euclidean'):
+        init = data[np.random.default_rng(60).choice(data.shape[0], k, replace=False)]
+        init = init.toarray() if sparse.issparse(init) else init
+        results = []
+        for n_jobs, chunk_size in ((1, 4096), (3, 97), (4, 31)):
+            model = KMeansClustering(k=k, max_iters=30, n_jobs=n_jobs, chunk_size=chunk_size, metric=metric)
+            result = model.fit(data, record_history=False, include_points=False, init=init)
+            results.append((model, result))
+        (reference, expected), others = results[0], results[1:]
+        for model, result in others:
+            self.assertEqual(result['iterations'], expected['iterations'])
+            np.testing.assert_array_equal(model.labels, reference.labels)
+            np.testing.assert_allclose(model.centroids, reference.centroids, rtol=1e-10, atol=1e-12)
+            self.assertAlmostEqual(result['sse'], expected['sse'], delta=1e-9 * expected['sse'])
+
+    def test_dense_euclidean(self):
+        self.assert_same_fit(_blobs(3000, 4, 6, seed=61), 6)
+
+    def test_other_metrics(self):
+        data = np.abs(_blobs(2000, 3, 4, seed=62)) + 0.1
+        self.assert_same_fit(data, 4, 'cosine')
+        self.assert_same_fit(data, 4, 'manhattan')
+
+    def test_sparse(self):
+        self.assert_same_fit(_sparse_blobs(2000, 50, 4, seed=63), 4)
+
+    def test_assignment_matches_brute_force(self):
+        data = _blobs(5000, 5, 8, seed=64)
+        centroids = data[:8]
+        model = KMeansClustering(k=8, n_jobs=3, chunk_size=333)
+        np.testing.assert_array_equal(model._assign_clusters(data, centroids),
+                                      cdist(data, centroids, 'sqeuclidean').argmin(axis=1))
+
+
+# ====================================================================
+# MODEL DẠNG GỌN (.npz + MANIFEST)
+# ====================================================================
+
+class CompactModelTests(TestCase):
+    """Model gọn phải dự đoán giống hệt pipeline joblib / bảng đếm nb_counts trên mọi tổ hợp category."""
+
+    MODEL_DIR = os.path.join(settings.BASE_DIR, 'data_mining', 'models')
+    UNKNOWN = '__unknown__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import joblib
+        from .service.classification_decisionTrees_views import MODEL_CONFIGS
+
+        cls.configs = MODEL_CONFIGS
+        cls.references = {}
+        for name, config in MODEL_CONFIGS.items():
+            if config.get('counts'):
+                cls.references[name] = CategoricalNaiveBayes.load(os.path.join(cls.MODEL_DIR, config['counts'])).predict
+                continue
+            pipeline = joblib.load(os.path.join(cls.MODEL_DIR, config['pipeline']))
+            encoder = joblib.load(os.path.join(cls.MODEL_DIR, config['encoder']))
+            cls.references[name] = (
+                lambda rows, p=pipeline, e=encoder, f=config['features']:
+                e.inverse_transform(p.predict(pd.DataFrame(rows, columns=f))).tolist()
+            )
+
+    def _rows(self, compact, unknown=True):
+        vocabularies = [values + [self.UNKNOWN] if unknown else values for values in compact.categories_]
+        return [list(values) for values in itertools.product(*vocabularies)]
+
+    def assert_matches_reference(self, name, compact):
+        rows = self._rows(compact)
+        expected = [str(label) for label in self.references[name](rows)]
+        self.assertEqual(compact.predict(rows), expected, name)
+
+    def test_shipped_artifacts_match_sources(self):
+        for name in self.configs:
+            arrays_path, manifest_path = compact_paths(self.MODEL_DIR, name)
+            self.assertTrue(sources_match(read_manifest(manifest_path), self.MODEL_DIR), name)
+            for mmap in (False, True):
+                compact = load_compact(arrays_path, manifest_path, mmap=mmap)
+                self.assert_matches_reference(name, compact)
+
+    def test_export_round_trip_and_stale_sources(self):
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            for config in self.configs.values():
+                for key in ('pipeline', 'encoder', 'counts'):
+                    if config.get(key):
+                        shutil.copy(os.path.join(self.MODEL_DIR, config[key]), model_dir)
+            call_command('export_models', model_dir=model_dir, stdout=io.StringIO())
+            for name in self.configs:
+                arrays_path, manifest_path = compact_paths(model_dir, name)
+                self.assert_matches_reference(name, load_compact(arrays_path, manifest_path, mmap=True))
+
+            counts_path = os.path.join(model_dir, self.configs['NAIVE_BAYES']['counts'])
+            manifest = read_manifest(compact_paths(model_dir, 'NAIVE_BAYES')[1])
+            with open(counts_path, 'ab') as f:
+                f.write(b'\0')
+            self.assertFalse(sources_match(manifest, model_dir))
+            os.remove(counts_path)
+            self.assertTrue(sources_match(manifest, model_dir))
+
+    def test_served_predictions_use_compact_model(self):
+        from .service.classification_decisionTrees_views import MODEL_CACHE
+
+        compact = load_compact(*compact_paths(self.MODEL_DIR, 'GINI_CART'))
+        rows = self._rows(compact, unknown=False)
+        expected = compact.predict(rows)
+        for values, label in zip(rows, expected):
+            response = post_json(self.client, '/data_mining/predict/gini/', dict(zip(compact.features, values)))
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(response.json()['prediction'], label, values)
+        self.assertIsInstance(MODEL_CACHE['GINI_CART'], CompactModel)
+
+
+# ====================================================================
+# DBSCAN (LƯỚI / KD-TREE)
+# ====================================================================
+
+def _density_data(n: int, d: int, seed: int) -> np.ndarray:
+    """Cụm dày, cụm thưa và nhiễu đều: có cả ô lưới lõi toàn bộ, điểm biên và nhiễu."""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-5, 5, size=(4, d))
+    spreads = np.array([0.05, 0.2, 0.4, 0.8])
+    labels = rng.integers(0, 4, size=n)
+    points = centers[labels] + rng.normal(size=(n, d)) * spreads[labels, None]
+    noise = rng.uniform(-7, 7, size=(n // 10, d))
+    return np.vstack([points, noise])
+
+
+class DBSCANTests(TestCase):
+    """Điểm lõi, nhiễu và phân hoạch các điểm lõi phải khớp sklearn.cluster.DBSCAN."""
+
+    def assert_matches_sklearn(self, data, eps, min_samples, index):
+        from sklearn.cluster import DBSCAN
+        from scipy.spatial import cKDTree
+
+        reference = DBSCAN(eps=eps, min_samples=min_samples).fit(data)
+        expected_core = np.zeros(len(data), dtype=bool)
+        expected_core[reference.core_sample_indices_] = True
+        model = DBSCANClustering(eps, min_samples, index=index)
+        result = model.fit(data, include_points=False)
+        self.assertEqual(result['index'], index)
+
+        np.testing.assert_array_equal(model.core_mask, expected_core)
+        np.testing.assert_array_equal(model.labels == NOISE, reference.labels_ == -1)
+        # Điểm lõi: cùng phân hoạch (ánh xạ một-một giữa nhãn)
+        core_pairs = set(zip(model.labels[expected_core], reference.labels_[expected_core]))
+        self.assertEqual(len(core_pairs), len({a for a, _ in core_pairs}))
+        self.assertEqual(len(core_pairs), len({b for _, b in core_pairs}))
+        self.assertEqual(model.n_clusters, len(set(reference.labels_)) - (-1 in reference.labels_))
+        # Điểm biên: thuộc cụm của một điểm lõi trong bán kính eps (sklearn chọn theo thứ tự duyệt)
+        border = np.flatnonzero(~expected_core & (model.labels != NOISE))
+        tree = cKDTree(data)
+        for i in border:
+            neighbours = [j for j in tree.query_ball_point(data[i], eps) if expected_core[j]]
+            self.assertIn(model.labels[i], set(model.labels[neighbours]))
+
+    def test_grid_index_2d(self):
+        data = _density_data(3000, 2, seed=1)
+        for eps, min_samples in ((0.1, 5), (0.3, 10), (0.05, 1)):
+            self.assert_matches_sklearn(data, eps, min_samples, 'grid')
+
+    def test_grid_index_1d(self):
+        self.assert_matches_sklearn(_density_data(2000, 1, seed=2), 0.02, 4, 'grid')
+
+    def test_kdtree_index(self):
+        self.assert_matches_sklearn(_density_data(3000, 2, seed=3), 0.15, 6, 'kdtree')
+        self.assert_matches_sklearn(_density_data(3000, 3, seed=4), 0.3, 6, 'kdtree')
+
+    def test_kdtree_connects_core_points_in_blocks(self):
+        # Khối nhỏ -> cặp lõi-lõi được nối qua nhiều khối, kết quả không đổi
+        from .service import dbscan_algorithm
+
+        with mock.patch.object(dbscan_algorithm, 'PAIR_CHUNK', 257):
+            self.assert_matches_sklearn(_density_data(3000, 3, seed=5), 0.3, 6, 'kdtree')
+            self.assert_matches_sklearn(_density_data(2000, 3, seed=6), 0.6, 3, 'kdtree')
+
+    def test_include_points_groups_by_label(self):
+        data = _density_data(2000, 2, seed=7)
+        model = DBSCANClustering(0.05, 4)
+        result = model.fit(data)
+        for i in range(model.n_clusters):
+            self.assertEqual(result['clusters'][f'cluster_{i}'], data[model.labels == i].tolist())
+        self.assertEqual(result['noise'], data[model.labels == NOISE].tolist())
+
+    def test_cost_grows_with_density(self):
+        rng = np.random.default_rng(8)
+        sparse_data, dense_data = rng.uniform(0, 100, size=(5000, 3)), rng.uniform(0, 1, size=(5000, 3))
+        self.assertLess(estimate_neighbours(sparse_data, 0.5), 1)
+        # ~ 5000 * thể tích cầu bán kính 0.5 (0.52), trừ hiệu ứng biên
+        self.assertGreater(estimate_neighbours(dense_data, 0.5), 500)
+        self.assertGreater(dbscan_cost(5000, 3, estimate_neighbours(dense_data, 0.5)), 10 * dbscan_cost(5000, 3))
+
+    def test_grid_rejects_more_than_two_dimensions(self):
+        with self.assertRaises(ValueError):
+            DBSCANClustering(0.5, 5, index='grid').fit(np.zeros((10, 3)))
+
+
+# ====================================================================
+# LƯU KẾT QUẢ GOM CỤM (RUN / MEMBER) VÀ TRUY VẤN THEO TRANG
+# ====================================================================
+
+class ClusteringRunTests(TestCase):
+    """save_run và các API /cluster/runs/... phải trả lại đúng nhãn, khoảng cách và tọa độ đã lưu."""
+
+    def setUp(self):
+        rng = np.random.default_rng(43)
+        self.data = _blobs(1500, 3, 5, seed=43)
+        self.init = self.data[rng.choice(len(self.data), 5, replace=False)]
+
+    def _get(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_save_run_round_trip(self):
+        labels = np.random.default_rng(0).integers(-1, 4, size=len(self.data))
+        with mock.patch.dict(RUN_STORE, {'batch_size': 97}):
+            run = save_run('dbscan', self.data, labels, 4)
+        sizes = np.bincount(labels[labels >= 0], minlength=4)
+        self.assertEqual((run.cluster_sizes, run.n_noise), (sizes.tolist(), int((labels < 0).sum())))
+        means = np.array([self.data[labels == c].mean(axis=0) for c in range(4)])
+        np.testing.assert_allclose(run.centroids, means, rtol=1e-12)
+
+        members = list(ClusterMember.objects.filter(run=run).order_by('index'))
+        self.assertEqual([m.index for m in members], list(range(len(self.data))))
+        self.assertEqual([m.cluster for m in members], labels.tolist())
+        # Tọa độ được lưu nguyên bit (float64)
+        np.testing.assert_array_equal([decode_point(m.point) for m in members], self.data)
+        for m in members[:200]:
+            if m.cluster < 0:
+                self.assertIsNone(m.distance)
+            else:
+                self.assertAlmostEqual(m.distance, np.linalg.norm(self.data[m.index] - means[m.cluster]), places=9)
+
+    def test_persisted_kmeans_pagination(self):
+        body = {'points': self.data.tolist(), 'k': 5, 'init_centroids': self.init.tolist(), 'persist': True}
+        result = post_json(self.client, '/data_mining/cluster/kmeans/', body).json()
+        labels, centroids = np.array(result['labels']), np.array(result['centroids'])
+        base = f"/data_mining/cluster/runs/{result['run_id']}/"
+
+        detail = self._get(base)['run']
+        self.assertEqual((detail['algorithm'], detail['n_points'], detail['n_clusters']), ('kmeans', 1500, 5))
+        np.testing.assert_allclose(detail['centroids'], centroids, rtol=1e-12)
+
+        counts, offset = [], 0
+        while offset is not None:
+            page = self._get(base + 'counts/', limit=2, offset=offset)
+            counts += [c['size'] for c in page['counts']]
+            offset = page['next_offset']
+        self.assertEqual(counts, np.bincount(labels, minlength=5).tolist())
+
+        distances = np.linalg.norm(self.data - centroids[labels], axis=1)
+        for cluster in range(5):
+            indices, after = [], None
+            while True:
+                params = {'cluster': cluster, 'limit': 64}
+                if after is not None:
+                    params['after'] = after
+                page = self._get(base + 'members/', **params)
+                indices += [m['index'] for m in page['members']]
+                after = page['next_after']
+                if after is None:
+                    break
+            self.assertEqual(indices, np.flatnonzero(labels == cluster).tolist())
+
+            nearest = self._get(base + 'nearest/', cluster=cluster, limit=10, offset=3)
+            expected = sorted(np.flatnonzero(labels == cluster), key=lambda i: (distances[i], i))[3:13]
+            self.assertEqual([m['index'] for m in nearest['members']], [int(i) for i in expected])
+            np.testing.assert_allclose([m['distance'] for m in nearest['members']], distances[expected], rtol=1e-9)
+
+        for index in (0, 777, 1499):
+            point = self._get(base + f'points/{index}/')
+            self.assertEqual(point['cluster'], labels[index])
+            self.assertEqual(point['point'], self.data[index].tolist())
+
+    def test_errors_and_delete(self):
+        run = save_run('kmeans', self.data[:20], np.zeros(20, dtype=int), 1)
+        base = f'/data_mining/cluster/runs/{run.id}/'
+        self.assertEqual(self.client.get(base + 'points/20/').status_code, 404)
+        self.assertEqual(self.client.get(base + 'members/').status_code, 400)
+        self.assertEqual(self.client.get(base + 'nearest/', {'cluster': -1}).status_code, 400)
+        self.assertEqual(self.client.get('/data_mining/cluster/runs/missing/counts/').status_code, 404)
+        self.assertEqual(self.client.delete(base).status_code, 200)
+        self.assertFalse(ClusterMember.objects.filter(run_id=run.id).exists())
+        self.assertEqual(self.client.get(base).status_code, 404)
+
+
+# ====================================================================
+# K-MEANS PHÂN TÁN (WORKER CỤC BỘ / TCP)
+# ====================================================================
+
+def _start_tcp_worker(authkey: bytes):
+    """Chạy serve_forever trong thread nền trên cổng ngẫu nhiên; trả về (địa chỉ, log)."""
+    log, ready = [], threading.Event()
+
+    def record(message):
+        log.append(message)
+        ready.set()
+
+    threading.Thread(target=serve_forever, args=(('127.0.0.1', 0), authkey),
+                     kwargs={'log': record}, daemon=True).start()
+    if not ready.wait(5):
+        raise AssertionError("Worker TCP không khởi động")
+    port = int(log[0].rsplit(':', 1)[1])
+    return ('127.0.0.1', port), log
+
+
+class DistributedKMeansTests(TestCase):
+    """Cùng centroids khởi tạo -> DistributedKMeans trùng KMeansClustering.fit trên một máy."""
+
+    def assert_matches_single_machine(self, workers, data, k):
+        init = data[np.random.default_rng(0).choice(len(data), k, replace=False)]
+        expected = KMeansClustering(k=k, max_iters=50)
+        expected_result = expected.fit(data, record_history=False, include_points=False, init=init)
+
+        workers.scatter(data)
+        model = DistributedKMeans(k=k, max_iters=50)
+        result = model.fit(workers, init=init)
+        self.assertEqual(result['iterations'], expected_result['iterations'])
+        np.testing.assert_allclose(model.centroids, expected.centroids, rtol=1e-12, atol=1e-12)
+        self.assertAlmostEqual(result['sse'], expected_result['sse'], delta=1e-9 * expected_result['sse'])
+        np.testing.assert_array_equal(model.labels(workers), expected.labels)
+        self.assertEqual(result['clusters'], expected_result['clusters'])
+        self.assertEqual(result['points'], len(data))
+
+    def test_local_workers_match_single_machine(self):
+        data = _blobs(3001, 3, 5, seed=20)
+        with WorkerGroup.local(3) as workers:
+            self.assertEqual(len(workers), 3)
+            self.assert_matches_single_machine(workers, data, 5)
+
+    def test_tcp_worker_round_trip(self):
+        address, log = _start_tcp_worker(b'secret')
+        data = _blobs(1000, 2, 4, seed=21)
+        with WorkerGroup.connect([address], authkey=b'secret') as workers:
+            self.assert_matches_single_machine(workers, data, 4)
+        _wait_until(lambda: "Coordinator đã ngắt kết nối" in log)
+
+    def test_tcp_worker_rejects_wrong_authkey(self):
+        from multiprocessing import AuthenticationError
+
+        address, log = _start_tcp_worker(b'secret')
+        with self.assertRaises(AuthenticationError):
+            WorkerGroup.connect([address], authkey=b'wrong')
+        _wait_until(lambda: any(line.startswith("Từ chối kết nối") for line in log))
+        # Worker vẫn tiếp tục phục vụ coordinator có authkey đúng
+        with WorkerGroup.connect([address], authkey=b'secret') as workers:
+            self.assertEqual(workers.scatter(np.zeros((10, 2))), [(10, 2)])
+
+    def test_worker_error_is_reported(self):
+        with WorkerGroup.local(2) as workers:
+            with self.assertRaises(WorkerError):
+                workers.call('info')
+            # Sau lỗi các kết nối vẫn đồng bộ
+            self.assertEqual(workers.scatter(np.ones((4, 2))), [(2, 2), (2, 2)])
+
+
+# ====================================================================
+# ADMISSION CONTROL
+# ====================================================================
+
+def _admission_config(**pools):
+    config = {**DEFAULT_ADMISSION, 'slots': 2, 'reserved_slots': 1}
+    config['pools'] = {
+        'predict': {'priority': 0, 'concurrency': 2, 'queue_depth': 4, 'queue_timeout': 2.0},
+        'clustering': {'priority': 1, 'concurrency': 2, 'queue_depth': 4, 'queue_timeout': 0.2, 'cost_budget': None},
+    }
+    for name, overrides in pools.items():
+        config['pools'][name].update(overrides)
+    return config
+
+
+def _wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Hết thời gian chờ")
+        time.sleep(0.005)
+
+
+class AdmissionControllerTests(TestCase):
+    """Slot dành riêng và thứ tự ưu tiên giữa các nhóm."""
+
+    def test_reserved_slots_only_for_top_priority(self):
+        controller = AdmissionController(_admission_config(clustering={'queue_depth': 0}))
+        with controller.admit('clustering'):
+            with self.assertRaises(AdmissionRejected) as ctx:
+                with controller.admit('clustering'):
+                    pass
+            self.assertEqual(ctx.exception.status, 429)
+            self.assertEqual(ctx.exception.retry_after, DEFAULT_ADMISSION['retry_after'])
+            # Slot dành riêng: dự đoán vẫn chạy được
+            with controller.admit('predict'):
+                pass
+
+    def test_lower_priority_waits_behind_queued_higher_priority(self):
+        controller = AdmissionController({**_admission_config(), 'slots': 1, 'reserved_slots': 0})
+        outcomes = {}
+
+        def predict():
+            with controller.admit('predict'):
+                outcomes['predict'] = time.monotonic()
+                time.sleep(0.5)
+
+        def cluster():
+            try:
+                with controller.admit('clustering'):
+                    outcomes['clustering'] = 'admitted'
+            except AdmissionRejected as e:
+                outcomes['clustering'] = e.status
+
+        with controller.admit('clustering'):
+            threads = [threading.Thread(target=predict)]
+            threads[0].start()
+            _wait_until(lambda: controller.pools['predict'].waiting == 1)
+            threads.append(threading.Thread(target=cluster))
+            threads[1].start()
+            _wait_until(lambda: controller.pools['clustering'].waiting == 1)
+        for thread in threads:
+            thread.join()
+        # Slot được trả cho dự đoán đang chờ; gom cụm chờ quá queue_timeout -> 429
+        self.assertIn('predict', outcomes)
+        self.assertEqual(outcomes['clustering'], 429)
+
+
+class AdmissionEndpointTests(TestCase):
+    """413 cho request quá lớn, 429 + Retry-After khi quá tải."""
+
+    POINTS = [[0, 0], [0, 1], [5, 5], [5, 6]]
+
+    def setUp(self):
+        admission._CONTROLLER = None
+
+    def tearDown(self):
+        admission._CONTROLLER = None
+
+    def test_max_iters_over_limit(self):
+        response = post_json(self.client, '/data_mining/cluster/kmeans/',
+                             {"points": self.POINTS, "k": 2, "max_iters": DEFAULT_ADMISSION['max_iters'] + 1})
+        self.assertEqual(response.status_code, 413)
+        self.assertNotIn('Retry-After', response)
+
+    @override_settings(ADMISSION_CONTROL={'max_cost': 1000})
+    def test_cost_over_limit(self):
+        response = post_json(self.client, '/data_mining/cluster/kmeans/',
+                             {"points": self.POINTS, "k": 2, "max_iters": 200})
+        self.assertEqual(response.status_code, 413)
+        response = post_json(self.client, '/data_mining/cluster/dbscan/',
+                             {"points": self.POINTS * 100, "eps": 0.5, "min_samples": 2})
+        self.assertEqual(response.status_code, 413)
+        response = post_json(self.client, '/data_mining/cluster/kmeans/',
+                             {"points": self.POINTS, "k": 2, "max_iters": 10})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ADMISSION_CONTROL={'pools': {'clustering': {'concurrency': 1, 'queue_depth': 0}}})
+    def test_overloaded_clustering_returns_429_with_retry_after(self):
+        with admission.admit('clustering'):
+            response = post_json(self.client, '/data_mining/cluster/kmeans/', {"points": self.POINTS, "k": 2})
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], str(DEFAULT_ADMISSION['retry_after']))
+            # Dự đoán không bị chặn bởi gom cụm
+            response = post_json(self.client, '/data_mining/predict/naivebayes/',
+                                 dict(zip(NAIVE_BAYES_FEATURES, ['Sunny', 'Hot', 'High', 'Weak'])))
+            self.assertEqual(response.status_code, 200)
+        response = post_json(self.client, '/data_mining/cluster/kmeans/', {"points": self.POINTS, "k": 2})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ADMISSION_CONTROL={'predict_max_cost': 16, 'max_cost': 1000,
+                                          'pools': {'clustering': {'concurrency': 1, 'queue_depth': 0}}})
+    def test_large_kmeans_prediction_is_costed_as_clustering(self):
+        centroids = [[0, 0], [5, 5]]
+        small = {"centroids": centroids, "points": self.POINTS}
+        large = {"centroids": centroids, "points": self.POINTS * 2}
+        huge = {"centroids": centroids, "points": self.POINTS * 100}
+        self.assertEqual(post_json(self.client, '/data_mining/cluster/kmeans/predict/', large).status_code, 200)
+        self.assertEqual(post_json(self.client, '/data_mining/cluster/kmeans/predict/', huge).status_code, 413)
+        with admission.admit('clustering'):
+            response = post_json(self.client, '/data_mining/cluster/kmeans/predict/', large)
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response)
+            # Lô nhỏ (n x k x d <= predict_max_cost) vẫn chạy trong nhóm predict
+            response = post_json(self.client, '/data_mining/cluster/kmeans/predict/', small)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['labels'], [0, 0, 1, 1])
+
+
+# ====================================================================
+# K-MEANS SPARSE VÀ CÁC ĐỘ ĐO
+# ====================================================================
+
+def _sparse_blobs(n: int, d: int, k: int, seed: int) -> sparse.csr_matrix:
+    """Mỗi cụm có tập cột khác 0 riêng (chồng lấn một phần), giá trị có cả số âm."""
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, k, size=n)
+    dense = np.zeros((n, d))
+    for c in range(k):
+        rows = np.flatnonzero(labels == c)
+        columns = rng.choice(d, size=d // 3, replace=False)
+        values = rng.normal(loc=rng.uniform(-3, 3, size=len(columns)), scale=1.0, size=(len(rows), len(columns)))
+        values[rng.random(values.shape) < 0.3] = 0.0
+        dense[np.ix_(rows, columns)] = values
+    return sparse.csr_matrix(dense)
+
+
+class SparseKMeansTests(TestCase):
+    """Fit trên CSR phải cho kết quả như fit trên mảng dày tương ứng, với mọi metric."""
+
+    def setUp(self):
+        self.matrix = _sparse_blobs(600, 40, 5, seed=7)
+        self.dense = self.matrix.toarray()
+
+    def _fit(self, data, metric, sample_weight=None):
+        np.random.seed(0)
+        model = KMeansClustering(k=5, max_iters=50, metric=metric)
+        result = model.fit(data, record_history=False, include_points=False, sample_weight=sample_weight)
+        return model, result
+
+    def test_sparse_fit_matches_dense(self):
+        weights = np.random.default_rng(1).uniform(0.5, 2.0, size=self.dense.shape[0])
+        for metric in METRICS:
+            for sample_weight in (None, weights):
+                with self.subTest(metric=metric, weighted=sample_weight is not None):
+                    dense_model, dense_result = self._fit(self.dense, metric, sample_weight)
+                    sparse_model, sparse_result = self._fit(self.matrix, metric, sample_weight)
+                    np.testing.assert_array_equal(sparse_model.labels, dense_model.labels)
+                    np.testing.assert_allclose(sparse_model.centroids, dense_model.centroids, atol=1e-10)
+                    self.assertAlmostEqual(sparse_result['sse'], dense_result['sse'], places=6)
+                    self.assertEqual(sparse_result['iterations'], dense_result['iterations'])
+
+    def test_predict_matches_brute_force(self):
+        for metric, distance in (('euclidean', 'sqeuclidean'), ('cosine', 'cosine'), ('manhattan', 'cityblock')):
+            with self.subTest(metric=metric):
+                model, _ = self._fit(self.matrix, metric)
+                expected = cdist(self.dense, model.centroids, distance).argmin(axis=1)
+                np.testing.assert_array_equal(model.predict(self.matrix), expected)
+
+    def test_cosine_centroids_have_unit_length(self):
+        model, _ = self._fit(self.matrix, 'cosine')
+        np.testing.assert_allclose(np.linalg.norm(model.centroids, axis=1), 1.0)
+
+    def test_manhattan_centroids_are_lower_medians(self):
+        model, _ = self._fit(self.matrix, 'manhattan')
+        for c in range(model.k):
+            members = np.sort(self.dense[model.labels == c], axis=0)
+            np.testing.assert_array_equal(model.centroids[c], members[(len(members) - 1) // 2])
+
+    def test_parse_sparse_formats(self):
+        small = sparse.csr_matrix(np.array([[0, 1.5, 0, 2], [0, 0, 0, 0], [-3, 0, 0, 0]]))
+        from_csr = parse_sparse_points({"shape": list(small.shape), "indptr": small.indptr.tolist(),
+                                        "indices": small.indices.tolist(), "data": small.data.tolist()})
+        from_rows = parse_sparse_points({"n_features": 4, "rows": [{"1": 1.5, "3": 2}, {}, {"0": -3}]})
+        np.testing.assert_array_equal(from_csr.toarray(), small.toarray())
+        np.testing.assert_array_equal(from_rows.toarray(), small.toarray())
+        for bad in ({"n_features": 2, "rows": [{"5": 1.0}]},
+                    {"shape": [1, 2], "indptr": [0, 1], "indices": [0], "data": [float('nan')]}):
+            with self.assertRaises(ValueError):
+                parse_sparse_points(bad)
+
+    def test_sparse_endpoint(self):
+        matrix = self.matrix
+        body = {"sparse": {"shape": list(matrix.shape), "indptr": matrix.indptr.tolist(),
+                           "indices": matrix.indices.tolist(), "data": matrix.data.tolist()},
+                "k": 5, "metric": "cosine"}
+        response = post_json(self.client, '/data_mining/cluster/kmeans/', body)
+        self.assertEqual(response.status_code, 200, response.content)
+        payload = response.json()
+        self.assertEqual(payload['metric'], 'cosine')
+        self.assertEqual(len(payload['labels']), matrix.shape[0])
+        self.assertEqual(sum(payload['clusters'].values()), matrix.shape[0])
+        response = post_json(self.client, '/data_mining/cluster/kmeans/', {**body, "persist": True})
+        self.assertEqual(response.status_code, 400)
+
+
+# ====================================================================
+# K-MEANS WARM START / FIT LẠI THEO PHẦN THAY ĐỔI
+# ====================================================================
+
+def _blobs(n: int, d: int, k: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 10, size=(k, d))
+    return centers[rng.integers(0, k, size=n)] + rng.normal(0, 1.5, size=(n, d))
+
+
+class WarmStartTests(TestCase):
+    """
+    Fit lại từ WarmStart (cận Hamerly) phải cho đúng kết quả của
+    fit(init=centroids) từ cùng centroid ban đầu, sau khi thêm/bớt dòng.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = _blobs(4000, 3, 6, seed=1)
+        self.weights = rng.uniform(0.5, 2.0, size=len(self.data))
+        self.removed = rng.choice(len(self.data), 150, replace=False)
+        self.added = _blobs(200, 3, 6, seed=1) + rng.normal(0, 2.0, size=(200, 3))
+        keep = np.ones(len(self.data), dtype=bool)
+        keep[self.removed] = False
+        self.keep = keep
+        self.updated = np.concatenate([self.data[keep], self.added])
+
+    def _fitted(self, data, sample_weight=None):
+        np.random.seed(0)
+        model = KMeansClustering(k=6, max_iters=300, tolerance=1e-8)
+        model.fit(data, record_history=False, include_points=False, sample_weight=sample_weight)
+        return model
+
+    def _assert_refit_matches(self, data, updated, state, sample_weight=None):
+        init = state.initial_centroids()
+        warm = KMeansClustering(k=6, max_iters=300, tolerance=1e-8)
+        warm_result = warm.fit(updated, record_history=False, include_points=False,
+                               sample_weight=sample_weight, init=state)
+        cold = KMeansClustering(k=6, max_iters=300, tolerance=1e-8)
+        cold_result = cold.fit(updated, record_history=False, include_points=False,
+                               sample_weight=sample_weight, init=init)
+        np.testing.assert_array_equal(warm.labels, cold.labels)
+        np.testing.assert_allclose(warm.centroids, cold.centroids, atol=1e-9)
+        self.assertAlmostEqual(warm_result['sse'], cold_result['sse'], places=6)
+        self.assertEqual(warm_result['iterations'], cold_result['iterations'])
+        # Chỉ một phần nhỏ điểm phải tính lại khoảng cách tới mọi centroid
+        self.assertLess(warm_result['relabelled'], updated.shape[0] * warm_result['iterations'] // 4)
+        return warm
+
+    def test_refit_after_add_and_remove_matches_fit_from_same_init(self):
+        model = self._fitted(self.data)
+        state = WarmStart.from_model(model, self.data)
+        state.remove(self.removed, self.data[self.removed]).add(self.added)
+        self._assert_refit_matches(self.data, self.updated, state)
+
+    def test_weighted_refit(self):
+        model = self._fitted(self.data, self.weights)
+        added_weights = np.full(len(self.added), 1.5)
+        state = WarmStart.from_model(model, self.data, sample_weight=self.weights)
+        state.remove(self.removed, self.data[self.removed], sample_weight=self.weights[self.removed])
+        state.add(self.added, sample_weight=added_weights)
+        weights = np.concatenate([self.weights[self.keep], added_weights])
+        self._assert_refit_matches(self.data, self.updated, state, sample_weight=weights)
+
+    def test_sparse_refit(self):
+        data, updated = sparse.csr_matrix(self.data), sparse.csr_matrix(self.updated)
+        model = self._fitted(data)
+        state = WarmStart.from_model(model, data)
+        state.remove(self.removed, data[self.removed]).add(sparse.csr_matrix(self.added))
+        self._assert_refit_matches(data, updated, state)
+
+    def test_initial_centroids_are_updated_means(self):
+        model = self._fitted(self.data)
+        state = WarmStart.from_model(model, self.data)
+        state.remove(self.removed, self.data[self.removed]).add(self.added)
+        labels = state.labels
+        for c in range(6):
+            np.testing.assert_allclose(state.initial_centroids()[c], self.updated[labels == c].mean(axis=0))
+
+    def test_invalid_remove(self):
+        state = WarmStart.from_model(self._fitted(self.data), self.data)
+        with self.assertRaises(ValueError):
+            state.remove([1, 1], self.data[[1, 1]])
+        with self.assertRaises(ValueError):
+            state.remove([len(self.data)], self.data[:1])
+
+    def test_delta_endpoint_matches_fit_from_same_init(self):
+        path = '/data_mining/cluster/kmeans/'
+        response = post_json(self.client, path, {"points": self.data.tolist(), "k": 6, "max_iters": 300,
+                                                 "persist": True})
+        self.assertEqual(response.status_code, 200, response.content)
+        run_id = response.json()['run_id']
+        _, state = load_warm_start(ClusteringRun.objects.get(pk=run_id))
+
+        response = post_json(self.client, path, {
+            "warm_start": {"run_id": run_id, "add": self.added.tolist(), "remove": self.removed.tolist()},
+            "max_iters": 300, "persist": True,
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        payload = response.json()
+        self.assertEqual(payload['warm_start']['removed'], len(self.removed))
+        self.assertEqual(payload['warm_start']['added'], len(self.added))
+        self.assertEqual(payload['n_points'], len(self.updated))
+
+        state.remove(self.removed, self.data[self.removed]).add(self.added)
+        reference = KMeansClustering(k=6, max_iters=300)
+        reference.fit(self.updated, record_history=False, include_points=False, init=state.initial_centroids())
+        np.testing.assert_array_equal(payload['labels'], reference.labels)
+        np.testing.assert_allclose(payload['centroids'], reference.centroids, atol=1e-9)
+        self.assertEqual(ClusteringRun.objects.get(pk=payload['run_id']).params['warm_start'], run_id)
+
+    def test_init_centroids_and_errors(self):
+        path = '/data_mining/cluster/kmeans/'
+        points = [[0, 0], [1, 1], [5, 5], [6, 6]]
+        response = post_json(self.client, path, {"points": points, "init_centroids": [[0, 0], [6, 6]]})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['centroids'], [[0.5, 0.5], [5.5, 5.5]])
+        response = post_json(self.client, path, {"points": points, "init_centroids": [[0, 0], [6, 6]], "k": 3})
+        self.assertEqual(response.status_code, 400)
+        response = post_json(self.client, path, {"warm_start": {"run_id": "missing", "add": [[1, 2]]}})
+        self.assertEqual(response.status_code, 404)
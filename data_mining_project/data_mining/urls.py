@@ -8,8 +8,22 @@ from .service.classification_decisionTrees_views import (
 from .service.clustering_views import (
     kmeans_cluster_view,
     kmeans_predict_view,
+    dbscan_cluster_view,
     load_example_data_view
 )
+from .service.run_views import (
+    cluster_run_list_view,
+    cluster_run_detail_view,
+    cluster_run_counts_view,
+    cluster_run_members_view,
+    cluster_run_nearest_view,
+    cluster_run_point_view
+)
+from .service.dataset_views import (
+    dataset_upload_view,
+    dataset_list_view,
+    dataset_detail_view
+)
 
 urlpatterns = [
     # URL Cho API Dự Đoán (Classification)
@@ -20,8 +34,23 @@ urlpatterns = [
     # URL Cho API Gom cụm (Clustering)
     path('cluster/kmeans/', kmeans_cluster_view, name='api_kmeans_cluster'),
     path('cluster/kmeans/predict/', kmeans_predict_view, name='api_kmeans_predict'),
+    path('cluster/dbscan/', dbscan_cluster_view, name='api_dbscan_cluster'),
     path('cluster/load-example/', load_example_data_view, name='api_load_example_data'),
 
+    # URL Cho API Kết quả gom cụm đã lưu ("persist": true)
+    path('cluster/runs/', cluster_run_list_view, name='api_cluster_run_list'),
+    path('cluster/runs/<str:run_id>/', cluster_run_detail_view, name='api_cluster_run_detail'),
+    path('cluster/runs/<str:run_id>/counts/', cluster_run_counts_view, name='api_cluster_run_counts'),
+    path('cluster/runs/<str:run_id>/members/', cluster_run_members_view, name='api_cluster_run_members'),
+    path('cluster/runs/<str:run_id>/nearest/', cluster_run_nearest_view, name='api_cluster_run_nearest'),
+    path('cluster/runs/<str:run_id>/points/<int:index>/', cluster_run_point_view,
+         name='api_cluster_run_point'),
+
+    # URL Cho API Kho dataset
+    path('datasets/', dataset_list_view, name='api_dataset_list'),
+    path('datasets/upload/', dataset_upload_view, name='api_dataset_upload'),
+    path('datasets/<str:dataset_id>/', dataset_detail_view, name='api_dataset_detail'),
+
     # URL Cho Giao Diện UI (Pages)
     # ------------------
     path('index/', views.index_view, name='home'), # Trang chủ
@@ -48,6 +48,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'data_mining.middleware.MetricsMiddleware',
+    'data_mining.middleware.RequestTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'data_mining_project.urls'
@@ -118,6 +120,104 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Đo thời gian request: header Server-Timing, log 'data_mining.timing' khi bật
+# 'log' (xem data_mining/middleware.py). Profiling theo request chỉ bật khi DEBUG.
+REQUEST_TIMING = {
+    'enabled': True,
+    'log': False,
+    'profiling': {
+        'allowed': DEBUG,
+        'sample_rate': 1.0,
+    },
+}
+
+# Gom các request dự đoán một bản ghi đồng thời thành một lần predict theo lô
+# (xem data_mining/service/batching.py). max_wait_ms lớn hơn -> lô to hơn,
+# throughput cao hơn nhưng mỗi request chờ lâu hơn.
+PREDICTION_BATCHING = {
+    'enabled': False,
+    'max_batch': 64,
+    'max_wait_ms': 2.0,
+}
+
+# K-Means trong API (xem data_mining/service/kmeans_algorithm.py): n_jobs thread
+# cho bước gán cụm theo chunk (-1 = số CPU). Khi n_jobs > 1 nên giới hạn BLAS về
+# 1 thread (OPENBLAS_NUM_THREADS=1 / OMP_NUM_THREADS=1) để tránh tranh CPU.
+KMEANS = {
+    'n_jobs': 1,
+    'chunk_size': 4096,
+}
+
+# Kết quả gom cụm lưu vào database khi request có "persist": true (xem
+# data_mining/service/run_store.py): giới hạn số điểm, số dòng mỗi lệnh INSERT
+# và kích thước trang của các API /cluster/runs/.
+CLUSTERING_RUNS = {
+    'max_points': 1000000,
+    'batch_size': 5000,
+    'page_size': 100,
+    'max_page_size': 1000,
+}
+
+# Admission control (xem data_mining/service/admission.py): gom cụm có chi phí
+# n x k x max_iters x d vượt max_cost bị từ chối (413); quá concurrency / hàng
+# đợi đầy -> 429 kèm Retry-After. Dự đoán có ưu tiên cao hơn và được giữ riêng
+# reserved_slots slot; dự đoán K-Means có n x k x d vượt predict_max_cost được tính
+# như gom cụm. Giới hạn tính trong từng tiến trình server.
+ADMISSION_CONTROL = {
+    'enabled': True,
+    'slots': 8,
+    'reserved_slots': 2,
+    'max_cost': 2e10,
+    'max_iters': 1000,
+    'predict_max_cost': 1e7,
+    'pools': {
+        'predict': {'concurrency': 8, 'queue_depth': 64, 'queue_timeout': 1.0},
+        'clustering': {'concurrency': 2, 'queue_depth': 4, 'queue_timeout': 5.0, 'cost_budget': 4e10},
+    },
+}
+
+# Model phân loại dạng gọn <tên>.compact.npz/.json (tạo bằng `manage.py export_models`,
+# xem data_mining/service/compact_models.py): được ưu tiên hơn file joblib khi còn
+# khớp với file nguồn. mmap: ánh xạ mảng từ file thay vì đọc vào bộ nhớ.
+COMPACT_MODELS = {
+    'enabled': True,
+    'mmap': True,
+}
+
+# Metrics Prometheus tại /metrics (xem data_mining/service/metrics.py).
+# Với server nhiều tiến trình, đặt multiprocess_dir (hoặc biến môi trường
+# DATA_MINING_METRICS_DIR) về một thư mục chung, xóa sạch khi khởi động lại.
+METRICS = {
+    'multiprocess_dir': None,
+    'flush_interval': 1.0,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+    },
+    'loggers': {
+        'data_mining': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
+# Kho dataset upload (xem data_mining/service/dataset_registry.py)
+DATASET_STORAGE_DIR = BASE_DIR / 'datasets'
+DATASET_UPLOAD_MAX_BYTES = 2 * 1024 ** 3
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
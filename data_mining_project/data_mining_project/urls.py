@@ -19,8 +19,11 @@ from django.urls import path
 from django.urls import include
 from django.views.generic import RedirectView
 
+from data_mining.service.metrics_views import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('data_mining/', include('data_mining.urls')),
+    path('metrics', metrics_view, name='metrics'),
     path('', RedirectView.as_view(url='data_mining/index/', permanent=False), name='root'),
 ]
@@ -1,11 +1,22 @@
 # K-Means Training Script
 # Script để train và test thuật toán K-Means với dữ liệu từ file CSV
+#
+# Cách dùng:
+#   python kmeans_training.py                              # Bài 1 (k=2) và Bài 2 (k=3)
+#   python kmeans_training.py data/a.csv:4 data/b.csv -k 3 -o out/ -j 4
+#   python kmeans_training.py data/Bai2_k3_data.csv:3 --show
+#
+# Mặc định chạy headless (backend Agg): chỉ lưu ảnh, không mở cửa sổ,
+# nên chạy được trên server/CI. Nhiều dataset được xử lý song song.
 
+import argparse
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 
 # Thêm đường dẫn để import thuật toán
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../data_mining'))
@@ -16,189 +27,194 @@ DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 BAI1_FILE = os.path.join(DATA_DIR, 'Bai1_k2_data.csv')
 BAI2_FILE = os.path.join(DATA_DIR, 'Bai2_k3_data.csv')
 
+# Dataset chạy khi không truyền tham số: (file, k, tiêu đề)
+DEFAULT_DATASETS = [
+    (BAI1_FILE, 2, "Bài 1: K-Means với k=2"),
+    (BAI2_FILE, 3, "Bài 2: K-Means với k=3"),
+]
+
+# Chỉ in chi tiết từng điểm / từng vòng lặp với dữ liệu nhỏ
+VERBOSE_MAX_POINTS = 50
+# Từ ngưỡng này các lớp điểm/đường nối được raster hóa (PDF/SVG không chứa
+# hàng nghìn đối tượng vector) và điểm được vẽ nhỏ hơn
+RASTERIZE_THRESHOLD = 2000
+
+COLORS = ['red', 'blue', 'green', 'orange', 'purple', 'brown', 'pink', 'gray']
+
+
 # ====================================================================
-# BÀI 1: Gom cụm k = 2 với 4 điểm
+# Chạy K-Means trên một dataset
 # ====================================================================
-def run_example_1():
+def run_dataset(path: str, k: int, output_dir: str, title: Optional[str] = None,
+                columns: Optional[List[str]] = None, max_iters: int = 100,
+                seed: Optional[int] = None, dpi: int = 150, image_format: str = 'png',
+                plot: bool = True, show: bool = False) -> Dict[str, Any]:
+    """
+    Đọc CSV, gom cụm, lưu ảnh + CSV kết quả vào output_dir.
+
+    Returns:
+        Tóm tắt (file, k, số điểm, iterations, sse, đường dẫn output)
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    title = title or f"{stem}: K-Means với k={k}"
+
+    df = pd.read_csv(path, index_col=0)
+    columns = columns or list(df.select_dtypes('number').columns)
+    if not columns:
+        raise ValueError(f"{path}: không có cột số để gom cụm")
+    data = df[columns].to_numpy(dtype=np.float64)
+    if len(data) < k:
+        raise ValueError(f"{path}: số điểm ({len(data)}) phải >= k ({k})")
+    small = len(data) <= VERBOSE_MAX_POINTS
+
     print("=" * 60)
-    print("BÀI 1: Gom cụm k = 2 với 4 điểm")
+    print(title)
     print("=" * 60)
-    
-    # Đọc dữ liệu từ file CSV
-    try:
-        df = pd.read_csv(BAI1_FILE, index_col=0)
-        print(f"\nĐã load dữ liệu từ: {BAI1_FILE}")
-        print(f"Số điểm: {len(df)}")
+    print(f"Đã load dữ liệu từ: {path}")
+    print(f"Số điểm: {len(data)}, số chiều: {len(columns)} ({', '.join(columns)}), k = {k}")
+    if small:
         print("\nDữ liệu:")
-        print(df)
-    except FileNotFoundError:
-        print(f"Lỗi: Không tìm thấy file {BAI1_FILE}")
-        return None
-    
-    # Lấy tọa độ x, y
-    data = df[['x', 'y']].values
-    k = 2
-    
-    print(f"\nDữ liệu đầu vào ({len(data)} điểm):")
-    for i, (idx, row) in enumerate(df.iterrows(), 1):
-        print(f"  {idx}: ({row['x']}, {row['y']})")
-    
-    print(f"\nSố cụm k = {k}")
-    print("\n" + "-" * 60)
-    
+        print(df[columns])
+
     # Tạo và train model
-    kmeans = KMeansClustering(k=k, max_iters=100)
-    result = kmeans.fit(data, verbose=True)
-    
-    # Hiển thị kết quả
-    print("\n" + "=" * 60)
-    print("KẾT QUẢ:")
-    print("=" * 60)
-    print(f"Số lần lặp: {result['iterations']}")
-    print(f"SSE (Sum of Squared Errors): {result['sse']:.4f}")
-    
-    print("\nCentroids cuối cùng:")
-    for i, centroid in enumerate(result['centroids']):
-        print(f"  Cụm {i}: ({centroid[0]:.4f}, {centroid[1]:.4f})")
-    
-    print("\nPhân cụm:")
-    for i in range(k):
-        cluster_key = f'cluster_{i}'
-        cluster_points = result['clusters'][cluster_key]
-        print(f"\n  Cụm {i} ({len(cluster_points)} điểm):")
-        for point in cluster_points:
-            print(f"    ({point[0]:.4f}, {point[1]:.4f})")
-    
-    # Vẽ biểu đồ
-    plot_clustering_result(data, result, "Bài 1: K-Means với k=2")
-    
-    return result
+    if seed is not None:
+        np.random.seed(seed)
+    kmeans = KMeansClustering(k=k, max_iters=max_iters)
+    result = kmeans.fit(data, verbose=small, record_history=small, include_points=False)
+    labels = kmeans.labels
+    centroids = kmeans.centroids
 
+    print_result(data, labels, centroids, result, show_points=small)
 
-# ====================================================================
-# BÀI 2: Gom cụm k = 3 với 9 điểm
-# ====================================================================
-def run_example_2():
-    print("\n\n" + "=" * 60)
-    print("BÀI 2: Gom cụm k = 3 với 9 điểm")
-    print("=" * 60)
-    
-    # Đọc dữ liệu từ file CSV
-    try:
-        df = pd.read_csv(BAI2_FILE, index_col=0)
-        print(f"\nĐã load dữ liệu từ: {BAI2_FILE}")
-        print(f"Số điểm: {len(df)}")
-        print("\nDữ liệu:")
-        print(df)
-    except FileNotFoundError:
-        print(f"Lỗi: Không tìm thấy file {BAI2_FILE}")
-        return None
-    
-    # Lấy tọa độ x, y
-    data = df[['x', 'y']].values
-    k = 3
-    
-    print(f"\nDữ liệu đầu vào ({len(data)} điểm):")
-    for i, (idx, row) in enumerate(df.iterrows(), 1):
-        print(f"  {idx}: ({row['x']}, {row['y']})")
-    
-    print(f"\nSố cụm k = {k}")
-    print("\n" + "-" * 60)
-    
-    # Tạo và train model
-    kmeans = KMeansClustering(k=k, max_iters=100)
-    result = kmeans.fit(data, verbose=True)
-    
-    # Hiển thị kết quả
+    os.makedirs(output_dir, exist_ok=True)
+    csv_file = os.path.join(output_dir, f"kmeans_result_{stem}.csv")
+    save_results_to_csv(df, columns, labels, centroids, csv_file)
+
+    image_file = None
+    if plot:
+        image_file = os.path.join(output_dir, f"{stem}_k{k}.{image_format}")
+        plot_clustering_result(data, labels, centroids, title, image_file, dpi=dpi, show=show)
+
+    return {
+        'file': path,
+        'k': k,
+        'n_points': len(data),
+        'iterations': result['iterations'],
+        'sse': result['sse'],
+        'csv': csv_file,
+        'image': image_file,
+    }
+
+
+def print_result(data: np.ndarray, labels: np.ndarray, centroids: np.ndarray,
+                 result: Dict[str, Any], show_points: bool):
+    """In kết quả; chỉ liệt kê từng điểm khi dữ liệu nhỏ."""
     print("\n" + "=" * 60)
     print("KẾT QUẢ:")
     print("=" * 60)
     print(f"Số lần lặp: {result['iterations']}")
     print(f"SSE (Sum of Squared Errors): {result['sse']:.4f}")
-    
+
     print("\nCentroids cuối cùng:")
-    for i, centroid in enumerate(result['centroids']):
-        print(f"  Cụm {i}: ({centroid[0]:.4f}, {centroid[1]:.4f})")
-    
+    for i, centroid in enumerate(centroids):
+        print(f"  Cụm {i}: ({', '.join(f'{v:.4f}' for v in centroid)})")
+
     print("\nPhân cụm:")
-    for i in range(k):
-        cluster_key = f'cluster_{i}'
-        cluster_points = result['clusters'][cluster_key]
-        print(f"\n  Cụm {i} ({len(cluster_points)} điểm):")
-        for point in cluster_points:
-            print(f"    ({point[0]:.4f}, {point[1]:.4f})")
-    
-    # Vẽ biểu đồ
-    plot_clustering_result(data, result, "Bài 2: K-Means với k=3")
-    
-    return result
+    sizes = np.bincount(labels, minlength=len(centroids))
+    for i in range(len(centroids)):
+        print(f"\n  Cụm {i} ({sizes[i]} điểm)" + (":" if show_points else ""))
+        if show_points:
+            for point in data[labels == i]:
+                print(f"    ({', '.join(f'{v:.4f}' for v in point)})")
 
 
 # ====================================================================
 # Hàm vẽ biểu đồ kết quả
 # ====================================================================
-def plot_clustering_result(data, result, title):
-    """Vẽ biểu đồ scatter plot cho kết quả clustering."""
-    colors = ['red', 'blue', 'green', 'orange', 'purple', 'brown', 'pink', 'gray']
-    
-    plt.figure(figsize=(10, 8))
-    
+def plot_clustering_result(data: np.ndarray, labels: np.ndarray, centroids: np.ndarray,
+                           title: str, output_file: str, dpi: int = 150, show: bool = False):
+    """
+    Vẽ scatter plot kết quả clustering (2 chiều đầu tiên) và lưu ra file.
+
+    Đường nối điểm -> centroid được vẽ bằng một LineCollection duy nhất thay
+    vì một lần plt.plot cho mỗi điểm; với dữ liệu lớn các lớp điểm/đường
+    được raster hóa. Mặc định dùng Figure + canvas Agg (không qua pyplot,
+    không cần màn hình); show=True mới dùng pyplot để mở cửa sổ.
+    """
+    from matplotlib.collections import LineCollection
+
+    if show:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=(10, 8))
+    else:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=(10, 8))
+        FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    xy = _plot_coordinates(data)
+    centroids_xy = _plot_coordinates(centroids)
+    large = len(xy) >= RASTERIZE_THRESHOLD
+    point_size = 100 if not large else max(1.0, 100 * RASTERIZE_THRESHOLD / len(xy))
+
+    # Vẽ đường nối từ điểm đến centroid (một collection cho mọi điểm)
+    segments = np.stack([xy, centroids_xy[labels]], axis=1)
+    ax.add_collection(LineCollection(segments, colors='k', linestyles='--', alpha=0.3,
+                                     linewidths=0.5, rasterized=large, zorder=1))
+
     # Vẽ các điểm theo cụm
-    for i in range(result['k']):
-        cluster_key = f'cluster_{i}'
-        cluster_points = result['clusters'][cluster_key]
-        if cluster_points:
-            cluster_array = np.array(cluster_points)
-            plt.scatter(cluster_array[:, 0], cluster_array[:, 1], 
-                       c=colors[i % len(colors)], label=f'Cụm {i}', 
-                       s=100, alpha=0.6, edgecolors='black', linewidths=1)
-    
+    for i in range(len(centroids)):
+        cluster_xy = xy[labels == i]
+        if len(cluster_xy):
+            ax.scatter(cluster_xy[:, 0], cluster_xy[:, 1],
+                       c=COLORS[i % len(COLORS)], label=f'Cụm {i}',
+                       s=point_size, alpha=0.6, edgecolors='black' if not large else 'none',
+                       linewidths=1, rasterized=large, zorder=2)
+
     # Vẽ centroids
-    centroids = np.array(result['centroids'])
-    plt.scatter(centroids[:, 0], centroids[:, 1], 
+    ax.scatter(centroids_xy[:, 0], centroids_xy[:, 1],
                c='black', marker='*', s=500, label='Centroids',
-               edgecolors='yellow', linewidths=2)
-    
-    # Vẽ đường nối từ điểm đến centroid
-    labels = result['labels']
-    for i, point in enumerate(data):
-        cluster_id = labels[i]
-        centroid = centroids[cluster_id]
-        plt.plot([point[0], centroid[0]], [point[1], centroid[1]], 
-                'k--', alpha=0.3, linewidth=0.5)
-    
-    plt.xlabel('X', fontsize=12)
-    plt.ylabel('Y', fontsize=12)
-    plt.title(title, fontsize=14, fontweight='bold')
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    
-    # Lưu biểu đồ vào thư mục data
-    output_file = os.path.join(DATA_DIR, f"{title.replace(' ', '_').replace(':', '')}.png")
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+               edgecolors='yellow', linewidths=2, zorder=3)
+
+    ax.set_xlabel('X', fontsize=12)
+    ax.set_ylabel('Y', fontsize=12)
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+
+    fig.savefig(output_file, dpi=dpi, bbox_inches='tight')
     print(f"\nĐã lưu biểu đồ: {output_file}")
-    plt.show()
+    if show:
+        plt.show()
+        plt.close(fig)
+
+
+def _plot_coordinates(points: np.ndarray) -> np.ndarray:
+    """Hai chiều đầu tiên để vẽ (dữ liệu 1 chiều: y = 0)."""
+    if points.shape[1] >= 2:
+        return points[:, :2]
+    return np.column_stack([points[:, 0], np.zeros(len(points))])
 
 
 # ====================================================================
 # Hàm lưu kết quả ra file CSV
 # ====================================================================
-def save_results_to_csv(result, df_original, filename):
+def save_results_to_csv(df_original: pd.DataFrame, columns: List[str], labels: np.ndarray,
+                        centroids: np.ndarray, output_file: str):
     """Lưu kết quả clustering ra file CSV."""
-    output_file = os.path.join(DATA_DIR, filename)
-    
     # Tạo DataFrame từ dữ liệu gốc
     df_result = df_original.copy()
-    df_result['cluster'] = result['labels']
-    df_result['centroid_x'] = [result['centroids'][label][0] for label in result['labels']]
-    df_result['centroid_y'] = [result['centroids'][label][1] for label in result['labels']]
-    
+    df_result['cluster'] = labels
+    assigned = centroids[labels]
+    for j, column in enumerate(columns):
+        df_result[f'centroid_{column}'] = assigned[:, j]
+
     # Tính khoảng cách đến centroid
-    df_result['distance_to_centroid'] = np.sqrt(
-        (df_result['x'] - df_result['centroid_x'])**2 + (df_result['y'] - df_result['centroid_y'])**2
-    )
-    
+    df_result['distance_to_centroid'] = np.linalg.norm(df_original[columns].to_numpy(dtype=np.float64) - assigned,
+                                                       axis=1)
+
     df_result.to_csv(output_file, index=True)
     print(f"Đã lưu kết quả: {output_file}")
 
@@ -206,26 +222,91 @@ def save_results_to_csv(result, df_original, filename):
 # ====================================================================
 # MAIN
 # ====================================================================
-if __name__ == "__main__":
+def parse_dataset_spec(spec: str, default_k: Optional[int]) -> Tuple[str, int]:
+    """'đường/dẫn.csv[:k]' -> (đường dẫn, k)."""
+    path, sep, k = spec.rpartition(':')
+    if sep and k.isdigit() and path:
+        return path, int(k)
+    if default_k is None:
+        raise argparse.ArgumentTypeError(f"Thiếu k cho '{spec}' (dùng '{spec}:k' hoặc -k)")
+    return spec, default_k
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Train K-Means trên một hoặc nhiều file CSV.")
+    parser.add_argument('datasets', nargs='*',
+                        help="File CSV (cột đầu là chỉ số), có thể kèm k: 'data.csv:3'. "
+                             "Mặc định: Bài 1 (k=2) và Bài 2 (k=3)")
+    parser.add_argument('-k', type=int, default=None, help="Số cụm cho các file không ghi kèm k")
+    parser.add_argument('-o', '--output-dir', default=DATA_DIR,
+                        help="Thư mục lưu ảnh và CSV kết quả (mặc định: thư mục data)")
+    parser.add_argument('-c', '--columns', default=None,
+                        help="Các cột dùng để gom cụm, ví dụ 'x,y' (mặc định: mọi cột số)")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="Số tiến trình xử lý song song (mặc định: số CPU, tối đa số dataset)")
+    parser.add_argument('--max-iters', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=None, help="Seed khởi tạo centroids")
+    parser.add_argument('--dpi', type=int, default=150)
+    parser.add_argument('--format', dest='image_format', choices=['png', 'pdf', 'svg'], default='png')
+    parser.add_argument('--no-plot', action='store_true', help="Không vẽ biểu đồ")
+    parser.add_argument('--show', action='store_true',
+                        help="Mở cửa sổ biểu đồ (cần màn hình; chạy tuần tự)")
+    return parser
+
+
+def _run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return run_dataset(**job)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Lỗi: {job['path']}: {e}", file=sys.stderr)
+        return {'file': job['path'], 'k': job['k'], 'error': str(e)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    common = {
+        'output_dir': args.output_dir,
+        'columns': args.columns.split(',') if args.columns else None,
+        'max_iters': args.max_iters,
+        'seed': args.seed,
+        'dpi': args.dpi,
+        'image_format': args.image_format,
+        'plot': not args.no_plot,
+        'show': args.show,
+    }
+    if args.datasets:
+        try:
+            specs = [parse_dataset_spec(spec, args.k) + (None,) for spec in args.datasets]
+        except argparse.ArgumentTypeError as e:
+            build_parser().error(str(e))
+    else:
+        specs = DEFAULT_DATASETS
+    jobs = [{'path': path, 'k': k, 'title': title, **common} for path, k, title in specs]
+
     print("\n" + "=" * 60)
     print("K-MEANS CLUSTERING - TRAINING SCRIPT")
     print("=" * 60)
-    
-    # Chạy Bài 1
-    result1 = run_example_1()
-    if result1:
-        # Đọc lại file để lấy DataFrame gốc
-        df1 = pd.read_csv(BAI1_FILE, index_col=0)
-        save_results_to_csv(result1, df1, "kmeans_result_bai1.csv")
-    
-    # Chạy Bài 2
-    result2 = run_example_2()
-    if result2:
-        # Đọc lại file để lấy DataFrame gốc
-        df2 = pd.read_csv(BAI2_FILE, index_col=0)
-        save_results_to_csv(result2, df2, "kmeans_result_bai2.csv")
-    
+
+    n_workers = 1 if args.show else min(args.jobs or os.cpu_count() or 1, len(jobs))
+    if n_workers <= 1:
+        results = [_run_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(_run_job, jobs))
+
     print("\n" + "=" * 60)
+    print("TÓM TẮT:")
+    for summary in results:
+        if 'error' in summary:
+            print(f"  {summary['file']} (k={summary['k']}): LỖI - {summary['error']}")
+        else:
+            print(f"  {summary['file']} (k={summary['k']}): {summary['n_points']} điểm, "
+                  f"{summary['iterations']} vòng lặp, SSE = {summary['sse']:.4f}")
     print("HOÀN TẤT!")
     print("=" * 60)
+    return 1 if any('error' in summary for summary in results) else 0
+
 
+if __name__ == "__main__":
+    sys.exit(main())